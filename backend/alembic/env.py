@@ -9,7 +9,7 @@ from app.db.base import Base
 from app.core.settings import settings
 
 # Import all ORM models here so Alembic can discover them
-from app.db.models import JobORM  # noqa: E402,F401
+from app.db.models import JobORM, JobArchiveORM, IdempotencyKeyORM, InferredSchemaORM  # noqa: E402,F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,32 @@
+"""add CSV_FILTER job type
+
+Revision ID: 5d2b9e7a4f18
+Revises: 8f1a6d3e5c24
+Create Date: 2026-10-19 16:52:46.819166
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b9e7a4f18'
+down_revision: Union[str, Sequence[str], None] = '8f1a6d3e5c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used inside the transaction that adds it.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_type ADD VALUE IF NOT EXISTS 'CSV_FILTER'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop a value from an enum type. The value stays;
+    # older code has no processor for it, so drain these jobs first.
+    pass
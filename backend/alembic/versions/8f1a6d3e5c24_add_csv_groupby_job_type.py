@@ -0,0 +1,32 @@
+"""add CSV_GROUPBY job type
+
+Revision ID: 8f1a6d3e5c24
+Revises: 3c8d2f6b1e97
+Create Date: 2026-10-19 16:35:03.532510
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f1a6d3e5c24'
+down_revision: Union[str, Sequence[str], None] = '3c8d2f6b1e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used inside the transaction that adds it.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_type ADD VALUE IF NOT EXISTS 'CSV_GROUPBY'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop a value from an enum type. The value stays;
+    # older code has no processor for it, so drain these jobs first.
+    pass
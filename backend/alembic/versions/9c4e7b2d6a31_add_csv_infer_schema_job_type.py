@@ -0,0 +1,46 @@
+"""add CSV_INFER_SCHEMA job type and inferred_schemas
+
+Revision ID: 9c4e7b2d6a31
+Revises: 5d2b9e7a4f18
+Create Date: 2026-10-19 17:11:43.199126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e7b2d6a31'
+down_revision: Union[str, Sequence[str], None] = '5d2b9e7a4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('inferred_schemas',
+    sa.Column('etag', sa.String(length=255), nullable=False),
+    sa.Column('dialect', sa.String(length=128), nullable=False),
+    sa.Column('input_file_path', sa.String(), nullable=False),
+    sa.Column('full', sa.Boolean(), nullable=False),
+    sa.Column('schema', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('etag', 'dialect')
+    )
+    op.create_index('ix_inferred_schemas_expires_at', 'inferred_schemas', ['expires_at'], unique=False)
+
+    # A new enum value cannot be used inside the transaction that adds it.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_type ADD VALUE IF NOT EXISTS 'CSV_INFER_SCHEMA'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inferred_schemas_expires_at', table_name='inferred_schemas')
+    op.drop_table('inferred_schemas')
+    # Postgres cannot drop a value from an enum type. The value stays;
+    # older code has no processor for it, so drain these jobs first.
@@ -0,0 +1,33 @@
+"""add job progress and started_at
+
+Revision ID: a4d8e2f61b07
+Revises: f19d5c7e3a42
+Create Date: 2026-10-19 14:24:22.536775
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2f61b07'
+down_revision: Union[str, Sequence[str], None] = 'f19d5c7e3a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('jobs', 'jobs_archive'):
+        op.add_column(table, sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+        op.add_column(table, sa.Column('progress', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('jobs', 'jobs_archive'):
+        op.drop_column(table, 'progress')
+        op.drop_column(table, 'started_at')
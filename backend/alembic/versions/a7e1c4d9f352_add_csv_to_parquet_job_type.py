@@ -0,0 +1,32 @@
+"""add CSV_TO_PARQUET job type
+
+Revision ID: a7e1c4d9f352
+Revises: d3a8f2c6e915
+Create Date: 2026-10-19 15:43:23.643782
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e1c4d9f352'
+down_revision: Union[str, Sequence[str], None] = 'd3a8f2c6e915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used inside the transaction that adds it.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_type ADD VALUE IF NOT EXISTS 'CSV_TO_PARQUET'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop a value from an enum type. The value stays;
+    # older code has no processor for it, so drain these jobs first.
+    pass
@@ -0,0 +1,155 @@
+"""partition jobs by created_at and add jobs_archive
+
+Revision ID: b5e1d9a0c3f7
+Revises: f4457f8e8b3f
+Create Date: 2026-10-19 09:12:44.301552
+
+The existing `jobs` table is not rewritten. It is renamed to `jobs_legacy`
+and attached as the first partition of a new range-partitioned `jobs`
+table, covering everything up to the start of next month. Every index the
+partitioned parent needs is built CONCURRENTLY on the old table first and
+the range CHECK is validated online, so the only ACCESS EXCLUSIVE section
+is the rename/attach swap, which is metadata-only.
+
+ATTACH PARTITION only reuses a child index for the parent's primary key if
+that index backs a constraint itself, so the (job_id, created_at) index is
+promoted to a UNIQUE constraint (a catalog-only change) before the swap.
+Without it the attach would build a new unique index over the whole table
+while holding the lock.
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1d9a0c3f7'
+down_revision: Union[str, Sequence[str], None] = 'f4457f8e8b3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PARTITION_MONTHS_AHEAD = 3
+
+# (legacy index name, parent index name, definition)
+INDEXES = [
+    ("ix_jobs_legacy_status", "ix_jobs_status", "(status)"),
+    ("ix_jobs_legacy_status_created_at", "ix_jobs_status_created_at", "(status, created_at)"),
+    ("ix_jobs_legacy_status_next_run_at", "ix_jobs_status_next_run_at", "(status, next_run_at)"),
+    ("ix_jobs_legacy_job_type", "ix_jobs_job_type", "(job_type)"),
+    ("ix_jobs_legacy_created_at", "ix_jobs_created_at", "(created_at)"),
+    (
+        "ix_jobs_legacy_claimable",
+        "ix_jobs_claimable",
+        "(created_at) WHERE status IN ('QUEUED', 'RETRYING')",
+    ),
+]
+
+# Indexes that only exist after this migration and must be pre-built online.
+NEW_INDEXES = {"ix_jobs_created_at", "ix_jobs_claimable"}
+
+
+def _month_start(year: int, month: int) -> datetime:
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _months_from(start: datetime, count: int):
+    for i in range(count):
+        lower = _month_start(start.year, start.month + i)
+        upper = _month_start(start.year, start.month + i + 1)
+        yield lower, upper
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    now = datetime.now(timezone.utc)
+    cutoff = _month_start(now.year, now.month + 1)
+
+    # --- Online preparation (no long-held locks) ---
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS jobs_legacy_job_id_created_at_key "
+            "ON jobs (job_id, created_at)"
+        )
+        # metadata only: the constraint takes over the index just built
+        op.execute(
+            "ALTER TABLE jobs ADD CONSTRAINT jobs_legacy_job_id_created_at_key "
+            "UNIQUE USING INDEX jobs_legacy_job_id_created_at_key"
+        )
+        for _, parent_name, definition in INDEXES:
+            if parent_name in NEW_INDEXES:
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {parent_name} ON jobs {definition}"
+                )
+        op.execute(
+            "ALTER TABLE jobs ADD CONSTRAINT ck_jobs_legacy_range "
+            f"CHECK (created_at < '{cutoff.isoformat()}') NOT VALID"
+        )
+        op.execute("ALTER TABLE jobs VALIDATE CONSTRAINT ck_jobs_legacy_range")
+
+    # --- Swap (metadata only) ---
+    op.execute("LOCK TABLE jobs IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER TABLE jobs RENAME TO jobs_legacy")
+    op.execute("ALTER TABLE jobs_legacy RENAME CONSTRAINT jobs_pkey TO jobs_legacy_pkey")
+    for legacy_name, parent_name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {parent_name} RENAME TO {legacy_name}")
+
+    op.execute(
+        "CREATE TABLE jobs (LIKE jobs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER TABLE jobs DROP CONSTRAINT ck_jobs_legacy_range")
+    op.execute("ALTER TABLE jobs ADD CONSTRAINT jobs_pkey PRIMARY KEY (job_id, created_at)")
+    op.execute(
+        "ALTER TABLE jobs ATTACH PARTITION jobs_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{cutoff.isoformat()}')"
+    )
+    op.execute("ALTER TABLE jobs_legacy DROP CONSTRAINT ck_jobs_legacy_range")
+
+    # Matching indexes on jobs_legacy are attached instead of rebuilt.
+    for _, parent_name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {parent_name} ON jobs {definition}")
+
+    for lower, upper in _months_from(cutoff, PARTITION_MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE jobs_p{lower:%Y_%m} PARTITION OF jobs "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+    op.execute("CREATE TABLE jobs_default PARTITION OF jobs DEFAULT")
+
+    # --- Archive ---
+    op.execute(
+        "CREATE TABLE jobs_archive (LIKE jobs INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute(
+        "ALTER TABLE jobs_archive ADD CONSTRAINT jobs_archive_pkey "
+        "PRIMARY KEY (job_id, created_at)"
+    )
+    op.execute("CREATE TABLE jobs_archive_default PARTITION OF jobs_archive DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("LOCK TABLE jobs IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER TABLE jobs DETACH PARTITION jobs_legacy")
+
+    # Fold newer partitions and the archive back into the single table.
+    op.execute("INSERT INTO jobs_legacy SELECT * FROM jobs")
+    op.execute("INSERT INTO jobs_legacy SELECT * FROM jobs_archive")
+    op.execute("DROP TABLE jobs_archive")
+    op.execute("DROP TABLE jobs")
+
+    op.execute("ALTER TABLE jobs_legacy RENAME TO jobs")
+    op.execute("ALTER TABLE jobs RENAME CONSTRAINT jobs_legacy_pkey TO jobs_pkey")
+    op.execute("ALTER TABLE jobs DROP CONSTRAINT IF EXISTS jobs_legacy_job_id_created_at_key")
+    for legacy_name, parent_name, _ in INDEXES:
+        if parent_name in NEW_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {legacy_name}")
+        else:
+            op.execute(f"ALTER INDEX {legacy_name} RENAME TO {parent_name}")
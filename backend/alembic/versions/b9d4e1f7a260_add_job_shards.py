@@ -0,0 +1,47 @@
+"""add parent/child columns for sharded jobs
+
+Revision ID: b9d4e1f7a260
+Revises: e2b7c5a8f603
+Create Date: 2026-10-19 15:13:07.098695
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4e1f7a260'
+down_revision: Union[str, Sequence[str], None] = 'e2b7c5a8f603'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('jobs', 'jobs_archive'):
+        op.add_column(table, sa.Column('parent_job_id', postgresql.UUID(as_uuid=True), nullable=True))
+        op.add_column(table, sa.Column('shard_index', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('shard_count', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('shards_pending', sa.Integer(), nullable=True))
+
+    op.create_index(
+        'ix_jobs_parent_job_id',
+        'jobs',
+        ['parent_job_id'],
+        unique=False,
+        postgresql_where=sa.text('parent_job_id IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_parent_job_id', table_name='jobs')
+
+    for table in ('jobs', 'jobs_archive'):
+        op.drop_column(table, 'shards_pending')
+        op.drop_column(table, 'shard_count')
+        op.drop_column(table, 'shard_index')
+        op.drop_column(table, 'parent_job_id')
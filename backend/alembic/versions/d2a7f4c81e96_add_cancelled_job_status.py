@@ -0,0 +1,33 @@
+"""add CANCELLED job status
+
+Revision ID: d2a7f4c81e96
+Revises: b5e1d9a0c3f7
+Create Date: 2026-10-19 14:03:27.845120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7f4c81e96'
+down_revision: Union[str, Sequence[str], None] = 'b5e1d9a0c3f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used inside the transaction that adds it.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_status ADD VALUE IF NOT EXISTS 'CANCELLED'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop a value from an enum type; park cancelled jobs
+    # as DEAD so older code never reads an unknown status.
+    op.execute("UPDATE jobs SET status = 'DEAD' WHERE status = 'CANCELLED'")
+    op.execute("UPDATE jobs_archive SET status = 'DEAD' WHERE status = 'CANCELLED'")
@@ -0,0 +1,31 @@
+"""add checkpoint column for resumable jobs
+
+Revision ID: d3a8f2c6e915
+Revises: b9d4e1f7a260
+Create Date: 2026-10-19 15:19:17.848973
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f2c6e915'
+down_revision: Union[str, Sequence[str], None] = 'b9d4e1f7a260'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('jobs', 'jobs_archive'):
+        op.add_column(table, sa.Column('checkpoint', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('jobs', 'jobs_archive'):
+        op.drop_column(table, 'checkpoint')
@@ -0,0 +1,32 @@
+"""add CSV_MULTI_SCAN job type
+
+Revision ID: e2b7c5a8f603
+Revises: c6f0a3d9b214
+Create Date: 2026-10-19 15:02:32.665271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c5a8f603'
+down_revision: Union[str, Sequence[str], None] = 'c6f0a3d9b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used inside the transaction that adds it.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE job_type ADD VALUE IF NOT EXISTS 'CSV_MULTI_SCAN'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop a value from an enum type. The value stays;
+    # older code has no processor for it, so drain these jobs first.
+    pass
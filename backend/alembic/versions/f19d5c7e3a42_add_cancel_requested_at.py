@@ -0,0 +1,31 @@
+"""add cancel_requested_at
+
+Revision ID: f19d5c7e3a42
+Revises: e8c3b6a2d915
+Create Date: 2026-10-19 14:22:45.681648
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19d5c7e3a42'
+down_revision: Union[str, Sequence[str], None] = 'e8c3b6a2d915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable, no default: metadata-only on every partition.
+    for table in ('jobs', 'jobs_archive'):
+        op.add_column(table, sa.Column('cancel_requested_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('jobs', 'jobs_archive'):
+        op.drop_column(table, 'cancel_requested_at')
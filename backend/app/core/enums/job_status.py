@@ -8,3 +8,4 @@ class JobStatus(str, Enum):
     FAILED = "FAILED"
     COMPLETED = "COMPLETED"
     DEAD = "DEAD"
+    CANCELLED = "CANCELLED"
@@ -5,4 +5,13 @@ class JobType(str, Enum):
     CSV_ROW_COUNT = "CSV_ROW_COUNT"
     CSV_COLUMN_STATS = "CSV_COLUMN_STATS"
     CSV_DEDUPLICATE = "CSV_DEDUPLICATE"
+    CSV_MULTI_SCAN = "CSV_MULTI_SCAN"
+    CSV_TO_PARQUET = "CSV_TO_PARQUET"
+    CSV_SORT = "CSV_SORT"
+    CSV_JOIN = "CSV_JOIN"
+    CSV_GROUPBY = "CSV_GROUPBY"
+    CSV_FILTER = "CSV_FILTER"
+    CSV_INFER_SCHEMA = "CSV_INFER_SCHEMA"
     JSON_CANONICALIZE = "JSON_CANONICALIZE"
+    NDJSON_CANONICALIZE = "NDJSON_CANONICALIZE"
+    NDJSON_VALIDATE = "NDJSON_VALIDATE"
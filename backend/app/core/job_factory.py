@@ -2,6 +2,8 @@ from app.models.job import Job
 from app.core.enums.job_type import JobType
 from app.core.enums.job_status import JobStatus
 from app.schemas.job import JobCreateRequest
+from app.core.compression import output_metadata
+from app.processors.csv.scanner import dialect_metadata
 
 def build_input_metadata(job_type: JobType, path: str, custom_metadata: dict) -> dict:
     """
@@ -13,12 +15,20 @@ def build_input_metadata(job_type: JobType, path: str, custom_metadata: dict) ->
         JobType.CSV_ROW_COUNT,
         JobType.CSV_COLUMN_STATS,
         JobType.CSV_DEDUPLICATE,
+        JobType.CSV_MULTI_SCAN,
+        JobType.CSV_TO_PARQUET,
+        JobType.CSV_SORT,
+        JobType.CSV_JOIN,
+        JobType.CSV_GROUPBY,
+        JobType.CSV_FILTER,
+        JobType.CSV_INFER_SCHEMA,
     }:
+        # the dialect is the caller's to choose, validated and with defaults filled in
         system_metadata = {
+            **dialect_metadata(custom_metadata or {}),
             "file_format": "CSV",
-            "delimiter": ",",
-            "has_header": True,
             "source_path": path,
+            "output_compression": output_metadata(custom_metadata or {}, path),
         }
         merged = dict(custom_metadata or {})
         merged.update(system_metadata)
@@ -29,6 +39,20 @@ def build_input_metadata(job_type: JobType, path: str, custom_metadata: dict) ->
             "file_format": "JSON",
             "canonical": True,
             "source_path": path,
+            "output_compression": output_metadata(custom_metadata or {}, path),
+        }
+        merged = dict(custom_metadata or {})
+        merged.update(system_metadata)
+        return merged
+
+    if job_type in {
+        JobType.NDJSON_CANONICALIZE,
+        JobType.NDJSON_VALIDATE,
+    }:
+        system_metadata = {
+            "file_format": "NDJSON",
+            "source_path": path,
+            "output_compression": output_metadata(custom_metadata or {}, path),
         }
         merged = dict(custom_metadata or {})
         merged.update(system_metadata)
@@ -44,3 +68,18 @@ def build_input_metadata(job_type: JobType, path: str, custom_metadata: dict) ->
         return merged
 
     raise ValueError(f"Unsupported job type: {job_type}")
+
+
+def additional_inputs(job_type: JobType, metadata: dict) -> dict[str, str]:
+    """
+    Objects in the input bucket a job reads besides its input_file_path,
+    by name. Workers download each next to the input; ValueError if the
+    metadata does not name them.
+    """
+    if job_type == JobType.CSV_JOIN:
+        right_input = (metadata or {}).get("right_input")
+        if not isinstance(right_input, str) or not right_input:
+            raise ValueError("Missing required metadata field 'right_input' for joining")
+        return {"right": right_input}
+
+    return {}
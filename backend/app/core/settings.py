@@ -46,6 +46,63 @@ class Settings(BaseSettings):
     MAILTRAP_SENDER_EMAIL: str = os.getenv("MAILTRAP_SENDER_EMAIL", "")
     MAILTRAP_SENDER_NAME: str = os.getenv("MAILTRAP_SENDER_NAME", "")
 
+    # --- Job retention / partitioning ---
+    JOB_ARCHIVE_RETENTION_DAYS: int = int(os.getenv("JOB_ARCHIVE_RETENTION_DAYS", 30))
+    JOB_ARCHIVE_BATCH_SIZE: int = int(os.getenv("JOB_ARCHIVE_BATCH_SIZE", 1000))
+    JOB_ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("JOB_ARCHIVE_INTERVAL_SECONDS", 3600))
+    JOB_PARTITION_MONTHS_AHEAD: int = int(os.getenv("JOB_PARTITION_MONTHS_AHEAD", 3))
+
+    # --- Worker ---
+    JOB_PROGRESS_PERSIST_SECONDS: float = float(os.getenv("JOB_PROGRESS_PERSIST_SECONDS", 2))
+    # Inputs of shardable job types at least this large are split into child
+    # jobs of about JOB_SHARD_MB each, at most JOB_MAX_SHARDS (0 disables)
+    JOB_SHARD_MIN_MB: int = int(os.getenv("JOB_SHARD_MIN_MB", 256))
+    JOB_SHARD_MB: int = int(os.getenv("JOB_SHARD_MB", 64))
+    JOB_MAX_SHARDS: int = int(os.getenv("JOB_MAX_SHARDS", 16))
+    # Unsharded inputs of those job types are scanned in segments of about
+    # this size, each saved as a checkpoint a retry resumes from (0 disables)
+    JOB_CHECKPOINT_MB: int = int(os.getenv("JOB_CHECKPOINT_MB", 64))
+
+    # --- Processors ---
+    # 0 means one process per available CPU
+    CSV_ROW_COUNT_WORKERS: int = int(os.getenv("CSV_ROW_COUNT_WORKERS", 0))
+    CSV_ROW_COUNT_CHUNK_MB: int = int(os.getenv("CSV_ROW_COUNT_CHUNK_MB", 16))
+    # Arrow/NumPy engine for numeric CSV jobs; falls back to the row scanner.
+    # Arrow reads ahead ~32 blocks, so peak memory is roughly 36 x CSV_BATCH_MB.
+    CSV_COLUMNAR_ENGINE: bool = os.getenv("CSV_COLUMNAR_ENGINE", "true").lower() == "true"
+    CSV_BATCH_MB: int = int(os.getenv("CSV_BATCH_MB", 2))
+    # CSV_TO_PARQUET types columns from the first PARQUET_SAMPLE_ROWS rows and
+    # writes a row group per PARQUET_ROW_GROUP_MB of CSV text (about what it holds in memory)
+    PARQUET_SAMPLE_ROWS: int = int(os.getenv("PARQUET_SAMPLE_ROWS", 10000))
+    PARQUET_ROW_GROUP_MB: int = int(os.getenv("PARQUET_ROW_GROUP_MB", 64))
+    PARQUET_COMPRESSION: str = os.getenv("PARQUET_COMPRESSION", "zstd")
+    # CSV_INFER_SCHEMA's sample unless its metadata says otherwise; inferred schemas
+    # are cached by input ETag for SCHEMA_CACHE_TTL_DAYS (purged by the archiver)
+    SCHEMA_SAMPLE_ROWS: int = int(os.getenv("SCHEMA_SAMPLE_ROWS", 10000))
+    SCHEMA_CACHE_TTL_DAYS: int = int(os.getenv("SCHEMA_CACHE_TTL_DAYS", 30))
+    # Digest index budget for CSV_DEDUPLICATE before it spills to disk
+    CSV_DEDUP_MEMORY_MB: int = int(os.getenv("CSV_DEDUP_MEMORY_MB", 64))
+    # CSV_SORT run generation holds about this much, shared by its processes (0 workers = one per CPU)
+    CSV_SORT_MEMORY_MB: int = int(os.getenv("CSV_SORT_MEMORY_MB", 128))
+    CSV_SORT_WORKERS: int = int(os.getenv("CSV_SORT_WORKERS", 0))
+    # CSV_JOIN's hash table on the smaller input before it partitions both inputs to disk
+    CSV_JOIN_MEMORY_MB: int = int(os.getenv("CSV_JOIN_MEMORY_MB", 128))
+    # CSV_GROUPBY's table of partial aggregates before it spills them to disk
+    CSV_GROUPBY_MEMORY_MB: int = int(os.getenv("CSV_GROUPBY_MEMORY_MB", 128))
+    # Encoded text one open JSON object/array may buffer before JSON_CANONICALIZE spools it to disk
+    JSON_CANONICAL_MEMORY_MB: int = int(os.getenv("JSON_CANONICAL_MEMORY_MB", 16))
+    # NDJSON jobs split the file at line boundaries across a process pool (0 = one per CPU)
+    NDJSON_WORKERS: int = int(os.getenv("NDJSON_WORKERS", 0))
+    NDJSON_CHUNK_MB: int = int(os.getenv("NDJSON_CHUNK_MB", 8))
+
+    # --- Preview ---
+    # POST /jobs/preview reads this many ranges of this size, spread over the object
+    PREVIEW_SAMPLES: int = int(os.getenv("PREVIEW_SAMPLES", 8))
+    PREVIEW_SAMPLE_KB: int = int(os.getenv("PREVIEW_SAMPLE_KB", 128))
+
+    # --- Idempotency ---
+    IDEMPOTENCY_KEY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
     # --- Computed properties ---
     @property
     def DATABASE_URL(self) -> str:
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+from typing import Callable, NamedTuple, Optional
 
 import boto3
 from botocore.client import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
+from app.core import compression
 from app.core.settings import settings
 from app.core.logging import setup_logging
 
 logger = setup_logging()
 
+RANGE_CHUNK_SIZE = 1024 * 1024
+# S3 parts must be at least 5 MiB, except the last
+UPLOAD_PART_SIZE = 8 * 1024 * 1024
+
 
 class StorageError(Exception):
     """Base exception for storage-related failures."""
@@ -21,6 +26,151 @@ class ObjectNotFound(StorageError):
     """Raised when an object does not exist."""
 
 
+class ObjectInfo(NamedTuple):
+    size: int
+    # quoted, as S3 returns it; changes whenever the object is rewritten
+    etag: str
+
+
+class UploadStream:
+    """
+    A binary writer whose bytes become one object. What fits in
+    UPLOAD_PART_SIZE is stored with a single PUT on `close()`; past that,
+    a multipart upload sends a part each time that much is buffered, so
+    memory stays at one part whatever the size. `abort()`, or leaving a
+    `with` block on an exception, discards the upload.
+    """
+
+    def __init__(self, client, bucket: str, object_key: str, extra_args: dict) -> None:
+        self._client = client
+        self._bucket = bucket
+        self._object_key = object_key
+        self._extra_args = extra_args
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: list[dict] = []
+        self._closed = False
+        # bytes written so far
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        self.size += len(data)
+        if len(self._buffer) >= UPLOAD_PART_SIZE:
+            self._send_part()
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self) -> None:
+        # parts go out as they fill; close() sends the rest
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return False
+
+    def seekable(self) -> bool:
+        return False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._upload_id is None:
+                self._client.put_object(
+                    Bucket=self._bucket, Key=self._object_key, Body=bytes(self._buffer), **self._extra_args
+                )
+            else:
+                if self._buffer:
+                    self._send_part()
+                self._client.complete_multipart_upload(
+                    Bucket=self._bucket,
+                    Key=self._object_key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+        except (BotoCoreError, ClientError) as e:
+            logger.error(
+                "Upload failed",
+                extra={"bucket": self._bucket, "object_key": self._object_key},
+                exc_info=True,
+            )
+            self.abort()
+            raise StorageError(
+                f"Failed to upload object '{self._object_key}' to bucket '{self._bucket}'"
+            ) from e
+
+        logger.debug(
+            "Upload successful",
+            extra={"bucket": self._bucket, "object_key": self._object_key, "parts": len(self._parts)},
+        )
+
+    def abort(self) -> None:
+        self._closed = True
+        self._buffer.clear()
+        if self._upload_id is None:
+            return
+        try:
+            self._client.abort_multipart_upload(
+                Bucket=self._bucket, Key=self._object_key, UploadId=self._upload_id
+            )
+        except (BotoCoreError, ClientError):
+            # left to the bucket's lifecycle rule for incomplete uploads
+            logger.warning(
+                "Failed to abort multipart upload",
+                extra={"bucket": self._bucket, "object_key": self._object_key},
+                exc_info=True,
+            )
+        self._upload_id = None
+
+    def _send_part(self) -> None:
+        try:
+            if self._upload_id is None:
+                self._upload_id = self._client.create_multipart_upload(
+                    Bucket=self._bucket, Key=self._object_key, **self._extra_args
+                )["UploadId"]
+
+            number = len(self._parts) + 1
+            response = self._client.upload_part(
+                Bucket=self._bucket,
+                Key=self._object_key,
+                UploadId=self._upload_id,
+                PartNumber=number,
+                Body=bytes(self._buffer),
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.error(
+                "Part upload failed",
+                extra={"bucket": self._bucket, "object_key": self._object_key},
+                exc_info=True,
+            )
+            self.abort()
+            raise StorageError(
+                f"Failed to upload object '{self._object_key}' to bucket '{self._bucket}'"
+            ) from e
+
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+        self._buffer.clear()
+
+    def __enter__(self) -> "UploadStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 class StorageClient:
     """
     S3-compatible storage client.
@@ -50,7 +200,17 @@ class StorageClient:
 
     # ---------- Public API ----------
 
-    def download_file(self, bucket: str, object_key: str, local_path: str) -> None:
+    def download_file(
+        self,
+        bucket: str,
+        object_key: str,
+        local_path: str,
+        on_chunk: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        """
+        `on_chunk(bytes_transferred)` is called as data arrives; raising from
+        it aborts the transfer (used for cancellation).
+        """
         logger.debug(
             "Downloading object",
             extra={
@@ -62,7 +222,7 @@ class StorageClient:
 
         try:
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            self._client.download_file(bucket, object_key, local_path)
+            self._client.download_file(bucket, object_key, local_path, Callback=on_chunk)
 
             logger.debug(
                 "Download successful",
@@ -99,7 +259,163 @@ class StorageClient:
             )
             raise StorageError("Storage backend error") from e
 
-    def upload_file(self, local_path: str, bucket: str, object_key: str, content_type: Optional[str] = None) -> None:
+    def download_range(
+        self,
+        bucket: str,
+        object_key: str,
+        local_path: str,
+        start: int,
+        end: int,
+        append: bool = False,
+        on_chunk: Optional[Callable[[int], None]] = None,
+        if_match: Optional[str] = None,
+    ) -> None:
+        """
+        Download bytes [start, end) of an object, appending them to
+        `local_path` when `append` is set. `on_chunk` works as in
+        `download_file()`; `if_match` as in `download_decompressed()`.
+        """
+        logger.debug(
+            "Downloading object range",
+            extra={
+                "bucket": bucket,
+                "object_key": object_key,
+                "local_path": local_path,
+                "range": [start, end],
+            },
+        )
+
+        try:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            conditions = {"IfMatch": if_match} if if_match else {}
+            response = self._client.get_object(
+                Bucket=bucket,
+                Key=object_key,
+                Range=f"bytes={start}-{end - 1}",
+                **conditions,
+            )
+            with open(local_path, "ab" if append else "wb") as f:
+                for chunk in response["Body"].iter_chunks(RANGE_CHUNK_SIZE):
+                    f.write(chunk)
+                    if on_chunk is not None:
+                        on_chunk(len(chunk))
+
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code")
+
+            logger.error(
+                "Range download failed",
+                extra={
+                    "bucket": bucket,
+                    "object_key": object_key,
+                    "error_code": error_code,
+                },
+                exc_info=True,
+            )
+
+            if error_code == "NoSuchKey":
+                raise ObjectNotFound(
+                    f"Object '{object_key}' not found in bucket '{bucket}'"
+                ) from e
+
+            raise StorageError(
+                f"Failed to download range of object '{object_key}' from bucket '{bucket}'"
+            ) from e
+
+        except BotoCoreError as e:
+            logger.error(
+                "Storage backend error during range download",
+                extra={"bucket": bucket, "object_key": object_key},
+                exc_info=True,
+            )
+            raise StorageError("Storage backend error") from e
+
+    def download_decompressed(
+        self,
+        bucket: str,
+        object_key: str,
+        local_path: str,
+        on_chunk: Optional[Callable[[int], None]] = None,
+        if_match: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Download an object to `local_path`, decompressing it on the way if
+        it is gzip, zstd or bz2 (`compression.detect()`). Returns the codec,
+        or None for a plain object. `on_chunk` gets the bytes transferred,
+        i.e. compressed ones, and works as in `download_file()`. With
+        `if_match`, a StorageError if the object's ETag is no longer that.
+        """
+        logger.debug(
+            "Downloading object",
+            extra={
+                "bucket": bucket,
+                "object_key": object_key,
+                "local_path": local_path,
+            },
+        )
+
+        try:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            conditions = {"IfMatch": if_match} if if_match else {}
+            body = self._client.get_object(Bucket=bucket, Key=object_key, **conditions)["Body"]
+
+            head = body.read(compression.MAGIC_BYTES)
+            if on_chunk is not None and head:
+                on_chunk(len(head))
+            codec = compression.detect(object_key, head)
+
+            stream = compression.PrefixedReader(head, body, on_chunk)
+            if codec is not None:
+                stream = compression.open_decompressed(stream, codec)
+
+            with open(local_path, "wb") as f:
+                for chunk in iter(lambda: stream.read(RANGE_CHUNK_SIZE), b""):
+                    f.write(chunk)
+
+            logger.debug(
+                "Download successful",
+                extra={"bucket": bucket, "object_key": object_key, "compression": codec},
+            )
+            return codec
+
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code")
+
+            logger.error(
+                "Download failed",
+                extra={
+                    "bucket": bucket,
+                    "object_key": object_key,
+                    "error_code": error_code,
+                },
+                exc_info=True,
+            )
+
+            if error_code == "NoSuchKey":
+                raise ObjectNotFound(
+                    f"Object '{object_key}' not found in bucket '{bucket}'"
+                ) from e
+
+            raise StorageError(
+                f"Failed to download object '{object_key}' from bucket '{bucket}'"
+            ) from e
+
+        except BotoCoreError as e:
+            logger.error(
+                "Storage backend error during download",
+                extra={"bucket": bucket, "object_key": object_key},
+                exc_info=True,
+            )
+            raise StorageError("Storage backend error") from e
+
+    def upload_file(
+        self,
+        local_path: str,
+        bucket: str,
+        object_key: str,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> None:
         logger.debug(
             "Uploading object",
             extra={
@@ -107,13 +423,18 @@ class StorageClient:
                 "object_key": object_key,
                 "local_path": local_path,
                 "content_type": content_type,
+                "content_encoding": content_encoding,
             },
         )
 
-        extra_args = {"ContentType": content_type} if content_type else None
+        extra_args = {}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        if content_encoding:
+            extra_args["ContentEncoding"] = content_encoding
 
         try:
-            self._client.upload_file(local_path, bucket, object_key, ExtraArgs=extra_args)
+            self._client.upload_file(local_path, bucket, object_key, ExtraArgs=extra_args or None)
 
             logger.debug(
                 "Upload successful",
@@ -134,6 +455,26 @@ class StorageClient:
                 f"Failed to upload object '{object_key}' to bucket '{bucket}'"
             ) from e
 
+    def open_upload(
+        self,
+        bucket: str,
+        object_key: str,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> UploadStream:
+        """A writer uploading to `object_key` as it goes, without a local file; see UploadStream."""
+        logger.debug(
+            "Streaming object upload",
+            extra={"bucket": bucket, "object_key": object_key, "content_type": content_type},
+        )
+
+        extra_args = {}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        if content_encoding:
+            extra_args["ContentEncoding"] = content_encoding
+        return UploadStream(self._client, bucket, object_key, extra_args)
+
     def object_exists(self, bucket: str, object_key: str) -> bool:
         logger.debug(
             "Checking object existence",
@@ -163,3 +504,78 @@ class StorageClient:
             raise StorageError(
                 f"Failed to check existence of object '{object_key}' in bucket '{bucket}'"
             ) from e
+
+    def object_info(self, bucket: str, object_key: str) -> ObjectInfo:
+        """Size and ETag of an object, from a HEAD request."""
+        try:
+            response = self._client.head_object(Bucket=bucket, Key=object_key)
+            return ObjectInfo(response["ContentLength"], response.get("ETag", ""))
+
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code")
+
+            if error_code in ("404", "NoSuchKey"):
+                raise ObjectNotFound(
+                    f"Object '{object_key}' not found in bucket '{bucket}'"
+                ) from e
+
+            logger.error(
+                "Failed to read object metadata",
+                extra={
+                    "bucket": bucket,
+                    "object_key": object_key,
+                    "error_code": error_code,
+                },
+                exc_info=True,
+            )
+            raise StorageError(
+                f"Failed to read metadata of object '{object_key}' in bucket '{bucket}'"
+            ) from e
+
+        except BotoCoreError as e:
+            logger.error(
+                "Storage backend error during HEAD",
+                extra={"bucket": bucket, "object_key": object_key},
+                exc_info=True,
+            )
+            raise StorageError("Storage backend error") from e
+
+    def read_range(self, bucket: str, object_key: str, start: int, end: int) -> bytes:
+        """Bytes [start, end) of an object, in memory; for small reads like samples."""
+        try:
+            response = self._client.get_object(
+                Bucket=bucket,
+                Key=object_key,
+                Range=f"bytes={start}-{end - 1}",
+            )
+            return response["Body"].read()
+
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code")
+
+            logger.error(
+                "Range read failed",
+                extra={
+                    "bucket": bucket,
+                    "object_key": object_key,
+                    "error_code": error_code,
+                },
+                exc_info=True,
+            )
+
+            if error_code == "NoSuchKey":
+                raise ObjectNotFound(
+                    f"Object '{object_key}' not found in bucket '{bucket}'"
+                ) from e
+
+            raise StorageError(
+                f"Failed to read range of object '{object_key}' from bucket '{bucket}'"
+            ) from e
+
+        except BotoCoreError as e:
+            logger.error(
+                "Storage backend error during range read",
+                extra={"bucket": bucket, "object_key": object_key},
+                exc_info=True,
+            )
+            raise StorageError("Storage backend error") from e
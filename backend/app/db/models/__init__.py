@@ -1,3 +1,5 @@
-from app.db.models.job import JobORM
+from app.db.models.job import JobORM, JobArchiveORM
+from app.db.models.idempotency_key import IdempotencyKeyORM
+from app.db.models.inferred_schema import InferredSchemaORM
 
-__all__ = ["JobORM"]
+__all__ = ["JobORM", "JobArchiveORM", "IdempotencyKeyORM", "InferredSchemaORM"]
@@ -0,0 +1,47 @@
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class IdempotencyKeyORM(Base):
+    """
+    Remembers the outcome of a request sent with an `Idempotency-Key` header.
+
+    Kept outside the partitioned `jobs` table so the key can be globally
+    unique. Rows expire after IDEMPOTENCY_KEY_TTL_HOURS and are purged by
+    the archiver, which keeps the primary key index small.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    # Endpoint the key was used on, e.g. "POST /jobs"
+    scope = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+
+    # sha256 of the canonical request body; a reused key with a different
+    # body is rejected instead of silently returning the wrong result.
+    request_hash = Column(String(64), nullable=False)
+
+    job_id = Column(UUID(as_uuid=True), nullable=True)
+    response = Column(JSONB, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    expires_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+    )
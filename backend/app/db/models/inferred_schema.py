@@ -0,0 +1,50 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    String,
+    DateTime,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class InferredSchemaORM(Base):
+    """
+    A CSV schema inferred by CSV_INFER_SCHEMA, reused by later jobs on the
+    same object.
+
+    Keyed by the object's ETag, which changes whenever the object is
+    rewritten, so a row never describes other content; objects with the
+    same content share it. Rows expire after SCHEMA_CACHE_TTL_DAYS and are
+    purged by the archiver.
+    """
+
+    __tablename__ = "inferred_schemas"
+
+    __table_args__ = (
+        Index("ix_inferred_schemas_expires_at", "expires_at"),
+    )
+
+    etag = Column(String(255), primary_key=True)
+    # The CsvDialect the object was read in, as JSON (SchemaCache.key())
+    dialect = Column(String(128), primary_key=True)
+
+    # Object the schema was inferred from, for reference
+    input_file_path = Column(String, nullable=False)
+
+    # Inferred from every row rather than a sample
+    full = Column(Boolean, nullable=False)
+    schema = Column(JSONB, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    expires_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+    )
@@ -16,30 +16,14 @@ from app.core.enums.job_type import JobType
 import uuid
 
 
-class JobORM(Base):
-    __tablename__ = "jobs"
+class JobColumnsMixin:
+    """
+    Columns shared by the hot `jobs` table and the `jobs_archive` table.
 
-    __table_args__ = (
-        # --- CHECK CONSTRAINTS ---
-        CheckConstraint(
-            "retry_count >= 0",
-            name="ck_jobs_retry_count_non_negative",
-        ),
-        CheckConstraint(
-            "max_retries >= 0",
-            name="ck_jobs_max_retries_non_negative",
-        ),
-        CheckConstraint(
-            "retry_count <= max_retries",
-            name="ck_jobs_retry_count_lte_max_retries",
-        ),
-
-        # --- INDEXES ---
-        Index("ix_jobs_status", "status"),
-        Index("ix_jobs_status_created_at", "status", "created_at"),
-        Index("ix_jobs_status_next_run_at", "status", "next_run_at"),
-        Index("ix_jobs_job_type", "job_type"),
-    )
+    Both tables are range-partitioned by `created_at`, so it is part of the
+    primary key. Keep the column order in sync with the migrations: the
+    archiver moves rows between the two tables column by column.
+    """
 
     job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -71,6 +55,7 @@ class JobORM(Base):
 
     created_at = Column(
         DateTime(timezone=True),
+        primary_key=True,
         server_default=func.now(),
         nullable=False,
     )
@@ -91,3 +76,85 @@ class JobORM(Base):
         DateTime(timezone=True),
         nullable=True,
     )
+
+    # Set by DELETE /jobs/{id} while the job is PROCESSING; the worker
+    # turns it into CANCELLED once the processor notices.
+    cancel_requested_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+
+    # Start of the current attempt; used with `progress` to estimate an ETA.
+    started_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+
+    # {"rows_processed", "bytes_processed", "total_bytes", "updated_at"},
+    # written by the worker at a bounded rate while PROCESSING.
+    progress = Column(JSONB, nullable=True)
+
+    # Sharded jobs: every shard is a child job pointing at its parent. The
+    # parent stays PROCESSING while `shards_pending` counts down to zero.
+    # No foreign key: the partitioned primary key includes created_at.
+    parent_job_id = Column(UUID(as_uuid=True), nullable=True)
+    shard_index = Column(Integer, nullable=True)
+    shard_count = Column(Integer, nullable=True)
+    shards_pending = Column(Integer, nullable=True)
+
+    # {"size", "header", "ranges", "segments"}: the segments of the input
+    # scanned so far, so a retry resumes after the last one. Cleared on
+    # completion.
+    checkpoint = Column(JSONB, nullable=True)
+
+
+class JobORM(JobColumnsMixin, Base):
+    __tablename__ = "jobs"
+
+    __table_args__ = (
+        # --- CHECK CONSTRAINTS ---
+        CheckConstraint(
+            "retry_count >= 0",
+            name="ck_jobs_retry_count_non_negative",
+        ),
+        CheckConstraint(
+            "max_retries >= 0",
+            name="ck_jobs_max_retries_non_negative",
+        ),
+        CheckConstraint(
+            "retry_count <= max_retries",
+            name="ck_jobs_retry_count_lte_max_retries",
+        ),
+
+        # --- INDEXES ---
+        Index("ix_jobs_status", "status"),
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_status_next_run_at", "status", "next_run_at"),
+        Index("ix_jobs_job_type", "job_type"),
+        Index("ix_jobs_created_at", "created_at"),
+        Index(
+            "ix_jobs_claimable",
+            "created_at",
+            postgresql_where="status IN ('QUEUED', 'RETRYING')",
+        ),
+        Index(
+            "ix_jobs_parent_job_id",
+            "parent_job_id",
+            postgresql_where="parent_job_id IS NOT NULL",
+        ),
+
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class JobArchiveORM(JobColumnsMixin, Base):
+    """
+    Terminal jobs moved out of the hot table by the archiver.
+    Read-only from the application's point of view.
+    """
+
+    __tablename__ = "jobs_archive"
+
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
@@ -39,6 +39,20 @@ class Job:
 
     next_run_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
+    cancel_requested_at: Optional[datetime] = None
+
+    started_at: Optional[datetime] = None
+    progress: Optional[Dict[str, Any]] = None
+
+    # set on the shards of a sharded job (parent_job_id, shard_index) and
+    # on the job they were split from (shard_count, shards_pending)
+    parent_job_id: Optional[UUID] = None
+    shard_index: Optional[int] = None
+    shard_count: Optional[int] = None
+    shards_pending: Optional[int] = None
+
+    # segments of the input already scanned by earlier attempts
+    checkpoint: Optional[Dict[str, Any]] = None
 
     def __post_init__(self):
         if self.job_type is None:
@@ -60,17 +74,25 @@ class Job:
 
     def can_transition_to(self, new_status: JobStatus) -> bool:
         allowed = {
-            JobStatus.CREATED: {JobStatus.QUEUED},
-            JobStatus.QUEUED: {JobStatus.PROCESSING},
+            JobStatus.CREATED: {JobStatus.QUEUED, JobStatus.CANCELLED},
+            JobStatus.QUEUED: {JobStatus.PROCESSING, JobStatus.CANCELLED},
             JobStatus.PROCESSING: {
                 JobStatus.COMPLETED,
                 JobStatus.FAILED,
+                JobStatus.CANCELLED,
             },
             JobStatus.FAILED: {
                 JobStatus.RETRYING,
                 JobStatus.DEAD,
+                JobStatus.CANCELLED,
             },
-            JobStatus.RETRYING: {JobStatus.QUEUED, JobStatus.PROCESSING},
+            JobStatus.RETRYING: {
+                JobStatus.QUEUED,
+                JobStatus.PROCESSING,
+                JobStatus.CANCELLED,
+            },
+            # DEAD only leaves via an explicit cancel (discard).
+            JobStatus.DEAD: {JobStatus.CANCELLED},
         }
 
         return new_status in allowed.get(self.status, set())
@@ -82,7 +104,7 @@ class Job:
         error_message: Optional[str] = None,
         next_run_at: Optional[datetime] = None,
     ):
-        if self.status in {JobStatus.COMPLETED, JobStatus.DEAD}:
+        if self.status in {JobStatus.COMPLETED, JobStatus.CANCELLED}:
             raise ValueError("Cannot transition from terminal state")
 
         if not self.can_transition_to(new_status):
@@ -98,9 +120,59 @@ class Job:
         if new_status == JobStatus.RETRYING:
             self.next_run_at = next_run_at
 
-        if new_status in {JobStatus.COMPLETED, JobStatus.DEAD}:
+        if new_status in {JobStatus.COMPLETED, JobStatus.DEAD, JobStatus.CANCELLED}:
             self.finished_at = utc_now()
 
+    def progress_estimate(self) -> tuple[Optional[float], Optional[datetime]]:
+        """
+        (percent complete, estimated finish time) from the last persisted
+        progress snapshot, extrapolating the byte rate since `started_at`.
+        """
+        if self.status == JobStatus.COMPLETED:
+            return 100.0, self.finished_at
+
+        if self.status != JobStatus.PROCESSING or not self.progress:
+            return None, None
+
+        done = self.progress.get("bytes_processed") or 0
+        total = self.progress.get("total_bytes")
+        if not total:
+            return None, None
+
+        percent = round(min(done / total, 1.0) * 100, 1)
+
+        reported_at = self.progress.get("updated_at")
+        if not (done and reported_at and self.started_at):
+            return percent, None
+
+        reported_at = datetime.fromisoformat(reported_at)
+        elapsed = (reported_at - self.started_at).total_seconds()
+        if elapsed <= 0:
+            return percent, None
+
+        rate = done / elapsed
+        return percent, reported_at + timedelta(seconds=(total - done) / rate)
+
+    def attempt_key(self) -> Optional[str]:
+        """Identifies the current attempt; the shards of a sharded job carry their parent's."""
+        return self.started_at.isoformat() if self.started_at else None
+
+    def can_cancel_immediately(self) -> bool:
+        """
+        Jobs not held by a worker are cancelled without asking the worker;
+        cancelling a DEAD job discards it, as the bulk cancel does.
+        """
+        if self.status == JobStatus.PROCESSING:
+            # a sharded job waiting for its shards has no worker of its own
+            return bool(self.shards_pending)
+        return self.status in {
+            JobStatus.CREATED,
+            JobStatus.QUEUED,
+            JobStatus.RETRYING,
+            JobStatus.FAILED,
+            JobStatus.DEAD,
+        }
+
     def should_notify(self, event) -> bool:
         """
         Determines whether a notification should be sent for a given event.
@@ -1,12 +1,176 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from pathlib import Path
+from typing import BinaryIO, ContextManager, Dict, Any, List
+
+from app.processors.csv.schema import SchemaCache
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.results import ResultWriter
+
+class ScanOperator(ABC):
+    """
+    Streaming form of a processor, so several of them can share one pass
+    over the same CSV (see CSV_MULTI_SCAN).
+
+    `start()` receives the header row, `consume()` every following batch of
+    rows exactly as `csv.reader` yields them (blank lines included, as
+    empty lists), and `finalize()` returns this operator's section of the
+    combined result. Without a header (`has_header: false`) `start()` gets
+    generated column names and the first record is part of the first
+    batch; see app/processors/csv/scanner.py. `close()` is always called
+    last, also when the scan fails, and should release anything the
+    operator holds open.
+
+    Operators of shardable processors also implement `partial()` and
+    `reduce()`, so a large input can be scanned as shards by several
+    workers (see app/workers/sharding.py).
+    """
+
+    def start(self, header: List[str]) -> None:
+        pass
+
+    @abstractmethod
+    def consume(self, rows: List[List[str]]) -> None:
+        pass
+
+    @abstractmethod
+    def finalize(self) -> Dict[str, Any]:
+        pass
+
+    def partial(self) -> Dict[str, Any]:
+        """
+        Called instead of `finalize()` after scanning one shard: this
+        operator's state as JSON-serializable data. Files it refers to
+        must be written to the shard's output_dir.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot run over shards")
+
+    def reduce(self, partials: List[Dict[str, Any]], shard_dirs: List[Path]) -> Dict[str, Any]:
+        """
+        What `finalize()` would return for the whole input, from the
+        `partial()` of every shard in input order. Files a partial refers
+        to are in the matching `shard_dirs` entry. `start()` is not called.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot run over shards")
+
+    def close(self) -> None:
+        pass
+
 
 class JobProcessor(ABC):
     name: str
 
+    # Wall-clock budget for one attempt, enforced by the worker (seconds).
+    timeout_seconds: int = 900
+
     @abstractmethod
     def process(self, job_input: Dict[str, Any]) -> Dict[str, Any]:
         """
         Takes validated input and returns structured output.
+
+        Long loops must call `cancel_token(job_input).check()` regularly so
+        cancellation and the deadline take effect, and should report work
+        done through `progress(job_input).tick()`.
+
+        Files written to `output_dir(job_input)` are uploaded next to
+        result.json as `outputs/{job_id}/{file name}`; one written through
+        `open_artifact()` is uploaded as it is written. Long lists of
+        records go through `result_writer(job_input)` instead of the
+        returned dict, which is then `writer.result({...})`.
         """
         pass
+
+    def operator(self, job_input: Dict[str, Any]) -> ScanOperator:
+        """
+        A ScanOperator doing this processor's work, for fused scans and
+        shards. Only processors that can work row by row override this.
+        `job_input["shard"]` is set when the operator scans one shard.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot run as part of a fused scan")
+
+    def shardable(self, metadata: Dict[str, Any]) -> bool:
+        """
+        Whether a large input may be split across workers: the operator
+        implements partial()/reduce() and splitting saves time.
+        """
+        return False
+
+    def reduce_reads_input(self, metadata: Dict[str, Any]) -> bool:
+        """Whether reduce() needs the whole input file, not just the partials."""
+        return False
+
+    def reduce(
+        self,
+        job_input: Dict[str, Any],
+        partials: List[Dict[str, Any]],
+        shard_dirs: List[Path],
+    ) -> Dict[str, Any]:
+        """
+        The result of a sharded job, shaped like `process()`'s, from the
+        operator partials of its shards in input order.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot run over shards")
+
+    def merge_partials(
+        self,
+        job_input: Dict[str, Any],
+        partials: List[Dict[str, Any]],
+        shard_dirs: List[Path],
+    ) -> Dict[str, Any]:
+        """`ScanOperator.reduce()` on a fresh operator, for `reduce()` implementations."""
+        operator = self.operator(job_input)
+        try:
+            return operator.reduce(partials, shard_dirs)
+        finally:
+            operator.close()
+
+    @staticmethod
+    def cancel_token(job_input: Dict[str, Any]) -> CancellationToken:
+        return job_input.get("cancel_token") or CancellationToken()
+
+    @staticmethod
+    def progress(job_input: Dict[str, Any]) -> ProgressReporter:
+        return job_input.get("progress") or ProgressReporter()
+
+    @staticmethod
+    def result_writer(job_input: Dict[str, Any]) -> ResultWriter:
+        return job_input.get("result_writer") or ResultWriter()
+
+    @staticmethod
+    def schema_cache(job_input: Dict[str, Any]) -> SchemaCache:
+        """Schemas CSV_INFER_SCHEMA cached for this input object; empty outside the worker."""
+        return job_input.get("schema_cache") or SchemaCache()
+
+    @staticmethod
+    def open_artifact(
+        job_input: Dict[str, Any],
+        name: str,
+        content_type: str = "application/octet-stream",
+        compress: bool = True,
+    ) -> ContextManager[BinaryIO]:
+        """
+        A binary writer for the artifact `name`. In the worker it uploads
+        as it goes, without a local copy, in the job's `output_compression`
+        unless `compress` is False (for formats compressed internally);
+        elsewhere it is a plain file in `output_dir()`.
+        """
+        opener = job_input.get("open_artifact")
+        if opener is not None:
+            return opener(name, content_type, compress)
+        return open(JobProcessor.output_dir(job_input) / name, "wb")
+
+    @staticmethod
+    def additional_input(job_input: Dict[str, Any], name: str) -> str:
+        """Local path of the additional input `name` (see job_factory.additional_inputs())."""
+        path = (job_input.get("additional_inputs") or {}).get(name)
+        if path is None:
+            raise ValueError(f"Missing additional input '{name}'")
+        return path
+
+    @staticmethod
+    def output_dir(job_input: Dict[str, Any]) -> Path:
+        path = Path(
+            job_input.get("output_dir")
+            or Path(job_input["input_file_path"]).parent / "artifacts"
+        )
+        path.mkdir(parents=True, exist_ok=True)
+        return path
@@ -1,34 +1,209 @@
-import csv
-from collections import defaultdict
-from app.processors.base import JobProcessor
+from typing import Optional
+
+from app.processors.base import JobProcessor, ScanOperator
+from app.processors.csv import columnar, scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.schema import column_types
+from app.processors.stats.streaming import ColumnSummary
+from app.processors.stats.sketches import ColumnProfile
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+class ColumnStatsOperator(ScanOperator):
+    """
+    CSV_COLUMN_STATS over row batches. Each batch is transposed and run
+    through the columnar kernels when Arrow is available, otherwise the
+    cells are added one at a time like `scan_rows`. The types of a full
+    cached `schema` of the same header speed up the kernels.
+    """
+
+    def __init__(self, profile: bool, top_k: int, vectorized: bool = True, schema: Optional[dict] = None):
+        self.profile = profile
+        self.top_k = top_k
+        self.schema = schema
+        self.columns: dict[str, int] = {}
+        self.summaries: dict[str, ColumnSummary] = {}
+        self.profiles: dict[str, ColumnProfile] = {}
+        self.vectorized = vectorized and columnar.HAS_ARROW and settings.CSV_COLUMNAR_ENGINE
+
+    def start(self, header: list[str]) -> None:
+        # like csv.DictReader, a repeated column name keeps the last column's values
+        self.columns = scanner.column_positions(header)
+        self.width = len(header)
+        self.types = column_types(self.schema, header, full=True) or [None] * len(header)
+        for name in self.columns:
+            self.summaries[name] = ColumnSummary()
+            if self.profile:
+                self.profiles[name] = ColumnProfile(self.top_k)
+        # (index, summary, profile) per column, for the cell-by-cell path
+        self.cells = [
+            (i, self.summaries[name], self.profiles.get(name))
+            for name, i in self.columns.items()
+        ]
+
+    def consume(self, rows: list[list[str]]) -> None:
+        rows = [row for row in rows if row]
+        if not rows:
+            return
+
+        if self.vectorized:
+            self._consume_columns(rows)
+            return
+
+        width = self.width
+        for row in rows:
+            short = len(row) < width
+            for i, summary, profile in self.cells:
+                value = None if short and i >= len(row) else row[i]
+                summary.add(value)
+                if profile is not None:
+                    profile.add(value)
+
+    def _consume_columns(self, rows: list[list[str]]) -> None:
+        width = self.width
+        if all(len(row) == width for row in rows):
+            columns = list(zip(*rows))
+        else:
+            # short rows read as nulls, extra fields are ignored
+            columns = [[row[i] if i < len(row) else "" for row in rows] for i in range(width)]
+
+        for name, i in self.columns.items():
+            column = columnar.text_column(columns[i])
+            self.summaries[name].merge(columnar.summarize_column(column, self.types[i]))
+            if self.profile:
+                columnar.profile_column(column, self.profiles[name])
+
+    def finalize(self) -> dict:
+        return {
+            "columns": {
+                col: {**summary.to_dict(), **(self.profiles[col].to_dict() if col in self.profiles else {})}
+                for col, summary in self.summaries.items()
+            }
+        }
+
+    def partial(self) -> dict:
+        return {
+            "columns": {
+                col: {
+                    "summary": summary.to_state(),
+                    "profile": self.profiles[col].to_state() if col in self.profiles else None,
+                }
+                for col, summary in self.summaries.items()
+            }
+        }
+
+    def reduce(self, partials: list[dict], shard_dirs) -> dict:
+        for partial in partials:
+            for col, state in partial["columns"].items():
+                summary = ColumnSummary.from_state(state["summary"])
+                if col in self.summaries:
+                    self.summaries[col].merge(summary)
+                else:
+                    self.summaries[col] = summary
+
+                if state["profile"] is not None:
+                    profile = ColumnProfile.from_state(state["profile"])
+                    if col in self.profiles:
+                        self.profiles[col].merge(profile)
+                    else:
+                        self.profiles[col] = profile
+
+        return self.finalize()
 
 class CsvColumnStatsProcessor(JobProcessor):
+    timeout_seconds = 900
+
     def process(self, job_input: dict) -> dict:
         file_path = job_input["input_file_path"]
         metadata = job_input["input_metadata"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
+        dialect = CsvDialect.from_metadata(metadata, file_path)
 
-        stats = defaultdict(list)
-
-        with open(file_path, newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                for k, v in row.items():
-                    try:
-                        stats[k].append(float(v))
-                    except (ValueError, TypeError):
-                        pass
-
-        result = {}
-        for col, values in stats.items():
-            if not values:
-                continue
-            result[col] = {
-                "min": min(values),
-                "max": max(values),
-                "avg": sum(values) / len(values),
-                "message": "Job executed",
-                "file_path": file_path,
-                "metadata": metadata,
-            }
+        profile, top_k = self.options(metadata)
+
+        summaries = None
+        if columnar.HAS_ARROW and settings.CSV_COLUMNAR_ENGINE:
+            schema = self.schema_cache(job_input).get(dialect)
+            try:
+                summaries, profiles = self.scan_columnar(file_path, dialect, profile, top_k, token, progress, schema)
+            except columnar.ENGINE_ERRORS as exc:
+                logger.warning("Columnar engine rejected %s, scanning rows: %s", file_path, exc)
+
+        if summaries is None:
+            summaries, profiles = self.scan_rows(file_path, dialect, profile, top_k, token, progress)
+
+        columns = (
+            (col, {**summary.to_dict(), **(profiles[col].to_dict() if col in profiles else {})})
+            for col, summary in summaries.items()
+        )
+        return self.result(job_input, columns)
+
+    def operator(self, job_input: dict) -> ScanOperator:
+        metadata = job_input["input_metadata"]
+        dialect = CsvDialect.from_metadata(metadata, job_input["input_file_path"])
+        return ColumnStatsOperator(*self.options(metadata), schema=self.schema_cache(job_input).get(dialect))
+
+    def shardable(self, metadata: dict) -> bool:
+        return True
+
+    def reduce(self, job_input: dict, partials: list[dict], shard_dirs) -> dict:
+        columns = self.merge_partials(job_input, partials, shard_dirs)["columns"]
+        return self.result(job_input, columns.items())
+
+    def result(self, job_input: dict, columns) -> dict:
+        # one entry per column, streamed; the job's details once, not per column
+        writer = self.result_writer(job_input)
+        with writer.entries("columns") as add:
+            for col, stats in columns:
+                add(col, stats)
+
+        return writer.result({
+            "message": "Job executed",
+            "file_path": job_input["input_file_path"],
+            "metadata": job_input["input_metadata"],
+        })
+
+    @staticmethod
+    def options(metadata: dict) -> tuple[bool, int]:
+        # "profile": true adds distinct counts and top values per column
+        return bool(metadata.get("profile")), int(metadata.get("top_k", 10))
+
+    @staticmethod
+    def scan_columnar(file_path, dialect, profile, top_k, token, progress, schema=None):
+        summaries: dict[str, ColumnSummary] = {}
+        profiles: dict[str, ColumnProfile] = {}
+        header = columnar.read_header(file_path, dialect)
+        types = column_types(schema, header, full=True) or [None] * len(header)
+        positions = scanner.column_positions(header)
+
+        for batch in columnar.iter_batches(
+            file_path,
+            dialect=dialect,
+            block_size=settings.CSV_BATCH_MB * 1024 * 1024,
+            token=token,
+            progress=progress,
+        ):
+            # like the row path, a repeated column name keeps the last column's values
+            for name, i in positions.items():
+                column = batch.column(i)
+                summaries.setdefault(name, ColumnSummary()).merge(columnar.summarize_column(column, types[i]))
+                if profile:
+                    columnar.profile_column(column, profiles.setdefault(name, ColumnProfile(top_k)))
+
+        # header-only file: report the columns with zero counts
+        for name in header if not summaries else ():
+            summaries[name] = ColumnSummary()
+            if profile:
+                profiles[name] = ColumnProfile(top_k)
+
+        return summaries, profiles
 
-        return result
+    @staticmethod
+    def scan_rows(file_path, dialect, profile, top_k, token, progress):
+        # One fixed-size summary per column; memory does not grow with rows.
+        operator = ColumnStatsOperator(profile, top_k, vectorized=False)
+        scanner.scan(file_path, dialect, [operator], token, progress)
+        return operator.summaries, operator.profiles
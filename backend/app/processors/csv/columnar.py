@@ -0,0 +1,282 @@
+"""
+Columnar CSV engine.
+
+Reads a CSV in fixed-size blocks as Arrow record batches (every column as
+text) and turns each column into a typed NumPy array with vectorized
+kernels, so per-cell work never runs in the Python interpreter. Memory is
+bounded by Arrow's read-ahead (a few dozen blocks) regardless of file size.
+
+pyarrow and numpy are optional: `HAS_ARROW` is False when either is
+missing, and callers keep their pure-Python path for that case and for
+files Arrow rejects (`ENGINE_ERRORS`, e.g. rows with a different number
+of fields, which the row scanner tolerates).
+"""
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
+
+    HAS_ARROW = True
+    ENGINE_ERRORS: tuple = (pa.ArrowInvalid,)
+except ImportError:  # pragma: no cover - depends on the image
+    HAS_ARROW = False
+    ENGINE_ERRORS = ()
+
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.stats.streaming import NUMBER_PATTERN, ColumnSummary, RunningStats
+from app.processors.stats.sketches import ColumnProfile
+
+DEFAULT_BLOCK_SIZE = 2 * 1024 * 1024
+
+# the same cells as ColumnSummary.add() on the row path
+_NUMBER = f"^{NUMBER_PATTERN}$"
+_INTEGER = r"^\s*[+-]?\d+\s*$"
+_BOOLEAN = r"(?i)^\s*(true|false)\s*$"
+
+
+def read_header(file_path: str, dialect: CsvDialect = CsvDialect()) -> list[str]:
+    with open(file_path, newline="") as f:
+        return scanner.read_header(dialect.reader(f), dialect)[0]
+
+
+def iter_batches(
+    file_path: str,
+    *,
+    dialect: CsvDialect = CsvDialect(),
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    token: Optional[CancellationToken] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> Iterator["pa.RecordBatch"]:
+    """Yield record batches with every column as non-null UTF-8 text."""
+    token = token or CancellationToken()
+    progress = progress or ProgressReporter()
+
+    header = read_header(file_path, dialect)
+    if not header:
+        return
+
+    rows = 0
+    with open(file_path, "rb") as f:
+        progress.track_file(f)
+        reader = pv.open_csv(
+            f,
+            read_options=pv.ReadOptions(
+                block_size=block_size,
+                # without a header the first record is data, under generated names
+                column_names=None if dialect.has_header else header,
+            ),
+            parse_options=pv.ParseOptions(
+                delimiter=dialect.delimiter,
+                quote_char=dialect.quotechar or False,
+                newlines_in_values=True,
+            ),
+            convert_options=pv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        for batch in reader:
+            token.check_now()
+            rows += batch.num_rows
+            progress.update(rows=rows)
+            yield batch
+
+
+def text_column(values) -> "pa.Array":
+    """Arrow text array from a sequence of str, e.g. one column of csv.reader rows."""
+    return pa.array(values, type=pa.string())
+
+
+def numeric_values(column: "pa.Array", data_type: Optional["pa.DataType"] = None) -> Tuple[int, int, "np.ndarray"]:
+    """
+    Split a text column into (null count, non-numeric count, float64 values
+    of the numeric cells). `data_type`, the type every non-blank cell of
+    the column converts to (a schema inferred from the whole file), skips
+    the checks it makes unnecessary.
+    """
+    if data_type is not None and (pa.types.is_boolean(data_type) or pa.types.is_timestamp(data_type)):
+        # no cell of these types is a number
+        nulls = pc.sum(pc.equal(column, "")).as_py() or 0
+        return nulls, len(column) - nulls, np.empty(0)
+
+    values = None
+    if data_type is not None and (pa.types.is_integer(data_type) or pa.types.is_floating(data_type)):
+        # every cell but the empty ones is a number: no regex, even with nulls
+        empty = pc.equal(column, "")
+        nulls = pc.sum(empty).as_py() or 0
+        try:
+            cells = pc.filter(column, pc.invert(empty)) if nulls else column
+            values = pc.cast(cells, pa.float64()).to_numpy(zero_copy_only=False)
+        except pa.ArrowInvalid:
+            # padded or whitespace-only cells
+            pass
+
+    if values is None and _looks_numeric(column):
+        try:
+            # fast path: the whole column casts cleanly
+            values = pc.cast(column, pa.float64()).to_numpy(zero_copy_only=False)
+            nulls = 0
+        except pa.ArrowInvalid:
+            pass
+
+    if values is None:
+        nulls = pc.sum(pc.equal(column, "")).as_py() or 0
+        numeric = pc.match_substring_regex(column, _NUMBER)
+        candidates = pc.utf8_trim_whitespace(pc.filter(column, numeric))
+        values = pc.cast(candidates, pa.float64()).to_numpy(zero_copy_only=False)
+
+    # e.g. "1e400" overflows to inf
+    finite = np.isfinite(values)
+    if not finite.all():
+        values = values[finite]
+
+    non_numeric = len(column) - nulls - len(values)
+    return nulls, non_numeric, values
+
+
+def _looks_numeric(column: "pa.Array", sample: int = 64) -> bool:
+    # a failed cast is expensive; only attempt it when the head of the column is numeric
+    head = column.slice(0, sample)
+    return len(head) > 0 and pc.all(pc.match_substring_regex(head, _NUMBER)).as_py()
+
+
+def summarize_column(column: "pa.Array", data_type: Optional["pa.DataType"] = None) -> ColumnSummary:
+    """ColumnSummary of one batch, ready to merge into the running one; see numeric_values() for `data_type`."""
+    summary = ColumnSummary()
+    nulls, non_numeric, values = numeric_values(column, data_type)
+
+    summary.count = len(column)
+    summary.null_count = nulls
+    summary.non_numeric_count = non_numeric
+
+    if len(values):
+        mean = float(values.mean())
+        summary.stats = RunningStats.from_moments(
+            count=len(values),
+            mean=mean,
+            m2=float(np.square(values - mean).sum()),
+            lo=float(values.min()),
+            hi=float(values.max()),
+        )
+        _sketch_values(summary, values)
+
+    return summary
+
+
+def infer_type(column: "pa.Array") -> "pa.DataType":
+    """
+    The narrowest of int64, float64, bool, timestamp[us] and string that
+    every non-blank cell of a text column converts to.
+    """
+    return classify(column)[1] or pa.string()
+
+
+def classify(column: "pa.Array") -> Tuple[int, Optional["pa.DataType"]]:
+    """
+    The blank (empty or whitespace) cells of a text column, and
+    `infer_type()` of the others; None if there are none.
+    """
+    values = pc.utf8_trim_whitespace(column)
+    values = pc.filter(values, pc.not_equal(values, ""))
+    blank = len(column) - len(values)
+    if len(values) == 0:
+        return blank, None
+    return blank, _narrowest_type(values)
+
+
+def count_blank(column: "pa.Array") -> int:
+    """The cells of a text column that are empty or only whitespace."""
+    return pc.sum(pc.equal(pc.utf8_trim_whitespace(column), "")).as_py() or 0
+
+
+def _narrowest_type(values: "pa.Array") -> "pa.DataType":
+    # `values` are trimmed and not blank
+    if pc.all(pc.match_substring_regex(values, _INTEGER)).as_py():
+        try:
+            pc.cast(values, pa.int64())
+            return pa.int64()
+        except pa.ArrowInvalid:
+            # out of int64 range
+            pass
+    if pc.all(pc.match_substring_regex(values, _NUMBER)).as_py():
+        return pa.float64()
+    if pc.all(pc.match_substring_regex(values, _BOOLEAN)).as_py():
+        return pa.bool_()
+    try:
+        pc.cast(values, pa.timestamp("us"))
+        return pa.timestamp("us")
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.string()
+
+
+def typed_column(column: "pa.Array", data_type: "pa.DataType") -> Tuple["pa.Array", int, Optional[int]]:
+    """
+    A text column converted to `data_type` with blank cells as nulls; then
+    how many other cells did not convert, and the index of the first one.
+    Those become nulls as well.
+    """
+    if pa.types.is_string(data_type):
+        return column, 0, None
+
+    blank = pa.scalar(None, pa.string())
+    text = pc.if_else(pc.equal(column, ""), blank, column)
+    try:
+        return pc.cast(text, data_type), 0, None
+    except pa.ArrowInvalid:
+        pass
+
+    # padded cells; trimming only when the plain cast fails keeps it off the common path
+    text = pc.utf8_trim_whitespace(column)
+    text = pc.if_else(pc.equal(text, ""), blank, text)
+    try:
+        return pc.cast(text, data_type), 0, None
+    except pa.ArrowInvalid:
+        pass
+
+    # rare: convert cell by cell to find the ones that do not fit
+    values, invalid, first_invalid = [], 0, None
+    for i, cell in enumerate(text):
+        try:
+            values.append(cell.cast(data_type).as_py())
+        except pa.ArrowInvalid:
+            values.append(None)
+            invalid += 1
+            if first_invalid is None:
+                first_invalid = i
+    return pa.array(values, data_type), invalid, first_invalid
+
+
+def _sketch_values(summary: ColumnSummary, values: "np.ndarray") -> None:
+    inv_log_gamma = summary.sketch.inv_log_gamma
+
+    def bucket_counts(magnitudes: "np.ndarray") -> Dict[int, int]:
+        if not len(magnitudes):
+            return {}
+        keys = np.ceil(np.log(magnitudes) * inv_log_gamma).astype(np.int64)
+        # keys span a few thousand buckets at most, so bincount beats sorting
+        low = int(keys.min())
+        counts = np.bincount(keys - low)
+        present = np.flatnonzero(counts)
+        return dict(zip((present + low).tolist(), counts[present].tolist()))
+
+    summary.sketch.add_counts(
+        positive=bucket_counts(values[values > 0]),
+        negative=bucket_counts(-values[values < 0]),
+        zeros=int(np.count_nonzero(values == 0)),
+    )
+
+
+def profile_column(column: "pa.Array", profile: ColumnProfile) -> None:
+    """Feed one batch into a ColumnProfile, one call per distinct value."""
+    counted = pc.value_counts(pc.filter(column, pc.not_equal(column, "")))
+    for value, count in zip(
+        counted.field("values").to_pylist(),
+        counted.field("counts").to_pylist(),
+    ):
+        profile.add(value, count)
@@ -1,41 +1,77 @@
-import csv
-from app.processors.base import JobProcessor
+from pathlib import Path
+
+from app.processors.base import JobProcessor, ScanOperator
+from app.processors.csv.external_dedup import DedupStats, ExternalDeduplicator, KEEP_OPTIONS
+from app.processors.csv.scanner import CsvDialect
+from app.core.settings import settings
 from app.core.logging import setup_logging
 
 logger = setup_logging()
 
+OUTPUT_NAME = "deduplicated.csv"
+# a shard's (digest, row) winners, grouped by partition
+INDEX_NAME = "dedup-index.bin"
+
+class DeduplicateOperator(ScanOperator):
+    """
+    CSV_DEDUPLICATE over row batches; a second pass, when needed, re-reads
+    the input. Over a shard (`shard=True`) it only builds the digest index;
+    the reduce writes the output from the whole input.
+    """
+
+    def __init__(self, deduplicator: ExternalDeduplicator, input_path: str, output_path: str, shard: bool = False):
+        self.deduplicator = deduplicator
+        self.input_path = input_path
+        self.output_path = output_path
+        self.shard = shard
+
+    def start(self, header: list[str]) -> None:
+        self.header = header
+        if self.shard:
+            self.deduplicator.start(header, None, work_dir=str(Path(self.output_path).parent))
+        else:
+            self.deduplicator.start(header, self.output_path)
+
+    def consume(self, rows: list[list[str]]) -> None:
+        self.deduplicator.consume(rows)
+
+    def finalize(self) -> dict:
+        stats = self.deduplicator.finish(self.input_path)
+        return CsvDeduplicateProcessor.summary(stats, self.deduplicator)
+
+    def partial(self) -> dict:
+        index_path = Path(self.output_path).parent / INDEX_NAME
+        offsets = self.deduplicator.write_index(str(index_path))
+        return {
+            "header": self.header,
+            "rows": self.deduplicator.stats.total_rows,
+            "index": INDEX_NAME,
+            "offsets": offsets,
+        }
+
+    def reduce(self, partials: list[dict], shard_dirs) -> dict:
+        shards = [
+            (str(Path(shard_dir) / partial["index"]), partial["offsets"], partial["rows"])
+            for partial, shard_dir in zip(partials, shard_dirs)
+        ]
+        stats = self.deduplicator.merge(partials[0]["header"], shards, self.input_path, self.output_path)
+        return CsvDeduplicateProcessor.summary(stats, self.deduplicator)
+
+    def close(self) -> None:
+        self.deduplicator.close()
+
 class CsvDeduplicateProcessor(JobProcessor):
+    timeout_seconds = 1200
+
     def process(self, job_input: dict) -> dict:
         file_path = job_input.get("input_file_path")
         metadata = job_input.get("input_metadata") or {}
-
-        key = metadata.get("key")
-        if not key:
-            logger.error("CsvDeduplicateProcessor missing required metadata 'key' for deduplication")
-            raise ValueError("Missing required metadata field 'key' for deduplication")
-
-        seen = set()
-        rows = []
-        total_rows = 0
+        deduplicator = self.deduplicator(job_input)
+        output_path = self.output_dir(job_input) / OUTPUT_NAME
 
         try:
-            with open(file_path, newline="") as f:
-                reader = csv.DictReader(f)
-                if not reader.fieldnames:
-                    logger.error("CSV file '%s' appears to have no header row", file_path)
-                    raise ValueError("CSV file does not contain a header row")
-
-                if key not in reader.fieldnames:
-                    logger.error("Deduplication key '%s' not found in CSV header: %s", key, reader.fieldnames)
-                    raise ValueError(f"Deduplication key '{key}' not found in CSV header")
-
-                for row in reader:
-                    total_rows += 1
-                    value = row.get(key)
-                    if value not in seen:
-                        seen.add(value)
-                        rows.append(row)
-                        
+            stats = deduplicator.run(file_path, str(output_path))
+
         except FileNotFoundError:
             logger.exception("CSV file not found: %s", file_path)
             raise
@@ -43,12 +79,72 @@ class CsvDeduplicateProcessor(JobProcessor):
             logger.exception("Error reading CSV file: %s", file_path)
             raise
 
-        duplicates_removed = total_rows - len(rows)
+        return self.result(self.summary(stats, deduplicator), file_path, metadata)
+
+    def operator(self, job_input: dict) -> ScanOperator:
+        return DeduplicateOperator(
+            self.deduplicator(job_input),
+            job_input["input_file_path"],
+            str(self.output_dir(job_input) / OUTPUT_NAME),
+            shard=bool(job_input.get("shard")),
+        )
+
+    def shardable(self, metadata: dict) -> bool:
+        return True
+
+    def reduce_reads_input(self, metadata: dict) -> bool:
+        # the output is written by a pass over the whole input
+        return True
+
+    def reduce(self, job_input: dict, partials: list[dict], shard_dirs) -> dict:
+        summary = self.merge_partials(job_input, partials, shard_dirs)
+        return self.result(summary, job_input["input_file_path"], job_input["input_metadata"])
 
+    @staticmethod
+    def result(summary: dict, file_path: str, metadata: dict) -> dict:
         return {
-            "deduplicated_rows": len(rows),
-            "duplicates_removed": duplicates_removed,
+            **summary,
             "message": "Job executed successfully",
             "file_path": file_path,
             "metadata": metadata,
         }
+
+    def deduplicator(self, job_input: dict) -> ExternalDeduplicator:
+        metadata = job_input.get("input_metadata") or {}
+
+        # "key" is a column name or a list of them (composite key)
+        key = metadata.get("key")
+        if not key:
+            logger.error("CsvDeduplicateProcessor missing required metadata 'key' for deduplication")
+            raise ValueError("Missing required metadata field 'key' for deduplication")
+        key_columns = [key] if isinstance(key, str) else list(key)
+
+        keep = metadata.get("keep", "first")
+        if keep not in KEEP_OPTIONS:
+            raise ValueError(f"'keep' must be one of {KEEP_OPTIONS}")
+
+        return ExternalDeduplicator(
+            key_columns,
+            keep=keep,
+            memory_budget=settings.CSV_DEDUP_MEMORY_MB * 1024 * 1024,
+            token=self.cancel_token(job_input),
+            progress=self.progress(job_input),
+            dialect=CsvDialect.from_metadata(metadata, job_input.get("input_file_path")),
+        )
+
+    @staticmethod
+    def summary(stats: DedupStats, deduplicator: ExternalDeduplicator) -> dict:
+        if stats.spilled:
+            logger.info(
+                "Deduplication spilled to disk",
+                extra={"rows": stats.total_rows, "partitions": stats.spill_partitions},
+            )
+
+        return {
+            "deduplicated_rows": stats.kept_rows,
+            "duplicates_removed": stats.duplicates_removed,
+            "key": deduplicator.key_columns,
+            "keep": deduplicator.keep,
+            "output": OUTPUT_NAME,
+            "spilled_to_disk": stats.spilled,
+        }
@@ -0,0 +1,381 @@
+"""
+External-memory CSV deduplication.
+
+Rows are identified by a 16-byte blake2b digest of their key columns, so
+memory per distinct key is fixed no matter how wide the values are. While
+the digest index fits `memory_budget` bytes everything happens in memory
+(and keep-first writes the output in the same pass). Past the budget the
+index is spilled to disk: every (digest, row number) pair is appended to
+one of `FANOUT` partition files chosen by the digest, each partition is
+reduced on its own (re-partitioned on the next digest byte if it is still
+too large), and the surviving row numbers go into a bitmap. A second pass
+over the input then writes the rows whose bit is set, in input order.
+
+Memory is bounded by the budget plus one bit per input row.
+
+A sharded job runs the first pass per shard: each shard reduces its own
+partitions and writes the surviving (digest, row number) records, grouped
+by partition, to an index file (`write_index()`). `merge()` then reduces
+partition i of every shard together, with row numbers shifted by the rows
+of the shards before, and makes the second pass over the whole input.
+"""
+import hashlib
+import struct
+import tempfile
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+
+DIGEST_SIZE = 16
+RECORD = struct.Struct(f"<{DIGEST_SIZE}sQ")
+FANOUT = 64
+
+# Approximate CPython cost of one dict[bytes, int] entry with a 16-byte key.
+ENTRY_BYTES = 120
+
+KEEP_OPTIONS = ("first", "last")
+
+
+@dataclass
+class DedupStats:
+    total_rows: int = 0
+    kept_rows: int = 0
+    spilled: bool = False
+    spill_partitions: int = 0
+
+    @property
+    def duplicates_removed(self) -> int:
+        return self.total_rows - self.kept_rows
+
+
+def key_digest(values: Sequence[str]) -> bytes:
+    if len(values) == 1:
+        data = values[0]
+    else:
+        # length-prefixed so ("a,b", "c") and ("a", "b,c") differ
+        data = "\x1f".join(f"{len(v)}:{v}" for v in values)
+    return hashlib.blake2b(data.encode(), digest_size=DIGEST_SIZE).digest()
+
+
+class _Bitmap:
+    def __init__(self, size: int):
+        self.bits = bytearray((size + 7) // 8)
+
+    def set(self, i: int) -> None:
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def __contains__(self, i: int) -> bool:
+        return bool(self.bits[i >> 3] & (1 << (i & 7)))
+
+
+class _Partitions:
+    """FANOUT append-only record files, split on one byte of the digest."""
+
+    def __init__(self, directory: Path, depth: int = 0, prefix: str = "part"):
+        self.depth = depth
+        self.paths = [directory / f"{prefix}-{i:02d}.bin" for i in range(FANOUT)]
+        self._files = [open(p, "wb") for p in self.paths]
+
+    def add(self, digest: bytes, row: int) -> None:
+        self._files[digest[self.depth] % FANOUT].write(RECORD.pack(digest, row))
+
+    def close(self) -> None:
+        for f in self._files:
+            f.close()
+
+
+def _iter_records(path, start: int = 0, end: Optional[int] = None):
+    """Records [start, end) of a record file (to its end by default)."""
+    with open(path, "rb") as f:
+        f.seek(start * RECORD.size)
+        remaining = None if end is None else (end - start) * RECORD.size
+        while remaining is None or remaining > 0:
+            size = RECORD.size * 65536 if remaining is None else min(RECORD.size * 65536, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield from RECORD.iter_unpack(chunk)
+
+
+def _iter_rows(reader):
+    """Data rows with their row numbers; blank lines are skipped like DictReader."""
+    index = 0
+    for row in reader:
+        if row:
+            yield index, row
+            index += 1
+
+
+class ExternalDeduplicator:
+    """
+    Either call `run()` on a file, or drive it row by row: `start()` with
+    the header, `consume()` for every batch of rows after it (blank rows
+    are skipped), then `finish()`, which re-reads the input only if a
+    second pass is needed. `close()` releases the spill files early.
+
+    A shard calls `start()` without an output path and `write_index()`
+    instead of `finish()`; the reduce calls `merge()` on a fresh instance.
+    """
+
+    def __init__(
+        self,
+        key_columns: Sequence[str],
+        keep: str = "first",
+        memory_budget: int = 64 * 1024 * 1024,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressReporter] = None,
+        dialect: CsvDialect = CsvDialect(),
+    ):
+        if keep not in KEEP_OPTIONS:
+            raise ValueError(f"keep must be one of {KEEP_OPTIONS}")
+        self.key_columns = list(key_columns)
+        self.keep = keep
+        self.dialect = dialect
+        self.max_entries = max(1, memory_budget // ENTRY_BYTES)
+        self.token = token or CancellationToken()
+        self.progress = progress or ProgressReporter()
+        self.stats = DedupStats()
+
+        self._out = None
+        self._writer = None
+        self._spill_dir: Optional[tempfile.TemporaryDirectory] = None
+        self._index: dict[bytes, int] = {}
+        self._partitions: Optional[_Partitions] = None
+
+    def run(self, input_path: str, output_path: str) -> DedupStats:
+        try:
+            with open(input_path, newline="") as f:
+                self.progress.track_file(f)
+                reader = self.dialect.reader(f)
+                header, pending = scanner.read_header(reader, self.dialect)
+                if not header:
+                    raise ValueError("CSV file does not contain a header row")
+
+                self.start(header, output_path)
+                for row in chain(pending, reader):
+                    self.token.check()
+                    self.progress.tick()
+                    self._add(row)
+
+            return self.finish(input_path)
+        finally:
+            self.close()
+
+    def start(self, header: list[str], output_path: Optional[str], work_dir: Optional[str] = None) -> None:
+        """Without `output_path` only the digest index is built (for `write_index()`)."""
+        self._header = header
+        self._key = self._key_getter(header)
+        self._output_path = output_path
+        self._spill_dir = tempfile.TemporaryDirectory(
+            dir=work_dir or Path(output_path).parent,
+            prefix="dedup-spill-",
+        )
+
+        if output_path is not None:
+            self._out = open(output_path, "w", newline="")
+            self._writer = self.dialect.writer(self._out)
+            if self.dialect.has_header:
+                self._writer.writerow(header)
+
+    def consume(self, rows: list[list[str]]) -> None:
+        for row in rows:
+            self._add(row)
+
+    def finish(self, input_path: str) -> DedupStats:
+        """Close the output, writing it in a second pass over `input_path` if needed."""
+        self._out.close()
+        keep_rows = self._winners()
+        if keep_rows is not None:
+            self._write(input_path, keep_rows)
+        return self.stats
+
+    def write_index(self, index_path: str) -> list[int]:
+        """
+        Shard side: write this shard's winning (digest, row) records to
+        `index_path` grouped by partition. Returns FANOUT + 1 record
+        offsets; partition i is records [offsets[i], offsets[i + 1]).
+        """
+        if self._partitions is None:
+            self._spill()
+        self._partitions.close()
+
+        offsets = [0]
+        with open(index_path, "wb") as out:
+            written = [0]
+
+            def emit(digest: bytes, row_index: int) -> None:
+                out.write(RECORD.pack(digest, row_index))
+                written[0] += 1
+
+            for path in self._partitions.paths:
+                self._reduce(path, 0, emit)
+                offsets.append(written[0])
+
+        self.stats.kept_rows = written[0]
+        return offsets
+
+    def merge(
+        self,
+        header: list[str],
+        shards: Sequence[tuple[str, list[int], int]],
+        input_path: str,
+        output_path: str,
+    ) -> DedupStats:
+        """
+        Reduce side: `shards` holds every shard's (index file, offsets from
+        `write_index()`, data rows) in input order. Writes the output with a
+        pass over the whole input.
+        """
+        self._header = header
+        self._output_path = output_path
+        self._spill_dir = tempfile.TemporaryDirectory(dir=Path(output_path).parent, prefix="dedup-merge-")
+        spill_dir = Path(self._spill_dir.name)
+
+        bases = []
+        for _, _, rows in shards:
+            bases.append(self.stats.total_rows)
+            self.stats.total_rows += rows
+        self.stats.spilled = True
+
+        keep_rows = _Bitmap(self.stats.total_rows)
+        for i in range(FANOUT):
+            self.token.check_now()
+            path = spill_dir / f"merge-{i:02d}.bin"
+            with open(path, "wb") as out:
+                for (index_path, offsets, _), base in zip(shards, bases):
+                    # shards in input order keep one digest's records in row order
+                    for digest, row_index in _iter_records(index_path, offsets[i], offsets[i + 1]):
+                        out.write(RECORD.pack(digest, base + row_index))
+            self._reduce(path, 0, lambda digest, row_index: keep_rows.set(row_index))
+
+        self._write(input_path, keep_rows)
+        return self.stats
+
+    def close(self) -> None:
+        if self._out is not None:
+            self._out.close()
+        if self._partitions is not None:
+            self._partitions.close()
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+
+    def _key_getter(self, header: list[str]):
+        positions = scanner.column_positions(header)
+        missing = [c for c in self.key_columns if c not in positions]
+        if missing:
+            raise ValueError(f"Deduplication key {missing} not found in CSV header")
+        return scanner.values_getter([positions[c] for c in self.key_columns])
+
+    def _add(self, row: list[str]) -> None:
+        """First pass, one input row."""
+        if not row:
+            return  # blank lines are skipped, like DictReader
+
+        i = self.stats.total_rows
+        self.stats.total_rows += 1
+        digest = key_digest(self._key(row))
+
+        if self._partitions is not None:
+            self._partitions.add(digest, i)
+            return
+
+        index = self._index
+        if self.keep == "first":
+            if digest in index:
+                return
+            index[digest] = i
+            if self._writer is not None:
+                self._writer.writerow(row)
+        else:
+            index[digest] = i
+
+        if len(index) > self.max_entries:
+            # over budget: move the index to disk and finish in two passes
+            self._spill()
+            self.stats.spilled = True
+
+    def _spill(self) -> None:
+        self._partitions = _Partitions(Path(self._spill_dir.name))
+        for digest, row_index in self._index.items():
+            self._partitions.add(digest, row_index)
+        self._index.clear()
+
+    def _winners(self) -> Optional[_Bitmap]:
+        """
+        Bitmap of the rows to keep, or None when keep-first already wrote
+        the output during the first pass.
+        """
+        stats = self.stats
+        if self._partitions is None:
+            if self.keep == "first":
+                stats.kept_rows = len(self._index)
+                return None
+            keep_rows = _Bitmap(stats.total_rows)
+            for row_index in self._index.values():
+                keep_rows.set(row_index)
+            return keep_rows
+
+        self._partitions.close()
+        keep_rows = _Bitmap(stats.total_rows)
+        for path in self._partitions.paths:
+            self._reduce(path, 0, lambda digest, row_index: keep_rows.set(row_index))
+        return keep_rows
+
+    def _reduce(self, path: Path, depth: int, emit: Callable[[bytes, int], None]) -> None:
+        """Hand the winning (digest, row) of every digest in a partition file to `emit`."""
+        self.token.check_now()
+        keep_first = self.keep == "first"
+        winners: dict[bytes, int] = {}
+
+        # records of one digest are appended in row order
+        for digest, row_index in _iter_records(path):
+            if keep_first:
+                winners.setdefault(digest, row_index)
+            else:
+                winners[digest] = row_index
+
+            if len(winners) > self.max_entries and depth + 1 < DIGEST_SIZE:
+                # too many distinct keys in this partition: split it on the next digest byte
+                winners.clear()
+                self._split(path, depth, emit)
+                return
+
+        path.unlink()
+        self.stats.spill_partitions += 1
+        for digest, row_index in winners.items():
+            emit(digest, row_index)
+
+    def _split(self, path: Path, depth: int, emit: Callable[[bytes, int], None]) -> None:
+        sub = _Partitions(path.parent, depth + 1, prefix=path.stem)
+        for digest, row_index in _iter_records(path):
+            sub.add(digest, row_index)
+        sub.close()
+        path.unlink()
+
+        for sub_path in sub.paths:
+            self._reduce(sub_path, depth + 1, emit)
+
+    def _write(self, input_path: str, keep_rows: _Bitmap) -> None:
+        """Second pass: copy the kept rows in input order."""
+        with open(input_path, newline="") as f, open(self._output_path, "w", newline="") as out:
+            self.progress.track_file(f)
+            reader = self.dialect.reader(f)
+            _, pending = scanner.read_header(reader, self.dialect)
+
+            writer = self.dialect.writer(out)
+            if self.dialect.has_header:
+                writer.writerow(self._header)
+
+            for i, row in _iter_rows(chain(pending, reader)):
+                self.token.check()
+                if i in keep_rows:
+                    writer.writerow(row)
+                    self.stats.kept_rows += 1
@@ -0,0 +1,371 @@
+"""
+External merge sort for CSV files.
+
+Rows are ordered by one or more key columns (`SortKey`), each compared
+as text or as a number, ascending or descending. Each row's key is
+encoded once into a value Python compares directly, so neither sorting
+nor merging calls back into per-column comparison code:
+
+    string asc    the text itself
+    string desc   its UTF-8 bytes complemented, plus a 0xFF terminator
+    number        (0, value) for numbers (negated when descending), then
+                  (1, text) for other text, then (2, "") for blank cells
+
+Run generation: the input is cut into record-aligned byte ranges (the
+shard planner's), which a process pool sorts independently. Each process
+keeps every record as the text it was read from, next to its key, until
+those pairs take about `run_bytes` of memory, then sorts them and writes
+them to a run file as marshal blocks. Records are never re-quoted: the
+output holds the input's records as they were, and merging only
+compares keys and copies text. The runs are merged FANIN at a time with
+heapq.merge, in extra passes when there are more, the last pass writing
+the output.
+
+The sort is stable: rows with equal keys keep their input order, since
+ranges and runs are numbered in input order and heapq.merge takes the
+earlier run on ties. Blank lines are dropped. Memory is bounded by
+`memory_budget` while sorting runs and by FANIN blocks while merging;
+the run files take about the input's size again on local disk.
+"""
+import heapq
+import io
+import marshal
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Sequence, TextIO
+
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.sharding import plan_shards
+from app.processors.execution import CancellationToken, ProgressReporter, wait_for
+
+KEY_TYPES = ("string", "number")
+ORDERS = ("asc", "desc")
+
+# Runs merged at once; more runs take extra merge passes.
+FANIN = 64
+# A run is read back a block at a time, so a merge holds FANIN blocks.
+BLOCK_BYTES = 256 * 1024
+# Ranges a run-generation process sorts in one task; smaller ranges
+# spread better across processes and answer cancellation sooner.
+RANGE_BYTES = 64 * 1024 * 1024
+
+# Approximate CPython cost of one (key, record) pair beyond the record's
+# text: the tuple, the str object and a typical key.
+PAIR_BYTES = 160
+
+# float() drops digits of integers from here on; those compare as int
+_EXACT_FLOAT = 2 ** 53
+_COMPLEMENT = bytes(range(255, -1, -1))
+_BLANK = (2, "")
+
+
+class SortKey(NamedTuple):
+    column: str
+    type: str = "string"
+    order: str = "asc"
+
+
+def parse_sort_keys(value) -> list[SortKey]:
+    """
+    The `key` metadata: a column name, or a list of column names and
+    {"column", "type", "order"} objects. ValueError if it is invalid.
+    """
+    if not value:
+        raise ValueError("Missing required metadata field 'key' for sorting")
+
+    keys = []
+    for item in [value] if isinstance(value, (str, dict)) else value:
+        if isinstance(item, str):
+            item = {"column": item}
+        if not isinstance(item, dict) or not isinstance(item.get("column"), str):
+            raise ValueError("Each sort key must be a column name or an object with a 'column'")
+        key = SortKey(item["column"], item.get("type", "string"), item.get("order", "asc"))
+        if key.type not in KEY_TYPES:
+            raise ValueError(f"Sort key 'type' must be one of {KEY_TYPES}")
+        if key.order not in ORDERS:
+            raise ValueError(f"Sort key 'order' must be one of {ORDERS}")
+        keys.append(key)
+    return keys
+
+
+def _string_desc(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass").translate(_COMPLEMENT) + b"\xff"
+
+
+def _number(text: str) -> tuple:
+    try:
+        value = float(text)
+    except ValueError:
+        return (1, text) if text.strip() else _BLANK
+    if value != value:
+        # nan is unordered
+        return (1, text)
+    if abs(value) >= _EXACT_FLOAT:
+        try:
+            value = int(text)
+        except ValueError:
+            pass
+    return (0, value)
+
+
+def _number_desc(text: str) -> tuple:
+    key = _number(text)
+    return (0, -key[1]) if key[0] == 0 else key
+
+
+_ENCODERS: dict[tuple[str, str], Optional[Callable[[str], Any]]] = {
+    ("string", "asc"): None,
+    ("string", "desc"): _string_desc,
+    ("number", "asc"): _number,
+    ("number", "desc"): _number_desc,
+}
+
+
+def key_function(keys: Sequence[SortKey], header: Sequence[str]) -> Callable[[list[str]], Any]:
+    """A function returning a row's encoded key; ValueError if a key column is not in `header`."""
+    positions = scanner.column_positions(header)
+    missing = [key.column for key in keys if key.column not in positions]
+    if missing:
+        raise ValueError(f"Sort key columns not in the CSV header: {missing}")
+
+    values = scanner.values_getter([positions[key.column] for key in keys])
+    encoders = [_ENCODERS[(key.type, key.order)] for key in keys]
+
+    if len(keys) == 1:
+        encode = encoders[0]
+        if encode is None:
+            return lambda row: values(row)[0]
+        return lambda row: encode(values(row)[0])
+
+    if all(encode is None for encode in encoders):
+        return values
+
+    def key(row: list[str]) -> tuple:
+        return tuple(
+            value if encode is None else encode(value)
+            for encode, value in zip(encoders, values(row))
+        )
+
+    return key
+
+
+class Run(NamedTuple):
+    path: str
+    rows: int
+    # estimated in-memory size of its pairs
+    size: int
+
+
+@dataclass
+class SortStats:
+    rows: int = 0
+    runs: int = 0
+    merge_passes: int = 0
+
+
+class _RangeReader(io.RawIOBase):
+    """Bytes [start, end) of an open binary file."""
+
+    def __init__(self, f, start: int, end: int):
+        f.seek(start)
+        self._f = f
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        buffer[: len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _write_run(path: str, blocks: Iterator[list]) -> None:
+    with open(path, "wb") as f:
+        for block in blocks:
+            marshal.dump(block, f)
+
+
+def _iter_run(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                block = marshal.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+def _rows_per_block(rows: int, size: int) -> int:
+    return max(1, BLOCK_BYTES * rows // max(size, 1))
+
+
+def sort_range(
+    file_path: str,
+    start: int,
+    end: int,
+    index: int,
+    header: list[str],
+    keys: list[SortKey],
+    dialect: CsvDialect,
+    run_bytes: int,
+    run_dir: str,
+) -> list[Run]:
+    """
+    Sort the records of one byte range into runs of about `run_bytes`
+    each. The range starting the file skips its header. Runs in a
+    process pool.
+    """
+    key = key_function(keys, header)
+    runs: list[Run] = []
+
+    def flush(pairs: list, size: int) -> None:
+        pairs.sort(key=itemgetter(0))
+        path = os.path.join(run_dir, f"run-{index:05d}-{len(runs):03d}.bin")
+        rows_per_block = _rows_per_block(len(pairs), size)
+        _write_run(path, (pairs[i:i + rows_per_block] for i in range(0, len(pairs), rows_per_block)))
+        runs.append(Run(path, len(pairs), size))
+
+    with open(file_path, "rb") as raw:
+        f = io.TextIOWrapper(io.BufferedReader(_RangeReader(raw, start, end)), newline="")
+        records = scanner.read_records(f, dialect)
+        if start == 0 and dialect.has_header:
+            for row, _ in records:
+                if row:
+                    break
+
+        pairs, size = [], 0
+        for row, text in records:
+            if not row:
+                continue
+            pairs.append((key(row), text))
+            size += PAIR_BYTES + len(text)
+            if size >= run_bytes:
+                flush(pairs, size)
+                pairs, size = [], 0
+        if pairs:
+            flush(pairs, size)
+
+    return runs
+
+
+class ExternalSorter:
+    """Call `run()` with the input path and a text stream for the sorted CSV."""
+
+    def __init__(
+        self,
+        keys: Sequence[SortKey],
+        memory_budget: int = 128 * 1024 * 1024,
+        workers: int = 1,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressReporter] = None,
+        dialect: CsvDialect = CsvDialect(),
+        work_dir: Optional[str] = None,
+    ):
+        self.keys = list(keys)
+        self.memory_budget = memory_budget
+        self.workers = max(1, workers)
+        self.token = token or CancellationToken()
+        self.progress = progress or ProgressReporter()
+        self.dialect = dialect
+        self.work_dir = work_dir
+        self.stats = SortStats()
+
+    def run(self, input_path: str, output: TextIO) -> SortStats:
+        header, header_text = scanner.first_record(input_path, self.dialect)
+        if not header:
+            raise ValueError("CSV file does not contain a header row")
+        if not self.dialect.has_header:
+            header = scanner.default_header(len(header))
+        # fail before spawning anything
+        key_function(self.keys, header)
+
+        with tempfile.TemporaryDirectory(dir=self.work_dir, prefix="sort-runs-") as run_dir:
+            runs = self._sort_ranges(input_path, header, run_dir)
+            self.stats.runs = len(runs)
+            self.stats.rows = sum(run.rows for run in runs)
+
+            while len(runs) > FANIN:
+                runs = self._merge_pass(runs, run_dir)
+
+            if self.dialect.has_header:
+                output.write(header_text)
+            merged = heapq.merge(*(_iter_run(run.path) for run in runs), key=itemgetter(0))
+            for batch in iter(lambda: list(islice(merged, scanner.BATCH_ROWS)), []):
+                self.token.check_now()
+                output.write("".join(record for _, record in batch))
+            self.stats.merge_passes += 1
+
+        return self.stats
+
+    def _ranges(self, input_path: str) -> list[tuple[int, int]]:
+        size = os.path.getsize(input_path)
+        if size > RANGE_BYTES:
+            plan = plan_shards(
+                input_path,
+                max(self.workers, math.ceil(size / RANGE_BYTES)),
+                quotechar=self.dialect.quotechar,
+                delimiter=self.dialect.delimiter,
+                token=self.token,
+            )
+            if plan is not None:
+                return plan.ranges
+        # small, or quoting the planner cannot follow: one range, cut into runs by memory alone
+        return [(0, size)]
+
+    def _sort_ranges(self, input_path: str, header: list[str], run_dir: str) -> list[Run]:
+        ranges = self._ranges(input_path)
+        workers = min(self.workers, len(ranges))
+        # the budget is shared by the processes sorting at the same time
+        args = (header, self.keys, self.dialect, max(1, self.memory_budget // workers), run_dir)
+
+        runs: list[Run] = []
+        if workers == 1:
+            for i, (start, end) in enumerate(ranges):
+                self.token.check_now()
+                runs.extend(sort_range(input_path, start, end, i, *args))
+                self.progress.update(rows=sum(run.rows for run in runs), bytes_read=end)
+            return runs
+
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(sort_range, input_path, start, end, i, *args) for i, (start, end) in enumerate(ranges)]
+            for (_, end), future in zip(ranges, futures):
+                runs.extend(wait_for(future, self.token))
+                self.progress.update(rows=sum(run.rows for run in runs), bytes_read=end)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return runs
+
+    def _merge_pass(self, runs: list[Run], run_dir: str) -> list[Run]:
+        """Merge consecutive groups of FANIN runs, so input order is kept for equal keys."""
+        merged = []
+        for i in range(0, len(runs), FANIN):
+            self.token.check_now()
+            group = runs[i:i + FANIN]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+
+            path = os.path.join(run_dir, f"merge-{self.stats.merge_passes:02d}-{len(merged):05d}.bin")
+            rows, size = sum(run.rows for run in group), sum(run.size for run in group)
+            pairs = heapq.merge(*(_iter_run(run.path) for run in group), key=itemgetter(0))
+            rows_per_block = _rows_per_block(rows, size)
+            _write_run(path, iter(lambda: list(islice(pairs, rows_per_block)), []))
+            merged.append(Run(path, rows, size))
+            for run in group:
+                Path(run.path).unlink()
+
+        self.stats.merge_passes += 1
+        return merged
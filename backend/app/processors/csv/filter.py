@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from typing import Optional, TextIO
+
+from app.processors.base import JobProcessor, ScanOperator
+from app.processors.csv import scanner
+from app.processors.csv.predicates import Predicate
+from app.processors.csv.scanner import CsvDialect
+from app.core.compression import text_writer
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+OUTPUT_NAME = "filtered.csv"
+
+@dataclass
+class FilterStats:
+    rows: int = 0
+    kept_rows: int = 0
+
+class FilterOperator(ScanOperator):
+    """
+    CSV_FILTER over row batches: the rows matching `predicate` (all rows
+    without one), cut to `columns` (all columns without them), written
+    to `output`, or to a file at `output_path` it opens itself.
+    """
+
+    def __init__(
+        self,
+        predicate: Optional[Predicate],
+        columns: Optional[list[str]],
+        dialect: CsvDialect,
+        output: Optional[TextIO] = None,
+        output_path: Optional[str] = None,
+    ):
+        self.predicate = predicate
+        self.columns = columns
+        self.dialect = dialect
+        self.output = output
+        self.output_path = output_path
+        self.stats = FilterStats()
+        self._owned: Optional[TextIO] = None
+
+    def start(self, header: list[str]) -> None:
+        positions = scanner.column_positions(header)
+        if self.columns is not None:
+            missing = [column for column in self.columns if column not in positions]
+            if missing:
+                raise ValueError(f"'columns' not in the CSV header: {missing}")
+        self._filter = self.predicate.compile(header) if self.predicate is not None else None
+        self._project = (
+            scanner.values_getter([positions[column] for column in self.columns])
+            if self.columns is not None else None
+        )
+
+        if self.output is None:
+            self.output = self._owned = open(self.output_path, "w", newline="")
+        self._writer = self.dialect.writer(self.output)
+        if self.dialect.has_header:
+            self._writer.writerow(self.columns if self.columns is not None else header)
+
+    def consume(self, rows: list[list[str]]) -> None:
+        # blank lines are dropped, like DictReader
+        kept = self._filter(rows) if self._filter is not None else [row for row in rows if row]
+        self.stats.rows += len(rows) - rows.count([])
+        self.stats.kept_rows += len(kept)
+        self._writer.writerows(kept if self._project is None else map(self._project, kept))
+
+    def finalize(self) -> dict:
+        return CsvFilterProcessor.summary(self.stats, self)
+
+    def close(self) -> None:
+        if self._owned is not None:
+            self._owned.close()
+            self._owned = None
+
+class CsvFilterProcessor(JobProcessor):
+    timeout_seconds = 1200
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        dialect = CsvDialect.from_metadata(metadata, file_path)
+        predicate, columns = self.parse(metadata)
+
+        with self.open_artifact(job_input, OUTPUT_NAME, "text/csv") as sink, text_writer(sink) as output:
+            operator = FilterOperator(predicate, columns, dialect, output=output)
+            try:
+                scanner.scan(file_path, dialect, [operator], self.cancel_token(job_input), self.progress(job_input))
+                summary = operator.finalize()
+            finally:
+                operator.close()
+
+        return {
+            **summary,
+            "message": "Job executed successfully",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
+
+    def operator(self, job_input: dict) -> ScanOperator:
+        metadata = job_input["input_metadata"]
+        predicate, columns = self.parse(metadata)
+        return FilterOperator(
+            predicate,
+            columns,
+            CsvDialect.from_metadata(metadata, job_input["input_file_path"]),
+            output_path=str(self.output_dir(job_input) / OUTPUT_NAME),
+        )
+
+    @staticmethod
+    def parse(metadata: dict) -> tuple[Optional[Predicate], Optional[list[str]]]:
+        """The `where` predicate and the `columns` to keep; ValueError if neither is given."""
+        where, columns = metadata.get("where"), metadata.get("columns")
+        if where is None and columns is None:
+            raise ValueError("CSV_FILTER needs a 'where' predicate, a 'columns' list, or both")
+
+        # "columns" is a column name or a list of them, output in that order
+        if columns is not None:
+            columns = [columns] if isinstance(columns, str) else columns
+            if not columns or not isinstance(columns, list) or not all(isinstance(c, str) for c in columns):
+                raise ValueError("'columns' must be a column name or a list of column names")
+            if len(set(columns)) != len(columns):
+                raise ValueError("'columns' lists a column more than once")
+
+        return (Predicate(where) if where is not None else None), columns
+
+    @staticmethod
+    def summary(stats: FilterStats, operator: FilterOperator) -> dict:
+        logger.info("Filtered CSV", extra={"rows": stats.rows, "kept_rows": stats.kept_rows})
+        return {
+            "where": operator.predicate.text if operator.predicate is not None else None,
+            "columns": operator.columns,
+            "rows": stats.rows,
+            "kept_rows": stats.kept_rows,
+            "removed_rows": stats.rows - stats.kept_rows,
+            "output": OUTPUT_NAME,
+        }
@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.processors.base import JobProcessor, ScanOperator
+from app.processors.csv import scanner
+from app.processors.csv.hash_aggregate import GroupTable, parse_aggregates
+from app.processors.csv.scanner import CsvDialect
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+# a shard's groups as partial aggregates, grouped by partition
+INDEX_NAME = "groupby-index.bin"
+
+class GroupByOperator(ScanOperator):
+    """
+    CSV_GROUPBY over row batches. Over a shard its partial is an index
+    file of the shard's groups, which the reduce merges.
+    """
+
+    def __init__(self, table: GroupTable, output_dir: Path):
+        self.table = table
+        self.output_dir = output_dir
+
+    def start(self, header: list[str]) -> None:
+        self.header = header
+        self.table.start(header)
+
+    def consume(self, rows: list[list[str]]) -> None:
+        self.table.consume(rows)
+
+    def finalize(self) -> dict:
+        groups = list(CsvGroupByProcessor.records(self.table, self.table.groups()))
+        return {**CsvGroupByProcessor.summary(self.table), "groups": groups}
+
+    def partial(self) -> dict:
+        offsets = self.table.write_index(str(self.output_dir / INDEX_NAME))
+        return {
+            "header": self.header,
+            "rows": self.table.stats.rows,
+            "index": INDEX_NAME,
+            "offsets": offsets,
+        }
+
+    def reduce(self, partials: list[dict], shard_dirs) -> dict:
+        merged = CsvGroupByProcessor.merge(self.table, partials, shard_dirs)
+        groups = list(CsvGroupByProcessor.records(self.table, merged))
+        return {**CsvGroupByProcessor.summary(self.table), "groups": groups}
+
+    def close(self) -> None:
+        self.table.close()
+
+class CsvGroupByProcessor(JobProcessor):
+    timeout_seconds = 1200
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        dialect = CsvDialect.from_metadata(job_input["input_metadata"], file_path)
+
+        operator = self.operator(job_input)
+        try:
+            scanner.scan(file_path, dialect, [operator], self.cancel_token(job_input), self.progress(job_input))
+            return self.result(job_input, operator.table, operator.table.groups())
+        finally:
+            operator.close()
+
+    def operator(self, job_input: dict) -> ScanOperator:
+        return GroupByOperator(self.table(job_input), self.output_dir(job_input))
+
+    def shardable(self, metadata: dict) -> bool:
+        return True
+
+    def reduce(self, job_input: dict, partials: list[dict], shard_dirs) -> dict:
+        table = self.table(job_input)
+        try:
+            return self.result(job_input, table, self.merge(table, partials, shard_dirs))
+        finally:
+            table.close()
+
+    def result(self, job_input: dict, table: GroupTable, groups: Iterable) -> dict:
+        # one record per group, streamed; there can be millions
+        writer = self.result_writer(job_input)
+        with writer.records("groups") as add:
+            for record in self.records(table, groups):
+                add(record)
+
+        return writer.result({
+            **self.summary(table),
+            "message": "Job executed",
+            "file_path": job_input["input_file_path"],
+            "metadata": job_input["input_metadata"],
+        })
+
+    def table(self, job_input: dict) -> GroupTable:
+        metadata = job_input.get("input_metadata") or {}
+
+        # "group_by" is a column name or a list of them
+        group_by = metadata.get("group_by")
+        if not group_by:
+            raise ValueError("Missing required metadata field 'group_by' for grouping")
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+
+        return GroupTable(
+            group_by,
+            parse_aggregates(metadata.get("aggregates", ["count"]), group_by),
+            memory_budget=settings.CSV_GROUPBY_MEMORY_MB * 1024 * 1024,
+            token=self.cancel_token(job_input),
+            work_dir=str(self.output_dir(job_input)),
+        )
+
+    @staticmethod
+    def merge(table: GroupTable, partials: list[dict], shard_dirs) -> Iterator:
+        """The groups of every shard's index file, merged."""
+        table.start(partials[0]["header"])
+        return table.merge([
+            (str(Path(shard_dir) / partial["index"]), partial["offsets"], partial["rows"])
+            for partial, shard_dir in zip(partials, shard_dirs)
+        ])
+
+    @staticmethod
+    def records(table: GroupTable, groups: Iterable) -> Iterator[dict]:
+        names = [aggregate.name for aggregate in table.aggregates]
+        for key, state in groups:
+            yield {**dict(zip(table.group_by, key)), **dict(zip(names, table.values(state)))}
+
+    @staticmethod
+    def summary(table: GroupTable) -> dict:
+        stats = table.stats
+        if stats.spilled:
+            logger.info("Group-by spilled to disk", extra={"rows": stats.rows, "groups": stats.groups})
+
+        return {
+            "group_by": table.group_by,
+            "aggregates": [aggregate._asdict() for aggregate in table.aggregates],
+            "rows": stats.rows,
+            "group_count": stats.groups,
+            "spilled_to_disk": stats.spilled,
+        }
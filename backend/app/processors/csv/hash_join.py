@@ -0,0 +1,382 @@
+"""
+Hash join of two CSV files.
+
+The smaller file is the build side: its rows go into a dict from join key
+to the rows with that key, and the other file (the probe side) streams
+past it once. Keys are compared as text. A row with a blank join cell
+matches nothing: an inner join drops it, a left join keeps it unmatched.
+
+An output row is the left row followed by the right row's columns other
+than its join columns; right column names that clash with a left one get
+RIGHT_SUFFIX. A key repeated on both sides gives every pairing, and an
+unmatched left row (left join) has blank right columns. Left records are
+written as the text they were read from and each right row is serialized
+once, so the wider side is never re-quoted. A left row with more or fewer
+fields than its header is fitted to it. The output is in the left file's
+dialect.
+
+Past `memory_budget` the join spills (grace hash join): the build rows
+held so far, and every one after them, are appended to one of FANOUT
+partition files by a hash of their key, the probe side is partitioned the
+same way, and each pair of partitions is joined on its own, re-partitioned
+with another hash if its build side is still too large. Rows with equal
+keys always share a partition, so after MAX_DEPTH levels a partition is
+joined in memory whatever its size; only a key whose build rows alone
+exceed the budget gets there.
+
+Row order: with the right file as build side and no spill, the output
+follows the left file; otherwise it follows no particular order, and a
+left join built on the left file writes its unmatched rows last.
+"""
+import io
+import marshal
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Sequence, TextIO
+
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+
+JOIN_TYPES = ("inner", "left")
+RIGHT_SUFFIX = "_right"
+
+FANOUT = 32
+MAX_DEPTH = 3
+# Rows a partition buffers before appending them to its file as one marshal block.
+BLOCK_BYTES = 64 * 1024
+
+# Approximate CPython cost of one build row beyond its text: the key tuple
+# and its strings, the str object and its slot in the dict's lists.
+ENTRY_BYTES = 300
+
+
+def parse_join_columns(metadata: dict) -> tuple[list[str], list[str]]:
+    """
+    The left and right join columns: `on` names columns of both files,
+    `left_on` and `right_on` name them per file. Each is a column name or
+    a list of them. ValueError if they are missing or invalid.
+    """
+    on = metadata.get("on")
+    left_on = metadata.get("left_on")
+    right_on = metadata.get("right_on")
+
+    if on is not None:
+        if left_on is not None or right_on is not None:
+            raise ValueError("Give either 'on' or 'left_on' and 'right_on', not both")
+        left_on = right_on = on
+    if left_on is None or right_on is None:
+        raise ValueError("Missing required metadata field 'on' (or 'left_on' and 'right_on') for joining")
+
+    left_on, right_on = _columns(left_on), _columns(right_on)
+    if len(left_on) != len(right_on):
+        raise ValueError("'left_on' and 'right_on' must name the same number of columns")
+    return left_on, right_on
+
+
+def _columns(value) -> list[str]:
+    columns = [value] if isinstance(value, str) else value
+    if not isinstance(columns, list) or not columns or not all(isinstance(c, str) and c for c in columns):
+        raise ValueError("Join columns must be a column name or a non-empty list of them")
+    return columns
+
+
+@dataclass
+class JoinStats:
+    left_rows: int = 0
+    right_rows: int = 0
+    joined_rows: int = 0
+    unmatched_left_rows: int = 0
+    build_side: str = "right"
+    spilled: bool = False
+    spill_partitions: int = 0
+
+    @property
+    def output_rows(self) -> int:
+        return self.joined_rows + self.unmatched_left_rows
+
+
+class _Serializer:
+    """One CSV record as text, without its line terminator."""
+
+    def __init__(self, dialect: CsvDialect):
+        self._buffer = io.StringIO()
+        self._writer = dialect.writer(self._buffer)
+
+    def __call__(self, values: Sequence[str]) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue()[:-1]
+
+
+class _Partitions:
+    """FANOUT files of marshalled (key, piece) blocks, split on a hash of the key."""
+
+    def __init__(self, directory: str, depth: int):
+        self.directory = tempfile.mkdtemp(dir=directory, prefix=f"level-{depth}-")
+        self.depth = depth
+        self.paths = [os.path.join(self.directory, f"part-{i:02d}.bin") for i in range(FANOUT)]
+        self.rows = [0] * FANOUT
+        self._files = [open(p, "wb") for p in self.paths]
+        self._blocks: list[list] = [[] for _ in range(FANOUT)]
+        self._sizes = [0] * FANOUT
+
+    def add(self, key: Optional[tuple], piece: str) -> None:
+        i = hash((self.depth, key)) % FANOUT
+        self._blocks[i].append((key, piece))
+        self.rows[i] += 1
+        self._sizes[i] += len(piece)
+        if self._sizes[i] >= BLOCK_BYTES:
+            marshal.dump(self._blocks[i], self._files[i])
+            self._blocks[i] = []
+            self._sizes[i] = 0
+
+    def close(self) -> None:
+        for f, block in zip(self._files, self._blocks):
+            if block:
+                marshal.dump(block, f)
+            f.close()
+        self._blocks = []
+
+    def remove(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _iter_partition(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                block = marshal.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+class HashJoiner:
+    """Call `run()` with the two input paths and a text stream for the joined CSV."""
+
+    def __init__(
+        self,
+        left_on: Sequence[str],
+        right_on: Sequence[str],
+        how: str = "inner",
+        memory_budget: int = 128 * 1024 * 1024,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressReporter] = None,
+        left_dialect: CsvDialect = CsvDialect(),
+        right_dialect: CsvDialect = CsvDialect(),
+        work_dir: Optional[str] = None,
+    ):
+        if how not in JOIN_TYPES:
+            raise ValueError(f"Join 'how' must be one of {JOIN_TYPES}")
+        self.left_on = list(left_on)
+        self.right_on = list(right_on)
+        self.how = how
+        self.memory_budget = memory_budget
+        self.token = token or CancellationToken()
+        self.progress = progress or ProgressReporter()
+        self.left_dialect = left_dialect
+        self.right_dialect = right_dialect
+        self.work_dir = work_dir
+        self.stats = JoinStats()
+        self._serialize = _Serializer(left_dialect)
+
+    def run(self, left_path: str, right_path: str, output: TextIO) -> JoinStats:
+        left_header, left_text = self._header(left_path, self.left_dialect, self.left_on, "left")
+        right_header, _ = self._header(right_path, self.right_dialect, self.right_on, "right")
+
+        right_keys = {scanner.column_positions(right_header)[c] for c in self.right_on}
+        right_columns = [i for i in range(len(right_header)) if i not in right_keys]
+        taken = set(left_header)
+        right_names = [
+            right_header[i] + RIGHT_SUFFIX if right_header[i] in taken else right_header[i]
+            for i in right_columns
+        ]
+        # right pieces are "" when the right file has no other columns
+        self._separator = self.left_dialect.delimiter if right_columns else ""
+        self._blank_right = self.left_dialect.delimiter * (len(right_columns) - 1) if right_columns else ""
+
+        self._output = output
+        self._lines: list[str] = []
+        if self.left_dialect.has_header:
+            header = left_text.rstrip("\r\n")
+            if right_columns:
+                header += self._separator + self._serialize(right_names)
+            output.write(header + "\n")
+
+        left = self._left_pieces(left_path, left_header)
+        right = self._right_pieces(right_path, right_header, right_columns)
+        # file size is a fair proxy for the rows' in-memory size
+        self._build_left = os.path.getsize(left_path) < os.path.getsize(right_path)
+        self.stats.build_side = "left" if self._build_left else "right"
+
+        with tempfile.TemporaryDirectory(dir=self.work_dir, prefix="join-") as spill_dir:
+            self._spill_dir = spill_dir
+            if self._build_left:
+                self._join(left, right, 0)
+            else:
+                self._join(right, left, 0)
+            self._write()
+
+        return self.stats
+
+    def _header(self, path: str, dialect: CsvDialect, columns: list[str], side: str) -> tuple[list[str], str]:
+        header, text = scanner.first_record(path, dialect)
+        if not header:
+            raise ValueError(f"The {side} CSV file does not contain a header row")
+        if not dialect.has_header:
+            header = scanner.default_header(len(header))
+        missing = [c for c in columns if c not in scanner.column_positions(header)]
+        if missing:
+            raise ValueError(f"Join columns not in the {side} CSV header: {missing}")
+        return header, text
+
+    def _records(self, path: str, dialect: CsvDialect, track: bool) -> Iterator[tuple[list[str], str]]:
+        """Non-blank records after the header, counted as progress."""
+        with open(path, newline="") as f:
+            if track:
+                self.progress.track_file(f)
+            records = scanner.read_records(f, dialect)
+            if dialect.has_header:
+                for row, _ in records:
+                    if row:
+                        break
+            for row, text in records:
+                if row:
+                    self.token.check()
+                    self.progress.tick()
+                    yield row, text
+
+    def _left_pieces(self, path: str, header: list[str]) -> Iterator[tuple]:
+        """(key, record text) of every left row; the key is None when a join cell is blank."""
+        positions = scanner.column_positions(header)
+        key = scanner.values_getter([positions[c] for c in self.left_on])
+        width = len(header)
+        keep_unkeyed = self.how == "left"
+
+        # the left file is the job's input, so its position is the progress in bytes
+        for row, text in self._records(path, self.left_dialect, track=True):
+            self.stats.left_rows += 1
+            values = key(row)
+            if "" in values:
+                if not keep_unkeyed:
+                    continue
+                values = None
+            if len(row) == width:
+                yield values, text.rstrip("\r\n")
+            else:
+                yield values, self._serialize((row + [""] * width)[:width])
+
+    def _right_pieces(self, path: str, header: list[str], columns: list[int]) -> Iterator[tuple]:
+        """(key, serialized non-key columns) of every right row with no blank join cell."""
+        positions = scanner.column_positions(header)
+        key = scanner.values_getter([positions[c] for c in self.right_on])
+        values = scanner.values_getter(columns) if columns else None
+        serialize = self._serialize
+
+        for row, _ in self._records(path, self.right_dialect, track=False):
+            self.stats.right_rows += 1
+            key_values = key(row)
+            if "" in key_values:
+                continue
+            yield key_values, serialize(values(row)) if values else ""
+
+    def _join(self, build: Iterable[tuple], probe: Iterable[tuple], depth: int) -> None:
+        table: dict = {}
+        size = 0
+        partitions = None
+
+        for key, piece in build:
+            if partitions is not None:
+                partitions.add(key, piece)
+                continue
+            pieces = table.get(key)
+            if pieces is None:
+                table[key] = [piece]
+            else:
+                pieces.append(piece)
+            size += ENTRY_BYTES + len(piece)
+            if size > self.memory_budget and depth < MAX_DEPTH:
+                partitions = _Partitions(self._spill_dir, depth)
+                for held_key, held in table.items():
+                    for held_piece in held:
+                        partitions.add(held_key, held_piece)
+                table = {}
+
+        if partitions is None:
+            self._probe(table, probe)
+            return
+
+        partitions.close()
+        probe_partitions = _Partitions(self._spill_dir, depth)
+        for key, piece in probe:
+            probe_partitions.add(key, piece)
+        probe_partitions.close()
+        self.stats.spilled = True
+        self.stats.spill_partitions += FANOUT
+
+        try:
+            for i in range(FANOUT):
+                self.token.check_now()
+                if not partitions.rows[i] and (self.how == "inner" or self._build_left):
+                    # nothing to match and no unmatched left rows to keep
+                    continue
+                self._join(_iter_partition(partitions.paths[i]), _iter_partition(probe_partitions.paths[i]), depth + 1)
+                os.unlink(partitions.paths[i])
+                os.unlink(probe_partitions.paths[i])
+        finally:
+            partitions.remove()
+            probe_partitions.remove()
+
+    def _probe(self, table: dict, probe: Iterable[tuple]) -> None:
+        separator = self._separator
+        lines = self._lines
+        joined = 0
+
+        if self._build_left:
+            # probe rows are right pieces; unmatched left rows come after
+            matched = set()
+            for key, right in probe:
+                lefts = table.get(key)
+                if lefts is None:
+                    continue
+                matched.add(key)
+                for left in lefts:
+                    lines.append(f"{left}{separator}{right}\n")
+                joined += len(lefts)
+                if len(lines) >= scanner.BATCH_ROWS:
+                    self._write()
+
+            if self.how == "left":
+                tail = f"{separator}{self._blank_right}\n"
+                for key, lefts in table.items():
+                    if key not in matched:
+                        self.stats.unmatched_left_rows += len(lefts)
+                        lines.extend(left + tail for left in lefts)
+                        if len(lines) >= scanner.BATCH_ROWS:
+                            self._write()
+        else:
+            keep_unmatched = self.how == "left"
+            tail = f"{separator}{self._blank_right}\n"
+            for key, left in probe:
+                rights = table.get(key)
+                if rights is None:
+                    if keep_unmatched:
+                        self.stats.unmatched_left_rows += 1
+                        lines.append(left + tail)
+                    continue
+                for right in rights:
+                    lines.append(f"{left}{separator}{right}\n")
+                joined += len(rights)
+                if len(lines) >= scanner.BATCH_ROWS:
+                    self._write()
+
+        self.stats.joined_rows += joined
+
+    def _write(self) -> None:
+        self.token.check_now()
+        self._output.write("".join(self._lines))
+        self._lines.clear()
@@ -0,0 +1,136 @@
+"""
+CSV_INFER_SCHEMA: the type and null ratio of every column.
+
+`mode` "sample" (the default) infers from the first `sample_rows` rows
+(SCHEMA_SAMPLE_ROWS by default), "full" from every row, so that its types
+hold for the whole file; a sample that reaches the end of the file is
+full too. Types are those of CSV_TO_PARQUET: int64, float64, bool,
+timestamp and string, and nulls are blank cells.
+
+The schema is cached for the input object (see schema.py). A job that
+finds one there returns it without reading the file: a full schema for
+either mode, a sampled one of at least `sample_rows` rows for a sample.
+"""
+from typing import Optional
+
+from app.processors.base import JobProcessor
+from app.processors.csv import columnar, scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.schema import SchemaBuilder, describe
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+MODES = ("sample", "full")
+
+class CsvInferSchemaProcessor(JobProcessor):
+    timeout_seconds = 1200
+
+    def process(self, job_input: dict) -> dict:
+        if not columnar.HAS_ARROW:
+            raise ValueError("CSV_INFER_SCHEMA needs pyarrow and numpy")
+
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        dialect = CsvDialect.from_metadata(metadata, file_path)
+        full, sample_rows = self.options(metadata)
+        cache = self.schema_cache(job_input)
+
+        schema = cache.get(dialect)
+        cached = schema is not None and (schema["full"] or (not full and schema["rows"] >= sample_rows))
+        if not cached:
+            schema = self.infer(
+                file_path,
+                dialect,
+                None if full else sample_rows,
+                self.cancel_token(job_input),
+                self.progress(job_input),
+            )
+            cache.put(dialect, schema)
+
+        logger.info("Inferred CSV schema", extra={"rows": schema["rows"], "full": schema["full"], "cached": cached})
+        return {
+            "mode": "full" if full else "sample",
+            # whether the types hold for every row, not just those read
+            "full": schema["full"],
+            "rows": schema["rows"],
+            "cached": cached,
+            "columns": describe(schema),
+            "message": "Job executed successfully",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
+
+    @staticmethod
+    def options(metadata: dict) -> tuple[bool, int]:
+        """Whether to read every row, and how many to sample otherwise."""
+        mode = metadata.get("mode", "sample")
+        if mode not in MODES:
+            raise ValueError(f"'mode' must be one of {MODES}")
+        sample_rows = metadata.get("sample_rows", settings.SCHEMA_SAMPLE_ROWS)
+        if not isinstance(sample_rows, int) or isinstance(sample_rows, bool) or sample_rows < 1:
+            raise ValueError("'sample_rows' must be a positive integer")
+        return mode == "full", sample_rows
+
+    @classmethod
+    def infer(
+        cls,
+        file_path: str,
+        dialect: CsvDialect,
+        limit: Optional[int],
+        token: CancellationToken,
+        progress: ProgressReporter,
+    ) -> dict:
+        """The schema of the first `limit` rows, or of all of them."""
+        try:
+            builder, complete = cls.scan_columnar(file_path, dialect, limit, token, progress)
+        except columnar.ENGINE_ERRORS as exc:
+            logger.warning("Columnar engine rejected %s, scanning rows: %s", file_path, exc)
+            builder, complete = cls.scan_rows(file_path, dialect, limit, token, progress)
+        return builder.schema(full=complete)
+
+    @staticmethod
+    def scan_columnar(file_path, dialect, limit, token, progress) -> tuple[SchemaBuilder, bool]:
+        builder = SchemaBuilder(columnar.read_header(file_path, dialect))
+
+        for batch in columnar.iter_batches(
+            file_path,
+            dialect=dialect,
+            block_size=settings.CSV_BATCH_MB * 1024 * 1024,
+            token=token,
+            progress=progress,
+        ):
+            if limit is not None:
+                batch = batch.slice(0, limit - builder.rows)
+            builder.add(batch.columns, batch.num_rows)
+            if limit is not None and builder.rows >= limit:
+                return builder, False
+
+        return builder, True
+
+    @staticmethod
+    def scan_rows(file_path, dialect, limit, token, progress) -> tuple[SchemaBuilder, bool]:
+        with open(file_path, newline="") as f:
+            progress.track_file(f)
+            reader = dialect.reader(f)
+            header, pending = scanner.read_header(reader, dialect)
+            builder = SchemaBuilder(header)
+
+            for batch in scanner.batches(reader, pending):
+                token.check_now()
+                rows = [row for row in batch if row]
+                if limit is not None:
+                    rows = rows[: limit - builder.rows]
+                # short rows read as blanks, extra fields are ignored, as in the column stats
+                columns = [
+                    columnar.text_column([row[i] if i < len(row) else "" for row in rows])
+                    for i in range(len(header))
+                ]
+                builder.add(columns, len(rows))
+                progress.update(rows=builder.rows)
+                if limit is not None and builder.rows >= limit:
+                    return builder, False
+
+        return builder, True
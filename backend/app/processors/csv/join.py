@@ -0,0 +1,74 @@
+from app.processors.base import JobProcessor
+from app.processors.csv.hash_join import HashJoiner, JoinStats, parse_join_columns
+from app.processors.csv.scanner import CsvDialect
+from app.core.compression import text_writer
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+OUTPUT_NAME = "joined.csv"
+
+class CsvJoinProcessor(JobProcessor):
+    timeout_seconds = 1800
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        # the job's input is the left side; "right_input" is downloaded next to it
+        right_path = self.additional_input(job_input, "right")
+        joiner = self.joiner(job_input, right_path)
+
+        with self.open_artifact(job_input, OUTPUT_NAME, "text/csv") as sink, text_writer(sink) as output:
+            stats = joiner.run(file_path, right_path, output)
+
+        return {
+            **self.summary(stats, joiner),
+            "message": "Job executed successfully",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
+
+    def joiner(self, job_input: dict, right_path: str) -> HashJoiner:
+        metadata = job_input.get("input_metadata") or {}
+        left_on, right_on = parse_join_columns(metadata)
+
+        return HashJoiner(
+            left_on,
+            right_on,
+            how=metadata.get("how", "inner"),
+            memory_budget=settings.CSV_JOIN_MEMORY_MB * 1024 * 1024,
+            token=self.cancel_token(job_input),
+            progress=self.progress(job_input),
+            # sniffed per file, but the output is written in the left file's dialect
+            left_dialect=CsvDialect.from_metadata(metadata, job_input.get("input_file_path")),
+            right_dialect=CsvDialect.from_metadata(metadata, right_path),
+            work_dir=str(self.output_dir(job_input)),
+        )
+
+    @staticmethod
+    def summary(stats: JoinStats, joiner: HashJoiner) -> dict:
+        if stats.spilled:
+            logger.info(
+                "Join spilled to disk",
+                extra={
+                    "left_rows": stats.left_rows,
+                    "right_rows": stats.right_rows,
+                    "spill_partitions": stats.spill_partitions,
+                },
+            )
+
+        return {
+            "how": joiner.how,
+            "left_on": joiner.left_on,
+            "right_on": joiner.right_on,
+            "left_rows": stats.left_rows,
+            "right_rows": stats.right_rows,
+            "joined_rows": stats.joined_rows,
+            "unmatched_left_rows": stats.unmatched_left_rows,
+            "output_rows": stats.output_rows,
+            "build_side": stats.build_side,
+            "spilled": stats.spilled,
+            "spill_partitions": stats.spill_partitions,
+            "output": OUTPUT_NAME,
+        }
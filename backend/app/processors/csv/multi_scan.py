@@ -0,0 +1,147 @@
+from app.core.enums.job_type import JobType
+from app.processors.base import JobProcessor, ScanOperator
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+
+class MultiScanOperator(ScanOperator):
+    """Fans every call out to the operators of a CSV_MULTI_SCAN, keyed by job type."""
+
+    def __init__(self, operators: dict[str, ScanOperator]):
+        self.operators = operators
+
+    def start(self, header: list[str]) -> None:
+        for operator in self.operators.values():
+            operator.start(header)
+
+    def consume(self, rows: list[list[str]]) -> None:
+        for operator in self.operators.values():
+            operator.consume(rows)
+
+    def finalize(self) -> dict:
+        return {name: operator.finalize() for name, operator in self.operators.items()}
+
+    def partial(self) -> dict:
+        return {name: operator.partial() for name, operator in self.operators.items()}
+
+    def reduce(self, partials: list[dict], shard_dirs) -> dict:
+        return {
+            name: operator.reduce([partial[name] for partial in partials], shard_dirs)
+            for name, operator in self.operators.items()
+        }
+
+    def close(self) -> None:
+        for operator in self.operators.values():
+            operator.close()
+
+class CsvMultiScanProcessor(JobProcessor):
+    """
+    Runs several CSV job types over one parse of the input. Every listed
+    operation becomes its processor's ScanOperator; each batch of rows is
+    handed to all of them, and each one's result becomes a section of the
+    combined output.
+    """
+
+    timeout_seconds = 1800
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
+
+        dialect = CsvDialect.from_metadata(job_input["input_metadata"], file_path)
+
+        operator = self.operator(job_input)
+        try:
+            scanner.scan(file_path, dialect, [operator], token, progress)
+            results = operator.finalize()
+        finally:
+            operator.close()
+
+        return self.result(results, file_path, job_input["input_metadata"])
+
+    def operator(self, job_input: dict) -> ScanOperator:
+        # imported here: the registry imports this module
+        from app.processors.registry import get_processor
+
+        metadata = job_input["input_metadata"]
+        operators: dict[str, ScanOperator] = {}
+        try:
+            for job_type, options in self.operations(metadata):
+                sub_input = {**job_input, "input_metadata": self.sub_metadata(metadata, options)}
+                operators[job_type.value] = get_processor(job_type).operator(sub_input)
+        except Exception:
+            for operator in operators.values():
+                operator.close()
+            raise
+
+        return MultiScanOperator(operators)
+
+    def shardable(self, metadata: dict) -> bool:
+        from app.processors.registry import get_processor
+
+        # a row count merges fine, it is just not worth sharding on its own
+        return all(
+            job_type == JobType.CSV_ROW_COUNT
+            or get_processor(job_type).shardable(self.sub_metadata(metadata, options))
+            for job_type, options in self.operations(metadata)
+        )
+
+    def reduce_reads_input(self, metadata: dict) -> bool:
+        from app.processors.registry import get_processor
+
+        return any(
+            get_processor(job_type).reduce_reads_input(self.sub_metadata(metadata, options))
+            for job_type, options in self.operations(metadata)
+        )
+
+    def reduce(self, job_input: dict, partials: list[dict], shard_dirs) -> dict:
+        results = self.merge_partials(job_input, partials, shard_dirs)
+        return self.result(results, job_input["input_file_path"], job_input["input_metadata"])
+
+    @staticmethod
+    def result(results: dict, file_path: str, metadata: dict) -> dict:
+        return {
+            "operations": list(results),
+            "results": results,
+            "message": "Job executed",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
+
+    @staticmethod
+    def sub_metadata(metadata: dict, options: dict) -> dict:
+        """An operation sees the job's metadata, without `operations`, plus its own options."""
+        return {**{k: v for k, v in metadata.items() if k != "operations"}, **options}
+
+    @staticmethod
+    def operations(metadata: dict) -> list[tuple[JobType, dict]]:
+        """
+        `operations` lists job types, each either a name or an object with
+        a `type` and that job type's metadata, e.g.
+        ["CSV_ROW_COUNT", {"type": "CSV_DEDUPLICATE", "key": "id"}].
+        Only job types with a ScanOperator can be listed, CSV_MULTI_SCAN
+        itself excepted.
+        """
+        from app.processors.registry import get_processor
+
+        entries = metadata.get("operations")
+        if not entries or not isinstance(entries, list):
+            raise ValueError("Missing required metadata field 'operations' (a list of job types)")
+
+        operations: list[tuple[JobType, dict]] = []
+        for entry in entries:
+            options = dict(entry) if isinstance(entry, dict) else {"type": entry}
+            name = options.pop("type", None)
+            try:
+                job_type = JobType(name)
+            except ValueError:
+                raise ValueError(f"Unknown operation {name!r}") from None
+
+            processor = get_processor(job_type)
+            if job_type == JobType.CSV_MULTI_SCAN or type(processor).operator is JobProcessor.operator:
+                raise ValueError(f"{job_type.value} cannot run in a CSV_MULTI_SCAN")
+            if any(seen == job_type for seen, _ in operations):
+                raise ValueError(f"Operation {name} is listed more than once")
+            operations.append((job_type, options))
+
+        return operations
@@ -0,0 +1,187 @@
+"""
+Row counting over raw bytes.
+
+The file is memory-mapped and cut into fixed-size byte chunks that are
+counted independently (in a process pool when there is more than one CPU).
+Each chunk reports its record terminators for both possible starting
+states — outside or inside a quoted field — and the chunks are then
+stitched together in order, carrying the quote state across boundaries.
+
+Chunks without a quote character (every chunk, when the dialect has no
+quoting) take a fast path that is just a few `bytes.count()` calls. Chunks with quotes are split on the quote character;
+every quote toggles the state, which matches RFC 4180 quoting including
+`""` escapes. Quotes that the `csv` module would treat literally (a quote
+in the middle of an unquoted field, text after a closing quote) make the
+chunk irregular, and `count_rows()` returns None so the caller can fall
+back to `csv.reader`.
+
+The result is the same number of records `csv.reader` yields, blank lines
+included.
+"""
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+from app.processors.execution import CancellationToken, ProgressReporter, wait_for
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+class ChunkCount(NamedTuple):
+    # terminators counted if the chunk starts outside / inside a quoted field
+    rows_outside: int
+    rows_inside: int
+    # whether the chunk contains an odd number of quote characters
+    flips_state: bool
+    # False when the chunk is not RFC 4180 quoted for that starting state
+    regular_outside: bool
+    regular_inside: bool
+    starts_with_lf: bool
+    ends_with_cr: bool
+
+
+def _terminators(data: bytes) -> int:
+    # \n, \r and \r\n each end a record
+    lf = data.count(b"\n")
+    if b"\r" not in data:
+        return lf
+    return lf + data.count(b"\r") - data.count(b"\r\n")
+
+
+def _scan(data: bytes, prev: int, quote: bytes, delimiter: bytes) -> ChunkCount:
+    if not quote or quote not in data:
+        rows = _terminators(data)
+        return ChunkCount(rows, 0, False, True, True, data[:1] == b"\n", data[-1:] == b"\r")
+
+    boundaries = {delimiter[0], ord("\n"), ord("\r")}
+    segments = data.split(quote)
+    last = len(segments) - 1
+
+    rows = [0, 0]
+    regular = [True, True]
+
+    for i, segment in enumerate(segments):
+        # with parity p, segment i is outside quotes when i % 2 == p
+        if segment:
+            rows[i % 2] += _terminators(segment)
+
+        for parity in (0, 1):
+            if i % 2 != parity or not regular[parity]:
+                continue
+
+            # text right after a closing quote must end the field
+            if segment and (i > 0 or prev == quote[0]) and segment[0] not in boundaries:
+                regular[parity] = False
+                continue
+
+            # an opening quote must start a field
+            if i < last:
+                if segment:
+                    before = segment[-1]
+                elif i == 0 and prev != quote[0]:
+                    before = prev
+                else:
+                    continue  # "" inside a quoted field
+                if before != -1 and before not in boundaries:
+                    regular[parity] = False
+
+    return ChunkCount(
+        rows_outside=rows[0],
+        rows_inside=rows[1],
+        flips_state=last % 2 == 1,
+        regular_outside=regular[0],
+        regular_inside=regular[1],
+        starts_with_lf=data[:1] == b"\n",
+        ends_with_cr=data[-1:] == b"\r",
+    )
+
+
+def count_chunk(
+    file_path: str,
+    start: int,
+    end: int,
+    quotechar: Optional[str] = '"',
+    delimiter: str = ",",
+) -> ChunkCount:
+    """Count one byte range of `file_path`. Runs in a pool worker."""
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            prev = mm[start - 1] if start > 0 else -1
+            quote = quotechar.encode() if quotechar else b""
+            return _scan(mm[start:end], prev, quote, delimiter.encode())
+
+
+def stitch(parts: list[ChunkCount], last_byte: int) -> Optional[int]:
+    """Combine per-chunk counts in file order. None if quoting is irregular."""
+    inside = False
+    total = 0
+    previous: Optional[ChunkCount] = None
+
+    for part in parts:
+        # \r at the end of one chunk and \n at the start of the next is one
+        # terminator, counted twice (only matters outside quotes)
+        if previous and previous.ends_with_cr and part.starts_with_lf and not inside:
+            total -= 1
+
+        if not (part.regular_inside if inside else part.regular_outside):
+            return None
+
+        total += part.rows_inside if inside else part.rows_outside
+        inside ^= part.flips_state
+        previous = part
+
+    # the last record has no terminator, or EOF hit an open quoted field
+    if inside or last_byte not in (ord("\n"), ord("\r")):
+        total += 1
+
+    return total
+
+
+def count_rows(
+    file_path: str,
+    *,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    quotechar: Optional[str] = '"',
+    delimiter: str = ",",
+    token: Optional[CancellationToken] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> Optional[int]:
+    """
+    Number of CSV records in `file_path`, or None if the file uses quoting
+    this engine cannot count exactly.
+    """
+    token = token or CancellationToken()
+    progress = progress or ProgressReporter()
+
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return 0
+
+    ranges = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+    args = (quotechar, delimiter)
+
+    parts: list[ChunkCount] = []
+
+    if workers <= 1 or len(ranges) == 1:
+        for start, end in ranges:
+            token.check_now()
+            parts.append(count_chunk(file_path, start, end, *args))
+            progress.update(bytes_read=end)
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(ranges)))
+        try:
+            futures = [pool.submit(count_chunk, file_path, start, end, *args) for start, end in ranges]
+            for (_, end), future in zip(ranges, futures):
+                parts.append(wait_for(future, token))
+                progress.update(bytes_read=end)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    with open(file_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        last_byte = f.read(1)[0]
+
+    return stitch(parts, last_byte)
+
@@ -0,0 +1,262 @@
+"""
+The predicate language of CSV_FILTER's `where`.
+
+A predicate is a boolean expression over a row's cells, written in a
+small subset of Python's expression syntax:
+
+    price > 100 and status in ("active", "pending")
+    not (country == "US" or col("unit price") <= 9.99)
+    0 < qty <= 10 and startswith(sku, "AB-") and not blank(note)
+
+    columns       a column whose name is an identifier, or col("any name")
+    comparisons   == != < <= > >= (chains too, as in 0 < qty <= 10), and
+                  in / not in a list of literals; every comparison sets a
+                  column against a literal
+    literals      a string compares the cell as text; a number compares it
+                  as a float, and cells float() cannot read (blank ones
+                  too) match no numeric comparison, != and not in included
+    functions     contains(column, "text"), startswith(column, "text"),
+                  endswith(column, "text"), blank(column) (empty or
+                  whitespace only)
+    logic         and, or, not, parentheses
+
+The text is parsed with `ast` and every node is checked against that
+grammar; nothing from it runs as Python. The checked tree is translated
+into the source of one function that filters a whole batch with a list
+comprehension, in which columns are row indexes and literals are bound
+names, and that source is compiled once per job. Per row this costs no
+function call for the predicate and no dict, and float() runs only on the
+cells a numeric comparison reads: columns the predicate does not name are
+never converted. Short rows read "" for the cells they lack.
+"""
+import ast
+import math
+from typing import Callable, Optional, Sequence
+
+from app.processors.csv import scanner
+
+FUNCTIONS = ("contains", "startswith", "endswith", "blank")
+MAX_LENGTH = 4096
+
+_COMPARISONS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+    ast.In: "in",
+    ast.NotIn: "not in",
+}
+_OPERATORS = ", ".join(_COMPARISONS.values())
+# a cell that is not a number must fail these too, though NaN passes them
+_NEGATED = (ast.NotEq, ast.NotIn)
+
+
+def _number(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+class Predicate:
+    """A checked `where` expression; `compile()` turns it into a batch filter for a header."""
+
+    def __init__(self, text):
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("'where' must be a non-empty expression")
+        if len(text) > MAX_LENGTH:
+            raise ValueError(f"'where' is longer than {MAX_LENGTH} characters")
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Cannot parse 'where': {e.msg}") from None
+
+        self.text = text
+        self._tree = tree.body
+        self.columns: list[str] = []
+        # the translation checks the grammar and collects the columns
+        _Translator(self, None).condition(self._tree)
+
+    def compile(self, header: Sequence[str]) -> Callable[[list[list[str]]], list[list[str]]]:
+        """
+        A function returning the non-blank rows of a batch that match;
+        ValueError if the predicate names a column not in `header`.
+        """
+        positions = scanner.column_positions(header)
+        missing = [column for column in self.columns if column not in positions]
+        if missing:
+            raise ValueError(f"'where' columns not in the CSV header: {missing}")
+
+        translator = _Translator(self, positions)
+        condition = translator.condition(self._tree)
+        width = max(positions[column] for column in self.columns) + 1
+
+        source = "\n".join([
+            "def batch_filter(rows):",
+            "    try:",
+            f"        return [row for row in rows if row and {condition.format(row='row')}]",
+            "    except IndexError:",
+            # a short row in the batch: again, reading padded copies
+            f"        return [row for row in rows if row for cells in (row + [''] * ({width} - len(row)),)"
+            f" if {condition.format(row='cells')}]",
+        ])
+        namespace = {"_number": _number, **translator.literals}
+        exec(compile(source, "<where>", "exec"), namespace)
+        return namespace["batch_filter"]
+
+
+class _Translator:
+    """
+    Python source for a checked tree, with `{row}` where the row goes.
+    Without `positions` it only checks the tree and collects its columns.
+    """
+
+    def __init__(self, predicate: Predicate, positions: Optional[dict[str, int]]):
+        self.predicate = predicate
+        self.positions = positions
+        self.literals: dict[str, object] = {}
+        self._temporaries = 0
+
+    def condition(self, node: ast.AST) -> str:
+        if isinstance(node, ast.BoolOp):
+            joiner = " and " if isinstance(node.op, ast.And) else " or "
+            return "(" + joiner.join(self.condition(value) for value in node.values) + ")"
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return f"(not {self.condition(node.operand)})"
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.Call) and self._function(node) in FUNCTIONS:
+            return self._call(node)
+        raise ValueError(
+            "'where' must be comparisons and function calls joined by and/or/not;"
+            f" got {ast.unparse(node)}"
+        )
+
+    def _compare(self, node: ast.Compare) -> str:
+        """A chain like 0 < qty <= 10 is translated pair by pair, joined with and."""
+        operands = [node.left, *node.comparators]
+        columns = [self._column(operand) for operand in operands]
+        # number cells read by two pairs, or guarded, are parsed once into a temporary
+        temporaries: dict[int, str] = {}
+        pairs = []
+
+        for i, op in enumerate(node.ops):
+            if type(op) not in _COMPARISONS or (columns[i] is None) == (columns[i + 1] is None):
+                raise ValueError(
+                    "Each comparison in 'where' must set a column against a literal"
+                    f" with {_OPERATORS}; got {ast.unparse(node)}"
+                )
+            column_first = columns[i] is not None
+            if isinstance(op, (ast.In, ast.NotIn)) and not column_first:
+                raise ValueError("'in' in 'where' needs a column on its left")
+
+            at = i if column_first else i + 1
+            value = self._literal(operands[2 * i + 1 - at], op)
+            literal = self._bind(value)
+            cell = self._cell(columns[at])
+            symbol = _COMPARISONS[type(op)]
+
+            def compare(operand: str) -> str:
+                return f"{operand} {symbol} {literal}" if column_first else f"{literal} {symbol} {operand}"
+
+            if not _numeric(value):
+                pairs.append(compare(cell))
+                continue
+
+            negated = isinstance(op, _NEGATED)
+            if at in temporaries:
+                first = number = temporaries[at]
+            elif negated or 0 < at < len(node.ops):
+                number = temporaries[at] = f"_n{self._temporaries}"
+                self._temporaries += 1
+                first = f"({number} := _number({cell}))"
+            else:
+                first = number = f"_number({cell})"
+            # NaN == NaN is False: only numbers get past the guard
+            pairs.append(f"{first} == {number} and {compare(number)}" if negated else compare(first))
+
+        return "(" + " and ".join(pairs) + ")"
+
+    def _call(self, node: ast.Call) -> str:
+        name = self._function(node)
+        if node.keywords:
+            raise ValueError(f"{name}() in 'where' takes no keyword arguments")
+        expected = 1 if name == "blank" else 2
+        if len(node.args) != expected:
+            raise ValueError(f"{name}() in 'where' takes {expected} argument{'s' if expected > 1 else ''}")
+
+        column = self._column(node.args[0])
+        if column is None:
+            raise ValueError(f"The first argument of {name}() in 'where' must be a column")
+        cell = self._cell(column)
+        if name == "blank":
+            return f"(not {cell}.strip())"
+
+        text = self._literal(node.args[1], None)
+        if not isinstance(text, str):
+            raise ValueError(f"The second argument of {name}() in 'where' must be a string")
+        if name == "contains":
+            return f"({self._bind(text)} in {cell})"
+        return f"{cell}.{name}({self._bind(text)})"
+
+    @staticmethod
+    def _function(node: ast.Call) -> Optional[str]:
+        return node.func.id if isinstance(node.func, ast.Name) else None
+
+    def _column(self, node: ast.AST) -> Optional[str]:
+        """The column `node` names, or None for anything else."""
+        if isinstance(node, ast.Name):
+            name = node.id
+        elif isinstance(node, ast.Call) and self._function(node) == "col":
+            if len(node.args) != 1 or node.keywords or not _is_string(node.args[0]):
+                raise ValueError('col() in \'where\' takes one column name, as in col("unit price")')
+            name = node.args[0].value
+        else:
+            return None
+        if self.positions is None and name not in self.predicate.columns:
+            self.predicate.columns.append(name)
+        return name
+
+    def _literal(self, node: ast.AST, op: Optional[ast.cmpop]):
+        """A literal's value: a str, a float, or for in/not in a frozenset of either."""
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+                raise ValueError("'in' in 'where' needs a list of literals, as in status in (\"a\", \"b\")")
+            values = frozenset(self._literal(element, None) for element in node.elts)
+            if len({isinstance(value, str) for value in values}) > 1:
+                raise ValueError("A list in 'where' cannot mix numbers and strings")
+            return values
+
+        if _is_string(node):
+            return node.value
+        sign = 1
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            sign = -1 if isinstance(node.op, ast.USub) else 1
+            node = node.operand
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float) and math.isfinite(node.value):
+            return sign * float(node.value)
+        raise ValueError(f"Expected a string or number literal in 'where'; got {ast.unparse(node)}")
+
+    def _cell(self, column: str) -> str:
+        if self.positions is None:
+            return "{row}[0]"
+        return f"{{row}}[{self.positions[column]}]"
+
+    def _bind(self, value) -> str:
+        name = f"_v{len(self.literals)}"
+        self.literals[name] = value
+        return name
+
+
+def _numeric(value) -> bool:
+    if isinstance(value, frozenset):
+        # an empty list matches nothing either way
+        return any(isinstance(v, float) for v in value)
+    return isinstance(value, float)
+
+
+def _is_string(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
@@ -1,16 +1,58 @@
-import csv
-from app.processors.base import JobProcessor
+from app.processors.base import JobProcessor, ScanOperator
+from app.processors.execution import available_cpus
+from app.processors.csv.parallel_count import count_rows
+from app.processors.csv.scanner import CsvDialect
+from app.core.settings import settings
+
+class RowCountOperator(ScanOperator):
+    """Counts records the way csv.reader yields them: header and blank lines included."""
+
+    def __init__(self, has_header: bool = True):
+        self.has_header = has_header
+        self.rows = 0
+
+    def start(self, header: list[str]) -> None:
+        # without a header the first record arrives in consume() instead
+        self.rows = 1 if header and self.has_header else 0
+
+    def consume(self, rows: list[list[str]]) -> None:
+        self.rows += len(rows)
+
+    def finalize(self) -> dict:
+        return {"rows": self.rows}
+
+    def partial(self) -> dict:
+        return {"rows": self.rows}
+
+    def reduce(self, partials: list[dict], shard_dirs) -> dict:
+        # every shard counted its own copy of the header
+        return {"rows": sum(p["rows"] for p in partials) - (len(partials) - 1)}
 
 class CsvRowCountProcessor(JobProcessor):
+    timeout_seconds = 600
+
     def process(self, job_input: dict) -> dict:
         file_path = job_input["input_file_path"]
         metadata = job_input["input_metadata"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
+        dialect = CsvDialect.from_metadata(metadata, file_path)
 
-        count = 0
-        with open(file_path, newline="") as f:
-            reader = csv.reader(f)
-            for _ in reader:
-                count += 1
+        count = count_rows(
+            file_path,
+            workers=settings.CSV_ROW_COUNT_WORKERS or available_cpus(),
+            chunk_size=settings.CSV_ROW_COUNT_CHUNK_MB * 1024 * 1024,
+            quotechar=dialect.quotechar,
+            delimiter=dialect.delimiter,
+            token=token,
+            progress=progress,
+        )
+
+        # Quoting the byte counter cannot follow exactly; parse it instead.
+        if count is None:
+            count = self.count_with_reader(file_path, dialect, token, progress)
+        else:
+            progress.update(rows=count)
 
         return {
             "rows": count,
@@ -19,3 +61,22 @@ class CsvRowCountProcessor(JobProcessor):
             "metadata": metadata,
 
         }
+
+    def operator(self, job_input: dict) -> ScanOperator:
+        return RowCountOperator(CsvDialect.from_metadata(job_input["input_metadata"]).has_header)
+
+    # Not shardable on its own: finding the shard boundaries already reads
+    # every byte, which is all this job does. It still merges as part of a
+    # sharded CSV_MULTI_SCAN.
+
+    @staticmethod
+    def count_with_reader(file_path: str, dialect: CsvDialect, token, progress) -> int:
+        count = 0
+        with open(file_path, newline="") as f:
+            progress.track_file(f)
+            reader = dialect.reader(f)
+            for _ in reader:
+                token.check()
+                progress.tick()
+                count += 1
+        return count
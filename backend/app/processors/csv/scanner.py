@@ -0,0 +1,222 @@
+"""
+CSV reading shared by the CSV processors.
+
+Every CSV job reads its input in the dialect its metadata describes
+(`CsvDialect.from_metadata()`):
+
+    delimiter   one ASCII character, default ","
+    quotechar   one ASCII character, default '"'; null reads quote
+                characters as ordinary data
+    has_header  default true; without a header the columns are named
+                column_1, column_2, ... after the first record's width
+    sniff       detect delimiter and quote character from the first
+                SNIFF_BYTES of the file, falling back to the two above
+
+Rows are the lists `csv.reader` yields. Processors find their columns
+once (`column_positions()`) and read values by index (`values_getter()`)
+rather than building a dict per row the way `csv.DictReader` does.
+"""
+import csv
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Sequence
+
+from app.processors.execution import CancellationToken, ProgressReporter
+
+BATCH_ROWS = 4096
+SNIFF_BYTES = 64 * 1024
+SNIFF_DELIMITERS = ",;\t|"
+
+
+def dialect_metadata(metadata: dict) -> dict:
+    """The dialect keys of job metadata with their defaults; ValueError if one is invalid."""
+    delimiter = metadata.get("delimiter", ",")
+    quotechar = metadata.get("quotechar", '"')
+    has_header = metadata.get("has_header", True)
+    sniff = metadata.get("sniff", False)
+
+    # the byte-level counters need single-byte characters
+    if not _single_ascii(delimiter) or delimiter in '\r\n"':
+        raise ValueError("'delimiter' must be one ASCII character other than a quote or line break")
+    if quotechar is not None and (not _single_ascii(quotechar) or quotechar in "\r\n" or quotechar == delimiter):
+        raise ValueError("'quotechar' must be null or one ASCII character other than the delimiter or a line break")
+    if not isinstance(has_header, bool) or not isinstance(sniff, bool):
+        raise ValueError("'has_header' and 'sniff' must be booleans")
+
+    return {"delimiter": delimiter, "quotechar": quotechar, "has_header": has_header, "sniff": sniff}
+
+
+def _single_ascii(value) -> bool:
+    return isinstance(value, str) and len(value) == 1 and value.isascii()
+
+
+class CsvDialect(NamedTuple):
+    delimiter: str = ","
+    # None: no quoting, quote characters are data (csv.QUOTE_NONE)
+    quotechar: Optional[str] = '"'
+    has_header: bool = True
+
+    @classmethod
+    def from_metadata(cls, metadata: dict, file_path: Optional[str] = None) -> "CsvDialect":
+        """The job's dialect; with `sniff`, delimiter and quote character come from `file_path`."""
+        options = dialect_metadata(metadata or {})
+        dialect = cls(options["delimiter"], options["quotechar"], options["has_header"])
+        if options["sniff"] and file_path is not None:
+            dialect = sniff(file_path, dialect)
+        return dialect
+
+    def to_metadata(self) -> dict:
+        """Metadata keys that select exactly this dialect, without sniffing."""
+        return {**self._asdict(), "sniff": False}
+
+    def reader(self, f):
+        return csv.reader(f, **self._format())
+
+    def writer(self, f):
+        return csv.writer(f, lineterminator="\n", **self._format())
+
+    def _format(self) -> dict:
+        if self.quotechar is None:
+            return {"delimiter": self.delimiter, "quotechar": None, "quoting": csv.QUOTE_NONE}
+        return {"delimiter": self.delimiter, "quotechar": self.quotechar}
+
+
+def sniff(file_path: str, fallback: CsvDialect) -> CsvDialect:
+    """Delimiter and quote character guessed from the start of the file, else `fallback`'s."""
+    with open(file_path, newline="") as f:
+        return sniff_text(f.read(SNIFF_BYTES), fallback)
+
+
+def sniff_text(sample: str, fallback: CsvDialect) -> CsvDialect:
+    """`sniff()` for text already read from the start of a file."""
+    sample = sample[:SNIFF_BYTES]
+    # a cut-off last line can skew the guess
+    if len(sample) == SNIFF_BYTES and "\n" in sample:
+        sample = sample[: sample.rindex("\n") + 1]
+
+    try:
+        found = csv.Sniffer().sniff(sample, delimiters=SNIFF_DELIMITERS)
+    except csv.Error:
+        return fallback
+
+    return fallback._replace(delimiter=found.delimiter, quotechar=found.quotechar or fallback.quotechar)
+
+
+def resolve_metadata(metadata: dict, file_path: str) -> dict:
+    """
+    `metadata` with the dialect sniffed once and written out, for work
+    that reads only part of the file (shards, checkpoint segments) and
+    must not sniff a different sample.
+    """
+    return {**metadata, **CsvDialect.from_metadata(metadata, file_path).to_metadata()}
+
+
+def default_header(width: int) -> list[str]:
+    return [f"column_{i}" for i in range(1, width + 1)]
+
+
+def read_header(reader, dialect: CsvDialect) -> tuple[list[str], list[list[str]]]:
+    """
+    The column names, and the rows read while finding them that are not
+    the header: blank lines before the first record and, without a
+    header, that record. Like csv.DictReader, the first non-blank record
+    is the header.
+    """
+    skipped: list[list[str]] = []
+    for row in reader:
+        if row:
+            if dialect.has_header:
+                return row, skipped
+            skipped.append(row)
+            return default_header(len(row)), skipped
+        skipped.append(row)
+    return [], skipped
+
+
+def read_records(f, dialect: CsvDialect) -> Iterator[tuple[list[str], str]]:
+    """
+    csv.reader rows of a text file, each with the text of its record,
+    line terminator included (added if the file's last line lacks one).
+    """
+    consumed: list[str] = []
+
+    def lines() -> Iterator[str]:
+        # csv.reader pulls exactly the lines of one record at a time
+        for line in f:
+            consumed.append(line)
+            yield line
+
+    for row in dialect.reader(lines()):
+        text = "".join(consumed)
+        consumed.clear()
+        if not text.endswith(("\n", "\r")):
+            text += "\n"
+        yield row, text
+
+
+def first_record(file_path: str, dialect: CsvDialect) -> tuple[list[str], str]:
+    """The first non-blank record and its text, which csv.reader takes as the header."""
+    with open(file_path, newline="") as f:
+        for row, text in read_records(f, dialect):
+            if row:
+                return row, text
+    return [], ""
+
+
+def batches(reader, pending: Sequence[list[str]] = (), size: int = BATCH_ROWS) -> Iterator[list[list[str]]]:
+    """`pending` rows (from `read_header()`), then the rest of `reader`, in lists of up to `size` rows."""
+    if pending:
+        yield list(pending)
+    yield from iter(lambda: list(islice(reader, size)), [])
+
+
+def scan(
+    file_path: str,
+    dialect: CsvDialect,
+    operators: Iterable,
+    token: CancellationToken,
+    progress: ProgressReporter,
+) -> int:
+    """
+    Feed the header and then row batches to every ScanOperator; returns
+    the rows after the header. Blank lines go to the operators too, so
+    row counts match csv.reader.
+    """
+    operators = list(operators)
+    with open(file_path, newline="") as f:
+        progress.track_file(f)
+        reader = dialect.reader(f)
+        header, pending = read_header(reader, dialect)
+
+        for operator in operators:
+            operator.start(header)
+
+        rows = 0
+        for batch in batches(reader, pending):
+            token.check_now()
+            for operator in operators:
+                operator.consume(batch)
+            rows += len(batch)
+            progress.update(rows=rows)
+
+    return rows
+
+
+def column_positions(header: Sequence[str]) -> dict[str, int]:
+    """Column name → index; like csv.DictReader, a repeated name means its last column."""
+    return {name: i for i, name in enumerate(header)}
+
+
+def values_getter(indexes: Sequence[int]) -> Callable[[Sequence[str]], tuple]:
+    """A function returning the values at `indexes` of a row; "" for fields a short row lacks."""
+    indexes = list(indexes)
+    get = itemgetter(*indexes)
+    needed = max(indexes) + 1
+    single = len(indexes) == 1
+
+    def values(row: Sequence[str]) -> tuple:
+        if len(row) >= needed:
+            return (get(row),) if single else get(row)
+        return tuple(row[i] if i < len(row) else "" for i in indexes)
+
+    return values
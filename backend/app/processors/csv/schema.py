@@ -0,0 +1,140 @@
+"""
+Column types of a CSV, and the cache that lets later jobs reuse them.
+
+A schema types every column as the narrowest of int64, float64, bool,
+timestamp and string that all its non-blank cells convert to
+(`columnar.classify()`), and counts the blank ones. `SchemaBuilder` infers
+one batch at a time and widens as it goes: int64 and float64 make float64,
+any other two types make string, and a column that is already string is
+only counted from then on.
+
+A schema is JSON, one entry per header position so repeated column names
+keep their own types:
+
+    {"header": [...], "types": ["int64", ...], "null_counts": [...],
+     "rows": 120000, "full": true}
+
+`full` says it was inferred from every row rather than the first
+SCHEMA_SAMPLE_ROWS. CSV_INFER_SCHEMA stores schemas through the job's
+`SchemaCache`, which the worker keys by the input object's ETag and the
+dialect it was read in. A later job on the same object reads it back:
+CSV_TO_PARQUET takes its types instead of sampling, and CSV_COLUMN_STATS
+uses those of a full schema to skip the number checks the types rule out
+(see `columnar.numeric_values()`).
+"""
+import json
+from typing import Callable, Optional, Sequence
+
+from app.processors.csv import columnar
+from app.processors.csv.scanner import CsvDialect
+
+if columnar.HAS_ARROW:
+    import pyarrow as pa
+
+    TYPES = {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us"),
+        "string": pa.string(),
+    }
+else:  # pragma: no cover - depends on the image
+    TYPES = {}
+
+
+def type_name(data_type: "pa.DataType") -> str:
+    return next(name for name, t in TYPES.items() if t == data_type)
+
+
+def widen(current: Optional[str], found: Optional[str]) -> Optional[str]:
+    """The narrowest type holding cells of both; None is a column with no values yet."""
+    if current is None or current == found:
+        return found
+    if found is None:
+        return current
+    if {current, found} == {"int64", "float64"}:
+        return "float64"
+    return "string"
+
+
+def column_types(schema: Optional[dict], header: Sequence[str], full: bool = False) -> Optional[list]:
+    """
+    The Arrow type of each column of `header` from `schema`, or None unless
+    it was inferred for exactly that header (and from every row, if `full`).
+    """
+    if schema is None or schema.get("header") != list(header) or (full and not schema.get("full")):
+        return None
+    return [TYPES[name] for name in schema["types"]]
+
+
+class SchemaBuilder:
+    """Types and blank counts of the columns of `header`, inferred batch by batch."""
+
+    def __init__(self, header: Sequence[str]):
+        self.header = list(header)
+        self.rows = 0
+        self.types: list[Optional[str]] = [None] * len(self.header)
+        self.null_counts = [0] * len(self.header)
+
+    def add(self, columns: Sequence["pa.Array"], rows: int) -> None:
+        """One batch, as a text column per header position."""
+        self.rows += rows
+        for i, column in enumerate(columns):
+            if self.types[i] == "string":
+                # nothing narrows a string column again
+                self.null_counts[i] += columnar.count_blank(column)
+                continue
+            blank, data_type = columnar.classify(column)
+            self.null_counts[i] += blank
+            if data_type is not None:
+                self.types[i] = widen(self.types[i], type_name(data_type))
+
+    def schema(self, full: bool) -> dict:
+        return {
+            "header": self.header,
+            # a column with no values reads as text, as in CSV_TO_PARQUET
+            "types": [t or "string" for t in self.types],
+            "null_counts": self.null_counts,
+            "rows": self.rows,
+            "full": full,
+        }
+
+
+def describe(schema: dict) -> dict:
+    """Type, null count and null ratio by column name, for a job result."""
+    rows = schema["rows"]
+    return {
+        name: {
+            "type": data_type,
+            "null_count": nulls,
+            "null_ratio": nulls / rows if rows else 0.0,
+        }
+        for name, data_type, nulls in zip(schema["header"], schema["types"], schema["null_counts"])
+    }
+
+
+class SchemaCache:
+    """
+    Schemas inferred for the job's input, by dialect. The worker backs it
+    with stored schemas of the input object as it is now; without `load`
+    and `save` (outside the worker) it holds nothing.
+    """
+
+    def __init__(
+        self,
+        load: Optional[Callable[[str], Optional[dict]]] = None,
+        save: Optional[Callable[[str, dict], None]] = None,
+    ):
+        self._load = load
+        self._save = save
+
+    def get(self, dialect: CsvDialect) -> Optional[dict]:
+        return self._load(self.key(dialect)) if self._load is not None else None
+
+    def put(self, dialect: CsvDialect, schema: dict) -> None:
+        if self._save is not None:
+            self._save(self.key(dialect), schema)
+
+    @staticmethod
+    def key(dialect: CsvDialect) -> str:
+        return json.dumps(dialect._asdict(), sort_keys=True)
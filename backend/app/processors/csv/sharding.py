@@ -0,0 +1,106 @@
+"""
+Record-aligned byte ranges for sharding a CSV file.
+
+A cut is only safe at a record terminator outside quoted fields. The
+quote state at any offset comes from the same per-chunk scan
+`parallel_count` uses: chunks are scanned in order, carrying the state
+across their boundaries, and every shard boundary is placed at the first
+`\\n` after a chunk boundary that ends a record.
+
+Shard 0 starts at byte 0, so it holds any blank lines before the header
+and the header itself. Every later shard is read with a copy of the
+header record (`ShardPlan.header`) in front, so each shard is a complete
+CSV file on its own.
+
+Files with quoting `csv` would read literally are not sharded (None),
+like `count_rows()` falls back to `csv.reader` for them.
+"""
+import mmap
+import os
+from typing import NamedTuple, Optional
+
+from app.processors.csv.parallel_count import DEFAULT_CHUNK_SIZE, count_chunk
+from app.processors.execution import CancellationToken
+
+
+class ShardPlan(NamedTuple):
+    # byte range of the header record, terminator included
+    header: tuple[int, int]
+    # one (start, end) byte range per shard, covering the whole file
+    ranges: list[tuple[int, int]]
+
+
+def _record_end(mm, pos: int, inside: bool, quote: bytes) -> int:
+    """Offset just after the first `\\n` at or after `pos` that is outside quotes."""
+    while True:
+        newline = mm.find(b"\n", pos)
+        if newline == -1:
+            return len(mm)
+        if quote and mm[pos:newline].count(quote) % 2:
+            inside = not inside
+        if not inside:
+            return newline + 1
+        pos = newline + 1
+
+
+def _header_range(mm, quote: bytes) -> Optional[tuple[int, int]]:
+    """The first non-blank record, which `csv.reader` takes as the header."""
+    start = 0
+    while start < len(mm):
+        end = _record_end(mm, start, False, quote)
+        if mm[start:end].strip(b"\r\n"):
+            return start, end
+        start = end
+    return None
+
+
+def plan_shards(
+    file_path: str,
+    shards: int,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    quotechar: Optional[str] = '"',
+    delimiter: str = ",",
+    token: Optional[CancellationToken] = None,
+) -> Optional[ShardPlan]:
+    """
+    Split `file_path` into at most `shards` record-aligned byte ranges of
+    roughly equal size. None when the file cannot be split safely or
+    holds too little to give two shards.
+    """
+    token = token or CancellationToken()
+    quote = quotechar.encode() if quotechar else b""
+
+    size = os.path.getsize(file_path)
+    if shards < 2 or size == 0:
+        return None
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = _header_range(mm, quote)
+        if header is None or header[1] >= size:
+            return None
+
+        # shard boundaries land on chunk boundaries, so shards cannot be smaller than a chunk
+        chunk_size = max(1, min(chunk_size, size // shards))
+        chunk_starts = range(0, size, chunk_size)
+        targets = {chunk_starts[i * len(chunk_starts) // shards] for i in range(1, shards)}
+
+        cuts = [0]
+        inside = False
+        for start in chunk_starts:
+            token.check_now()
+            if start in targets and start > cuts[-1]:
+                cut = _record_end(mm, start, inside, quote)
+                if header[1] < cut < size and cut > cuts[-1]:
+                    cuts.append(cut)
+
+            part = count_chunk(file_path, start, min(start + chunk_size, size), quotechar, delimiter)
+            if not (part.regular_inside if inside else part.regular_outside):
+                return None
+            inside ^= part.flips_state
+
+    if len(cuts) < 2:
+        return None
+
+    cuts.append(size)
+    return ShardPlan(header, list(zip(cuts, cuts[1:])))
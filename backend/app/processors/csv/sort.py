@@ -0,0 +1,61 @@
+from app.processors.base import JobProcessor
+from app.processors.csv.external_sort import ExternalSorter, SortStats, parse_sort_keys
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import available_cpus
+from app.core.compression import text_writer
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+OUTPUT_NAME = "sorted.csv"
+
+class CsvSortProcessor(JobProcessor):
+    timeout_seconds = 1800
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        sorter = self.sorter(job_input)
+
+        with self.open_artifact(job_input, OUTPUT_NAME, "text/csv") as sink, text_writer(sink) as output:
+            stats = sorter.run(file_path, output)
+
+        return {
+            **self.summary(stats, sorter),
+            "message": "Job executed successfully",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
+
+    def sorter(self, job_input: dict) -> ExternalSorter:
+        metadata = job_input.get("input_metadata") or {}
+
+        # "key" is a column name or a list of columns and {"column", "type", "order"} objects
+        keys = parse_sort_keys(metadata.get("key"))
+
+        return ExternalSorter(
+            keys,
+            memory_budget=settings.CSV_SORT_MEMORY_MB * 1024 * 1024,
+            workers=settings.CSV_SORT_WORKERS or available_cpus(),
+            token=self.cancel_token(job_input),
+            progress=self.progress(job_input),
+            dialect=CsvDialect.from_metadata(metadata, job_input.get("input_file_path")),
+            work_dir=str(self.output_dir(job_input)),
+        )
+
+    @staticmethod
+    def summary(stats: SortStats, sorter: ExternalSorter) -> dict:
+        if stats.runs > 1:
+            logger.info(
+                "Sort spilled to disk",
+                extra={"rows": stats.rows, "runs": stats.runs, "merge_passes": stats.merge_passes},
+            )
+
+        return {
+            "sorted_rows": stats.rows,
+            "key": [key._asdict() for key in sorter.keys],
+            "runs": stats.runs,
+            "merge_passes": stats.merge_passes,
+            "output": OUTPUT_NAME,
+        }
@@ -0,0 +1,163 @@
+"""
+CSV_TO_PARQUET: the input as one Parquet file.
+
+Column types are inferred from the first PARQUET_SAMPLE_ROWS rows
+(`columnar.infer_type()`) unless `types` names them, or taken from the
+schema CSV_INFER_SCHEMA cached for the same object (see schema.py). The file is then read
+as Arrow batches, each column converted to its type, and written a row
+group at a time, every PARQUET_ROW_GROUP_MB of CSV text, into the artifact
+stream. Memory holds about one row group, and in the worker the file goes
+straight to the output bucket without a local copy.
+"""
+from typing import Optional
+
+from app.processors.base import JobProcessor
+from app.processors.csv import columnar
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.schema import TYPES, column_types, type_name
+from app.core.settings import settings
+
+if columnar.HAS_ARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+OUTPUT_NAME = "converted.parquet"
+CONTENT_TYPE = "application/vnd.apache.parquet"
+
+# "null" stores cells that do not convert to their column's type as nulls
+ON_INVALID_OPTIONS = ("fail", "null")
+
+
+class CsvToParquetProcessor(JobProcessor):
+    timeout_seconds = 1800
+
+    def process(self, job_input: dict) -> dict:
+        if not columnar.HAS_ARROW:
+            raise ValueError("CSV_TO_PARQUET needs pyarrow and numpy")
+
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
+        dialect = CsvDialect.from_metadata(metadata, file_path)
+
+        on_invalid = metadata.get("on_invalid", "fail")
+        if on_invalid not in ON_INVALID_OPTIONS:
+            raise ValueError(f"'on_invalid' must be one of {ON_INVALID_OPTIONS}")
+
+        cached = column_types(
+            self.schema_cache(job_input).get(dialect),
+            columnar.read_header(file_path, dialect),
+        )
+        schema = self.infer_schema(file_path, dialect, self.type_overrides(metadata), cached)
+        group_bytes = settings.PARQUET_ROW_GROUP_MB * 1024 * 1024
+        rows = invalid = row_groups = 0
+
+        # Parquet compresses its own pages
+        with self.open_artifact(job_input, OUTPUT_NAME, CONTENT_TYPE, compress=False) as sink:
+            writer = pq.ParquetWriter(sink, schema, compression=settings.PARQUET_COMPRESSION)
+            try:
+                pending, pending_bytes = [], 0
+                for batch in columnar.iter_batches(
+                    file_path,
+                    dialect=dialect,
+                    block_size=settings.CSV_BATCH_MB * 1024 * 1024,
+                    token=token,
+                    progress=progress,
+                ):
+                    typed, bad = self.convert(batch, schema, on_invalid, rows)
+                    pending.append(typed)
+                    pending_bytes += batch.nbytes
+                    rows += batch.num_rows
+                    invalid += bad
+
+                    if pending_bytes >= group_bytes:
+                        self.write_row_group(writer, schema, pending)
+                        row_groups += 1
+                        pending, pending_bytes = [], 0
+
+                if pending or not row_groups:
+                    self.write_row_group(writer, schema, pending)
+                    row_groups += 1
+            finally:
+                writer.close()
+
+        return {
+            "output": OUTPUT_NAME,
+            "rows": rows,
+            "row_groups": row_groups,
+            "columns": {field.name: type_name(field.type) for field in schema},
+            "cached_schema": cached is not None,
+            "invalid_values": invalid,
+            "message": "Job executed",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
+
+    @staticmethod
+    def type_overrides(metadata: dict) -> dict:
+        # "types": {"zip": "string"} pins a column's type instead of inferring it
+        types = metadata.get("types") or {}
+        if not isinstance(types, dict) or any(t not in TYPES for t in types.values()):
+            raise ValueError(f"'types' must map column names to one of {tuple(TYPES)}")
+        return {name: TYPES[t] for name, t in types.items()}
+
+    @staticmethod
+    def infer_schema(
+        file_path: str,
+        dialect: CsvDialect,
+        overrides: dict,
+        cached: Optional[list] = None,
+    ) -> "pa.Schema":
+        """The Parquet schema: `overrides`, then `cached` types (one per header column) or a sample's."""
+        sample = []
+        sampled = 0
+        for batch in columnar.iter_batches(file_path, dialect=dialect) if cached is None else ():
+            sample.append(batch)
+            sampled += batch.num_rows
+            if sampled >= settings.PARQUET_SAMPLE_ROWS:
+                break
+
+        header = columnar.read_header(file_path, dialect)
+        if not header:
+            raise ValueError("CSV input has no columns")
+        missing = set(overrides) - set(header)
+        if missing:
+            raise ValueError(f"'types' names columns not in the CSV header: {sorted(missing)}")
+
+        table = pa.Table.from_batches(sample) if sample else None
+        fields = []
+        for i, name in enumerate(header):
+            if name in overrides:
+                data_type = overrides[name]
+            elif cached is not None:
+                data_type = cached[i]
+            elif table is not None:
+                column = table.column(i).slice(0, settings.PARQUET_SAMPLE_ROWS).combine_chunks()
+                data_type = columnar.infer_type(column)
+            else:
+                data_type = pa.string()
+            fields.append(pa.field(name, data_type))
+        return pa.schema(fields)
+
+    @staticmethod
+    def convert(batch: "pa.RecordBatch", schema: "pa.Schema", on_invalid: str, rows_before: int):
+        """The batch with every column in its schema type, and the count of cells that did not convert."""
+        columns, invalid = [], 0
+        for i, field in enumerate(schema):
+            column, bad, first_invalid = columnar.typed_column(batch.column(i), field.type)
+            if bad and on_invalid == "fail":
+                value = batch.column(i)[first_invalid].as_py()
+                raise ValueError(
+                    f"Row {rows_before + first_invalid + 1}, column '{field.name}': {value!r} is not "
+                    f"{type_name(field.type)}; set 'types' or 'on_invalid': 'null'"
+                )
+            invalid += bad
+            columns.append(column)
+        return pa.RecordBatch.from_arrays(columns, schema=schema), invalid
+
+    @staticmethod
+    def write_row_group(writer: "pq.ParquetWriter", schema: "pa.Schema", batches: list) -> None:
+        table = pa.Table.from_batches(batches, schema=schema)
+        # one row group per call, however many rows it has
+        writer.write_table(table, row_group_size=max(table.num_rows, 1))
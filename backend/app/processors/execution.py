@@ -0,0 +1,194 @@
+import math
+import os
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside a processor when the job was cancelled via the API."""
+
+
+class JobDeadlineExceeded(Exception):
+    """Raised inside a processor when the job ran past its timeout."""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation + deadline check for processors.
+
+    Processors call `check()` once per row (or `check_now()` once per chunk).
+    `check()` only looks at the clock every `check_every` calls and only asks
+    the cancel source every `poll_interval` seconds, so it is cheap enough
+    for the innermost loop.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        poll_interval: float = 0.25,
+        check_every: int = 1024,
+    ):
+        # `deadline` is a time.monotonic() timestamp
+        self.deadline = deadline
+        self._is_cancelled = is_cancelled
+        self._poll_interval = poll_interval
+        self._check_every = check_every
+        self._countdown = check_every
+        self._last_poll = 0.0
+
+    def check(self) -> None:
+        self._countdown -= 1
+        if self._countdown > 0:
+            return
+        self._countdown = self._check_every
+        self.check_now()
+
+    def check_now(self) -> None:
+        now = time.monotonic()
+
+        if self.deadline is not None and now >= self.deadline:
+            raise JobDeadlineExceeded("Job exceeded its execution deadline")
+
+        if self._is_cancelled and now - self._last_poll >= self._poll_interval:
+            self._last_poll = now
+            if self._is_cancelled():
+                raise JobCancelled("Job was cancelled")
+
+    def sleep(self, seconds: float) -> None:
+        """time.sleep() that still honours cancellation and the deadline."""
+        end = time.monotonic() + seconds
+        while True:
+            self.check_now()
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, self._poll_interval))
+
+    @property
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class ProgressReporter:
+    """
+    Throttled progress callback for processors.
+
+    `tick()` is meant for the innermost row loop: it increments a counter
+    and only every `check_every` calls looks at the clock. A snapshot is
+    handed to `sink` at most once per `persist_interval` seconds, so the
+    database sees a bounded write rate no matter how fast rows go by.
+    """
+
+    def __init__(
+        self,
+        total_bytes: Optional[int] = None,
+        sink: Optional[Callable[[dict], None]] = None,
+        persist_interval: float = 2.0,
+        check_every: int = 4096,
+    ):
+        self.total_bytes = total_bytes
+        self.rows = 0
+        self.bytes_read = 0
+        self._sink = sink
+        self._persist_interval = persist_interval
+        self._check_every = check_every
+        self._countdown = check_every
+        self._last_flush = time.monotonic()
+        self._position: Optional[Callable[[], int]] = None
+        self._base_rows = 0
+        self._base_bytes = 0
+
+    def rebase(self, rows: int, bytes_read: int) -> None:
+        """
+        Count from here on: later absolute updates and tracked file
+        positions are added to `rows` and `bytes_read`. For inputs that
+        are scanned in segments.
+        """
+        self._base_rows = self.rows = rows
+        self._base_bytes = self.bytes_read = bytes_read
+        self._position = None
+
+    def track_file(self, f) -> None:
+        """Read `bytes_read` from an open file's position at flush time."""
+        raw = getattr(f, "buffer", f)
+        base = self._base_bytes
+        self._position = (lambda: base + raw.tell()) if base else raw.tell
+
+    def tick(self, rows: int = 1) -> None:
+        self.rows += rows
+        self._countdown -= 1
+        if self._countdown > 0:
+            return
+        self._countdown = self._check_every
+        self._flush_if_due()
+
+    def update(self, rows: Optional[int] = None, bytes_read: Optional[int] = None) -> None:
+        """Absolute update, for processors that work in chunks."""
+        if rows is not None:
+            self.rows = self._base_rows + rows
+        if bytes_read is not None:
+            self.bytes_read = self._base_bytes + bytes_read
+        self._flush_if_due()
+
+    def snapshot(self) -> dict:
+        if self._position is not None:
+            try:
+                self.bytes_read = self._position()
+            except (OSError, ValueError):
+                pass  # file already closed; keep the last known position
+
+        return {
+            "rows_processed": self.rows,
+            "bytes_processed": self.bytes_read,
+            "total_bytes": self.total_bytes,
+        }
+
+    def finish(self) -> None:
+        """Report the whole input as consumed once the processor returns."""
+        self._position = None
+        if self.total_bytes is not None:
+            self.bytes_read = self.total_bytes
+        self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if self._sink is not None:
+            self._sink(self.snapshot())
+
+    def _flush_if_due(self) -> None:
+        if time.monotonic() - self._last_flush >= self._persist_interval:
+            self.flush()
+
+
+def wait_for(future: Future, token: CancellationToken) -> Any:
+    """future.result() that still honours cancellation and the deadline."""
+    while True:
+        try:
+            return future.result(timeout=0.25)
+        except TimeoutError:
+            token.check_now()
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use: the scheduler affinity mask,
+    capped by a cgroup v2 CPU quota (the pod's CPU limit) when one is set.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return cpus
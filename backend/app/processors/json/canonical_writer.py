@@ -0,0 +1,354 @@
+"""
+Streaming JSON canonicalization.
+
+Produces the same document as `json.dumps(json.load(f), sort_keys=True,
+separators=(",", ":"))` without ever building it in memory, and without
+recursion, so nesting depth is only limited by disk.
+
+The parser keeps an explicit stack of open containers. Each container
+buffers its already-encoded members as "fragments": strings, lists of
+fragments, or references to a spool file. Object members have to be held
+until the closing brace so the keys can be sorted; arrays do not, and a
+top-level array writes its elements straight to the output. Whenever a
+container holds more than `spill_bytes` of encoded text, that text is
+moved to the spool and only (offset, length) is kept, so memory stays at
+roughly `spill_bytes` per open container plus the keys of open objects.
+
+Output is ASCII (non-ASCII characters are escaped, as with the default
+`ensure_ascii=True`), so its bytes and hash do not depend on an encoding.
+"""
+import hashlib
+import json
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional
+
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.json.tokenizer import (
+    LITERAL,
+    NUMBER,
+    STRING,
+    JsonSyntaxError,
+    JsonTokenizer,
+)
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+# fragments smaller than this are joined into one string when their container closes
+JOIN_BYTES = 4096
+COPY_CHUNK = 1024 * 1024
+
+# parser states
+_VALUE = 0
+_VALUE_OR_END = 1  # right after "["
+_KEY = 2
+_KEY_OR_END = 3  # right after "{"
+_COLON = 4
+_NEXT = 5  # after a value: "," or the closing bracket
+
+
+@dataclass
+class CanonicalStats:
+    objects: int = 0
+    keys: int = 0
+    duplicate_keys: int = 0
+    size_bytes: int = 0
+    sha256: str = ""
+    spilled: bool = False
+
+
+class _Spilled(NamedTuple):
+    offset: int
+    length: int
+
+
+class _Frame:
+    __slots__ = ("is_object", "members", "parts", "key", "count", "pending", "to_output")
+
+    def __init__(self, is_object: bool, to_output: bool = False):
+        self.is_object = is_object
+        self.members: dict = {}
+        self.parts: list = []
+        self.key: Optional[str] = None
+        self.count = 0
+        self.pending = 0  # encoded bytes held in memory
+        self.to_output = to_output
+
+
+class _Sink:
+    """ASCII text writer over a binary file that counts (and optionally hashes) bytes."""
+
+    def __init__(self, f: BinaryIO, hashed: bool = False):
+        self.f = f
+        self.size = 0
+        self.hash = hashlib.sha256() if hashed else None
+
+    def write(self, text: str) -> None:
+        self.write_bytes(text.encode("ascii"))
+
+    def write_bytes(self, data: bytes) -> None:
+        self.f.write(data)
+        self.size += len(data)
+        if self.hash is not None:
+            self.hash.update(data)
+
+
+def _float_text(text: str) -> str:
+    value = float(text)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(value)
+
+
+def _number_text(text: str) -> str:
+    if "." in text or "e" in text or "E" in text:
+        return _float_text(text)
+    # "-0" -> "0", as a round trip through int would
+    return str(int(text))
+
+
+class StreamingCanonicalizer:
+    def __init__(
+        self,
+        spill_bytes: int = 16 * 1024 * 1024,
+        token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressReporter] = None,
+    ):
+        self.spill_bytes = spill_bytes
+        self.token = token or CancellationToken()
+        self.progress = progress or ProgressReporter()
+        self._decoder = json.JSONDecoder(object_pairs_hook=self._count_pairs)
+        self._encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+        self._counts = [0, 0, 0]  # objects, keys, duplicate keys of the value being decoded
+
+    def run(self, input_path: str, output_path: str) -> CanonicalStats:
+        stats = CanonicalStats()
+
+        with (
+            open(input_path, encoding="utf-8") as f,
+            open(output_path, "wb") as out_file,
+            tempfile.TemporaryFile(dir=Path(output_path).parent, prefix="canonical-spool-") as spool_file,
+        ):
+            self.progress.track_file(f)
+            self._out = _Sink(out_file, hashed=True)
+            self._spool = _Sink(spool_file)
+            self._stats = stats
+            self._parse(JsonTokenizer(f))
+
+        stats.size_bytes = self._out.size
+        stats.sha256 = self._out.hash.hexdigest()
+        stats.spilled = self._spool.size > 0
+        return stats
+
+    def _parse(self, tokens: JsonTokenizer) -> None:
+        stack: list[_Frame] = []
+        stats = self._stats
+        state = _VALUE
+        # depth at which the C decoder last hit the recursion limit
+        fast_path_depth: Optional[int] = None
+
+        for kind, value in tokens:
+            self.token.check()
+
+            if state == _NEXT:
+                if not stack:
+                    raise JsonSyntaxError("Extra data", tokens.offset)
+                top = stack[-1]
+                if kind == ",":
+                    state = _KEY if top.is_object else _VALUE
+                elif kind == ("}" if top.is_object else "]"):
+                    self._close(stack)
+                else:
+                    raise JsonSyntaxError("Expecting ',' delimiter", tokens.offset)
+                continue
+
+            if state == _COLON:
+                if kind != ":":
+                    raise JsonSyntaxError("Expecting ':' delimiter", tokens.offset)
+                state = _VALUE
+                continue
+
+            if state in (_KEY, _KEY_OR_END):
+                if kind == STRING:
+                    stack[-1].key = value
+                    state = _COLON
+                elif kind == "}" and state == _KEY_OR_END:
+                    self._close(stack)
+                    state = _NEXT
+                else:
+                    raise JsonSyntaxError("Expecting property name enclosed in double quotes", tokens.offset)
+                continue
+
+            # a value is expected
+            if kind == "]" and state == _VALUE_OR_END:
+                self._close(stack)
+                state = _NEXT
+            elif kind in ("{", "["):
+                if fast_path_depth is None or len(stack) <= fast_path_depth:
+                    # containers that end within the buffered text go through the C decoder/encoder
+                    try:
+                        done, text = tokens.read_container(self._decode)
+                    except RecursionError:
+                        done, fast_path_depth = False, len(stack)
+                    if done:
+                        self._add(stack, text)
+                        state = _NEXT
+                        continue
+
+                is_object = kind == "{"
+                # only a top-level array can write straight to the output
+                stack.append(_Frame(is_object, to_output=not stack and not is_object))
+                if is_object:
+                    stats.objects += 1
+                state = _KEY_OR_END if is_object else _VALUE_OR_END
+                if stack[-1].to_output:
+                    self._out.write("[")
+            elif kind == STRING:
+                self._add(stack, _encode_string(value))
+                state = _NEXT
+            elif kind == NUMBER:
+                self._add(stack, _number_text(value))
+                state = _NEXT
+            elif kind == LITERAL:
+                self._add(stack, value)
+                state = _NEXT
+            else:
+                raise JsonSyntaxError("Expecting value", tokens.offset)
+
+        if stack or state != _NEXT:
+            raise JsonSyntaxError("Unexpected end of input" if stack else "Expecting value", tokens.offset)
+
+    def _decode(self, text: str, index: int):
+        self._counts = [0, 0, 0]
+        value, end = self._decoder.raw_decode(text, index)
+        encoded = self._encoder.encode(value)
+
+        objects, keys, duplicates = self._counts
+        self._stats.objects += objects
+        self._stats.keys += keys
+        self._stats.duplicate_keys += duplicates
+        return encoded, end
+
+    def _count_pairs(self, pairs: list) -> dict:
+        obj = dict(pairs)
+        counts = self._counts
+        counts[0] += 1
+        counts[1] += len(obj)
+        counts[2] += len(pairs) - len(obj)
+        return obj
+
+    def _add(self, stack: list[_Frame], fragment, size: Optional[int] = None) -> None:
+        """Hand a finished value to the innermost open container (or the output)."""
+        if size is None:
+            size = len(fragment)
+
+        if not stack:
+            self._write(fragment, self._out)
+            return
+
+        top = stack[-1]
+        if top.is_object:
+            if top.key in top.members:
+                # last one wins, as with json.load
+                self._stats.duplicate_keys += 1
+            else:
+                self._stats.keys += 1
+            top.members[top.key] = fragment
+            top.pending += size + len(top.key)
+        else:
+            if top.count:
+                top.parts.append(",")
+                size += 1
+            top.parts.append(fragment)
+            top.pending += size
+        top.count += 1
+
+        if len(stack) == 1:
+            self.progress.tick()
+        if top.pending > self.spill_bytes:
+            self._flush(top)
+
+    def _close(self, stack: list[_Frame]) -> None:
+        frame = stack.pop()
+
+        if frame.to_output:
+            for part in frame.parts:
+                self._write(part, self._out)
+            self._out.write("]")
+            return
+
+        if frame.is_object:
+            pieces = ["{"]
+            for i, key in enumerate(sorted(frame.members)):
+                pieces.append(("," if i else "") + _encode_string(key) + ":")
+                pieces.append(frame.members[key])
+            pieces.append("}")
+        else:
+            pieces = ["[", *frame.parts, "]"]
+
+        # small containers become one string; bigger ones stay a list so
+        # closing a deep chain of containers does not copy their text over and over
+        size = frame.pending + 2 * len(frame.members) + 2
+        if size <= JOIN_BYTES and all(type(p) is str for p in pieces):
+            fragment = "".join(pieces)
+            size = len(fragment)
+        else:
+            fragment = pieces
+
+        self._add(stack, fragment, size)
+
+    def _flush(self, frame: _Frame) -> None:
+        """Move a container's buffered text to the output (top-level array) or the spool."""
+        if frame.to_output:
+            for part in frame.parts:
+                self._write(part, self._out)
+            frame.parts = []
+        elif frame.is_object:
+            for key, fragment in frame.members.items():
+                if not isinstance(fragment, _Spilled):
+                    frame.members[key] = self._spill(fragment)
+        else:
+            # earlier spills stay where they are; only the text since then moves
+            parts = frame.parts
+            split = next((i for i, p in enumerate(parts) if not isinstance(p, _Spilled)), len(parts))
+            frame.parts = parts[:split] + [self._spill(parts[split:])]
+        frame.pending = 0
+
+    def _spill(self, fragment) -> _Spilled:
+        offset = self._spool.size
+        self._write(fragment, self._spool)
+        return _Spilled(offset, self._spool.size - offset)
+
+    def _write(self, fragment, sink: _Sink) -> None:
+        # iterative walk, fragments can be nested as deep as the document
+        pending = [iter((fragment,))]
+        while pending:
+            for piece in pending[-1]:
+                if type(piece) is str:
+                    sink.write(piece)
+                elif isinstance(piece, _Spilled):
+                    self._copy_spilled(piece, sink)
+                else:
+                    pending.append(iter(piece))
+                    break
+            else:
+                pending.pop()
+
+    def _copy_spilled(self, spilled: _Spilled, sink: _Sink) -> None:
+        # the sink may be the spool itself, so seek back to its end before every write
+        f = self._spool.f
+        end = f.seek(0, 2)
+        offset, remaining = spilled.offset, spilled.length
+        while remaining:
+            f.seek(offset)
+            data = f.read(min(COPY_CHUNK, remaining))
+            if not data:
+                raise OSError("JSON spool file is shorter than expected")
+            f.seek(end)
+            sink.write_bytes(data)
+            offset += len(data)
+            remaining -= len(data)
+            end = f.seek(0, 2)
@@ -1,33 +1,48 @@
-import json
-from json import JSONDecodeError
 from app.processors.base import JobProcessor
+from app.processors.json.canonical_writer import StreamingCanonicalizer
+from app.processors.json.tokenizer import JsonSyntaxError
+from app.core.settings import settings
+from app.core.logging import setup_logging
 
-def canonicalize(obj):
-    if isinstance(obj, dict):
-        return {k: canonicalize(obj[k]) for k in sorted(obj)}
-    elif isinstance(obj, list):
-        return [canonicalize(item) for item in obj]
-    else:
-        return obj
+logger = setup_logging()
+
+OUTPUT_NAME = "canonical.json"
 
 class JsonCanonicalizeProcessor(JobProcessor):
+    timeout_seconds = 600
+
     def process(self, job_input: dict) -> dict:
         file_path = job_input["input_file_path"]
         metadata = job_input["input_metadata"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
 
         if not file_path:
             raise ValueError("input_file_path is required")
 
+        # The document is streamed to an artifact; only a summary goes into result.json.
+        output_path = self.output_dir(job_input) / OUTPUT_NAME
+
         try:
-            with open(file_path) as f:
-                data = json.load(f)
-        except JSONDecodeError as e:
+            stats = StreamingCanonicalizer(
+                spill_bytes=settings.JSON_CANONICAL_MEMORY_MB * 1024 * 1024,
+                token=token,
+                progress=progress,
+            ).run(file_path, str(output_path))
+        except (JsonSyntaxError, UnicodeDecodeError) as e:
             raise ValueError(f"Invalid JSON input file: {e}") from e
 
-        canonical = canonicalize(data)
+        if stats.spilled:
+            logger.info("JSON canonicalization spilled to disk", extra={"size_bytes": stats.size_bytes})
 
         return {
-            "canonical_json": canonical,
+            "output": OUTPUT_NAME,
+            "size_bytes": stats.size_bytes,
+            "sha256": stats.sha256,
+            "objects": stats.objects,
+            "keys": stats.keys,
+            "duplicate_keys": stats.duplicate_keys,
+            "spilled_to_disk": stats.spilled,
             "message": "JSON canonicalization successful",
             "file_path": file_path,
             "metadata": metadata,
@@ -0,0 +1,198 @@
+"""
+Line-partitioned NDJSON processing.
+
+The file is memory-mapped and cut into chunks of about `chunk_size` bytes,
+each extended to end just after a newline so every chunk holds whole
+records. Chunks are decoded independently (in a process pool when there is
+more than one CPU) and their results are consumed in file order, with at
+most two chunks per worker in flight, so memory is bounded by the chunk
+size rather than the file size.
+
+Every non-blank line must be one JSON value; blank lines are counted and
+skipped. Line numbers in errors are 1-based and count blank lines.
+"""
+import codecs
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from app.processors.execution import CancellationToken, ProgressReporter, wait_for
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_ERRORS = 20
+
+OPERATIONS = ("validate", "canonicalize")
+
+_encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+
+class ChunkResult(NamedTuple):
+    lines: int
+    records: int
+    blank_lines: int
+    invalid: int
+    # (line index within the chunk, message) of the first MAX_ERRORS invalid lines
+    errors: list
+    # canonical records, newline-terminated ("canonicalize" only)
+    output: bytes
+
+
+@dataclass
+class NdjsonStats:
+    records: int = 0
+    blank_lines: int = 0
+    invalid_records: int = 0
+    errors: list = field(default_factory=list)
+    size_bytes: int = 0
+    sha256: str = ""
+
+
+def line_ranges(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[tuple[int, int]]:
+    """Byte ranges of about `chunk_size` that each end just after a newline (or at EOF)."""
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+
+    ranges = []
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            newline = mm.find(b"\n", min(start + chunk_size, size) - 1)
+            end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def process_chunk(file_path: str, start: int, end: int, operation: str) -> ChunkResult:
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+
+    if start == 0 and data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()  # the chunk ends with a newline
+
+    canonical = [] if operation == "canonicalize" else None
+    records = blank = invalid = 0
+    errors = []
+
+    for index, line in enumerate(lines):
+        if not line or line.isspace():
+            blank += 1
+            continue
+
+        try:
+            value = json.loads(line)
+        except (ValueError, RecursionError) as exc:
+            # JSONDecodeError and UnicodeDecodeError are both ValueErrors
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append((index, _describe(exc)))
+            continue
+
+        records += 1
+        if canonical is not None:
+            canonical.append(_encoder.encode(value))
+
+    output = ("\n".join(canonical) + "\n").encode("ascii") if canonical else b""
+    return ChunkResult(len(lines), records, blank, invalid, errors, output)
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, json.JSONDecodeError):
+        return f"{exc.msg} (column {exc.colno})"
+    if isinstance(exc, RecursionError):
+        return "Record is nested too deeply"
+    return str(exc)
+
+
+def process_lines(
+    file_path: str,
+    operation: str,
+    output: Optional[BinaryIO] = None,
+    *,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stop_on_invalid: bool = False,
+    token: Optional[CancellationToken] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> NdjsonStats:
+    """
+    Validate (and for "canonicalize", write to `output`) every record of an
+    NDJSON file. With `stop_on_invalid` the first invalid line raises
+    ValueError; otherwise invalid lines are counted and skipped.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"operation must be one of {OPERATIONS}")
+
+    token = token or CancellationToken()
+    progress = progress or ProgressReporter()
+
+    stats = NdjsonStats()
+    digest = hashlib.sha256()
+    lines_before = 0
+
+    results = _chunk_results(file_path, line_ranges(file_path, chunk_size), operation, workers, token)
+    with contextlib.closing(results):
+        for end, result in results:
+            if result.invalid and stop_on_invalid:
+                index, message = result.errors[0]
+                raise ValueError(f"Invalid JSON on line {lines_before + index + 1}: {message}")
+
+            for index, message in result.errors[: MAX_ERRORS - len(stats.errors)]:
+                stats.errors.append({"line": lines_before + index + 1, "error": message})
+
+            stats.records += result.records
+            stats.blank_lines += result.blank_lines
+            stats.invalid_records += result.invalid
+            lines_before += result.lines
+
+            if output is not None and result.output:
+                output.write(result.output)
+                digest.update(result.output)
+                stats.size_bytes += len(result.output)
+
+            progress.update(rows=stats.records, bytes_read=end)
+
+    stats.sha256 = digest.hexdigest()
+    return stats
+
+
+def _chunk_results(
+    file_path: str,
+    ranges: list[tuple[int, int]],
+    operation: str,
+    workers: int,
+    token: CancellationToken,
+) -> Iterator[tuple[int, ChunkResult]]:
+    """(chunk end offset, result) in file order."""
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            token.check_now()
+            yield end, process_chunk(file_path, start, end, operation)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(ranges)))
+    try:
+        in_flight = deque()
+        for start, end in ranges:
+            in_flight.append((end, pool.submit(process_chunk, file_path, start, end, operation)))
+            # finished chunks wait for the consumer; cap how many are held
+            if len(in_flight) >= 2 * workers:
+                chunk_end, future = in_flight.popleft()
+                yield chunk_end, wait_for(future, token)
+
+        while in_flight:
+            chunk_end, future = in_flight.popleft()
+            yield chunk_end, wait_for(future, token)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
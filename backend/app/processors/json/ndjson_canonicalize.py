@@ -0,0 +1,49 @@
+from app.processors.base import JobProcessor
+from app.processors.execution import available_cpus
+from app.processors.json.ndjson import process_lines
+from app.core.settings import settings
+
+OUTPUT_NAME = "canonical.ndjson"
+
+ON_INVALID_OPTIONS = ("fail", "skip")
+
+class NdjsonCanonicalizeProcessor(JobProcessor):
+    timeout_seconds = 900
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
+
+        # "skip" drops invalid lines instead of failing the job
+        on_invalid = metadata.get("on_invalid", "fail")
+        if on_invalid not in ON_INVALID_OPTIONS:
+            raise ValueError(f"'on_invalid' must be one of {ON_INVALID_OPTIONS}")
+
+        output_path = self.output_dir(job_input) / OUTPUT_NAME
+
+        with open(output_path, "wb") as out:
+            stats = process_lines(
+                file_path,
+                "canonicalize",
+                out,
+                workers=settings.NDJSON_WORKERS or available_cpus(),
+                chunk_size=settings.NDJSON_CHUNK_MB * 1024 * 1024,
+                stop_on_invalid=on_invalid == "fail",
+                token=token,
+                progress=progress,
+            )
+
+        return {
+            "output": OUTPUT_NAME,
+            "records": stats.records,
+            "blank_lines": stats.blank_lines,
+            "invalid_records": stats.invalid_records,
+            "errors": stats.errors,
+            "size_bytes": stats.size_bytes,
+            "sha256": stats.sha256,
+            "message": "NDJSON canonicalization successful",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
@@ -0,0 +1,34 @@
+from app.processors.base import JobProcessor
+from app.processors.execution import available_cpus
+from app.processors.json.ndjson import process_lines
+from app.core.settings import settings
+
+class NdjsonValidateProcessor(JobProcessor):
+    timeout_seconds = 600
+
+    def process(self, job_input: dict) -> dict:
+        file_path = job_input["input_file_path"]
+        metadata = job_input["input_metadata"]
+        token = self.cancel_token(job_input)
+        progress = self.progress(job_input)
+
+        stats = process_lines(
+            file_path,
+            "validate",
+            workers=settings.NDJSON_WORKERS or available_cpus(),
+            chunk_size=settings.NDJSON_CHUNK_MB * 1024 * 1024,
+            token=token,
+            progress=progress,
+        )
+
+        return {
+            "records": stats.records,
+            "blank_lines": stats.blank_lines,
+            "invalid_records": stats.invalid_records,
+            "valid": stats.invalid_records == 0,
+            # the first few invalid lines, 1-based
+            "errors": stats.errors,
+            "message": "Job executed",
+            "file_path": file_path,
+            "metadata": metadata,
+        }
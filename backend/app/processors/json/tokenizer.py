@@ -0,0 +1,151 @@
+"""
+Incremental JSON tokenizer.
+
+Reads a text stream in fixed-size chunks and yields one token at a time,
+so a document never has to be in memory as a whole. Strings and numbers
+are scanned with the same (C-accelerated) helpers `json.loads` uses, so
+what is accepted, and how escapes decode, matches the standard library,
+including its NaN / Infinity extensions.
+
+The tokenizer only splits the input; checking that tokens form a valid
+document is up to the consumer (see `canonical_writer`).
+"""
+import json.decoder
+import json.scanner
+import re
+from typing import Any, Callable, Iterator, Optional, TextIO, Tuple
+
+STRING = "string"
+NUMBER = "number"
+LITERAL = "literal"
+PUNCTUATION = frozenset("{}[]:,")
+
+LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER = json.scanner.NUMBER_RE
+_scanstring = json.decoder.scanstring
+
+# a token shorter than this may continue in the next chunk
+_LOOKAHEAD = 64
+
+Token = Tuple[str, Optional[str]]
+
+
+class JsonSyntaxError(ValueError):
+    def __init__(self, msg: str, offset: int):
+        super().__init__(f"{msg}: char {offset}")
+        self.msg = msg
+        self.offset = offset
+
+
+class JsonTokenizer:
+    """
+    Iterate to get `(kind, value)` tokens: punctuation comes back as
+    `(char, None)`, strings as `(STRING, decoded text)`, numbers as
+    `(NUMBER, source text)` and literals as `(LITERAL, source text)`.
+    `offset` is the character offset of the last token.
+    """
+
+    def __init__(self, f: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._base = 0  # offset of _buf[0] in the stream
+        self._eof = False
+        self.offset = 0
+
+    def __iter__(self) -> Iterator[Token]:
+        while True:
+            if len(self._buf) - self._pos < _LOOKAHEAD and not self._eof:
+                self._fill(_LOOKAHEAD)
+
+            buf = self._buf
+            pos = _WHITESPACE.match(buf, self._pos).end()
+            self._pos = pos
+            if pos == len(buf):
+                if self._eof:
+                    self.offset = self._base + pos
+                    return
+                self._fill()
+                continue
+
+            self.offset = self._base + pos
+            ch = buf[pos]
+
+            if ch in PUNCTUATION:
+                self._pos = pos + 1
+                yield ch, None
+                continue
+
+            if ch == '"':
+                try:
+                    value, end = _scanstring(buf, pos + 1, True)
+                except json.JSONDecodeError as exc:
+                    # the string may just continue past the end of the buffer
+                    truncated = exc.msg.startswith("Unterminated string") or exc.pos >= len(buf) - 6
+                    if truncated and not self._eof:
+                        self._fill(len(buf) - pos)
+                        continue
+                    raise JsonSyntaxError(exc.msg, self._base + exc.pos) from None
+                self._pos = end
+                yield STRING, value
+                continue
+
+            match = _NUMBER.match(buf, pos)
+            if match is not None:
+                # "1" followed by ".5" or "e3" in the next chunk
+                if match.end() > len(buf) - 3 and not self._eof:
+                    self._fill(len(buf) - pos)
+                    continue
+                self._pos = match.end()
+                yield NUMBER, match.group()
+                continue
+
+            for literal in LITERALS:
+                if buf.startswith(literal, pos):
+                    self._pos = pos + len(literal)
+                    yield LITERAL, literal
+                    break
+            else:
+                raise JsonSyntaxError("Expecting value", self.offset)
+
+    def read_container(self, decode: Callable[[str, int], Tuple[Any, int]]) -> Tuple[bool, Any]:
+        """
+        Hand the container whose opening bracket was just returned to
+        `decode(text, index) -> (value, end)` (e.g. `JSONDecoder.raw_decode`)
+        and skip past it. Returns (False, None), leaving the position
+        untouched, when the container does not end within the buffered
+        text plus one more chunk, or is malformed (the token stream then
+        reports the error where it occurs). Exceptions other than
+        JSONDecodeError (e.g. RecursionError) propagate.
+        """
+        start = self._pos - 1
+        retried = False
+        while True:
+            try:
+                value, end = decode(self._buf, start)
+            except json.JSONDecodeError as exc:
+                if retried or self._eof or exc.pos < len(self._buf) - _LOOKAHEAD:
+                    return False, None
+                # most values that cross a chunk boundary are small: read on and retry once
+                retried = True
+                self._pos = start
+                self._fill()
+                start = self._pos
+                self._pos = start + 1
+                continue
+            self._pos = end
+            return True, value
+
+    def _fill(self, at_least: int = 0) -> None:
+        """Drop the consumed prefix and read at least one more chunk."""
+        chunk = self._f.read(max(self._chunk_size, at_least))
+        if not chunk:
+            self._eof = True
+        self._base += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
@@ -0,0 +1,448 @@
+"""
+Sampled previews of input objects, for `POST /jobs/preview`.
+
+A preview never downloads the object. It splits it into PREVIEW_SAMPLES
+equal strata and reads PREVIEW_SAMPLE_KB from the middle of each, plus the
+head for a CSV header, with parallel ranged GETs, so it costs the
+same whatever the object's size. Samples are cut to whole lines. A CSV
+sample that starts inside a quoted field shows it by rows of the wrong
+width, and is read from a later line instead.
+
+The sampled records give approximate stats (for CSV, the CSV_COLUMN_STATS
+summary of the sampled rows), inferred column types and an estimated
+record count: records per sampled byte times the object's bytes, with 95%
+bounds from how much that rate varies from stratum to stratum (a ratio
+estimate over the samples as clusters; Student's t). Samples in the middle
+of their strata keep a trend along the file (say, longer rows towards its
+end) from skewing the estimate. An object no larger than all samples
+together is read whole, and its preview is exact.
+
+A compressed object cannot be read from the middle. Its preview reads one
+sample at the head, decompresses as many bytes as all samples would hold,
+and scales the records seen by the object's size over the compressed
+bytes they took, without bounds. A JSON document does not split into
+records either: it is previewed only when read whole.
+"""
+import csv
+import io
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from app.core import compression
+from app.core.settings import settings
+from app.core.storage import StorageClient
+from app.processors.csv import columnar, scanner
+from app.processors.csv.column_stats import ColumnStatsOperator
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.schema import type_name
+from app.processors.stats.streaming import RunningStats
+
+CONFIDENCE = 0.95
+# two-sided 95% quantiles of Student's t for 1..30 degrees of freedom; the normal's past that
+_T95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+# lines a CSV sample may skip while its rows do not have the header's width
+ALIGN_ATTEMPTS = 4
+DECOMPRESS_CHUNK_SIZE = 8 * 1024
+
+
+class Sample(NamedTuple):
+    data: bytes
+    # whether `data` starts at the first byte of the input / ends at its last
+    head: bool
+    tail: bool
+
+
+def preview_object(storage: StorageClient, bucket: str, object_key: str, metadata: dict) -> dict:
+    """
+    The preview of an input object for a job with `metadata` (from
+    `build_input_metadata()`); ValueError if it cannot be previewed.
+    """
+    file_format = metadata.get("file_format")
+    if file_format not in ("CSV", "NDJSON", "JSON"):
+        raise ValueError("Only CSV, NDJSON and JSON inputs can be previewed")
+
+    info = storage.object_info(bucket, object_key)
+    sample_bytes = settings.PREVIEW_SAMPLE_KB * 1024
+    budget = settings.PREVIEW_SAMPLES * sample_bytes
+    compressed = compression.detect(object_key, b"") is not None
+    if file_format == "JSON" and info.size > budget and not compressed:
+        raise ValueError(_json_too_large())
+
+    # the head alone of a compressed object is of use
+    ranges = (
+        [(0, min(info.size, sample_bytes))] if compressed
+        else plan_ranges(info.size, settings.PREVIEW_SAMPLES, sample_bytes)
+    )
+    chunks = [b""]
+    if info.size:
+        with ThreadPoolExecutor(len(ranges)) as pool:
+            chunks = list(pool.map(lambda r: storage.read_range(bucket, object_key, *r), ranges))
+
+    codec = compression.detect(object_key, chunks[0][:compression.MAGIC_BYTES])
+    if codec is not None:
+        data, ratio, complete = decompress_head(chunks[0], codec, budget)
+        complete = complete and len(chunks[0]) == info.size
+        head = Sample(data, True, complete)
+        samples = [head]
+        input_bytes = len(data) if complete else (info.size * ratio if ratio else None)
+    elif len(ranges) == 1:
+        head = Sample(chunks[0], True, True)
+        samples = [head]
+        input_bytes = info.size
+    else:
+        head = Sample(chunks[0], True, False)
+        samples = [Sample(chunk, False, end == info.size) for chunk, (_, end) in zip(chunks[1:], ranges[1:])]
+        input_bytes = info.size
+
+    if file_format == "CSV":
+        result = preview_csv(head, samples, input_bytes, metadata)
+    elif file_format == "NDJSON":
+        result = preview_ndjson(samples, input_bytes)
+    else:
+        result = preview_json(samples)
+
+    rows = result["rows"]
+    if codec is not None and not rows["exact"]:
+        # scaled by the compression ratio of the head alone
+        rows["low"] = rows["high"] = None
+    return {
+        "format": file_format,
+        "size_bytes": info.size,
+        "compression": codec,
+        "samples": len(samples),
+        "sampled_bytes": sum(len(sample.data) for sample in samples),
+        "exact": rows["exact"],
+        **result,
+    }
+
+
+def plan_ranges(size: int, count: int, sample_bytes: int) -> list[tuple[int, int]]:
+    """
+    The first `sample_bytes` of `size` (the header, and the magic bytes of
+    a compressed object), then `sample_bytes` from the middle of each of
+    `count` equal strata; the whole object if that is no more.
+    """
+    if size <= count * sample_bytes:
+        return [(0, size)]
+    stratum = size / count
+    starts = [round((i + 0.5) * stratum - sample_bytes / 2) for i in range(count)]
+    return [(0, sample_bytes)] + [(start, start + sample_bytes) for start in starts]
+
+
+def decompress_head(head: bytes, codec: str, limit: int) -> tuple[bytes, Optional[float], bool]:
+    """
+    Up to `limit` bytes decompressed from the start of a compressed
+    object, the decompressed bytes per compressed byte seen (None if no
+    input was fully decoded), and whether the stream ended in `head`.
+    """
+    raw = _Trickle(head)
+    stream = compression.open_decompressed(raw, codec)
+    parts, size, complete = [], 0, False
+    # (compressed, decompressed) bytes when all the input read so far was decoded:
+    # a read that needs more input starts there (block codecs like bz2 read a
+    # whole block before they output any of it)
+    checkpoint = (0, 0)
+    position = 0
+    try:
+        while True:
+            position = raw.tell()
+            chunk = stream.read(DECOMPRESS_CHUNK_SIZE)
+            if raw.tell() != position:
+                checkpoint = (position, size)
+            if not chunk:
+                complete = True
+                break
+            if size < limit:
+                parts.append(chunk[: limit - size])
+            size += len(chunk)
+            # past the limit, read on to the next checkpoint for the ratio, unless
+            # the codec has already taken the whole head (bz2 may read it up front)
+            if size >= limit and (raw.tell() != position or raw.tell() == len(head)):
+                break
+    except Exception:
+        # the head ends mid-stream, which every codec reports its own way
+        if raw.tell() != position:
+            checkpoint = (position, size)
+
+    compressed, decompressed = checkpoint
+    ratio = decompressed / compressed if compressed and decompressed else None
+    return b"".join(parts), ratio, complete
+
+
+class _Trickle(io.BytesIO):
+    """Bytes read back in small pieces, so a decompressor's position is close to what it used."""
+
+    def read(self, size: int = -1) -> bytes:
+        return super().read(DECOMPRESS_CHUNK_SIZE if size is None or size < 0 else min(size, DECOMPRESS_CHUNK_SIZE))
+
+    read1 = read
+
+
+def estimate_rows(counts: list[tuple[int, int]], total_bytes: Optional[float], exact: bool) -> dict:
+    """
+    Records in `total_bytes` from (records, bytes) per sample: their ratio
+    scaled up, with CONFIDENCE bounds from the samples' spread. None
+    without a size to scale to.
+    """
+    rows = sum(r for r, _ in counts)
+    sampled = sum(b for _, b in counts)
+    if exact:
+        return {"estimate": rows, "low": rows, "high": rows, "confidence": CONFIDENCE, "exact": True}
+    if not sampled or total_bytes is None:
+        return {"estimate": None, "low": None, "high": None, "confidence": CONFIDENCE, "exact": False}
+
+    rate = rows / sampled
+    estimate = rate * total_bytes
+    low = high = None
+    k = len(counts)
+    if k > 1:
+        # ratio estimator over k clusters, with the finite population correction
+        spread = sum((r - rate * b) ** 2 for r, b in counts) / (k - 1)
+        correction = max(0.0, 1 - sampled / total_bytes)
+        error = math.sqrt(spread * correction / k) / (sampled / k) * total_bytes
+        t = _T95[k - 2] if k - 1 <= len(_T95) else 1.96
+        low = max(rows, math.floor(estimate - t * error))
+        high = max(low, math.ceil(estimate + t * error))
+    return {"estimate": round(estimate), "low": low, "high": high, "confidence": CONFIDENCE, "exact": False}
+
+
+def preview_csv(head: Sample, samples: list[Sample], input_bytes: Optional[float], metadata: dict) -> dict:
+    """`head` has the header; rows come from `samples`, which are `[head]` when it is all that was read."""
+    data = head.data if head.tail else _whole_lines(head.data)
+    if not data and not head.tail:
+        raise ValueError("The first record is longer than a preview sample (PREVIEW_SAMPLE_KB)")
+    text = _text(data)
+    dialect = CsvDialect.from_metadata({**metadata, "sniff": False})
+    if metadata.get("sniff"):
+        dialect = scanner.sniff_text(text, dialect)
+
+    # blank lines and the header record are not rows; their bytes are not either
+    records = scanner.read_records(io.StringIO(text, newline=""), dialect)
+    header, header_bytes, head_rows = [], 0, []
+    for row, record in records:
+        if not row:
+            header_bytes += len(record.encode())
+            continue
+        if dialect.has_header:
+            header, header_bytes = row, header_bytes + len(record.encode())
+        else:
+            header, head_rows = scanner.default_header(len(row)), [row]
+        break
+
+    if samples == [head]:
+        head_rows.extend(row for row, _ in records)
+        rows = head_rows
+        counts = [(sum(1 for row in rows if row), len(data) - header_bytes)]
+    else:
+        rows, counts = [], []
+        for sample in samples:
+            sample_rows, sampled = _aligned_rows(sample, dialect, len(header))
+            rows.extend(sample_rows)
+            counts.append((sum(1 for row in sample_rows if row), sampled))
+
+    operator = ColumnStatsOperator(profile=False, top_k=0)
+    operator.start(header)
+    operator.consume(rows)
+    columns = operator.finalize()["columns"]
+    for name, data_type in _column_types(header, rows).items():
+        columns[name] = {"type": data_type, **columns[name]}
+
+    return {
+        "dialect": dialect.to_metadata(),
+        "header": header,
+        "sampled_rows": sum(count for count, _ in counts),
+        "rows": estimate_rows(
+            counts,
+            input_bytes - header_bytes if input_bytes is not None else None,
+            samples == [head] and head.tail,
+        ),
+        "columns": columns,
+    }
+
+
+def _aligned_rows(sample: Sample, dialect: CsvDialect, width: int) -> tuple[list[list[str]], int]:
+    """
+    The rows of a sample from its first line break on after which rows
+    have `width` fields, and the bytes they take.
+    """
+    data = sample.data if sample.tail else _whole_lines(sample.data)
+    best: Optional[tuple[int, list, int]] = None
+    start = 0
+    for _ in range(ALIGN_ATTEMPTS if dialect.quotechar is not None else 1):
+        start = data.find(b"\n", start) + 1
+        if not start:
+            break
+        try:
+            records = list(scanner.read_records(io.StringIO(_text(data[start:]), newline=""), dialect))
+        except csv.Error:
+            continue
+        if not sample.tail:
+            # the last line break may be one inside a quoted field
+            records = records[:-1]
+        rows = [row for row, _ in records]
+        misfits = sum(len(row) != width for row in rows if row)
+        if best is None or misfits < best[0]:
+            best = (misfits, rows, sum(len(text.encode()) for _, text in records))
+        if not misfits:
+            break
+    if best is None:
+        return [], 0
+    return best[1], best[2]
+
+
+def preview_ndjson(samples: list[Sample], input_bytes: Optional[float]) -> dict:
+    fields: dict[str, _FieldSummary] = {}
+    counts, invalid, non_objects = [], 0, 0
+    for sample in samples:
+        data = sample.data if sample.tail else _whole_lines(sample.data)
+        if not sample.head:
+            # lines hold no raw line breaks, so the first whole one starts after the first \n
+            data = data[data.find(b"\n") + 1:] if b"\n" in data else b""
+        records = 0
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            records += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                invalid += 1
+                continue
+            if isinstance(record, dict):
+                _add_record(fields, record)
+            else:
+                non_objects += 1
+        counts.append((records, len(data)))
+
+    exact = len(samples) == 1 and samples[0].head and samples[0].tail
+    return {
+        "sampled_rows": sum(count for count, _ in counts),
+        "invalid_rows": invalid,
+        "non_object_rows": non_objects,
+        "rows": estimate_rows(counts, input_bytes, exact),
+        "columns": {name: field.to_dict() for name, field in fields.items()},
+    }
+
+
+def preview_json(samples: list[Sample]) -> dict:
+    sample = samples[0]
+    if not (sample.head and sample.tail):
+        raise ValueError(_json_too_large())
+    try:
+        document = json.loads(sample.data)
+    except ValueError as e:
+        raise ValueError(f"Input is not valid JSON: {e}") from None
+
+    # an array of objects previews like NDJSON records
+    fields: dict[str, _FieldSummary] = {}
+    records = document if isinstance(document, list) else []
+    for record in records:
+        if isinstance(record, dict):
+            _add_record(fields, record)
+    return {
+        "top_level": _json_type(document),
+        "sampled_rows": len(records),
+        "rows": estimate_rows([(len(records), len(sample.data))], len(sample.data), True),
+        "columns": {name: field.to_dict() for name, field in fields.items()},
+    }
+
+
+class _FieldSummary:
+    """Presence, JSON types and numeric stats of one top-level field of sampled records."""
+
+    __slots__ = ("count", "null_count", "types", "stats")
+
+    def __init__(self):
+        self.count = 0
+        self.null_count = 0
+        self.types: dict[str, int] = {}
+        self.stats = RunningStats()
+
+    def add(self, value) -> None:
+        self.count += 1
+        kind = _json_type(value)
+        self.types[kind] = self.types.get(kind, 0) + 1
+        if value is None:
+            self.null_count += 1
+        elif kind in ("integer", "number") and math.isfinite(value):
+            self.stats.add(float(value))
+
+    def to_dict(self) -> dict:
+        kinds = [kind for kind in self.types if kind != "null"]
+        if set(kinds) == {"integer", "number"}:
+            kind = "number"
+        else:
+            kind = kinds[0] if len(kinds) == 1 else ("mixed" if kinds else "null")
+        result = {
+            "type": kind,
+            "count": self.count,
+            "null_count": self.null_count,
+            "types": self.types,
+        }
+        if self.stats.count:
+            result.update({
+                "min": self.stats.min,
+                "max": self.stats.max,
+                "avg": self.stats.mean,
+                "stddev": self.stats.stddev,
+            })
+        return result
+
+
+def _add_record(fields: dict[str, _FieldSummary], record: dict) -> None:
+    for name, value in record.items():
+        field = fields.get(name)
+        if field is None:
+            field = fields[name] = _FieldSummary()
+        field.add(value)
+
+
+def _json_type(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "array" if isinstance(value, list) else "object"
+
+
+def _column_types(header: list[str], rows: list[list[str]]) -> dict[str, Optional[str]]:
+    """Column → the type CSV_TO_PARQUET would infer from these rows, or None without Arrow."""
+    positions = scanner.column_positions(header)
+    if not columnar.HAS_ARROW:
+        return dict.fromkeys(positions)
+    rows = [row for row in rows if row]
+    types = {}
+    for name, i in positions.items():
+        column = columnar.text_column([row[i] if i < len(row) else "" for row in rows])
+        types[name] = type_name(columnar.infer_type(column))
+    return types
+
+
+def _json_too_large() -> str:
+    limit = settings.PREVIEW_SAMPLES * settings.PREVIEW_SAMPLE_KB
+    return (
+        f"A JSON document is previewed only if it is at most {limit} KB "
+        "(decompressed, for compressed ones): it does not split into records"
+    )
+
+
+def _whole_lines(data: bytes) -> bytes:
+    """`data` up to and including its last line break."""
+    return data[: data.rfind(b"\n") + 1]
+
+
+def _text(data: bytes) -> str:
+    # a range can split a multi-byte character only at its ends
+    return data.decode("utf-8", errors="replace")
@@ -4,14 +4,32 @@ from app.processors.test_job import TestJobProcessor
 from app.processors.csv.row_count import CsvRowCountProcessor
 from app.processors.csv.column_stats import CsvColumnStatsProcessor
 from app.processors.csv.deduplicate import CsvDeduplicateProcessor
+from app.processors.csv.multi_scan import CsvMultiScanProcessor
+from app.processors.csv.to_parquet import CsvToParquetProcessor
+from app.processors.csv.sort import CsvSortProcessor
+from app.processors.csv.join import CsvJoinProcessor
+from app.processors.csv.groupby import CsvGroupByProcessor
+from app.processors.csv.filter import CsvFilterProcessor
+from app.processors.csv.infer_schema import CsvInferSchemaProcessor
 from app.processors.json.canonicalize import JsonCanonicalizeProcessor
+from app.processors.json.ndjson_canonicalize import NdjsonCanonicalizeProcessor
+from app.processors.json.ndjson_validate import NdjsonValidateProcessor
 
 _PROCESSORS = {
     JobType.TEST_JOB: TestJobProcessor(),
     JobType.CSV_ROW_COUNT: CsvRowCountProcessor(),
     JobType.CSV_COLUMN_STATS: CsvColumnStatsProcessor(),
     JobType.CSV_DEDUPLICATE: CsvDeduplicateProcessor(),
+    JobType.CSV_MULTI_SCAN: CsvMultiScanProcessor(),
+    JobType.CSV_TO_PARQUET: CsvToParquetProcessor(),
+    JobType.CSV_SORT: CsvSortProcessor(),
+    JobType.CSV_JOIN: CsvJoinProcessor(),
+    JobType.CSV_GROUPBY: CsvGroupByProcessor(),
+    JobType.CSV_FILTER: CsvFilterProcessor(),
+    JobType.CSV_INFER_SCHEMA: CsvInferSchemaProcessor(),
     JobType.JSON_CANONICALIZE: JsonCanonicalizeProcessor(),
+    JobType.NDJSON_CANONICALIZE: NdjsonCanonicalizeProcessor(),
+    JobType.NDJSON_VALIDATE: NdjsonValidateProcessor(),
 }
 
 def get_processor(job_type: JobType):
@@ -0,0 +1,113 @@
+"""
+Streamed job results.
+
+A processor with many records to report writes them through the job's
+ResultWriter (`JobProcessor.result_writer()`) rather than collecting
+them in the dict it returns. In the worker the writer serializes each
+record into result.json as it comes, compact and with orjson when it is
+installed, and the bytes go straight into the upload
+(`StorageClient.open_upload()`); nothing is staged on disk. Without a
+stream (tests, benchmarks, direct calls to `process()`) the writer
+collects the records, and `result()` puts them back into the returned
+dict, so the result is the same either way.
+"""
+import json
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+try:
+    import orjson
+
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+except ImportError:  # pragma: no cover - depends on the image
+    _encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(value: Any) -> bytes:
+        return _encoder.encode(value).encode()
+
+
+class ResultWriter:
+    """
+    Writes one JSON object: sections streamed through `records()` (a list)
+    or `entries()` (an object), then the fields given to `close()`.
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None) -> None:
+        self._stream = stream
+        self._collected: dict[str, Any] = {}
+        self._sections: set[str] = set()
+        self._first = True
+        if stream is not None:
+            stream.write(b"{")
+
+    @contextmanager
+    def records(self, key: str) -> Iterator[Callable[[Any], None]]:
+        """Stream the list `key`; yields a function adding one record to it."""
+        if self._stream is None:
+            collected = self._collected.setdefault(key, [])
+            yield collected.append
+            return
+
+        self._open_section(key, b"[")
+        first = [True]
+
+        def add(record: Any) -> None:
+            if not first[0]:
+                self._stream.write(b",")
+            first[0] = False
+            self._stream.write(dumps(record))
+
+        yield add
+        self._stream.write(b"]")
+
+    @contextmanager
+    def entries(self, key: str) -> Iterator[Callable[[str, Any], None]]:
+        """Stream the object `key`; yields a function adding one name/value pair to it."""
+        if self._stream is None:
+            collected = self._collected.setdefault(key, {})
+            yield collected.__setitem__
+            return
+
+        self._open_section(key, b"{")
+        first = [True]
+
+        def add(name: str, value: Any) -> None:
+            if not first[0]:
+                self._stream.write(b",")
+            first[0] = False
+            self._stream.write(dumps(str(name)) + b":" + dumps(value))
+
+        yield add
+        self._stream.write(b"}")
+
+    def result(self, fields: dict) -> dict:
+        """What `process()` returns: `fields`, plus the sections collected when not streaming."""
+        return {**self._collected, **fields}
+
+    def close(self, fields: dict) -> None:
+        """Write the remaining top-level `fields` and end the object."""
+        if self._stream is None:
+            self._collected.update(fields)
+            return
+
+        for key, value in fields.items():
+            if key in self._sections:
+                raise ValueError(f"Result field '{key}' was already streamed")
+            self._key(key)
+            self._stream.write(dumps(value))
+        self._stream.write(b"}")
+
+    def _open_section(self, key: str, opening: bytes) -> None:
+        if key in self._sections:
+            raise ValueError(f"Result section '{key}' was already streamed")
+        self._sections.add(key)
+        self._key(key)
+        self._stream.write(opening)
+
+    def _key(self, key: str) -> None:
+        if not self._first:
+            self._stream.write(b",")
+        self._first = False
+        self._stream.write(dumps(key) + b":")
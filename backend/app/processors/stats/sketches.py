@@ -0,0 +1,239 @@
+"""
+Fixed-memory sketches for column profiling.
+
+HyperLogLog estimates the number of distinct values. With the default
+precision of 12 it keeps 4096 one-byte registers (4 KiB) and has a relative
+standard error of 1.04 / sqrt(4096) ~= 1.6%.
+
+Space-Saving tracks the most frequent values with `capacity` counters.
+A reported count overestimates the true count by at most its `max_error`,
+which is itself at most N / capacity (N = values seen). Every value that
+occurs more than N / capacity times is guaranteed to be in the summary.
+
+Both merge: sketches built over disjoint chunks or shards combine into the
+sketch of the whole input, and `to_state()` / `from_state()` move them
+between workers as JSON. Hashing uses blake2b rather than hash(), which
+is salted per process, so sketches from different processes agree.
+"""
+import base64
+import hashlib
+import math
+from typing import Any, Dict, List, Optional
+
+
+def hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str) -> None:
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h: int) -> None:
+        """add() of a value whose hash64() is `h`."""
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        # position of the leftmost 1-bit in the remaining 64 - p bits
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(self.registers).decode("ascii"),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        hll = cls(state["precision"])
+        hll.registers = bytearray(base64.b64decode(state["registers"]))
+        return hll
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # small-range correction: linear counting while registers are empty
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+
+        return round(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class SpaceSaving:
+    """
+    Heavy hitters in O(capacity) memory (Metwally et al.).
+
+    Counters are grouped by count ("stream summary"), so both increments
+    and evicting the current minimum are O(1).
+    """
+
+    __slots__ = ("capacity", "total", "_counts", "_errors", "_buckets", "_min")
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._buckets: Dict[int, set] = {}
+        self._min = 0
+
+    def add(self, value: str, weight: int = 1) -> None:
+        """Count `value` `weight` times (weights come from per-batch value counts)."""
+        self.total += weight
+        count = self._counts.get(value)
+
+        if count is not None:
+            self._move(value, count, count + weight)
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[value] = weight
+            self._errors[value] = 0
+            self._buckets.setdefault(weight, set()).add(value)
+            self._min = weight if len(self._counts) == 1 else min(self._min, weight)
+            return
+
+        # replace a value holding the minimum count; it inherits that count as error
+        floor = self._min
+        evicted = self._buckets[floor].pop()
+        del self._counts[evicted]
+        del self._errors[evicted]
+        if not self._buckets[floor]:
+            del self._buckets[floor]
+
+        self._counts[value] = floor + weight
+        self._errors[value] = floor
+        self._buckets.setdefault(floor + weight, set()).add(value)
+        if floor not in self._buckets:
+            self._min = floor + 1 if weight == 1 else min(self._buckets)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        # values missing from a full summary may have occurred up to its minimum
+        mine_floor = self._min if len(self._counts) >= self.capacity else 0
+        their_floor = other._min if len(other._counts) >= other.capacity else 0
+
+        counts, errors = {}, {}
+        for value in self._counts.keys() | other._counts.keys():
+            if value in self._counts:
+                count, error = self._counts[value], self._errors[value]
+            else:
+                count, error = mine_floor, mine_floor
+            if value in other._counts:
+                count += other._counts[value]
+                error += other._errors[value]
+            else:
+                count += their_floor
+                error += their_floor
+            counts[value], errors[value] = count, error
+
+        kept = sorted(counts, key=counts.get, reverse=True)[: self.capacity]
+
+        self.total += other.total
+        self._counts = {v: counts[v] for v in kept}
+        self._errors = {v: errors[v] for v in kept}
+        self._buckets = {}
+        for value, count in self._counts.items():
+            self._buckets.setdefault(count, set()).add(value)
+        self._min = min(self._buckets) if self._buckets else 0
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": [[value, count, self._errors[value]] for value, count in self._counts.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SpaceSaving":
+        summary = cls(state["capacity"])
+        summary.total = state["total"]
+        for value, count, error in state["counters"]:
+            summary._counts[value] = count
+            summary._errors[value] = error
+            summary._buckets.setdefault(count, set()).add(value)
+        summary._min = min(summary._buckets) if summary._buckets else 0
+        return summary
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [
+            {"value": value, "count": count, "max_error": self._errors[value]}
+            for value, count in ranked
+        ]
+
+    def _move(self, value: str, old: int, new: int) -> None:
+        bucket = self._buckets[old]
+        bucket.discard(value)
+        if not bucket:
+            del self._buckets[old]
+        self._buckets.setdefault(new, set()).add(value)
+        self._counts[value] = new
+        if self._min == old and old not in self._buckets:
+            self._min = new if new == old + 1 else min(self._buckets)
+
+
+class ColumnProfile:
+    """Distinct count and top values of one CSV column; nulls are skipped."""
+
+    MAX_TOP_K = 100
+
+    __slots__ = ("top_k", "distinct", "heavy_hitters")
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = max(1, min(top_k, self.MAX_TOP_K))
+        self.distinct = HyperLogLog()
+        # extra counters keep the reported top-k accurate on skewed data
+        self.heavy_hitters = SpaceSaving(capacity=max(64, 10 * self.top_k))
+
+    def add(self, raw: Optional[str], weight: int = 1) -> None:
+        if raw is None or raw == "":
+            return
+        self.distinct.add(raw)
+        self.heavy_hitters.add(raw, weight)
+
+    def merge(self, other: "ColumnProfile") -> None:
+        self.distinct.merge(other.distinct)
+        self.heavy_hitters.merge(other.heavy_hitters)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "top_k": self.top_k,
+            "distinct": self.distinct.to_state(),
+            "heavy_hitters": self.heavy_hitters.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ColumnProfile":
+        profile = cls(state["top_k"])
+        profile.distinct = HyperLogLog.from_state(state["distinct"])
+        profile.heavy_hitters = SpaceSaving.from_state(state["heavy_hitters"])
+        return profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "distinct_count": self.distinct.estimate(),
+            "distinct_count_relative_error": round(self.distinct.relative_error, 4),
+            "top_values": self.heavy_hitters.top(self.top_k),
+            "top_values_max_error": self.heavy_hitters.total // self.heavy_hitters.capacity,
+        }
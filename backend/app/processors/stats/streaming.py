@@ -0,0 +1,305 @@
+"""
+Single-pass, constant-memory column statistics.
+
+Everything here is mergeable: two summaries built over disjoint parts of
+a file combine into the summary of the whole, so chunks and shards can be
+processed independently. `to_state()` / `from_state()` carry a summary
+between workers as plain JSON.
+"""
+import math
+import re
+from typing import Any, Dict, Optional
+
+# The cells the stats count as numbers, on the row path and (as an Arrow
+# regex) the columnar one alike: what float() reads in ASCII, without
+# digit-group underscores; inf and nan are left out after parsing.
+# Whitespace is spelled out to match RE2's \s, which lacks \v.
+NUMBER_PATTERN = r"[ \t\n\f\r]*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?[ \t\n\f\r]*"
+_NUMBER = re.compile(NUMBER_PATTERN, re.ASCII)
+
+
+def parse_number(raw: str) -> Optional[float]:
+    """The finite number in a cell, or None if the stats count it as non-numeric."""
+    if _NUMBER.fullmatch(raw) is None:
+        return None
+    x = float(raw)
+    return x if math.isfinite(x) else None
+
+
+class RunningStats:
+    """Count, min, max, mean and variance via Welford's algorithm."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @classmethod
+    def from_moments(cls, count: int, mean: float, m2: float, lo: float, hi: float) -> "RunningStats":
+        """Build from moments computed elsewhere (e.g. over a NumPy batch)."""
+        stats = cls()
+        if count:
+            stats.count, stats.mean, stats.m2, stats.min, stats.max = count, mean, m2, lo, hi
+        return stats
+
+    def merge(self, other: "RunningStats") -> None:
+        # Chan et al. pairwise update
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_state(self) -> list:
+        """JSON-safe form for `from_state()`: [count, mean, m2, min, max]."""
+        if self.count == 0:
+            return [0, 0.0, 0.0, None, None]
+        return [self.count, self.mean, self.m2, self.min, self.max]
+
+    @classmethod
+    def from_state(cls, state: list) -> "RunningStats":
+        return cls.from_moments(*state)
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance (n - 1 denominator)."""
+        if self.count == 0:
+            return None
+        if self.count == 1:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stddev(self) -> Optional[float]:
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+
+class QuantileSketch:
+    """
+    DDSketch-style quantile sketch with relative accuracy `relative_accuracy`.
+
+    Values are mapped to logarithmically sized buckets, so any quantile is
+    returned within that relative error of a true sample value. Memory is
+    bounded by `max_buckets` per sign; past that the buckets nearest zero are
+    collapsed together, which only affects accuracy at the low end.
+    """
+
+    __slots__ = ("_gamma", "_inv_log_gamma", "_max_buckets", "positive", "negative", "zero_count", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1 / math.log(self._gamma)
+        self._max_buckets = max_buckets
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        if x > 0:
+            store = self.positive
+        elif x < 0:
+            store = self.negative
+            x = -x
+        else:
+            self.zero_count += 1
+            return
+
+        key = self.key(x)
+        store[key] = store.get(key, 0) + 1
+        if len(store) > self._max_buckets:
+            self._collapse(store)
+
+    def key(self, magnitude: float) -> int:
+        """Bucket index of a positive magnitude."""
+        return math.ceil(math.log(magnitude) * self._inv_log_gamma)
+
+    @property
+    def inv_log_gamma(self) -> float:
+        return self._inv_log_gamma
+
+    def add_counts(self, positive: Dict[int, int], negative: Dict[int, int], zeros: int) -> None:
+        """Add pre-bucketed counts, keyed like `key()` (negatives by magnitude)."""
+        for mine, theirs in ((self.positive, positive), (self.negative, negative)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+                self.count += n
+            while len(mine) > self._max_buckets:
+                self._collapse(mine)
+
+        self.zero_count += zeros
+        self.count += zeros
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other._gamma != self._gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+            while len(mine) > self._max_buckets:
+                self._collapse(mine)
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def to_state(self) -> Dict[str, Any]:
+        # bucket keys become strings in JSON, so buckets travel as [key, count] pairs
+        return {
+            "gamma": self._gamma,
+            "max_buckets": self._max_buckets,
+            "positive": list(self.positive.items()),
+            "negative": list(self.negative.items()),
+            "zero_count": self.zero_count,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(max_buckets=state["max_buckets"])
+        # keep gamma bit for bit, so merge() accepts the sketch
+        sketch._gamma = state["gamma"]
+        sketch._inv_log_gamma = 1 / math.log(sketch._gamma)
+        sketch.positive = {key: n for key, n in state["positive"]}
+        sketch.negative = {key: n for key, n in state["negative"]}
+        sketch.zero_count = state["zero_count"]
+        sketch.count = state["count"]
+        return sketch
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+
+        # most negative first: largest magnitude keys of the negative store
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def _value(self, key: int) -> float:
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def _collapse(self, store: Dict[int, int]) -> None:
+        # fold the two lowest-magnitude buckets into one
+        lowest, second = sorted(store)[:2]
+        store[second] += store.pop(lowest)
+
+
+class ColumnSummary:
+    """Streaming summary of one CSV column."""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    __slots__ = ("count", "null_count", "non_numeric_count", "stats", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.null_count = 0
+        self.non_numeric_count = 0
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+
+    def add(self, raw: Optional[str]) -> None:
+        self.count += 1
+
+        if raw is None or raw == "":
+            self.null_count += 1
+            return
+
+        x = parse_number(raw)
+        if x is None:
+            self.non_numeric_count += 1
+            return
+
+        self.stats.add(x)
+        self.sketch.add(x)
+
+    def merge(self, other: "ColumnSummary") -> None:
+        self.count += other.count
+        self.null_count += other.null_count
+        self.non_numeric_count += other.non_numeric_count
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "null_count": self.null_count,
+            "non_numeric_count": self.non_numeric_count,
+            "stats": self.stats.to_state(),
+            "sketch": self.sketch.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ColumnSummary":
+        summary = cls()
+        summary.count = state["count"]
+        summary.null_count = state["null_count"]
+        summary.non_numeric_count = state["non_numeric_count"]
+        summary.stats = RunningStats.from_state(state["stats"])
+        summary.sketch = QuantileSketch.from_state(state["sketch"])
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "null_count": self.null_count,
+            "non_numeric_count": self.non_numeric_count,
+            "numeric_count": self.stats.count,
+        }
+
+        if self.stats.count:
+            result.update(
+                {
+                    "min": self.stats.min,
+                    "max": self.stats.max,
+                    "avg": self.stats.mean,
+                    "variance": self.stats.variance,
+                    "stddev": self.stats.stddev,
+                }
+            )
+            for q in self.QUANTILES:
+                # the sketch is relative-error; never report outside the observed range
+                value = self.sketch.quantile(q)
+                result[f"p{round(q * 100)}"] = min(max(value, self.stats.min), self.stats.max)
+
+        return result
@@ -1,12 +1,13 @@
-import time
 from app.processors.base import JobProcessor
 
 class TestJobProcessor(JobProcessor):
+    timeout_seconds = 60
+
     def process(self, job_input: dict) -> dict:
         file_path = job_input["input_file_path"]
         metadata = job_input["input_metadata"]
 
-        time.sleep(2)
+        self.cancel_token(job_input).sleep(2)
 
         return {
             "ping": "pong",
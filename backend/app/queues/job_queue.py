@@ -6,6 +6,8 @@ from app.core.logging import setup_logging
 
 logger = setup_logging()
 
+CANCEL_KEY_TTL_SECONDS = 24 * 3600
+
 
 class JobQueue:
     def __init__(self):
@@ -18,6 +20,13 @@ class JobQueue:
         logger.info(f"Enqueuing job: {job_id} to the Redis Queue")
         self.client.lpush("job_queue", str(job_id))
 
+    def enqueue_many(self, job_ids) -> None:
+        """Wake workers for a whole batch with a single round trip."""
+        if not job_ids:
+            return
+        logger.info(f"Enqueuing {len(job_ids)} jobs to the Redis Queue")
+        self.client.lpush("job_queue", *(str(job_id) for job_id in job_ids))
+
     def dequeue(self, timeout: int = 5) -> UUID | None:
         result = self.client.brpop("job_queue", timeout=timeout)
         if not result:
@@ -26,3 +35,15 @@ class JobQueue:
         _, job_id = result
         logger.info(f"Dequeuing job: {job_id} from the Redis Queue")
         return UUID(job_id)
+
+    # ---------- Cancellation signals ----------
+
+    def request_cancel(self, job_id: UUID) -> None:
+        logger.info(f"Requesting cancellation of job: {job_id}")
+        self.client.set(f"job_cancel:{job_id}", 1, ex=CANCEL_KEY_TTL_SECONDS)
+
+    def is_cancel_requested(self, job_id: UUID) -> bool:
+        return bool(self.client.exists(f"job_cancel:{job_id}"))
+
+    def clear_cancel(self, job_id: UUID) -> None:
+        self.client.delete(f"job_cancel:{job_id}")
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.models.idempotency_key import IdempotencyKeyORM
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable sha256 of a JSON-serializable request body."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+
+    def get(self, scope: str, key: str) -> IdempotencyKeyORM | None:
+        return (
+            self.db.query(IdempotencyKeyORM)
+            .filter(
+                IdempotencyKeyORM.scope == scope,
+                IdempotencyKeyORM.key == key,
+                IdempotencyKeyORM.expires_at > utc_now(),
+            )
+            .one_or_none()
+        )
+
+
+    def reserve(
+        self,
+        scope: str,
+        key: str,
+        request_hash: str,
+        *,
+        job_id=None,
+        response: dict | None = None,
+    ) -> bool:
+        """
+        Claim `key` for this request. Returns False if another live request
+        already owns it; an expired row with the same key is taken over.
+        """
+        now = utc_now()
+        values = {
+            "scope": scope,
+            "key": key,
+            "request_hash": request_hash,
+            "job_id": job_id,
+            "response": response,
+            "created_at": now,
+            "expires_at": now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        }
+
+        stmt = insert(IdempotencyKeyORM).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKeyORM.scope, IdempotencyKeyORM.key],
+            set_={k: stmt.excluded[k] for k in values if k not in ("scope", "key")},
+            where=IdempotencyKeyORM.expires_at <= now,
+        ).returning(IdempotencyKeyORM.key)
+
+        claimed = self.db.execute(stmt).scalar_one_or_none() is not None
+        self.db.commit()
+
+        logger.debug(f"Idempotency key {scope} {key}: {'reserved' if claimed else 'taken'}")
+        return claimed
+
+
+    def complete(self, scope: str, key: str, response: dict) -> None:
+        """Store the response of the request that reserved `key`, for replays."""
+        self.db.execute(
+            update(IdempotencyKeyORM)
+            .where(
+                IdempotencyKeyORM.scope == scope,
+                IdempotencyKeyORM.key == key,
+            )
+            .values(response=response)
+        )
+        self.db.commit()
+
+
+    def release(self, scope: str, key: str) -> None:
+        """Drop a reservation whose request failed, so the client can retry."""
+        # the failed request may have left the session's transaction aborted
+        self.db.rollback()
+        self.db.execute(
+            delete(IdempotencyKeyORM).where(
+                IdempotencyKeyORM.scope == scope,
+                IdempotencyKeyORM.key == key,
+            )
+        )
+        self.db.commit()
+
+
+    def purge_expired(self) -> int:
+        deleted = self.db.execute(
+            delete(IdempotencyKeyORM).where(IdempotencyKeyORM.expires_at <= utc_now())
+        ).rowcount
+        self.db.commit()
+
+        if deleted:
+            logger.info(f"Purged {deleted} expired idempotency keys")
+        return deleted
@@ -0,0 +1,230 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.enums.job_status import JobStatus
+from app.db.models.job import JobORM
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+# Jobs in these states are never touched by a worker again.
+ARCHIVABLE_STATUSES = (JobStatus.COMPLETED, JobStatus.DEAD, JobStatus.CANCELLED)
+
+_LOWER_BOUND = re.compile(r"FROM \('([^']+)'\)")
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def _bound(pattern: re.Pattern, expr: str):
+    # None for MINVALUE/MAXVALUE
+    match = pattern.search(expr)
+    if not match:
+        return None
+    value = datetime.fromisoformat(match.group(1))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def month_start(year: int, month: int) -> datetime:
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+class JobArchiveRepository:
+    """
+    Partition maintenance and archival for the `jobs` table.
+
+    `jobs` and `jobs_archive` are both range-partitioned by `created_at`
+    with one partition per calendar month. Terminal jobs older than the
+    retention window are moved in small batches from `jobs` to
+    `jobs_archive`; hot partitions that end up empty are detached and dropped.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+
+    def partitions(self, parent: str) -> list[tuple[str, datetime | None, datetime | None]]:
+        """
+        (name, lower, upper) of every range partition of `parent`; None
+        stands for MINVALUE/MAXVALUE. The DEFAULT partition is left out.
+        """
+        rows = self.db.execute(
+            text(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = CAST(:parent AS regclass)
+                """
+            ),
+            {"parent": parent},
+        ).all()
+
+        return [
+            (name, _bound(_LOWER_BOUND, bound), _bound(_UPPER_BOUND, bound))
+            for name, bound in rows
+            if bound and bound != "DEFAULT"
+        ]
+
+
+    def ensure_partitions(self, table: str, months_ahead: int) -> list[str]:
+        """
+        Create monthly partitions from the current month onwards. Months an
+        existing partition already covers (such as `jobs_legacy`, which runs
+        up to the month after the partitioning migration) are skipped.
+        """
+        now = utc_now()
+        created = []
+
+        for i in range(months_ahead + 1):
+            lower = month_start(now.year, now.month + i)
+            upper = month_start(now.year, now.month + i + 1)
+            if self.create_partition(table, lower, upper):
+                created.append(f"{table}_p{lower:%Y_%m}")
+
+        return created
+
+
+    def create_partition(self, parent: str, lower: datetime, upper: datetime) -> bool:
+        name = f"{parent}_p{lower:%Y_%m}"
+
+        # a partition of this name, or one overlapping the range such as jobs_legacy
+        covered = any(
+            (start is None or start < upper) and (end is None or end > lower)
+            for _, start, end in self.partitions(parent)
+        )
+        if covered:
+            return False
+
+        try:
+            self.db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                )
+            )
+            self.db.commit()
+        except DBAPIError:
+            # e.g. rows for the range already landed in the DEFAULT partition
+            logger.exception(f"Could not create partition {name}")
+            self.db.rollback()
+            return False
+
+        logger.info(f"Created partition {name}")
+        return True
+
+
+    def ensure_archive_partitions(self, older_than: datetime) -> list[str]:
+        """Create archive partitions for every month that has rows about to be archived."""
+        months = self.db.execute(
+            text(
+                """
+                SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')
+                FROM jobs
+                WHERE status = ANY(CAST(:statuses AS job_status[]))
+                  AND created_at < :older_than
+                """
+            ),
+            {
+                "statuses": [s.value for s in ARCHIVABLE_STATUSES],
+                "older_than": older_than,
+            },
+        ).scalars().all()
+
+        created = []
+        for month in months:
+            lower = month_start(month.year, month.month)
+            upper = month_start(month.year, month.month + 1)
+            if self.create_partition("jobs_archive", lower, upper):
+                created.append(f"jobs_archive_p{lower:%Y_%m}")
+
+        return created
+
+
+    def archive_batch(self, older_than: datetime, batch_size: int) -> int:
+        """
+        Move up to `batch_size` terminal jobs created before `older_than`
+        into `jobs_archive` in a single statement. Returns the number moved.
+        """
+        columns = ", ".join(c.name for c in JobORM.__table__.columns)
+
+        moved = self.db.execute(
+            text(
+                f"""
+                WITH victims AS (
+                    SELECT job_id, created_at
+                    FROM jobs
+                    WHERE status = ANY(CAST(:statuses AS job_status[]))
+                      AND created_at < :older_than
+                    ORDER BY created_at
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                ),
+                moved AS (
+                    DELETE FROM jobs j
+                    USING victims v
+                    WHERE j.job_id = v.job_id AND j.created_at = v.created_at
+                    RETURNING {", ".join(f"j.{c.name}" for c in JobORM.__table__.columns)}
+                )
+                INSERT INTO jobs_archive ({columns})
+                SELECT {columns} FROM moved
+                """
+            ),
+            {
+                "statuses": [s.value for s in ARCHIVABLE_STATUSES],
+                "older_than": older_than,
+                "batch_size": batch_size,
+            },
+        ).rowcount
+
+        self.db.commit()
+        return moved
+
+
+    def archive_terminal_jobs(self, retention: timedelta, batch_size: int) -> int:
+        older_than = utc_now() - retention
+        self.ensure_archive_partitions(older_than)
+        total = 0
+
+        while True:
+            moved = self.archive_batch(older_than, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+
+        if total:
+            logger.info(f"Archived {total} terminal jobs created before {older_than}")
+        return total
+
+
+    def drop_empty_partitions(self, before: datetime) -> list[str]:
+        """
+        Detach and drop hot partitions that lie entirely before `before`
+        and no longer hold any rows.
+        """
+        dropped = []
+        for name, _, upper in self.partitions("jobs"):
+            if upper is None or upper > before:
+                continue
+
+            has_rows = self.db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar()
+            if has_rows:
+                continue
+
+            self.db.execute(text(f"ALTER TABLE jobs DETACH PARTITION {name}"))
+            self.db.execute(text(f"DROP TABLE {name}"))
+            self.db.commit()
+            dropped.append(name)
+            logger.info(f"Dropped empty partition {name}")
+
+        self.db.rollback()
+        return dropped
+
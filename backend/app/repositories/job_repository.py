@@ -1,11 +1,12 @@
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, func, select, true, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, NoResultFound, IntegrityError
 from datetime import datetime, timezone
 
 from app.models.job import Job
-from app.db.models.job import JobORM
+from app.db.models.job import JobORM, JobArchiveORM
 from app.core.enums.job_status import JobStatus
+from app.core.enums.job_type import JobType
 from app.repositories.mappers import orm_to_domain, domain_to_orm
 from app.core.logging import setup_logging
 
@@ -56,6 +57,7 @@ class JobRepository:
         *,
         error_message: str | None = None,
         output_file_path: str | None = None,
+        next_run_at: datetime | None = None,
     ) -> Job:
         try:
             orm = (
@@ -73,7 +75,7 @@ class JobRepository:
             logger.info(f"Job {job_id} already in status {new_status}, no transition needed")
             return domain
         
-        domain.transition(new_status, error_message=error_message)
+        domain.transition(new_status, error_message=error_message, next_run_at=next_run_at)
         logger.info(f"Transitioned job {job_id} to {new_status}")
 
         # ---- APPLY DOMAIN → ORM ----
@@ -81,6 +83,9 @@ class JobRepository:
         orm.retry_count = domain.retry_count
         orm.error_message = domain.error_message
         orm.output_file_path = output_file_path
+        orm.next_run_at = domain.next_run_at
+        orm.updated_at = domain.updated_at
+        orm.finished_at = domain.finished_at
 
         try:
             logger.debug(f"Committing transition of job {job_id} to {new_status}")
@@ -102,13 +107,24 @@ class JobRepository:
             .filter(JobORM.job_id == job_id)
             .one_or_none()
         )
+
+        if orm is None:
+            # Terminal jobs past the retention window live in jobs_archive.
+            orm = (
+                self.db.query(JobArchiveORM)
+                .filter(JobArchiveORM.job_id == job_id)
+                .one_or_none()
+            )
+
         logger.debug(f"Fetched job {job_id}: {'found' if orm else 'not found'}")
         return orm_to_domain(orm) if orm else None
     
 
-    def list_jobs(self, limit: int = 20, offset: int = 0):
+    def list_jobs(self, limit: int = 20, offset: int = 0, parent_job_id=None):
+        """Top-level jobs, or the shards of `parent_job_id`."""
         orms = (
             self.db.query(JobORM)
+            .filter(JobORM.parent_job_id == parent_job_id)
             .order_by(JobORM.created_at.desc())
             .offset(offset)
             .limit(limit)
@@ -118,8 +134,8 @@ class JobRepository:
         return [orm_to_domain(orm) for orm in orms]
     
     
-    def count_jobs(self) -> int:
-        return self.db.query(JobORM).count()
+    def count_jobs(self, parent_job_id=None) -> int:
+        return self.db.query(JobORM).filter(JobORM.parent_job_id == parent_job_id).count()
     
 
     def mark_queued(self, job_id) -> Job:
@@ -134,13 +150,90 @@ class JobRepository:
 
     def mark_completed(self, job_id, output_file_path: str) -> Job:
         logger.debug(f"Marking job {job_id} as COMPLETED with output file: {output_file_path}")
-        return self._transition(
+        job = self._transition(
             job_id,
             JobStatus.COMPLETED,
             output_file_path=output_file_path,
         )
+        if job.checkpoint is not None:
+            self.save_checkpoint(job_id, None)
+            job.checkpoint = None
+        return job
     
 
+    def update_progress(self, job_id, progress: dict) -> None:
+        """
+        Persist a progress snapshot without loading the row. Leaves
+        updated_at alone so progress writes are not mistaken for transitions.
+        """
+        snapshot = dict(progress, updated_at=utc_now().isoformat())
+        self.db.execute(
+            update(JobORM)
+            .where(JobORM.job_id == job_id, JobORM.status == JobStatus.PROCESSING)
+            .values(progress=snapshot, updated_at=JobORM.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+
+    def save_checkpoint(self, job_id, checkpoint: dict | None) -> None:
+        """Record the segments scanned so far; like progress, leaves updated_at alone."""
+        self.db.execute(
+            update(JobORM)
+            .where(JobORM.job_id == job_id)
+            .values(checkpoint=checkpoint, updated_at=JobORM.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+
+    def mark_cancelled(self, job_id) -> Job:
+        logger.debug(f"Marking job {job_id} as CANCELLED")
+        return self._transition(job_id, JobStatus.CANCELLED)
+
+
+    def cancel_job(self, job_id) -> Job | None:
+        """
+        Cancel a job on behalf of the API.
+
+        Jobs not held by a worker go straight to CANCELLED. A PROCESSING job
+        only gets `cancel_requested_at`; the worker finishes the transition.
+        The row lock serializes this with claim_next_job.
+        """
+        orm = (
+            self.db.query(JobORM)
+            .filter(JobORM.job_id == job_id)
+            .with_for_update()
+            .one_or_none()
+        )
+        if not orm:
+            return None
+
+        domain = orm_to_domain(orm)
+
+        if domain.can_cancel_immediately():
+            domain.transition(JobStatus.CANCELLED)
+            orm.status = domain.status
+            orm.next_run_at = None
+            orm.updated_at = domain.updated_at
+            orm.finished_at = domain.finished_at
+            logger.info(f"Cancelled job {job_id}")
+
+        elif domain.status == JobStatus.PROCESSING:
+            if orm.cancel_requested_at is None:
+                orm.cancel_requested_at = utc_now()
+            logger.info(f"Cancellation requested for running job {job_id}")
+
+        else:
+            self.db.rollback()
+            raise ValueError(f"Job in state {domain.status.value} cannot be cancelled")
+
+        self.db.commit()
+        self.db.refresh(orm)
+
+        return orm_to_domain(orm)
+
+
     def handle_failure(self, job_id: str, error_message: str) -> Job:
         try:
             orm = (
@@ -152,13 +245,32 @@ class JobRepository:
             logger.exception(f"Job {job_id} not found while handling failure")
             raise ValueError(f"Job {job_id} not found")
 
+        self._apply_failure(orm, error_message)
+
+        try:
+            self.db.commit()
+        except IntegrityError:
+            logger.exception(f"Failed to persist failure handling for job {job_id}")
+            self.db.rollback()
+            raise
+
+        self.db.refresh(orm)
+    
+        return orm_to_domain(orm)
+
+
+    def _apply_failure(self, orm: JobORM, error_message: str) -> None:
+        job_id = orm.job_id
         domain = orm_to_domain(orm)
 
         # Step 1: mark FAILED (increments retry_count)
         domain.transition(JobStatus.FAILED, error_message=error_message)
 
-        # Step 2: decide retry vs dead 
-        if domain.should_retry():
+        # Step 2: decide retry vs dead (a pending cancel wins over both)
+        if domain.cancel_requested_at is not None:
+            domain.transition(JobStatus.CANCELLED)
+            logger.info(f"Job {job_id} failed after cancellation was requested; cancelled")
+        elif domain.should_retry():
             next_run_at = domain.compute_next_run_at()
             domain.transition(
                 JobStatus.RETRYING,
@@ -181,17 +293,6 @@ class JobRepository:
         orm.updated_at = domain.updated_at
         orm.finished_at = domain.finished_at
 
-        try:
-            self.db.commit()
-        except IntegrityError:
-            logger.exception(f"Failed to persist failure handling for job {job_id}")
-            self.db.rollback()
-            raise
-
-        self.db.refresh(orm)
-    
-        return orm_to_domain(orm)
-
 
     def claim_next_job(self) -> Job | None:
         now = utc_now()
@@ -219,6 +320,10 @@ class JobRepository:
 
         orm.status = domain.status
         orm.updated_at = domain.updated_at
+        orm.started_at = domain.updated_at
+        orm.progress = None
+        orm.shard_count = None
+        orm.shards_pending = None
 
         self.db.commit()
         self.db.refresh(orm)
@@ -228,3 +333,277 @@ class JobRepository:
         return orm_to_domain(orm)
 
 
+    # ---------- Sharded jobs ----------
+
+    def create_shards(self, parent_id, shards: list[Job], total_bytes: int) -> list[Job]:
+        """
+        Insert the shards of a PROCESSING job as QUEUED jobs and start
+        counting them on the parent, in one transaction.
+        """
+        parent = (
+            self.db.query(JobORM)
+            .filter(JobORM.job_id == parent_id)
+            .with_for_update()
+            .one()
+        )
+
+        orms = []
+        for shard in shards:
+            shard.transition(JobStatus.QUEUED)
+            orms.append(domain_to_orm(shard))
+        self.db.add_all(orms)
+
+        parent.shard_count = len(shards)
+        parent.shards_pending = len(shards)
+        parent.progress = {
+            "rows_processed": 0,
+            "bytes_processed": 0,
+            "total_bytes": total_bytes,
+            "updated_at": utc_now().isoformat(),
+        }
+
+        try:
+            self.db.commit()
+        except IntegrityError:
+            logger.exception(f"Failed to create shards of job {parent_id}")
+            self.db.rollback()
+            raise
+
+        logger.info(f"Split job {parent_id} into {len(shards)} shards")
+        return [orm_to_domain(orm) for orm in orms]
+
+
+    def _shard_parent(self, shard: Job) -> JobORM | None:
+        """
+        The locked parent of `shard`, or None when the shard no longer
+        counts: the parent finished, or was retried and split again after
+        this shard was created.
+        """
+        parent = (
+            self.db.query(JobORM)
+            .filter(JobORM.job_id == shard.parent_job_id)
+            .with_for_update()
+            .one_or_none()
+        )
+        if (
+            parent is None
+            or parent.status != JobStatus.PROCESSING
+            or not parent.shards_pending
+            or shard.input_metadata["shard"]["attempt"] != orm_to_domain(parent).attempt_key()
+        ):
+            self.db.rollback()
+            return None
+        return parent
+
+
+    def finish_shard(self, shard: Job, rows: int, bytes_processed: int) -> Job | None:
+        """
+        Count a COMPLETED shard against its parent. Returns the parent when
+        this was its last pending shard (time to reduce), None otherwise.
+        """
+        parent = self._shard_parent(shard)
+        if parent is None:
+            return None
+
+        progress = dict(parent.progress or {})
+        progress["rows_processed"] = progress.get("rows_processed", 0) + rows
+        progress["bytes_processed"] = progress.get("bytes_processed", 0) + bytes_processed
+        progress["updated_at"] = utc_now().isoformat()
+
+        parent.shards_pending -= 1
+        parent.progress = progress
+        self.db.commit()
+        self.db.refresh(parent)
+
+        logger.info(f"Shard {shard.shard_index} of job {parent.job_id} done, {parent.shards_pending} pending")
+        return orm_to_domain(parent) if parent.shards_pending == 0 else None
+
+
+    def fail_shard(self, shard: Job) -> tuple[Job | None, list]:
+        """
+        A shard ended DEAD or CANCELLED, so its parent cannot complete:
+        fail the parent (retrying it re-splits the input) and cancel the
+        other shards. Returns the parent (None if it was no longer waiting)
+        and the ids of shards still PROCESSING, which need a cancel signal.
+        """
+        parent = self._shard_parent(shard)
+        if parent is None:
+            return None, []
+
+        parent.shards_pending = None
+        self._apply_failure(
+            parent,
+            f"Shard {shard.shard_index + 1} of {parent.shard_count} failed: {shard.error_message or shard.status.value}",
+        )
+        running = self._cancel_shards(parent.job_id)
+
+        self.db.commit()
+        self.db.refresh(parent)
+        return orm_to_domain(parent), running
+
+
+    def cancel_shards(self, parent_id) -> list:
+        """
+        Cancel the unfinished shards of a cancelled job. Returns the ids of
+        shards still PROCESSING, which need a cancel signal.
+        """
+        running = self._cancel_shards(parent_id)
+        self.db.commit()
+        return running
+
+
+    def _cancel_shards(self, parent_id) -> list:
+        now = utc_now()
+
+        self.db.execute(
+            update(JobORM)
+            .where(
+                JobORM.parent_job_id == parent_id,
+                JobORM.status.in_([JobStatus.CREATED, JobStatus.QUEUED, JobStatus.RETRYING, JobStatus.FAILED]),
+            )
+            .values(status=JobStatus.CANCELLED, next_run_at=None, finished_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        return self.db.execute(
+            update(JobORM)
+            .where(
+                JobORM.parent_job_id == parent_id,
+                JobORM.status == JobStatus.PROCESSING,
+                JobORM.cancel_requested_at.is_(None),
+            )
+            .values(cancel_requested_at=now)
+            .returning(JobORM.job_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+
+
+    def list_shards(self, parent: Job) -> list[Job]:
+        """COMPLETED shards of the parent's current attempt, in input order."""
+        orms = (
+            self.db.query(JobORM)
+            .filter(
+                JobORM.parent_job_id == parent.job_id,
+                JobORM.status == JobStatus.COMPLETED,
+                JobORM.input_metadata["shard"]["attempt"].astext == parent.attempt_key(),
+            )
+            .order_by(JobORM.shard_index)
+            .all()
+        )
+        return [orm_to_domain(orm) for orm in orms]
+
+
+    # ---------- Bulk operations ----------
+
+    def _selector(
+        self,
+        *,
+        job_ids=None,
+        job_type: JobType | None = None,
+        error_pattern: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        user_id: str | None = None,
+    ):
+        conditions = []
+
+        if job_ids:
+            conditions.append(JobORM.job_id.in_(job_ids))
+        if job_type:
+            conditions.append(JobORM.job_type == job_type)
+        if error_pattern:
+            conditions.append(JobORM.error_message.ilike(error_pattern))
+        if created_after:
+            conditions.append(JobORM.created_at >= created_after)
+        if created_before:
+            conditions.append(JobORM.created_at < created_before)
+        if user_id:
+            conditions.append(JobORM.context["user_id"].astext == user_id)
+
+        if not conditions:
+            raise ValueError("Bulk operations require at least one selector")
+
+        # shards follow their parent: retried or cancelled with it, never on their own
+        return and_(JobORM.parent_job_id.is_(None), *conditions)
+
+
+    def bulk_retry(self, *, reset_retries: bool = False, **criteria) -> tuple[list, int]:
+        """
+        Re-queue every FAILED/DEAD job matching `criteria` in one statement.
+
+        This is the set-based equivalent of FAILED → RETRYING → QUEUED.
+        Unless `reset_retries` is set, jobs with retry_count >= max_retries
+        are left alone and only counted as skipped.
+
+        Returns (requeued job ids, skipped count).
+        """
+        within_budget = true() if reset_retries else JobORM.retry_count < JobORM.max_retries
+
+        # both numbers come from the same locked rows: a job that fails or
+        # is retried concurrently is either requeued or skipped, never both
+        matched = (
+            select(JobORM.job_id, JobORM.created_at, within_budget.label("within_budget"))
+            .where(self._selector(**criteria), JobORM.status.in_([JobStatus.FAILED, JobStatus.DEAD]))
+            .with_for_update()
+            .cte("matched")
+        )
+        requeued = (
+            update(JobORM)
+            .where(
+                JobORM.job_id == matched.c.job_id,
+                JobORM.created_at == matched.c.created_at,
+                matched.c.within_budget,
+            )
+            .values(
+                status=JobStatus.QUEUED,
+                retry_count=0 if reset_retries else JobORM.retry_count,
+                next_run_at=None,
+                finished_at=None,
+                updated_at=func.now(),
+            )
+            .returning(JobORM.job_id)
+            .cte("requeued")
+        )
+        stmt = select(
+            select(func.array_agg(requeued.c.job_id)).scalar_subquery(),
+            select(func.count()).select_from(matched).where(~matched.c.within_budget).scalar_subquery(),
+        )
+
+        try:
+            job_ids, skipped = self.db.execute(stmt).one()
+            self.db.commit()
+        except IntegrityError:
+            logger.exception("Failed to bulk retry jobs")
+            self.db.rollback()
+            raise
+
+        job_ids = job_ids or []
+        logger.info(f"Bulk retry re-queued {len(job_ids)} jobs, skipped {skipped}")
+        return job_ids, skipped
+
+
+    def bulk_cancel(self, **criteria) -> list:
+        """
+        Cancel every FAILED/RETRYING/DEAD job matching `criteria` in one UPDATE.
+        """
+        stmt = (
+            update(JobORM)
+            .where(
+                self._selector(**criteria),
+                JobORM.status.in_([JobStatus.FAILED, JobStatus.RETRYING, JobStatus.DEAD]),
+            )
+            .values(
+                status=JobStatus.CANCELLED,
+                next_run_at=None,
+                finished_at=func.now(),
+                updated_at=func.now(),
+            )
+            .returning(JobORM.job_id)
+            .execution_options(synchronize_session=False)
+        )
+
+        job_ids = self.db.execute(stmt).scalars().all()
+        self.db.commit()
+
+        logger.info(f"Bulk cancel cancelled {len(job_ids)} jobs")
+        return job_ids
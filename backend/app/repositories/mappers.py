@@ -24,6 +24,15 @@ def orm_to_domain(orm: JobORM) -> Job:
         updated_at=orm.updated_at,
         next_run_at=orm.next_run_at,
         finished_at=orm.finished_at,
+        cancel_requested_at=orm.cancel_requested_at,
+        started_at=orm.started_at,
+        progress=orm.progress,
+
+        parent_job_id=orm.parent_job_id,
+        shard_index=orm.shard_index,
+        shard_count=orm.shard_count,
+        shards_pending=orm.shards_pending,
+        checkpoint=orm.checkpoint,
     )
 
 
@@ -47,5 +56,11 @@ def domain_to_orm(job: Job) -> JobORM:
 
         next_run_at=job.next_run_at,
         finished_at=job.finished_at,
+
+        parent_job_id=job.parent_job_id,
+        shard_index=job.shard_index,
+        shard_count=job.shard_count,
+        shards_pending=job.shards_pending,
+        checkpoint=job.checkpoint,
     )
 
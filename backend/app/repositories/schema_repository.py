@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.models.inferred_schema import InferredSchemaORM
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class SchemaRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+
+    def get(self, etag: str, dialect: str) -> dict | None:
+        row = (
+            self.db.query(InferredSchemaORM)
+            .filter(
+                InferredSchemaORM.etag == etag,
+                InferredSchemaORM.dialect == dialect,
+                InferredSchemaORM.expires_at > utc_now(),
+            )
+            .one_or_none()
+        )
+        return row.schema if row is not None else None
+
+
+    def save(self, etag: str, dialect: str, input_file_path: str, schema: dict) -> None:
+        """
+        Store the schema of an object; a sampled schema does not replace a
+        live full one.
+        """
+        now = utc_now()
+        values = {
+            "etag": etag,
+            "dialect": dialect,
+            "input_file_path": input_file_path,
+            "full": bool(schema["full"]),
+            "schema": schema,
+            "created_at": now,
+            "expires_at": now + timedelta(days=settings.SCHEMA_CACHE_TTL_DAYS),
+        }
+
+        stmt = insert(InferredSchemaORM).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[InferredSchemaORM.etag, InferredSchemaORM.dialect],
+            set_={k: stmt.excluded[k] for k in values if k not in ("etag", "dialect")},
+            where=or_(
+                stmt.excluded.full,
+                InferredSchemaORM.full.is_(False),
+                InferredSchemaORM.expires_at <= now,
+            ),
+        )
+        self.db.execute(stmt)
+        self.db.commit()
+
+        logger.debug(f"Schema of {input_file_path} ({etag}) saved, full={values['full']}")
+
+
+    def purge_expired(self) -> int:
+        deleted = self.db.execute(
+            delete(InferredSchemaORM).where(InferredSchemaORM.expires_at <= utc_now())
+        ).rowcount
+        self.db.commit()
+
+        if deleted:
+            logger.info(f"Purged {deleted} expired inferred schemas")
+        return deleted
@@ -1,26 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
+from typing import Optional
 from uuid import UUID
 
 from app.schemas.job import (
     JobCreateRequest,
     JobCreateResponse,
+    JobPreviewRequest,
+    JobPreviewResponse,
     JobStatusResponse,  
     JobListResponse,
+    JobBulkRequest,
+    JobBulkRetryRequest,
+    JobBulkResponse,
 )
 from app.core.enums.job_status import JobStatus
 from app.core.enums.job_type import JobType
 from app.models.job import Job
 from app.repositories.job_repository import JobRepository
+from app.repositories.idempotency_repository import IdempotencyRepository, request_fingerprint
+from app.queues.job_queue import JobQueue
 from app.db.session import get_db
-from app.core.job_factory import build_input_metadata
-from app.core.storage import StorageClient
+from app.core.job_factory import additional_inputs, build_input_metadata
+from app.core.storage import ObjectNotFound, StorageClient, StorageError
 from app.core.settings import settings
 from app.core.logging import setup_logging
+from app.processors.preview import preview_object
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 logger = setup_logging()
 
+CREATE_JOB_SCOPE = "POST /jobs"
+BULK_RETRY_SCOPE = "POST /jobs/bulk/retry"
+BULK_CANCEL_SCOPE = "POST /jobs/bulk/cancel"
+
+
+def idempotency_key_header(
+    idempotency_key: Optional[str] = Header(
+        default=None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Client-generated key; repeating it returns the original result",
+    ),
+) -> Optional[str]:
+    return idempotency_key
+
+
+def to_status_response(job: Job) -> JobStatusResponse:
+    percent_complete, estimated_finish_at = job.progress_estimate()
+
+    return JobStatusResponse(
+        job_id=job.job_id,
+        job_type=job.job_type,
+        status=job.status,
+        retry_count=job.retry_count,
+        max_retries=job.max_retries,
+        error_message=job.error_message,
+        input_file_path=job.input_file_path,
+        output_file_path=job.output_file_path,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        next_run_at=job.next_run_at,
+        finished_at=job.finished_at,
+        cancel_requested_at=job.cancel_requested_at,
+        progress=job.progress,
+        percent_complete=percent_complete,
+        estimated_finish_at=estimated_finish_at,
+        parent_job_id=job.parent_job_id,
+        shard_index=job.shard_index,
+        shard_count=job.shard_count,
+        shards_pending=job.shards_pending,
+    )
+
+
+def _find_replay(idem: IdempotencyRepository, scope: str, key: str, request_hash: str):
+    record = idem.get(scope, key)
+    if record and record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body",
+        )
+    return record
+
+
+def _replay_created_job(idem, repo, key, request_hash, response: Response):
+    record = _find_replay(idem, CREATE_JOB_SCOPE, key, request_hash)
+    if not record:
+        return None
+
+    job = repo.get_job_by_id(record.job_id)
+    if not job:
+        # Key reserved by a request that has not inserted its job yet.
+        return None
+
+    response.headers["Idempotent-Replayed"] = "true"
+    logger.info(
+        "Replayed job creation for idempotency key",
+        extra={"job_id": str(job.job_id)},
+    )
+    return JobCreateResponse(job_id=job.job_id, status=job.status)
+
+
+def _replay_bulk(idem, scope, key, request_hash, response: Response):
+    record = _find_replay(idem, scope, key, request_hash)
+    if not record or record.response is None:
+        return None
+
+    response.headers["Idempotent-Replayed"] = "true"
+    return JobBulkResponse.model_validate(record.response)
+
+
+def _reserve_bulk(idem, scope, key, request_hash, response: Response):
+    """
+    Claim `key` before a bulk operation runs, so overlapping requests with
+    the same key do not both run it. Returns the stored response if the
+    other request finished in the meantime.
+    """
+    if idem.reserve(scope, key, request_hash):
+        return None
+
+    replay = _replay_bulk(idem, scope, key, request_hash, response)
+    if replay:
+        return replay
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is still in progress",
+    )
+
 
 @router.post(
     "",
@@ -29,17 +135,33 @@ logger = setup_logging()
 )
 def create_job(
     request: JobCreateRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
     db: Session = Depends(get_db),
 ):
     try:
-        storage = StorageClient()
         repo = JobRepository(db)
+        idem = IdempotencyRepository(db)
+        request_hash = None
+
+        # A repeated key short-circuits before the HEAD check and the insert.
+        if idempotency_key:
+            request_hash = request_fingerprint(request.model_dump(mode="json"))
+            replay = _replay_created_job(idem, repo, idempotency_key, request_hash, response)
+            if replay:
+                return replay
+
+        storage = StorageClient()
+        input_keys = [
+            request.input_file_path,
+            *additional_inputs(request.job_type, request.input_metadata).values(),
+        ]
 
         try:
-            exists = storage.object_exists(
-                bucket=settings.S3_INPUT_BUCKET,
-                object_key=request.input_file_path,
-            )
+            missing = [
+                key for key in input_keys
+                if not storage.object_exists(bucket=settings.S3_INPUT_BUCKET, object_key=key)
+            ]
         except Exception as e:
             logger.exception(
                 "Failed to create job as Storage backend was unavailable",
@@ -50,11 +172,11 @@ def create_job(
                 detail="Storage backend unavailable",
             )
 
-        if not exists:
-            logger.exception(f"Failed to create job as Input file '{request.input_file_path}' does not exist")
+        if missing:
+            logger.exception(f"Failed to create job as Input file '{missing[0]}' does not exist")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Input file '{request.input_file_path}' does not exist",
+                detail=f"Input file '{missing[0]}' does not exist",
             )
         
         # Create domain job
@@ -73,8 +195,29 @@ def create_job(
             notifications=request.notifications.dict() if request.notifications else {},
         )
 
+        if idempotency_key and not idem.reserve(
+            CREATE_JOB_SCOPE,
+            idempotency_key,
+            request_hash,
+            job_id=job.job_id,
+        ):
+            # Lost the race against a concurrent request with the same key.
+            replay = _replay_created_job(idem, repo, idempotency_key, request_hash, response)
+            if replay:
+                return replay
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+            )
+
         # Persist job
-        job = repo.create_job(job)
+        try:
+            job = repo.create_job(job)
+        except Exception:
+            if idempotency_key:
+                idem.release(CREATE_JOB_SCOPE, idempotency_key)
+            raise
+
         job = repo.mark_queued(job.job_id)
 
         return JobCreateResponse(
@@ -82,6 +225,9 @@ def create_job(
             status=job.status,
         )
 
+    except HTTPException:
+        raise
+
     except ValueError as e:
         # Domain errors (invalid state transitions, etc.)
         logger.warning(
@@ -104,6 +250,66 @@ def create_job(
         )
 
 
+@router.post(
+    "/preview",
+    response_model=JobPreviewResponse,
+)
+def preview_job(request: JobPreviewRequest):
+    """
+    Approximate stats, column types and row count of an input file from a
+    few ranged reads, in about the time of one request whatever its size.
+    """
+    try:
+        metadata = build_input_metadata(
+            request.job_type,
+            request.input_file_path,
+            request.input_metadata,
+        )
+        preview = preview_object(
+            StorageClient(),
+            settings.S3_INPUT_BUCKET,
+            request.input_file_path,
+            metadata,
+        )
+
+    except ObjectNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Input file '{request.input_file_path}' does not exist",
+        )
+
+    except StorageError as e:
+        logger.exception(
+            "Failed to preview input as Storage backend was unavailable",
+            extra={"error": str(e)},
+        )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Storage backend unavailable",
+        )
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+
+    logger.info(
+        "Input previewed",
+        extra={
+            "input_file_path": request.input_file_path,
+            "size_bytes": preview["size_bytes"],
+            "exact": preview["exact"],
+        },
+    )
+
+    return JobPreviewResponse(
+        job_type=request.job_type,
+        input_file_path=request.input_file_path,
+        **preview,
+    )
+
+
 @router.get(
     "/{job_id}",
     response_model=JobStatusResponse,
@@ -121,59 +327,128 @@ def get_job(
             detail="Job not found",
         )
 
-    return JobStatusResponse(
-        job_id=job.job_id,
-        job_type=job.job_type,
-        status=job.status,
-        retry_count=job.retry_count,
-        max_retries=job.max_retries,
-        error_message=job.error_message,
-        input_file_path=job.input_file_path,
-        output_file_path=job.output_file_path,
-        created_at=job.created_at,
-        updated_at=job.updated_at,
-        next_run_at=job.next_run_at,
-        finished_at=job.finished_at,
-
-    )
+    return to_status_response(job)
 
 
 @router.get("",response_model=JobListResponse,)
 def list_jobs(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    parent_job_id: Optional[UUID] = Query(None, description="List the shards of this job instead"),
     db: Session = Depends(get_db),
 ):
     repo = JobRepository(db)
 
-    jobs = repo.list_jobs(limit=limit, offset=offset)
-    total = repo.count_jobs()
+    jobs = repo.list_jobs(limit=limit, offset=offset, parent_job_id=parent_job_id)
+    total = repo.count_jobs(parent_job_id=parent_job_id)
 
     return JobListResponse(
-        items=[
-            JobStatusResponse(
-                job_id=job.job_id,
-                job_type=job.job_type,
-                status=job.status,
-                retry_count=job.retry_count,
-                max_retries=job.max_retries,
-                error_message=job.error_message,
-                input_file_path=job.input_file_path,
-                output_file_path=job.output_file_path,
-                created_at=job.created_at,
-                updated_at=job.updated_at,
-                next_run_at=job.next_run_at,
-                finished_at=job.finished_at,
-            )
-
-            for job in jobs
-        ],
+        items=[to_status_response(job) for job in jobs],
         total=total,
         limit=limit,
         offset=offset,
     )
 
 
+# Bulk routes must be registered before "/{job_id}/..." so that "bulk"
+# is not parsed as a job id.
+@router.post(
+    "/bulk/retry",
+    response_model=JobBulkResponse,
+)
+def bulk_retry_jobs(
+    request: JobBulkRetryRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
+    db: Session = Depends(get_db),
+):
+    repo = JobRepository(db)
+    idem = IdempotencyRepository(db)
+
+    if idempotency_key:
+        request_hash = request_fingerprint(request.model_dump(mode="json"))
+        replay = (
+            _replay_bulk(idem, BULK_RETRY_SCOPE, idempotency_key, request_hash, response)
+            or _reserve_bulk(idem, BULK_RETRY_SCOPE, idempotency_key, request_hash, response)
+        )
+        if replay:
+            return replay
+
+    try:
+        job_ids, skipped = repo.bulk_retry(
+            reset_retries=request.reset_retries,
+            **request.criteria(),
+        )
+
+        # One signal for the whole batch instead of one per job.
+        JobQueue().enqueue_many(job_ids)
+    except Exception:
+        if idempotency_key:
+            idem.release(BULK_RETRY_SCOPE, idempotency_key)
+        raise
+
+    logger.info(
+        "Jobs bulk retried",
+        extra={"affected": len(job_ids), "skipped": skipped},
+    )
+
+    result = JobBulkResponse(
+        affected=len(job_ids),
+        skipped=skipped,
+        job_ids=job_ids,
+    )
+
+    if idempotency_key:
+        idem.complete(BULK_RETRY_SCOPE, idempotency_key, result.model_dump(mode="json"))
+
+    return result
+
+
+@router.post(
+    "/bulk/cancel",
+    response_model=JobBulkResponse,
+)
+def bulk_cancel_jobs(
+    request: JobBulkRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Depends(idempotency_key_header),
+    db: Session = Depends(get_db),
+):
+    repo = JobRepository(db)
+    idem = IdempotencyRepository(db)
+
+    if idempotency_key:
+        request_hash = request_fingerprint(request.model_dump(mode="json"))
+        replay = (
+            _replay_bulk(idem, BULK_CANCEL_SCOPE, idempotency_key, request_hash, response)
+            or _reserve_bulk(idem, BULK_CANCEL_SCOPE, idempotency_key, request_hash, response)
+        )
+        if replay:
+            return replay
+
+    try:
+        job_ids = repo.bulk_cancel(**request.criteria())
+    except Exception:
+        if idempotency_key:
+            idem.release(BULK_CANCEL_SCOPE, idempotency_key)
+        raise
+
+    logger.info(
+        "Jobs bulk cancelled",
+        extra={"affected": len(job_ids)},
+    )
+
+    result = JobBulkResponse(
+        affected=len(job_ids),
+        job_ids=job_ids,
+    )
+
+    if idempotency_key:
+        idem.complete(BULK_CANCEL_SCOPE, idempotency_key, result.model_dump(mode="json"))
+
+    return result
+
+
 @router.post(
     "/{job_id}/retry",
     response_model=JobStatusResponse,
@@ -219,18 +494,49 @@ def retry_job(
         extra={"job_id": str(job.job_id)},
     )
 
-    return JobStatusResponse(
-        job_id=job.job_id,
-        job_type=job.job_type,
-        status=job.status,
-        retry_count=job.retry_count,
-        max_retries=job.max_retries,
-        error_message=job.error_message,
-        input_file_path=job.input_file_path,
-        output_file_path=job.output_file_path,
-        created_at=job.created_at,
-        updated_at=job.updated_at,
-        next_run_at=job.next_run_at,
-        finished_at=job.finished_at,
+    return to_status_response(job)
+
+
+@router.delete(
+    "/{job_id}",
+    response_model=JobStatusResponse,
+    responses={202: {"description": "Cancellation requested; the worker will stop the job"}},
+)
+def cancel_job(
+    job_id: UUID,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    repo = JobRepository(db)
+
+    try:
+        job = repo.cancel_job(job_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+
+    if job.status == JobStatus.PROCESSING:
+        # The worker polls this flag from inside the processor loop.
+        JobQueue().request_cancel(job.job_id)
+        response.status_code = status.HTTP_202_ACCEPTED
+
+    elif job.status == JobStatus.CANCELLED and job.shard_count:
+        # A sharded job takes its unfinished shards with it.
+        queue = JobQueue()
+        for shard_id in repo.cancel_shards(job.job_id):
+            queue.request_cancel(shard_id)
+
+    logger.info(
+        "Job cancellation handled",
+        extra={"job_id": str(job.job_id), "status": job.status.value},
     )
 
+    return to_status_response(job)
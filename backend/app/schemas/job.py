@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, model_validator
 from uuid import UUID
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -71,6 +71,69 @@ class JobCreateRequest(BaseModel):
         description="Maximum retry attempts before marking job as DEAD",
     )
 
+class JobPreviewRequest(BaseModel):
+    """
+    Request payload for a sampled preview of an input file, described as
+    for creating a job on it. No job is created.
+    """
+    job_type: JobType
+
+    input_file_path: str = Field(
+        ...,
+        description="Object key of the input file in the configured input bucket",
+        example="large.csv",
+    )
+
+    input_metadata: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="The job's metadata; for CSV, its dialect keys say how to parse the samples",
+        example={"delimiter": ";", "sniff": False},
+    )
+
+class PreviewRowEstimate(BaseModel):
+    """
+    Estimated records in the file: rows after the header for CSV, lines
+    for NDJSON, elements of a top-level array for JSON.
+    """
+
+    estimate: Optional[int] = Field(
+        default=None,
+        description="None when a compressed file's size ratio could not be measured",
+    )
+    low: Optional[int] = Field(default=None, description="Lower confidence bound; None for compressed files")
+    high: Optional[int] = Field(default=None, description="Upper confidence bound; None for compressed files")
+    confidence: float
+    exact: bool
+
+class JobPreviewResponse(BaseModel):
+    """
+    Approximate shape of an input file, from a few ranged reads of it.
+    Stats describe the sampled rows only.
+    """
+
+    job_type: JobType
+    input_file_path: str
+    format: str
+    size_bytes: int
+    compression: Optional[str] = None
+
+    samples: int = Field(..., description="Ranges the estimate is based on")
+    sampled_bytes: int
+    exact: bool = Field(..., description="The whole file was read: counts and stats are exact")
+    sampled_rows: int
+    rows: PreviewRowEstimate
+
+    columns: Dict[str, Dict[str, Any]] = Field(
+        ...,
+        description="Per column (CSV) or top-level field (JSON): inferred type and stats of the sampled rows",
+    )
+
+    header: Optional[List[str]] = None
+    dialect: Optional[Dict[str, Any]] = None
+    invalid_rows: Optional[int] = None
+    non_object_rows: Optional[int] = None
+    top_level: Optional[str] = None
+
 class JobCreateResponse(BaseModel):
     """
     Response returned after a job is successfully created.
@@ -79,6 +142,16 @@ class JobCreateResponse(BaseModel):
     job_id: UUID = Field(..., description="Unique identifier for the job")
     status: JobStatus = Field(..., description="Initial job status")
 
+class JobProgress(BaseModel):
+    """
+    Last progress snapshot persisted by the worker.
+    """
+
+    rows_processed: int = 0
+    bytes_processed: int = 0
+    total_bytes: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
 class JobStatusResponse(BaseModel):
     """
     Represents the current state of a job.
@@ -102,6 +175,32 @@ class JobStatusResponse(BaseModel):
     next_run_at: Optional[datetime]
     finished_at: Optional[datetime]
 
+    cancel_requested_at: Optional[datetime] = None
+
+    progress: Optional[JobProgress] = None
+    percent_complete: Optional[float] = Field(
+        default=None,
+        description="Share of input bytes processed (PROCESSING) or 100 (COMPLETED)",
+    )
+    estimated_finish_at: Optional[datetime] = Field(
+        default=None,
+        description="Extrapolated from the byte rate since the attempt started",
+    )
+
+    parent_job_id: Optional[UUID] = Field(
+        default=None,
+        description="Set on the shards of a sharded job",
+    )
+    shard_index: Optional[int] = None
+    shard_count: Optional[int] = Field(
+        default=None,
+        description="Number of shards a large input was split into",
+    )
+    shards_pending: Optional[int] = Field(
+        default=None,
+        description="Shards of the current attempt that have not completed",
+    )
+
 class JobListResponse(BaseModel):
     """
     Paginated list of jobs for a user.
@@ -111,4 +210,75 @@ class JobListResponse(BaseModel):
     total: int
     limit: int
     offset: int
-    
\ No newline at end of file
+
+class JobBulkFilter(BaseModel):
+    """
+    Set-based job selector. All provided fields are combined with AND.
+    """
+
+    job_type: Optional[JobType] = None
+
+    error_message: Optional[str] = Field(
+        default=None,
+        description="Case-insensitive SQL LIKE pattern on error_message",
+        example="%timeout%",
+    )
+
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    user_id: Optional[str] = Field(
+        default=None,
+        description="Tenant identifier, matched against context.user_id",
+    )
+
+class JobBulkRequest(BaseModel):
+    """
+    Selects jobs either by explicit ids, by filter, or both (intersection).
+    """
+
+    job_ids: Optional[List[UUID]] = Field(
+        default=None,
+        max_length=10000,
+        description="Explicit job ids to operate on",
+    )
+
+    filter: Optional[JobBulkFilter] = None
+
+    @model_validator(mode="after")
+    def require_selector(self):
+        has_filter = self.filter is not None and any(
+            v is not None for v in self.filter.model_dump().values()
+        )
+        if not self.job_ids and not has_filter:
+            raise ValueError("Provide job_ids or at least one filter field")
+        return self
+
+    def criteria(self) -> Dict[str, Any]:
+        f = self.filter or JobBulkFilter()
+        return {
+            "job_ids": self.job_ids,
+            "job_type": f.job_type,
+            "error_pattern": f.error_message,
+            "created_after": f.created_after,
+            "created_before": f.created_before,
+            "user_id": f.user_id,
+        }
+
+class JobBulkRetryRequest(JobBulkRequest):
+    reset_retries: bool = Field(
+        default=False,
+        description=(
+            "Reset retry_count to 0 before re-queueing. Without it, jobs that "
+            "already used all max_retries attempts are skipped."
+        ),
+    )
+
+class JobBulkResponse(BaseModel):
+    """
+    Result of a bulk operation.
+    """
+
+    affected: int = Field(..., description="Number of jobs whose status changed")
+    skipped: int = Field(default=0, description="Matched jobs left untouched (retries exhausted)")
+    job_ids: List[UUID]
@@ -0,0 +1,65 @@
+import sys
+import time
+from datetime import timedelta
+
+from app.db.session import SessionLocal
+from app.repositories.job_archive_repository import JobArchiveRepository, utc_now
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.schema_repository import SchemaRepository
+from app.core.settings import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+
+def run_maintenance():
+    """
+    One archival pass:
+      1. make sure next months' partitions exist (so inserts never hit DEFAULT)
+      2. move terminal jobs older than the retention window into jobs_archive,
+         creating the matching monthly archive partitions first
+      3. drop hot partitions that are now empty
+      4. purge expired idempotency keys and inferred schemas
+    """
+    db = SessionLocal()
+    retention = timedelta(days=settings.JOB_ARCHIVE_RETENTION_DAYS)
+
+    try:
+        repo = JobArchiveRepository(db)
+
+        repo.ensure_partitions("jobs", settings.JOB_PARTITION_MONTHS_AHEAD)
+
+        archived = repo.archive_terminal_jobs(retention, settings.JOB_ARCHIVE_BATCH_SIZE)
+        dropped = repo.drop_empty_partitions(before=utc_now() - retention)
+        purged = IdempotencyRepository(db).purge_expired()
+        purged_schemas = SchemaRepository(db).purge_expired()
+
+        logger.info(
+            "Archiver pass finished",
+            extra={
+                "archived": archived,
+                "dropped_partitions": dropped,
+                "purged_idempotency_keys": purged,
+                "purged_schemas": purged_schemas,
+            },
+        )
+
+    finally:
+        db.close()
+
+
+def run_archiver():
+    while True:
+        try:
+            run_maintenance()
+        except Exception:
+            logger.exception("Archiver pass failed")
+
+        time.sleep(settings.JOB_ARCHIVE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    if "--once" in sys.argv:
+        run_maintenance()
+    else:
+        run_archiver()
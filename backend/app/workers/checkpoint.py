@@ -0,0 +1,193 @@
+"""
+Checkpoints, so a retry resumes a long scan instead of starting over.
+
+A shardable CSV job that runs on one worker (not split, or too small to
+split) and is at least two JOB_CHECKPOINT_MB long is scanned in segments:
+record-aligned byte ranges planned like shards. Each segment runs the
+processor's ScanOperator as a shard would and keeps its `partial()`; the
+result is the processor's reduce over all of them. After every segment
+but the last, its partial and the files it refers to are uploaded under
+outputs/{job_id}/checkpoint/{i}/ and the job row's `checkpoint` records
+the plan and the segments done.
+
+A later attempt on the same input reuses that plan, downloads the
+partials of the segments done and scans only the rest. The same input is
+the same object version (its ETag), size and job metadata; a checkpoint
+that differs in any of them is discarded. The segments and
+their partials are the same either way, so a resumed job returns exactly
+what an uninterrupted one would.
+"""
+import hashlib
+import json
+import math
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.core.logging import setup_logging
+from app.core.settings import settings
+from app.core.storage import ObjectNotFound, StorageClient
+from app.models.job import Job
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.sharding import plan_shards
+from app.processors.execution import CancellationToken
+from app.workers import sharding
+
+logger = setup_logging()
+
+
+def plan(
+    job: Job,
+    processor,
+    input_path: Path,
+    token: CancellationToken,
+    etag: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    The checkpoint to run `job` from: the one an earlier attempt left for
+    this input (`etag` is the version downloaded), or a new plan with no
+    segments done. None to run the processor in one go.
+    """
+    metadata = job.input_metadata or {}
+    if not settings.JOB_CHECKPOINT_MB or metadata.get("file_format") != "CSV" or not processor.shardable(metadata):
+        return None
+
+    size = input_path.stat().st_size
+    identity = {"size": size, "etag": etag, "metadata": fingerprint(metadata)}
+    if job.checkpoint:
+        if all(job.checkpoint.get(k) == v for k, v in identity.items()):
+            return job.checkpoint
+        logger.info("Input changed since the checkpoint, scanning from the start", extra={"job_id": str(job.job_id)})
+
+    segment_bytes = settings.JOB_CHECKPOINT_MB * 1024 * 1024
+    if size < 2 * segment_bytes:
+        return None
+
+    # segments after the first need a header to put in front of them
+    dialect = CsvDialect.from_metadata(metadata, str(input_path))
+    if not dialect.has_header:
+        return None
+
+    segments = plan_shards(
+        str(input_path),
+        math.ceil(size / segment_bytes),
+        quotechar=dialect.quotechar,
+        delimiter=dialect.delimiter,
+        token=token,
+    )
+    if segments is None:
+        return None
+
+    return {
+        **identity,
+        "header": list(segments.header),
+        "ranges": [list(r) for r in segments.ranges],
+        "segments": [],
+    }
+
+
+def fingerprint(metadata: dict) -> str:
+    """Stable sha256 of a job's metadata, dialect included."""
+    canonical = json.dumps(metadata, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def run(
+    job: Job,
+    processor,
+    payload: dict,
+    checkpoint: dict,
+    storage: StorageClient,
+    save: Callable[[dict], None],
+) -> dict:
+    """Scan the segments not done yet, saving a checkpoint after each, and reduce them all."""
+    token = processor.cancel_token(payload)
+    progress = processor.progress(payload)
+    workspace = Path(payload["input_file_path"]).parent
+    header, ranges = checkpoint["header"], checkpoint["ranges"]
+    done = list(checkpoint["segments"])
+    # every segment reads the dialect sniffed from the whole input
+    metadata = scanner.resolve_metadata(payload["input_metadata"], payload["input_file_path"])
+
+    try:
+        partials, segment_dirs = sharding.fetch_partials([s["result"] for s in done], storage, workspace, token)
+    except ObjectNotFound:
+        logger.warning("Checkpoint objects missing, scanning from the start", extra={"job_id": str(job.job_id)})
+        done, partials, segment_dirs = [], [], []
+
+    if done:
+        logger.info(
+            "Resuming from checkpoint",
+            extra={"job_id": str(job.job_id), "segments_done": len(done), "segments": len(ranges)},
+        )
+
+    rows = sum(segment["rows"] for segment in done)
+    saving = True
+
+    for i in range(len(done), len(ranges)):
+        start, end = ranges[i]
+        segment_dir = workspace / "segments" / str(i)
+        segment_input = segment_dir / "input"
+        segment_input.parent.mkdir(parents=True, exist_ok=True)
+        with open(payload["input_file_path"], "rb") as src, open(segment_input, "wb") as dst:
+            sharding.copy_shard(src, dst, header, start, end)
+
+        # the header copied in front of a later segment is not input progress
+        progress.rebase(rows, start - (header[1] - header[0] if start > 0 else 0))
+        result = sharding.scan_shard(processor, {
+            **payload,
+            "input_metadata": metadata,
+            "input_file_path": str(segment_input),
+            "output_dir": str(segment_dir / "artifacts"),
+            "shard": {"index": i},
+        })
+        segment_input.unlink()
+        rows += result["rows"]
+
+        last = i == len(ranges) - 1
+        if saving and not last:
+            try:
+                done.append({"result": _upload(job, i, result, segment_dir, storage), "rows": result["rows"]})
+                save({**checkpoint, "segments": done})
+            except Exception:
+                # best-effort: a later attempt resumes from the last saved segment
+                logger.warning("Failed to save checkpoint", extra={"job_id": str(job.job_id)}, exc_info=True)
+                saving = False
+
+        # in the form a resumed attempt reads it back, so both reduce the same data
+        partials.append(json.loads(json.dumps(result["partial"])))
+        segment_dirs.append(segment_dir / "artifacts")
+
+    return processor.reduce(payload, partials, segment_dirs)
+
+
+def _upload(job: Job, index: int, result: dict, segment_dir: Path, storage: StorageClient) -> str:
+    """Upload a segment's result and artifacts the way a shard's are stored; returns the result key."""
+    prefix = f"outputs/{job.job_id}/checkpoint/{index}"
+    artifacts_dir = segment_dir / "artifacts"
+
+    artifacts = []
+    for path in sorted(artifacts_dir.iterdir() if artifacts_dir.is_dir() else []):
+        if not path.is_file():
+            continue
+        object_key = f"{prefix}/{path.name}"
+        storage.upload_file(
+            local_path=str(path),
+            bucket=settings.S3_OUTPUT_BUCKET,
+            object_key=object_key,
+            content_type="application/octet-stream",
+        )
+        artifacts.append({"name": path.name, "key": object_key, "size_bytes": path.stat().st_size})
+
+    result_path = segment_dir / "result.json"
+    with open(result_path, "w") as f:
+        json.dump({**result, "artifacts": artifacts}, f)
+
+    result_key = f"{prefix}/result.json"
+    storage.upload_file(
+        local_path=str(result_path),
+        bucket=settings.S3_OUTPUT_BUCKET,
+        object_key=result_key,
+        content_type="application/json",
+    )
+    return result_key
@@ -0,0 +1,267 @@
+"""
+Map-reduce execution of large inputs across workers.
+
+A job whose processor is shardable and whose input is at least
+JOB_SHARD_MIN_MB is split at record boundaries into byte ranges, and each
+range becomes a child job (a shard) that any worker can claim. A shard
+downloads only the header and its own range, runs the processor's
+ScanOperator over them and stores the operator's `partial()` as its
+result. The worker that completes the last shard runs the reduce: it
+downloads every shard's partial, plus the files it refers to, and the
+processor merges them into the parent's result.
+
+Shards read their ranges with If-Match on the ETag of the input the
+parent split, so an input replaced meanwhile fails them instead of
+mixing ranges of two objects.
+
+A compressed input is stored compressed, so ranges of the plain file
+cannot be fetched from it: the splitting worker uploads each shard's
+input, header included, compressed with `compression.fast_codec()`, and
+the shard downloads that instead.
+
+The parent stays PROCESSING, without a worker, until then. A shard that
+ends DEAD or CANCELLED fails the parent; retrying the parent splits the
+input again, and shards of earlier attempts no longer count.
+"""
+import json
+import math
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from app.core import compression
+from app.core.settings import settings
+from app.core.storage import StorageClient
+from app.models.job import Job
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.csv.sharding import plan_shards
+from app.processors.execution import CancellationToken
+from app.processors.registry import get_processor
+
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def split(
+    job: Job,
+    input_path: Path,
+    token: CancellationToken,
+    compressed: bool = False,
+    etag: Optional[str] = None,
+) -> list[Job]:
+    """
+    The shards to run instead of `job`, or [] to run it on this worker.
+    For a `compressed` input each shard names the object to upload its
+    input to (`upload_shard_inputs()`); otherwise it reads its range of
+    the input object, which must still have `etag`.
+    """
+    size = input_path.stat().st_size
+    if not settings.JOB_SHARD_MIN_MB or size < settings.JOB_SHARD_MIN_MB * 1024 * 1024:
+        return []
+
+    metadata = job.input_metadata or {}
+    if metadata.get("file_format") != "CSV" or not get_processor(job.job_type).shardable(metadata):
+        return []
+
+    # shards get the dialect as sniffed from the whole file; without a
+    # header there is nothing to put in front of a later shard
+    metadata = scanner.resolve_metadata(metadata, str(input_path))
+    dialect = CsvDialect.from_metadata(metadata)
+    if not dialect.has_header:
+        return []
+
+    count = min(settings.JOB_MAX_SHARDS, math.ceil(size / (settings.JOB_SHARD_MB * 1024 * 1024)))
+    plan = plan_shards(
+        str(input_path),
+        count,
+        quotechar=dialect.quotechar,
+        delimiter=dialect.delimiter,
+        token=token,
+    )
+    if plan is None:
+        return []
+
+    return [
+        Job(
+            job_type=job.job_type,
+            input_file_path=job.input_file_path,
+            input_metadata={
+                **metadata,
+                "shard": {
+                    "index": i,
+                    "count": len(plan.ranges),
+                    "range": [start, end],
+                    "header": list(plan.header),
+                    "attempt": job.attempt_key(),
+                    **({"input": _shard_input_key(job, i)} if compressed else {"etag": etag}),
+                },
+            },
+            context=job.context,
+            # the parent notifies once for the whole job
+            notifications={},
+            max_retries=job.max_retries,
+            parent_job_id=job.job_id,
+            shard_index=i,
+            shard_count=len(plan.ranges),
+        )
+        for i, (start, end) in enumerate(plan.ranges)
+    ]
+
+
+def _shard_input_key(job: Job, index: int) -> str:
+    return f"outputs/{job.job_id}/shards/{index}/input{compression.SUFFIXES[compression.fast_codec()]}"
+
+
+def upload_shard_inputs(
+    shards: list[Job],
+    input_path: Path,
+    storage: StorageClient,
+    workspace: Path,
+    token: CancellationToken,
+) -> None:
+    """Upload the input of every shard that has an `input` object, compressed."""
+    codec = compression.fast_codec()
+    for shard in shards:
+        spec = shard.input_metadata["shard"]
+        if "input" not in spec:
+            continue
+
+        token.check_now()
+        local_path = workspace / "shards" / str(spec["index"]) / "input"
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        start, end = spec["range"]
+        with open(input_path, "rb") as src, compression.open_compressed(
+            str(local_path), codec, compression.FAST_LEVELS[codec]
+        ) as dst:
+            copy_shard(src, dst, spec["header"], start, end)
+
+        storage.upload_file(
+            local_path=str(local_path),
+            bucket=settings.S3_OUTPUT_BUCKET,
+            object_key=spec["input"],
+            content_type="text/csv",
+            content_encoding=compression.CONTENT_ENCODINGS[codec],
+        )
+        local_path.unlink()
+
+
+def copy_shard(src: BinaryIO, dst: BinaryIO, header: list[int], start: int, end: int) -> None:
+    """Write a shard (or checkpoint segment) as a CSV of its own: the header record, unless it starts the file, then its range."""
+    ranges = [(start, end)] if start == 0 else [tuple(header), (start, end)]
+    for range_start, range_end in ranges:
+        src.seek(range_start)
+        remaining = range_end - range_start
+        while remaining > 0:
+            chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            dst.write(chunk)
+            remaining -= len(chunk)
+
+
+def shard_bytes(shard: Job) -> int:
+    start, end = shard.input_metadata["shard"]["range"]
+    return end - start
+
+
+def fetch_shard_input(job: Job, storage: StorageClient, workspace: Path, token: CancellationToken) -> Path:
+    """
+    Download the shard's byte range, behind a copy of the header unless it
+    starts the file; or the input the splitting worker uploaded for it.
+    """
+    input_path = workspace / "input"
+    shard = job.input_metadata["shard"]
+    start, end = shard["range"]
+
+    if "input" in shard:
+        storage.download_decompressed(
+            bucket=settings.S3_OUTPUT_BUCKET,
+            object_key=shard["input"],
+            local_path=str(input_path),
+            on_chunk=lambda _: token.check_now(),
+        )
+        return input_path
+
+    if start > 0:
+        header_start, header_end = shard["header"]
+        storage.download_range(
+            bucket=settings.S3_INPUT_BUCKET,
+            object_key=job.input_file_path,
+            local_path=str(input_path),
+            start=header_start,
+            end=header_end,
+            on_chunk=lambda _: token.check_now(),
+            if_match=shard.get("etag"),
+        )
+
+    storage.download_range(
+        bucket=settings.S3_INPUT_BUCKET,
+        object_key=job.input_file_path,
+        local_path=str(input_path),
+        start=start,
+        end=end,
+        append=start > 0,
+        on_chunk=lambda _: token.check_now(),
+        if_match=shard.get("etag"),
+    )
+
+    return input_path
+
+
+def scan_shard(processor, payload: dict) -> dict:
+    """Run the processor's operator over one shard; the result carries its partial state."""
+    token = processor.cancel_token(payload)
+    progress = processor.progress(payload)
+
+    operator = processor.operator(payload)
+    try:
+        dialect = CsvDialect.from_metadata(payload["input_metadata"])
+        rows = scanner.scan(payload["input_file_path"], dialect, [operator], token, progress)
+        partial = operator.partial()
+    finally:
+        operator.close()
+
+    return {
+        "shard": payload["shard"]["index"],
+        "rows": rows,
+        "partial": partial,
+    }
+
+
+def fetch_partials(
+    result_keys: list[str],
+    storage: StorageClient,
+    workspace: Path,
+    token: CancellationToken,
+) -> tuple[list[dict], list[Path]]:
+    """
+    The partial in each shard's (or checkpoint segment's) result.json, and
+    the local directory holding its artifacts.
+    """
+    partials, shard_dirs = [], []
+
+    for i, result_key in enumerate(result_keys):
+        shard_dir = workspace / "shards" / str(i)
+        result_path = shard_dir / "result.json"
+
+        storage.download_file(
+            bucket=settings.S3_OUTPUT_BUCKET,
+            object_key=result_key,
+            local_path=str(result_path),
+            on_chunk=lambda _: token.check_now(),
+        )
+        with open(result_path) as f:
+            result = json.load(f)
+
+        for artifact in result.get("artifacts", []):
+            storage.download_file(
+                bucket=settings.S3_OUTPUT_BUCKET,
+                object_key=artifact["key"],
+                local_path=str(shard_dir / artifact["name"]),
+                on_chunk=lambda _: token.check_now(),
+            )
+
+        partials.append(result["partial"])
+        shard_dirs.append(shard_dir)
+
+    return partials, shard_dirs
@@ -1,15 +1,26 @@
 import time
-import json
+import mimetypes
+import shutil
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Optional
 from app.db.session import SessionLocal
 from app.queues.job_queue import JobQueue
 from app.repositories.job_repository import JobRepository
+from app.repositories.schema_repository import SchemaRepository
 from app.core.notifications.dispatcher import NotificationDispatcher
 from app.core.notifications.events import JobEvent
+from app.core.enums.job_status import JobStatus
+from app.core import compression
+from app.core.job_factory import additional_inputs
 from app.core.storage import StorageClient
 from app.core.settings import settings
 from app.processors.registry import get_processor
+from app.processors.csv.schema import SchemaCache
+from app.processors.execution import CancellationToken, JobCancelled, ProgressReporter
+from app.processors.results import ResultWriter
 from app.core.logging import setup_logging
+from app.workers import checkpoint, sharding
 from prometheus_client import start_http_server, Counter, Histogram
 
 logger = setup_logging()
@@ -34,48 +45,295 @@ TMP_DIR = Path("/tmp/jobs")
 def prepare_workspace(job_id):
     path = TMP_DIR / str(job_id)
     path.mkdir(parents=True, exist_ok=True)
+    # drop files left behind by a failed earlier attempt
+    for name in ("artifacts", "compressed", "segments", "shards"):
+        shutil.rmtree(path / name, ignore_errors=True)
     return path
 
 
-def fetch_input(job, storage: StorageClient, workspace: Path) -> Path:
+def build_cancel_token(job, queue: JobQueue) -> CancellationToken:
+    processor = get_processor(job.job_type)
+    return CancellationToken(
+        deadline=time.monotonic() + processor.timeout_seconds,
+        is_cancelled=lambda: queue.is_cancel_requested(job.job_id),
+    )
+
+
+def build_progress_reporter(job, repo: JobRepository, input_path: Path) -> ProgressReporter:
+    def persist(snapshot: dict) -> None:
+        try:
+            repo.update_progress(job.job_id, snapshot)
+        except Exception:
+            # Progress is best-effort; never fail a job because of it.
+            repo.db.rollback()
+            logger.warning("Failed to persist job progress", extra={"job_id": str(job.job_id)})
+
+    return ProgressReporter(
+        total_bytes=input_path.stat().st_size,
+        sink=persist,
+        persist_interval=settings.JOB_PROGRESS_PERSIST_SECONDS,
+    )
+
+
+def build_checkpoint_sink(job, repo: JobRepository):
+    def save(state: dict) -> None:
+        try:
+            repo.save_checkpoint(job.job_id, state)
+        except Exception:
+            repo.db.rollback()
+            raise
+
+    return save
+
+
+def fetch_input(
+    job,
+    storage: StorageClient,
+    workspace: Path,
+    token: CancellationToken,
+    etag: Optional[str] = None,
+) -> tuple[Path, Optional[str]]:
+    """
+    The input as a plain local file, and the compression it was stored in
+    (None if none); with `etag`, only that version of it. Additional inputs
+    are downloaded next to it.
+    """
     input_path = workspace / "input"
 
-    storage.download_file(
+    codec = storage.download_decompressed(
         bucket=settings.S3_INPUT_BUCKET,
         object_key=job.input_file_path,
         local_path=str(input_path),
+        on_chunk=lambda _: token.check_now(),
+        if_match=etag,
     )
 
-    return input_path
+    object_keys = additional_inputs(job.job_type, job.input_metadata)
+    for name, local_path in additional_input_paths(job, workspace).items():
+        storage.download_decompressed(
+            bucket=settings.S3_INPUT_BUCKET,
+            object_key=object_keys[name],
+            local_path=str(local_path),
+            on_chunk=lambda _: token.check_now(),
+        )
 
+    return input_path, codec
+
+
+def additional_input_paths(job, workspace: Path) -> dict[str, Path]:
+    """Where fetch_input() puts the job's additional inputs, by name."""
+    return {
+        name: workspace / f"input-{name}"
+        for name in additional_inputs(job.job_type, job.input_metadata)
+    }
 
-def execute_processor(job, input_path: Path) -> dict:
-    processor = get_processor(job.job_type)
 
-    payload = {
+def build_schema_cache(job, repo: JobRepository, etag: Optional[str]) -> Optional[SchemaCache]:
+    """
+    Schemas inferred for the input object as it was downloaded, by its
+    ETag. Best-effort like progress: a failed lookup is a miss and a
+    failed save is only logged.
+    """
+    if not etag:
+        return None
+    schemas = SchemaRepository(repo.db)
+
+    def load(dialect: str) -> Optional[dict]:
+        try:
+            return schemas.get(etag, dialect)
+        except Exception:
+            repo.db.rollback()
+            logger.warning("Failed to read cached schema", extra={"job_id": str(job.job_id)})
+            return None
+
+    def save(dialect: str, schema: dict) -> None:
+        try:
+            schemas.save(etag, dialect, job.input_file_path, schema)
+        except Exception:
+            repo.db.rollback()
+            logger.warning("Failed to cache schema", extra={"job_id": str(job.job_id)})
+
+    return SchemaCache(load, save)
+
+
+def build_payload(
+    job,
+    input_path: Path,
+    token: CancellationToken,
+    progress: ProgressReporter,
+    writer: Optional[ResultWriter] = None,
+    open_artifact: Optional[Callable] = None,
+    schema_cache: Optional[SchemaCache] = None,
+) -> dict:
+    return {
         "job_id": str(job.job_id),
         "job_type": job.job_type,
         "input_file_path": str(input_path),
         "input_metadata": job.input_metadata or {},
+        "additional_inputs": {
+            name: str(path) for name, path in additional_input_paths(job, input_path.parent).items()
+        },
+        "cancel_token": token,
+        "progress": progress,
+        "result_writer": writer,
+        "open_artifact": open_artifact,
+        "schema_cache": schema_cache,
+        "output_dir": str(input_path.parent / "artifacts"),
     }
 
-    return processor.process(payload)
-
-
-def persist_output(job, result: dict, storage: StorageClient, workspace: Path) -> str:
-    output_path = workspace / "output.json"
-
-    with open(output_path, "w") as f:
-        json.dump(result, f, indent=2)
 
+def execute_processor(
+    job,
+    input_path: Path,
+    token: CancellationToken,
+    progress: ProgressReporter,
+    repo: JobRepository,
+    storage: StorageClient,
+    writer: ResultWriter,
+    open_artifact: Callable,
+    schema_cache: Optional[SchemaCache] = None,
+    etag: Optional[str] = None,
+) -> dict:
+    processor = get_processor(job.job_type)
+    payload = build_payload(job, input_path, token, progress, writer, open_artifact, schema_cache)
+
+    if job.parent_job_id:
+        payload["shard"] = job.input_metadata["shard"]
+        result = sharding.scan_shard(processor, payload)
+    else:
+        state = checkpoint.plan(job, processor, input_path, token, etag)
+        if state is None:
+            result = processor.process(payload)
+        else:
+            save = build_checkpoint_sink(job, repo)
+            result = checkpoint.run(job, processor, payload, state, storage, save)
+
+    progress.finish()
+    return result
+
+
+def split_job(
+    job,
+    repo: JobRepository,
+    queue: JobQueue,
+    storage: StorageClient,
+    input_path: Path,
+    codec: Optional[str],
+    token: CancellationToken,
+    etag: Optional[str] = None,
+) -> bool:
+    """Hand a large input to other workers as shards; True if the job was split."""
+    shards = sharding.split(job, input_path, token, compressed=codec is not None, etag=etag)
+    if not shards:
+        return False
+
+    sharding.upload_shard_inputs(shards, input_path, storage, input_path.parent, token)
+
+    shards = repo.create_shards(job.job_id, shards, total_bytes=input_path.stat().st_size)
+    queue.enqueue_many([shard.job_id for shard in shards])
+    logger.info("Job split into shards", extra={"job_id": str(job.job_id), "shards": len(shards)})
+    return True
+
+
+def upload_artifacts(job, storage: StorageClient, workspace: Path) -> list[dict]:
+    """
+    Upload files a processor wrote to its output_dir, compressed in the
+    job's `output_compression`; returns their descriptors.
+    """
+    artifacts_dir = workspace / "artifacts"
+    if not artifacts_dir.is_dir():
+        return []
+
+    # a shard's artifacts are only read back by the reduce
+    codec = None if job.parent_job_id else compression.output_codec(job.input_metadata)
+
+    artifacts = []
+    for path in sorted(p for p in artifacts_dir.iterdir() if p.is_file()):
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        artifact = {"name": path.name}
+
+        upload_path = path
+        if codec is not None:
+            upload_path = workspace / "compressed" / f"{path.name}{compression.SUFFIXES[codec]}"
+            upload_path.parent.mkdir(parents=True, exist_ok=True)
+            compression.compress_file(str(path), str(upload_path), codec)
+            artifact.update(content_encoding=compression.CONTENT_ENCODINGS[codec], plain_bytes=path.stat().st_size)
+
+        object_key = f"outputs/{job.job_id}/{upload_path.name}"
+        storage.upload_file(
+            local_path=str(upload_path),
+            bucket=settings.S3_OUTPUT_BUCKET,
+            object_key=object_key,
+            content_type=content_type,
+            content_encoding=artifact.get("content_encoding"),
+        )
+        artifacts.append({**artifact, "key": object_key, "size_bytes": upload_path.stat().st_size})
+
+    return artifacts
+
+
+def build_artifact_opener(job, storage: StorageClient, artifacts: list[dict]) -> Callable:
+    """
+    `open_artifact` for the payload: streams an artifact to the output
+    bucket, compressed in the job's `output_compression` unless the
+    processor says not to, and lists it in `artifacts`.
+    """
+    # a shard's artifacts are only read back by the reduce
+    codec = None if job.parent_job_id else compression.output_codec(job.input_metadata)
+
+    @contextmanager
+    def open_artifact(name: str, content_type: str, compress: bool = True):
+        stream_codec = codec if compress else None
+        artifact = {"name": name}
+        if stream_codec is not None:
+            name = f"{name}{compression.SUFFIXES[stream_codec]}"
+            artifact["content_encoding"] = compression.CONTENT_ENCODINGS[stream_codec]
+
+        object_key = f"outputs/{job.job_id}/{name}"
+        with storage.open_upload(
+            bucket=settings.S3_OUTPUT_BUCKET,
+            object_key=object_key,
+            content_type=content_type,
+            content_encoding=artifact.get("content_encoding"),
+        ) as stream:
+            if stream_codec is None:
+                yield stream
+            else:
+                writer = compression.open_compressed_stream(stream, stream_codec)
+                yield writer
+                writer.close()
+                artifact["plain_bytes"] = writer.size
+        artifacts.append({**artifact, "key": object_key, "size_bytes": stream.size})
+
+    return open_artifact
+
+
+def persist_output(
+    job,
+    produce: Callable[[ResultWriter, Callable], dict],
+    storage: StorageClient,
+    workspace: Path,
+) -> str:
+    """
+    Run `produce` with a ResultWriter and an artifact opener, streaming the
+    result it writes and then the fields it returns into result.json as it
+    goes; nothing is kept if it fails.
+    """
     output_key = f"outputs/{job.job_id}/result.json"
+    streamed: list[dict] = []
 
-    storage.upload_file(
-        local_path=str(output_path),
+    with storage.open_upload(
         bucket=settings.S3_OUTPUT_BUCKET,
         object_key=output_key,
         content_type="application/json",
-    )
+    ) as stream:
+        writer = ResultWriter(stream)
+        result = produce(writer, build_artifact_opener(job, storage, streamed))
+
+        artifacts = streamed + upload_artifacts(job, storage, workspace)
+        if artifacts:
+            result = {**result, "artifacts": artifacts}
+        writer.close(result)
 
     return output_key
 
@@ -84,34 +342,134 @@ def finalize_success(job, repo: JobRepository, output_key: str):
     job = repo.mark_completed(job.job_id, output_file_path=output_key)
     dispatcher.dispatch(job, JobEvent.SUCCESS)
     logger.info("Job completed", extra={"job_id": str(job.job_id)})
+    return job
 
 
 def finalize_failure(job, repo: JobRepository, error: Exception):
     logger.exception("Job failed", extra={"job_id": str(job.job_id)})
     job = repo.handle_failure(job.job_id, str(error))
     dispatcher.dispatch(job, JobEvent.FAILURE)
+    return job
 
 
-def handle_job(job, repo: JobRepository, storage: StorageClient):
-    logger.info("Handling job", extra={"job_id": str(job.job_id)})
+def finalize_cancelled(job, repo: JobRepository):
+    job = repo.mark_cancelled(job.job_id)
+    logger.info("Job cancelled", extra={"job_id": str(job.job_id)})
+    return job
+
+
+def settle_shard(shard, repo: JobRepository, storage: StorageClient, queue: JobQueue):
+    """Count a finished shard against its parent; the last one runs the reduce."""
+    if shard.status == JobStatus.COMPLETED:
+        rows = (shard.progress or {}).get("rows_processed", 0)
+        parent = repo.finish_shard(shard, rows=rows, bytes_processed=sharding.shard_bytes(shard))
+        if parent is not None:
+            reduce_job(parent, repo, storage, queue)
+
+    elif shard.status in {JobStatus.DEAD, JobStatus.CANCELLED}:
+        parent, running = repo.fail_shard(shard)
+        for job_id in running:
+            queue.request_cancel(job_id)
+        if parent is not None:
+            logger.warning("Sharded job failed", extra={"job_id": str(parent.job_id)})
+            dispatcher.dispatch(parent, JobEvent.FAILURE)
+
+
+def reduce_job(job, repo: JobRepository, storage: StorageClient, queue: JobQueue):
+    """Merge the shards of a sharded job into its result."""
+    logger.info("Reducing sharded job", extra={"job_id": str(job.job_id)})
     start_time = time.time()
+    token = build_cancel_token(job, queue)
+    processor = get_processor(job.job_type)
 
     try:
         workspace = prepare_workspace(job.job_id)
-        input_path = fetch_input(job, storage, workspace)
-        result = execute_processor(job, input_path)
-        output_key = persist_output(job, result, storage, workspace)
+        shards = repo.list_shards(job)
+        if len(shards) != job.shard_count:
+            raise ValueError(f"Only {len(shards)} of {job.shard_count} shards completed")
+
+        partials, shard_dirs = sharding.fetch_partials(
+            [shard.output_file_path for shard in shards], storage, workspace, token
+        )
+
+        input_path = workspace / "input"
+        if processor.reduce_reads_input(job.input_metadata):
+            input_path, _ = fetch_input(job, storage, workspace, token)
+
+        def produce(writer: ResultWriter, open_artifact: Callable) -> dict:
+            # the parent's progress already adds up its shards
+            payload = build_payload(job, input_path, token, ProgressReporter(), writer, open_artifact)
+            return {**processor.reduce(payload, partials, shard_dirs), "shards": len(shards)}
+
+        output_key = persist_output(job, produce, storage, workspace)
         finalize_success(job, repo, output_key)
         JOB_COUNT.labels(job_type=job.job_type, status="success").inc()
 
+    except JobCancelled:
+        finalize_cancelled(job, repo)
+        JOB_COUNT.labels(job_type=job.job_type, status="cancelled").inc()
+
     except Exception as e:
         finalize_failure(job, repo, e)
         JOB_COUNT.labels(job_type=job.job_type, status="error").inc()
 
     finally:
+        queue.clear_cancel(job.job_id)
+        duration = time.time() - start_time
+        JOB_DURATION.labels(job_type=job.job_type).observe(duration)
+
+
+def handle_job(job, repo: JobRepository, storage: StorageClient, queue: JobQueue):
+    logger.info("Handling job", extra={"job_id": str(job.job_id)})
+    start_time = time.time()
+    token = build_cancel_token(job, queue)
+    outcome = None
+    schema_cache = None
+    etag = None
+
+    try:
+        workspace = prepare_workspace(job.job_id)
+
+        if job.parent_job_id:
+            input_path = sharding.fetch_shard_input(job, storage, workspace, token)
+        else:
+            # the download must be the version cached schemas and checkpoints are keyed by
+            etag = storage.object_info(settings.S3_INPUT_BUCKET, job.input_file_path).etag
+            input_path, codec = fetch_input(job, storage, workspace, token, etag)
+            schema_cache = build_schema_cache(job, repo, etag)
+            if split_job(job, repo, queue, storage, input_path, codec, token, etag):
+                JOB_COUNT.labels(job_type=job.job_type, status="sharded").inc()
+                return
+
+        progress = build_progress_reporter(job, repo, input_path)
+        output_key = persist_output(
+            job,
+            lambda writer, open_artifact: execute_processor(
+                job, input_path, token, progress, repo, storage, writer, open_artifact, schema_cache, etag
+            ),
+            storage,
+            workspace,
+        )
+        outcome = finalize_success(job, repo, output_key)
+        JOB_COUNT.labels(job_type=job.job_type, status="success").inc()
+
+    except JobCancelled:
+        outcome = finalize_cancelled(job, repo)
+        JOB_COUNT.labels(job_type=job.job_type, status="cancelled").inc()
+
+    except Exception as e:
+        # Includes JobDeadlineExceeded: a timeout is retried like any failure.
+        outcome = finalize_failure(job, repo, e)
+        JOB_COUNT.labels(job_type=job.job_type, status="error").inc()
+
+    finally:
+        queue.clear_cancel(job.job_id)
         duration = time.time() - start_time
         JOB_DURATION.labels(job_type=job.job_type).observe(duration)
 
+    if outcome is not None and outcome.parent_job_id:
+        settle_shard(outcome, repo, storage, queue)
+
 
 def run_worker():
     start_http_server(8000)
@@ -134,7 +492,7 @@ def run_worker():
 
             logger.info(f"Processing job {job.job_id}")
 
-            handle_job(job, repo, storage)
+            handle_job(job, repo, storage, queue)
 
         except Exception:
             # This should NEVER happen often; If it does, your worker logic is broken.
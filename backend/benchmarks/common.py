@@ -0,0 +1,28 @@
+"""Helpers shared by the benchmark scripts."""
+
+import importlib.util
+import os
+import time
+from pathlib import Path
+
+GENERATOR = Path(__file__).resolve().parents[2] / "test-data-generator.py"
+
+
+def generate(rows: int, output_dir: str, kind: str = "csv") -> str:
+    """Write a test-data-generator.py file and return its path."""
+    spec = importlib.util.spec_from_file_location("test_data_generator", GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    path = os.path.join(output_dir, f"large_test.{kind}")
+    getattr(module, f"generate_{kind}")(path, rows)
+    return path
+
+
+def best_of(repeat: int, fn) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+csv_column_stats.py
+===================
+Compare the columnar (Arrow/NumPy) column statistics engine with the
+csv.reader row scanner.
+
+Usage (from backend/):
+    python -m benchmarks.csv_column_stats [--file PATH] [--rows N] [--profile] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      700000   (only used when generating; ~600 MB)
+    --repeat    3        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_column_stats --rows 100000
+    python -m benchmarks.csv_column_stats --file ../large_test.csv --profile
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+
+from app.core.settings import settings
+from app.processors.csv import columnar
+from app.processors.csv.column_stats import CsvColumnStatsProcessor
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+from benchmarks.common import best_of, generate
+
+
+def run(scan, path: str, profile: bool) -> dict:
+    summaries, profiles = scan(path, CsvDialect(), profile, 10, CancellationToken(), ProgressReporter())
+    return {
+        name: {**summary.to_dict(), **(profiles[name].to_dict() if name in profiles else {})}
+        for name, summary in summaries.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV column statistics")
+    parser.add_argument("--file", help="CSV to analyse (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--profile", action="store_true", help="Also build distinct/top-k sketches")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (default: 3)")
+    args = parser.parse_args()
+
+    if not columnar.HAS_ARROW:
+        parser.error("pyarrow and numpy are required for the columnar engine")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        print(f"\n{'='*55}")
+        print(f" CSV column stats benchmark — {size_mb:.1f} MB, block {settings.CSV_BATCH_MB} MB")
+        print(f"{'='*55}")
+
+        baseline, expected = best_of(
+            args.repeat, lambda: run(CsvColumnStatsProcessor.scan_rows, path, args.profile)
+        )
+        print(f"  {'row scanner':<16} {baseline:7.2f}s")
+
+        elapsed, result = best_of(
+            args.repeat, lambda: run(CsvColumnStatsProcessor.scan_columnar, path, args.profile)
+        )
+        counts_match = all(
+            result[name][key] == expected[name][key]
+            for name in expected
+            for key in ("count", "null_count", "non_numeric_count", "numeric_count")
+        )
+        status = "ok" if counts_match else "MISMATCH"
+        print(f"  {'columnar':<16} {elapsed:7.2f}s  {baseline / elapsed:5.1f}x  {status}")
+
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"  peak RSS {peak_mb:.0f} MB")
+        print(f"{'='*55}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+csv_groupby.py
+==============
+Compare CSV_GROUPBY's hash aggregation, in memory and forced to spill to
+disk, with the obvious group-by: csv.DictReader rows folded into a dict
+of running aggregates per key.
+
+Each variant computes count, sum(price), mean(price), min(price),
+max(price) and approx_distinct(status) (an exact set for the DictReader
+loop) grouped by --by. Reports throughput (MB/s and input rows/s), the
+number of groups and the peak RSS of a fresh process running each
+variant once.
+
+Usage (from backend/):
+    python -m benchmarks.csv_groupby [--file PATH] [--rows N] [--by COLUMN]
+                                     [--memory-mb N] [--spill-mb N] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      700000   (only used when generating; ~600 MB)
+    --by        name     (one group per few rows; `category` has a handful)
+    --memory-mb CSV_GROUPBY_MEMORY_MB (128)
+    --spill-mb  8        (budget of the spilling variant)
+    --repeat    1        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_groupby --rows 100000
+    python -m benchmarks.csv_groupby --file big.csv --by category
+"""
+
+import argparse
+import csv
+import math
+import multiprocessing
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.settings import settings
+from app.processors.csv import scanner
+from app.processors.csv.hash_aggregate import GroupTable, parse_aggregates
+from app.processors.csv.scanner import CsvDialect
+from benchmarks.common import best_of, generate
+
+AGGREGATES = ["count", "sum(price)", "mean(price)", "min(price)", "max(price)", "approx_distinct(status)"]
+
+
+def group_hash(path: str, by: str, memory_mb: int) -> int:
+    table = GroupTable(
+        [by], parse_aggregates(AGGREGATES, [by]),
+        memory_budget=memory_mb * 1024 * 1024,
+        work_dir=os.path.dirname(path),
+    )
+    dialect = CsvDialect()
+    try:
+        with open(path, newline="") as f:
+            reader = dialect.reader(f)
+            header, pending = scanner.read_header(reader, dialect)
+            table.start(header)
+            for batch in scanner.batches(reader, pending):
+                table.consume(batch)
+        groups = 0
+        for _, state in table.groups():
+            table.values(state)
+            groups += 1
+        return groups
+    finally:
+        table.close()
+
+
+def group_dict_reader(path: str, by: str, memory_mb: int) -> int:
+    # The obvious group-by: a dict of running aggregates per key.
+    groups: dict[str, list] = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            state = groups.get(row[by])
+            if state is None:
+                state = groups[row[by]] = [0, 0, 0.0, math.inf, -math.inf, set()]
+            state[0] += 1
+            try:
+                price = float(row["price"])
+            except ValueError:
+                price = math.nan
+            if math.isfinite(price):
+                state[1] += 1
+                state[2] += price
+                state[3] = min(state[3], price)
+                state[4] = max(state[4], price)
+            if row["status"]:
+                state[5].add(row["status"])
+
+    results = [
+        (count, total, total / n if n else None, low, high, len(distinct))
+        for count, n, total, low, high, distinct in groups.values()
+    ]
+    return len(results)
+
+
+def peak_rss(group, *args) -> int:
+    """Peak RSS in bytes of a fresh process running `group` once."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_measure, group, *args).result()
+
+
+def _measure(group, *args) -> int:
+    group(*args)
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV group-by aggregation")
+    parser.add_argument("--file", help="CSV file to aggregate (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--by", default="name", help="Column to group by (default: name)")
+    parser.add_argument("--memory-mb", type=int, default=settings.CSV_GROUPBY_MEMORY_MB,
+                        help=f"Group table memory (default: {settings.CSV_GROUPBY_MEMORY_MB})")
+    parser.add_argument("--spill-mb", type=int, default=8,
+                        help="Group table memory of the spilling variant (default: 8)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per variant (default: 1)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        with open(path, newline="") as f:
+            rows = sum(1 for _ in csv.reader(f)) - 1
+
+        print(f"\n{'='*66}")
+        print(f" CSV group-by benchmark — {size_mb:.1f} MB, {rows:,} rows by {args.by}")
+        print(f"{'='*66}")
+        print(f"  {'variant':<16} {'MB/s':>7} {'rows/s':>11} {'groups':>9} {'peak RSS':>10}")
+
+        variants = [
+            (f"hash ({args.memory_mb} MB)", group_hash, args.memory_mb),
+            (f"spilled ({args.spill_mb} MB)", group_hash, args.spill_mb),
+            ("DictReader", group_dict_reader, 0),
+        ]
+        # before any timed run: a spawned process starts with this one's peak RSS
+        peaks = [peak_rss(group, path, args.by, memory_mb) for _, group, memory_mb in variants]
+
+        for (label, group, memory_mb), peak in zip(variants, peaks):
+            elapsed, groups = best_of(args.repeat, lambda: group(path, args.by, memory_mb))
+            rss_mb = peak / 1024 / 1024
+            print(f"  {label:<16} {size_mb / elapsed:7.1f} {rows / elapsed:11,.0f} {groups:9,} {rss_mb:8.0f} MB")
+
+        print(f"{'='*66}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+csv_join.py
+===========
+Compare CSV_JOIN's hash join, in memory and forced to spill to disk,
+with the obvious join: the right file in a dict of csv.DictReader rows,
+the left file streamed through DictReader and DictWriter.
+
+The right file is derived from the left one: the id, name and price of
+every --every-th row, renamed so only the id clashes. Reports throughput
+(MB/s of both inputs and output rows/s) and the peak RSS of a fresh
+process running each variant once.
+
+Usage (from backend/):
+    python -m benchmarks.csv_join [--file PATH] [--rows N] [--every N] [--how inner|left]
+                                  [--memory-mb N] [--spill-mb N] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      700000   (only used when generating; ~600 MB)
+    --every     2        (right file: every 2nd left row)
+    --how       inner
+    --memory-mb CSV_JOIN_MEMORY_MB (128)
+    --spill-mb  8        (budget of the spilling variant)
+    --repeat    1        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_join --rows 100000
+    python -m benchmarks.csv_join --file big.csv --every 1 --how left
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.settings import settings
+from app.processors.csv.hash_join import HashJoiner
+from benchmarks.common import best_of, generate
+
+
+def derive_right(path: str, output: str, every: int) -> None:
+    with open(path, newline="") as f, open(output, "w", newline="") as out:
+        reader = csv.DictReader(f)
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(["id", "right_name", "right_price"])
+        for i, row in enumerate(reader):
+            if i % every == 0:
+                writer.writerow([row["id"], row["name"], row["price"]])
+
+
+def join_hash(left: str, right: str, output: str, how: str, memory_mb: int) -> int:
+    joiner = HashJoiner(
+        ["id"], ["id"], how,
+        memory_budget=memory_mb * 1024 * 1024,
+        work_dir=os.path.dirname(output),
+    )
+    with open(output, "w", newline="") as out:
+        return joiner.run(left, right, out).output_rows
+
+
+def join_dict_reader(left: str, right: str, output: str, how: str, memory_mb: int) -> int:
+    # The obvious join: every right row as a dict, left rows as dicts too.
+    with open(right, newline="") as f:
+        reader = csv.DictReader(f)
+        right_fields = [name for name in reader.fieldnames if name != "id"]
+        table: dict[str, list[dict]] = {}
+        for row in reader:
+            table.setdefault(row.pop("id"), []).append(row)
+
+    rows = 0
+    blank = dict.fromkeys(right_fields, "")
+    with open(left, newline="") as f, open(output, "w", newline="") as out:
+        reader = csv.DictReader(f)
+        writer = csv.DictWriter(out, reader.fieldnames + right_fields, lineterminator="\n")
+        writer.writeheader()
+        for row in reader:
+            matches = table.get(row["id"]) or ([blank] if how == "left" else [])
+            for match in matches:
+                writer.writerow({**row, **match})
+                rows += 1
+    return rows
+
+
+def peak_rss(join, *args) -> int:
+    """Peak RSS in bytes of a fresh process running `join` once."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_measure, join, *args).result()
+
+
+def _measure(join, *args) -> int:
+    join(*args)
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV hash joins")
+    parser.add_argument("--file", help="Left CSV (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--every", type=int, default=2,
+                        help="Take every N-th left row into the right file (default: 2)")
+    parser.add_argument("--how", default="inner", choices=("inner", "left"), help="Join type (default: inner)")
+    parser.add_argument("--memory-mb", type=int, default=settings.CSV_JOIN_MEMORY_MB,
+                        help=f"Hash table memory (default: {settings.CSV_JOIN_MEMORY_MB})")
+    parser.add_argument("--spill-mb", type=int, default=8,
+                        help="Hash table memory of the spilling variant (default: 8)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per variant (default: 1)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        left = args.file or generate(args.rows, tmp)
+        right = os.path.join(tmp, "right.csv")
+        derive_right(left, right, args.every)
+        size_mb = (os.path.getsize(left) + os.path.getsize(right)) / 1024 / 1024
+        output = os.path.join(tmp, "joined.csv")
+
+        print(f"\n{'='*66}")
+        print(
+            f" CSV join benchmark — {os.path.getsize(left) / 1024 / 1024:.1f} MB "
+            f"{args.how} join {os.path.getsize(right) / 1024 / 1024:.1f} MB on id"
+        )
+        print(f"{'='*66}")
+        print(f"  {'variant':<16} {'MB/s':>7} {'rows/s':>11} {'peak RSS':>10}")
+
+        variants = [
+            (f"hash ({args.memory_mb} MB)", join_hash, args.memory_mb),
+            (f"spilled ({args.spill_mb} MB)", join_hash, args.spill_mb),
+            ("DictReader", join_dict_reader, 0),
+        ]
+        # before any timed run: a spawned process starts with this one's peak RSS
+        peaks = [peak_rss(join, left, right, output, args.how, memory_mb) for _, join, memory_mb in variants]
+
+        for (label, join, memory_mb), peak in zip(variants, peaks):
+            join_args = (left, right, output, args.how, memory_mb)
+            elapsed, rows = best_of(args.repeat, lambda: join(*join_args))
+            rss_mb = peak / 1024 / 1024
+            print(f"  {label:<16} {size_mb / elapsed:7.1f} {rows / elapsed:11,.0f} {rss_mb:8.0f} MB")
+
+        print(f"{'='*66}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+csv_row_count.py
+================
+Compare the byte-level row counter with the csv.reader loop it replaced.
+
+Usage (from backend/):
+    python -m benchmarks.csv_row_count [--file PATH] [--rows N] [--workers N ...] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      700000   (only used when generating; ~600 MB)
+    --workers   1 and every available CPU
+    --repeat    3        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_row_count --rows 100000
+    python -m benchmarks.csv_row_count --file ../large_test.csv --workers 1 2 4
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+
+from app.processors.csv.parallel_count import count_rows
+from app.processors.execution import available_cpus
+from benchmarks.common import best_of, generate
+
+
+def count_with_reader(path: str) -> int:
+    # The CsvRowCountProcessor loop before the byte-level engine.
+    count = 0
+    with open(path, newline="") as f:
+        for _ in csv.reader(f):
+            count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV row counting")
+    parser.add_argument("--file", help="CSV to count (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="Process counts to try (default: 1 and all CPUs)")
+    parser.add_argument("--chunk-mb", type=int, default=16, help="Chunk size in MB (default: 16)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        workers = args.workers or sorted({1, available_cpus()})
+
+        print(f"\n{'='*55}")
+        print(f" CSV row count benchmark — {size_mb:.1f} MB")
+        print(f"{'='*55}")
+
+        baseline, expected = best_of(args.repeat, lambda: count_with_reader(path))
+        print(f"  {'csv.reader':<22} {baseline:7.2f}s  rows={expected:,}")
+
+        for n in workers:
+            elapsed, rows = best_of(
+                args.repeat,
+                lambda: count_rows(path, workers=n, chunk_size=args.chunk_mb * 1024 * 1024),
+            )
+            status = "ok" if rows == expected else f"MISMATCH ({rows})"
+            print(f"  {f'mmap, {n} worker(s)':<22} {elapsed:7.2f}s  {baseline / elapsed:5.1f}x  {status}")
+
+        print(f"{'='*55}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+csv_scan.py
+===========
+Compare reading rows with csv.DictReader against the shared scanner
+(csv.reader lists, values read by column index).
+
+Reports time per million rows for reading --columns from every row, and
+bytes allocated per million rows while one BATCH_ROWS batch of rows is
+held in memory, the way processors hold rows between reader and
+operators.
+
+Usage (from backend/):
+    python -m benchmarks.csv_scan [--file PATH] [--rows N] [--columns NAME ...] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      200000   (only used when generating; ~170 MB)
+    --columns   id price
+    --repeat    3        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_scan --rows 50000
+    python -m benchmarks.csv_scan --file ../large_test.csv --columns id status
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import tracemalloc
+from itertools import islice
+
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from benchmarks.common import best_of, generate
+
+
+def read_dicts(path: str, columns: list[str]) -> int:
+    # How the CSV processors read rows before the shared scanner.
+    rows = 0
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            tuple(row.get(name) for name in columns)
+            rows += 1
+    return rows
+
+
+def read_scanner(path: str, columns: list[str]) -> int:
+    rows = 0
+    with open(path, newline="") as f:
+        reader = CsvDialect().reader(f)
+        header, pending = scanner.read_header(reader, CsvDialect())
+        positions = scanner.column_positions(header)
+        values = scanner.values_getter([positions[name] for name in columns])
+        for batch in scanner.batches(reader, pending):
+            for row in batch:
+                values(row)
+            rows += len(batch)
+    return rows
+
+
+def batch_bytes(path: str, dicts: bool) -> tuple[int, int]:
+    """Bytes allocated for one batch of rows held at once, and the rows in it."""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f) if dicts else CsvDialect().reader(f)
+        if not dicts:
+            scanner.read_header(reader, CsvDialect())
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        batch = list(islice(reader, scanner.BATCH_ROWS))
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+    return allocated, len(batch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV row scanning")
+    parser.add_argument("--file", help="CSV to scan (default: generate one)")
+    parser.add_argument("--rows", type=int, default=200_000,
+                        help="Rows to generate when --file is not given (default: 200000)")
+    parser.add_argument("--columns", nargs="+", default=["id", "price"],
+                        help="Columns read from every row (default: id price)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        print(f"\n{'='*62}")
+        print(f" CSV scan benchmark — {size_mb:.1f} MB, columns {', '.join(args.columns)}")
+        print(f"{'='*62}")
+        print(f"  {'reader':<16} {'s/M rows':>9} {'MB/M rows':>10}")
+
+        baseline = None
+        for label, read, dicts in (
+            ("csv.DictReader", read_dicts, True),
+            ("scanner", read_scanner, False),
+        ):
+            elapsed, rows = best_of(args.repeat, lambda: read(path, args.columns))
+            allocated, batch_rows = batch_bytes(path, dicts)
+            per_million = elapsed / rows * 1_000_000
+            mb_per_million = allocated / max(batch_rows, 1) * 1_000_000 / 1024 / 1024
+            speedup = f"{baseline / per_million:5.1f}x" if baseline else ""
+            baseline = baseline or per_million
+            print(f"  {label:<16} {per_million:9.2f} {mb_per_million:10.0f}  {speedup}")
+
+        print(f"{'='*62}")
+
+
+if __name__ == "__main__":
+    main()
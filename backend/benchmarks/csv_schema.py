@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+csv_schema.py
+=============
+Time CSV_INFER_SCHEMA on a sample and on every row, then compare the
+columnar CSV_COLUMN_STATS scan without a schema and with the full schema
+cached for its input.
+
+With a schema the numeric columns skip the regex that tells numbers from
+other text, which otherwise runs on every cell of a column as soon as it
+has a blank. --blank-every blanks the numeric columns of every Nth row of
+a copy of the file to show that case.
+
+Usage (from backend/):
+    python -m benchmarks.csv_schema [--file PATH] [--rows N] [--blank-every N] [--repeat N]
+
+Defaults:
+    --file          generate one with test-data-generator.py into a temp dir
+    --rows          700000   (only used when generating; ~600 MB)
+    --blank-every   10       (0 keeps the file as it is)
+    --repeat        3        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_schema --rows 100000
+    python -m benchmarks.csv_schema --file big.csv --blank-every 0
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+
+from app.core.settings import settings
+from app.processors.csv import columnar
+from app.processors.csv.column_stats import CsvColumnStatsProcessor
+from app.processors.csv.infer_schema import CsvInferSchemaProcessor
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+from benchmarks.common import best_of, generate
+
+NUMERIC = ("int64", "float64")
+
+
+def infer(path: str, limit) -> dict:
+    return CsvInferSchemaProcessor.infer(path, CsvDialect(), limit, CancellationToken(), ProgressReporter())
+
+
+def stats(path: str, schema) -> dict:
+    summaries, _ = CsvColumnStatsProcessor.scan_columnar(
+        path, CsvDialect(), False, 10, CancellationToken(), ProgressReporter(), schema
+    )
+    return {name: summary.to_dict() for name, summary in summaries.items()}
+
+
+def blank_numeric(path: str, output: str, every: int) -> None:
+    # the numeric columns of the original, blank in every Nth row
+    types = infer(path, None)["types"]
+    positions = [i for i, t in enumerate(types) if t in NUMERIC]
+    with open(path, newline="") as f, open(output, "w", newline="") as out:
+        reader, writer = csv.reader(f), csv.writer(out, lineterminator="\n")
+        writer.writerow(next(reader))
+        for n, row in enumerate(reader):
+            if n % every == 0:
+                for i in positions:
+                    if i < len(row):
+                        row[i] = ""
+            writer.writerow(row)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV schema inference and typed column stats")
+    parser.add_argument("--file", help="CSV to analyse (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--blank-every", type=int, default=10,
+                        help="Blank the numeric columns of every Nth row (default: 10; 0 = never)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (default: 3)")
+    args = parser.parse_args()
+
+    if not columnar.HAS_ARROW:
+        parser.error("pyarrow and numpy are required for schema inference")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        if args.blank_every:
+            blanked = os.path.join(tmp, "blanked.csv")
+            blank_numeric(path, blanked, args.blank_every)
+            path = blanked
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        print(f"\n{'='*60}")
+        print(f" CSV schema benchmark — {size_mb:.1f} MB, block {settings.CSV_BATCH_MB} MB")
+        print(f"{'='*60}")
+
+        elapsed, _ = best_of(args.repeat, lambda: infer(path, settings.SCHEMA_SAMPLE_ROWS))
+        print(f"  {'infer, sample':<24} {elapsed:7.2f}s  ({settings.SCHEMA_SAMPLE_ROWS:,} rows)")
+        elapsed, schema = best_of(args.repeat, lambda: infer(path, None))
+        print(f"  {'infer, full':<24} {elapsed:7.2f}s  {size_mb / elapsed:7.1f} MB/s")
+        print(f"    {', '.join(f'{n}: {t}' for n, t in zip(schema['header'], schema['types']))}")
+
+        baseline, expected = best_of(args.repeat, lambda: stats(path, None))
+        print(f"  {'column stats':<24} {baseline:7.2f}s")
+        elapsed, result = best_of(args.repeat, lambda: stats(path, schema))
+        status = "ok" if result == expected else "MISMATCH"
+        print(f"  {'column stats, schema':<24} {elapsed:7.2f}s  {baseline / elapsed:5.2f}x  {status}")
+        print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+csv_sort.py
+===========
+Compare CSV_SORT's external merge sort with reading every row into a
+list, sorting it and writing it out.
+
+Reports throughput (CSV MB/s and rows/s) and the peak RSS of a fresh
+process running each variant once, its run-generation processes
+included. The in-memory sort needs several times the file's size in
+RAM; skip it with --external-only on inputs larger than memory.
+
+Usage (from backend/):
+    python -m benchmarks.csv_sort [--file PATH] [--rows N] [--key COLUMN] [--type string|number]
+                                  [--memory-mb N] [--workers N] [--repeat N] [--external-only]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      700000   (only used when generating; ~600 MB)
+    --key       price
+    --type      number
+    --memory-mb CSV_SORT_MEMORY_MB (128)
+    --workers   CSV_SORT_WORKERS, else one per CPU
+    --repeat    1        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_sort --rows 100000
+    python -m benchmarks.csv_sort --file big.csv --key category --type string --external-only
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.settings import settings
+from app.processors.csv.external_sort import ExternalSorter, SortKey, key_function
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import available_cpus
+from benchmarks.common import best_of, generate
+
+
+def sort_external(path: str, output: str, key: SortKey, memory_mb: int, workers: int) -> int:
+    sorter = ExternalSorter(
+        [key],
+        memory_budget=memory_mb * 1024 * 1024,
+        workers=workers,
+        work_dir=os.path.dirname(output),
+    )
+    with open(output, "w", newline="") as out:
+        return sorter.run(path, out).rows
+
+
+def sort_in_memory(path: str, output: str, key: SortKey, memory_mb: int, workers: int) -> int:
+    # The obvious sort: every row in one list.
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [row for row in reader if row]
+    rows.sort(key=key_function([key], header))
+
+    with open(output, "w", newline="") as out:
+        writer = CsvDialect().writer(out)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def peak_rss(sort, *args) -> int:
+    """Peak RSS in bytes of a fresh process running `sort` once, or of its largest child."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_measure, sort, *args).result()
+
+
+def _measure(sort, *args) -> int:
+    sort(*args)
+    # kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark external CSV sorting")
+    parser.add_argument("--file", help="CSV to sort (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--key", default="price", help="Column to sort by (default: price)")
+    parser.add_argument("--type", default="number", choices=("string", "number"),
+                        help="Key comparison (default: number)")
+    parser.add_argument("--memory-mb", type=int, default=settings.CSV_SORT_MEMORY_MB,
+                        help=f"Run-generation memory (default: {settings.CSV_SORT_MEMORY_MB})")
+    parser.add_argument("--workers", type=int, default=settings.CSV_SORT_WORKERS or available_cpus(),
+                        help="Run-generation processes (default: one per CPU)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per variant (default: 1)")
+    parser.add_argument("--external-only", action="store_true", help="Skip the in-memory sort")
+    args = parser.parse_args()
+
+    key = SortKey(args.key, args.type)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        output = os.path.join(tmp, "sorted.csv")
+
+        print(f"\n{'='*66}")
+        print(
+            f" CSV sort benchmark — {size_mb:.1f} MB by {args.key} ({args.type}), "
+            f"{args.memory_mb} MB, {args.workers} workers"
+        )
+        print(f"{'='*66}")
+        print(f"  {'variant':<12} {'MB/s':>7} {'rows/s':>11} {'peak RSS':>10}")
+
+        variants = [("external", sort_external)]
+        if not args.external_only:
+            variants.append(("in memory", sort_in_memory))
+
+        for label, sort in variants:
+            sort_args = (path, output, key, args.memory_mb, args.workers)
+            elapsed, rows = best_of(args.repeat, lambda: sort(*sort_args))
+            rss_mb = peak_rss(sort, *sort_args) / 1024 / 1024
+            print(f"  {label:<12} {size_mb / elapsed:7.1f} {rows / elapsed:11,.0f} {rss_mb:8.0f} MB")
+
+        print(f"{'='*66}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+csv_to_parquet.py
+=================
+Compare CSV_TO_PARQUET's chunked conversion with reading the whole CSV
+into one Arrow table and writing it with pq.write_table.
+
+Reports throughput (CSV MB/s and rows/s), Parquet size as a share of the
+CSV, and the peak RSS of a fresh process running each variant once.
+
+Usage (from backend/):
+    python -m benchmarks.csv_to_parquet [--file PATH] [--rows N] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      700000   (only used when generating; ~600 MB)
+    --repeat    3        (best run is reported)
+
+Examples:
+    python -m benchmarks.csv_to_parquet --rows 100000
+    python -m benchmarks.csv_to_parquet --file ../large_test.csv --repeat 1
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.settings import settings
+from app.processors.csv import columnar
+from app.processors.csv.to_parquet import OUTPUT_NAME, CsvToParquetProcessor
+from benchmarks.common import best_of, generate
+
+
+def convert_chunked(path: str, output_dir: str) -> tuple[int, str]:
+    result = CsvToParquetProcessor().process({
+        "input_file_path": path,
+        "input_metadata": {},
+        "output_dir": output_dir,
+    })
+    return result["rows"], os.path.join(output_dir, OUTPUT_NAME)
+
+
+def convert_whole(path: str, output_dir: str) -> tuple[int, str]:
+    # The obvious conversion: the whole file in memory, types inferred by Arrow.
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+
+    table = pv.read_csv(path)
+    output = os.path.join(output_dir, "whole.parquet")
+    pq.write_table(table, output, compression=settings.PARQUET_COMPRESSION)
+    return table.num_rows, output
+
+
+def peak_rss(convert, path: str, output_dir: str) -> int:
+    """Peak RSS in bytes of a fresh process running `convert` once."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_measure, convert, path, output_dir).result()
+
+
+def _measure(convert, path: str, output_dir: str) -> int:
+    convert(path, output_dir)
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV to Parquet conversion")
+    parser.add_argument("--file", help="CSV to convert (default: generate one)")
+    parser.add_argument("--rows", type=int, default=700_000,
+                        help="Rows to generate when --file is not given (default: 700000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (default: 3)")
+    args = parser.parse_args()
+
+    if not columnar.HAS_ARROW:
+        parser.error("pyarrow and numpy are required for the conversion")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp)
+        size = os.path.getsize(path)
+        size_mb = size / 1024 / 1024
+
+        print(f"\n{'='*66}")
+        print(
+            f" CSV to Parquet benchmark — {size_mb:.1f} MB, "
+            f"row groups {settings.PARQUET_ROW_GROUP_MB} MB, {settings.PARQUET_COMPRESSION}"
+        )
+        print(f"{'='*66}")
+        print(f"  {'variant':<14} {'MB/s':>7} {'rows/s':>11} {'size':>7} {'peak RSS':>10}")
+
+        for label, convert in (
+            ("chunked", convert_chunked),
+            ("whole file", convert_whole),
+        ):
+            elapsed, (rows, output) = best_of(args.repeat, lambda: convert(path, tmp))
+            ratio = os.path.getsize(output) / size
+            rss_mb = peak_rss(convert, path, tmp) / 1024 / 1024
+            print(
+                f"  {label:<14} {size_mb / elapsed:7.1f} {rows / elapsed:11,.0f} "
+                f"{ratio:6.1%} {rss_mb:8.0f} MB"
+            )
+
+        print(f"{'='*66}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+ndjson.py
+=========
+Compare line-partitioned NDJSON canonicalization with a plain json.loads
+loop over the file.
+
+Usage (from backend/):
+    python -m benchmarks.ndjson [--file PATH] [--rows N] [--workers N ...] [--repeat N]
+
+Defaults:
+    --file      generate one with test-data-generator.py into a temp dir
+    --rows      300000   (only used when generating; ~100 MB)
+    --workers   1 and every available CPU
+    --repeat    3        (best run is reported)
+
+Examples:
+    python -m benchmarks.ndjson --rows 100000
+    python -m benchmarks.ndjson --file ../large_test.ndjson --workers 1 2 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+from app.processors.execution import available_cpus
+from app.processors.json.ndjson import process_lines
+from benchmarks.common import best_of, generate
+
+
+def canonicalize_serially(path: str, output: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f, open(output, "wb") as out:
+        for line in f:
+            if line.strip():
+                data = (json.dumps(json.loads(line), sort_keys=True, separators=(",", ":")) + "\n").encode()
+                out.write(data)
+                digest.update(data)
+    return digest.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark NDJSON canonicalization")
+    parser.add_argument("--file", help="NDJSON file to process (default: generate one)")
+    parser.add_argument("--rows", type=int, default=300_000,
+                        help="Records to generate when --file is not given (default: 300000)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="Process counts to try (default: 1 and all CPUs)")
+    parser.add_argument("--chunk-mb", type=int, default=8, help="Chunk size in MB (default: 8)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or generate(args.rows, tmp, kind="ndjson")
+        output = os.path.join(tmp, "canonical.ndjson")
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        workers = args.workers or sorted({1, available_cpus()})
+
+        print(f"\n{'='*55}")
+        print(f" NDJSON canonicalize benchmark — {size_mb:.1f} MB")
+        print(f"{'='*55}")
+
+        baseline, expected = best_of(args.repeat, lambda: canonicalize_serially(path, output))
+        print(f"  {'json.loads loop':<22} {baseline:7.2f}s")
+
+        def run(n: int) -> str:
+            with open(output, "wb") as out:
+                return process_lines(
+                    path, "canonicalize", out, workers=n, chunk_size=args.chunk_mb * 1024 * 1024
+                ).sha256
+
+        for n in workers:
+            elapsed, sha256 = best_of(args.repeat, lambda: run(n))
+            status = "ok" if sha256 == expected else "MISMATCH"
+            print(f"  {f'chunked, {n} worker(s)':<22} {elapsed:7.2f}s  {baseline / elapsed:5.1f}x  {status}")
+
+        print(f"{'='*55}")
+
+
+if __name__ == "__main__":
+    main()
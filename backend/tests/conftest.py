@@ -0,0 +1,4 @@
+import os
+
+# the Mailtrap client needs an inbox id at import time, in sandbox mode
+os.environ.setdefault("MAILTRAP_INBOX_ID", "1")
@@ -0,0 +1,103 @@
+"""In-memory stand-ins for the services the worker and the API talk to."""
+import hashlib
+import io
+import os
+from types import SimpleNamespace
+from typing import Optional
+
+from app.core import compression
+from app.core.storage import ObjectInfo, ObjectNotFound, StorageError, UploadStream
+
+
+class FakeStorage:
+    """The parts of StorageClient the code under test uses, over a dict of objects."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+
+    def put(self, bucket: str, object_key: str, data: bytes) -> str:
+        self.objects[(bucket, object_key)] = data
+        return self.etag(bucket, object_key)
+
+    def etag(self, bucket: str, object_key: str) -> str:
+        return f'"{hashlib.md5(self._get(bucket, object_key)).hexdigest()}"'
+
+    def _get(self, bucket: str, object_key: str, if_match: Optional[str] = None) -> bytes:
+        if (bucket, object_key) not in self.objects:
+            raise ObjectNotFound(f"Object '{object_key}' not found in bucket '{bucket}'")
+        if if_match is not None and if_match != self.etag(bucket, object_key):
+            raise StorageError(f"Object '{object_key}' changed (precondition failed)")
+        return self.objects[(bucket, object_key)]
+
+    def object_exists(self, bucket, object_key) -> bool:
+        return (bucket, object_key) in self.objects
+
+    def object_info(self, bucket, object_key) -> ObjectInfo:
+        return ObjectInfo(len(self._get(bucket, object_key)), self.etag(bucket, object_key))
+
+    def read_range(self, bucket, object_key, start, end) -> bytes:
+        return self._get(bucket, object_key)[start:end]
+
+    def download_file(self, bucket, object_key, local_path, on_chunk=None) -> None:
+        self._write(local_path, self._get(bucket, object_key))
+
+    def download_range(
+        self, bucket, object_key, local_path, start, end, append=False, on_chunk=None, if_match=None
+    ) -> None:
+        self._write(local_path, self._get(bucket, object_key, if_match)[start:end], append)
+
+    def download_decompressed(self, bucket, object_key, local_path, on_chunk=None, if_match=None):
+        data = self._get(bucket, object_key, if_match)
+        codec = compression.detect(object_key, data[:compression.MAGIC_BYTES])
+        if codec is not None:
+            data = compression.open_decompressed(io.BytesIO(data), codec).read()
+        self._write(local_path, data)
+        return codec
+
+    def open_upload(self, bucket, object_key, content_type=None, content_encoding=None) -> UploadStream:
+        # the real stream, over a client that only takes single PUTs (objects under UPLOAD_PART_SIZE)
+        return UploadStream(_FakeClient(self), bucket, object_key, {})
+
+    def upload_file(self, local_path, bucket, object_key, content_type=None, content_encoding=None) -> None:
+        with open(local_path, "rb") as f:
+            self.objects[(bucket, object_key)] = f.read()
+
+    @staticmethod
+    def _write(local_path: str, data: bytes, append: bool = False) -> None:
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "ab" if append else "wb") as f:
+            f.write(data)
+
+
+class FakeIdempotency:
+    """IdempotencyRepository over a dict of (scope, key) → record; keys never expire."""
+
+    def __init__(self):
+        self.records: dict[tuple[str, str], SimpleNamespace] = {}
+
+    def __call__(self, db) -> "FakeIdempotency":
+        # stands in for the class: every request shares this store
+        return self
+
+    def get(self, scope, key):
+        return self.records.get((scope, key))
+
+    def reserve(self, scope, key, request_hash, *, job_id=None, response=None) -> bool:
+        if (scope, key) in self.records:
+            return False
+        self.records[(scope, key)] = SimpleNamespace(request_hash=request_hash, job_id=job_id, response=response)
+        return True
+
+    def complete(self, scope, key, response) -> None:
+        self.records[(scope, key)].response = response
+
+    def release(self, scope, key) -> None:
+        del self.records[(scope, key)]
+
+
+class _FakeClient:
+    def __init__(self, storage: FakeStorage):
+        self.storage = storage
+
+    def put_object(self, Bucket, Key, Body, **extra_args) -> None:
+        self.storage.objects[(Bucket, Key)] = Body
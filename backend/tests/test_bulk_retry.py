@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.enums.job_type import JobType
+from app.repositories.job_repository import JobRepository
+
+
+class RecordingSession:
+    """Records the statements a repository runs, answering each with `row`."""
+
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return self
+
+    def one(self):
+        return self.row
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_requeued_and_skipped_come_from_one_statement():
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    db = RecordingSession((ids, 3))
+
+    assert JobRepository(db).bulk_retry(job_type=JobType.CSV_SORT) == (ids, 3)
+
+    [sql] = db.statements
+    assert db.commits == 1
+    # the matching rows are locked once; the UPDATE and the skipped count both read them
+    assert sql.count("FOR UPDATE") == 1
+    assert "UPDATE jobs SET" in sql and "FROM matched WHERE" in sql
+    assert "jobs.retry_count < jobs.max_retries AS within_budget" in sql
+    assert "count(*)" in sql and "NOT matched.within_budget" in sql
+
+
+@pytest.mark.parametrize("reset_retries", [False, True])
+def test_nothing_requeued(reset_retries):
+    db = RecordingSession((None, 0))
+    assert JobRepository(db).bulk_retry(reset_retries=reset_retries, job_ids=[uuid.uuid4()]) == ([], 0)
+    # a reset zeroes the count and requeues every match, whatever its budget
+    assert ("retry_count=jobs.retry_count" in db.statements[0]) is not reset_retries
+    assert ("true AS within_budget" in db.statements[0]) is reset_retries
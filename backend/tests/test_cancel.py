@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.enums.job_status import JobStatus
+from app.core.enums.job_type import JobType
+from app.models.job import Job
+
+
+def make_job(status: JobStatus, **fields) -> Job:
+    return Job(job_type=JobType.CSV_ROW_COUNT, input_file_path="data.csv", input_metadata={}, status=status, **fields)
+
+
+@pytest.mark.parametrize("status", [
+    JobStatus.CREATED, JobStatus.QUEUED, JobStatus.RETRYING, JobStatus.FAILED, JobStatus.DEAD,
+])
+def test_jobs_without_a_worker_cancel_at_once(status):
+    job = make_job(status)
+    assert job.can_cancel_immediately()
+
+    job.transition(JobStatus.CANCELLED)
+    assert job.status == JobStatus.CANCELLED
+    assert job.finished_at is not None
+
+
+@pytest.mark.parametrize("status", [JobStatus.COMPLETED, JobStatus.CANCELLED])
+def test_finished_jobs_cannot_be_cancelled(status):
+    assert not make_job(status).can_cancel_immediately()
+
+
+def test_processing_job_waits_for_its_worker_unless_it_only_waits_for_shards():
+    assert not make_job(JobStatus.PROCESSING).can_cancel_immediately()
+    assert make_job(JobStatus.PROCESSING, shard_count=4, shards_pending=2).can_cancel_immediately()
@@ -0,0 +1,98 @@
+import pytest
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.models.job import Job
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.registry import get_processor
+from app.workers import checkpoint
+from app.workers.worker import build_payload
+from tests.fakes import FakeStorage
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_CHECKPOINT_MB", 1)
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    # about 3.5 MB: three or four segments of 1 MB
+    path = tmp_path / "input"
+    with open(path, "w") as f:
+        f.write("id,price,name\n")
+        for i in range(120_000):
+            f.write(f"{i},{i % 997 * 1.5},name-{i % 31}\n")
+    return path
+
+
+def make_job(input_path, **metadata) -> Job:
+    return Job(
+        job_type=JobType.CSV_COLUMN_STATS,
+        input_file_path="data.csv",
+        input_metadata=build_input_metadata(JobType.CSV_COLUMN_STATS, "data.csv", metadata),
+    )
+
+
+def run(job, input_path, storage, saved) -> dict:
+    payload = build_payload(job, input_path, CancellationToken(), ProgressReporter())
+    processor = get_processor(job.job_type)
+    state = checkpoint.plan(job, processor, input_path, CancellationToken(), '"v1"')
+    return checkpoint.run(job, processor, payload, state, storage, saved.append)
+
+
+def test_plan_records_the_input_identity(input_path):
+    job = make_job(input_path)
+    state = checkpoint.plan(job, get_processor(job.job_type), input_path, CancellationToken(), '"v1"')
+
+    assert len(state["ranges"]) >= 3
+    assert state["etag"] == '"v1"'
+    assert state["size"] == input_path.stat().st_size
+    assert state["metadata"] == checkpoint.fingerprint(job.input_metadata)
+
+
+def test_resumed_scan_matches_an_uninterrupted_one(input_path):
+    job = make_job(input_path)
+    expected = get_processor(job.job_type).process(
+        build_payload(job, input_path, CancellationToken(), ProgressReporter())
+    )
+
+    storage, saved = FakeStorage(), []
+    first = run(job, input_path, storage, saved)
+    assert len(saved) == len(saved[-1]["ranges"]) - 1
+
+    # a retry after the first segment
+    job.checkpoint = saved[0]
+    resumed = run(job, input_path, storage, [])
+
+    # merging segments only reorders the floating-point sums
+    for name, stats in expected["columns"].items():
+        assert first["columns"][name] == pytest.approx(stats)
+    assert resumed["columns"] == first["columns"]
+
+
+@pytest.mark.parametrize("change", ["etag", "size", "metadata"])
+def test_checkpoint_of_another_input_is_discarded(input_path, change):
+    job = make_job(input_path)
+    processor = get_processor(job.job_type)
+    state = checkpoint.plan(job, processor, input_path, CancellationToken(), '"v1"')
+    job.checkpoint = {**state, "segments": [{"result": "outputs/x/checkpoint/0/result.json", "rows": 1}]}
+
+    etag = '"v2"' if change == "etag" else '"v1"'
+    if change == "size":
+        with open(input_path, "a") as f:
+            f.write("120000,1.5,name-0\n")
+    if change == "metadata":
+        job.input_metadata = {**job.input_metadata, "profile": True}
+
+    fresh = checkpoint.plan(job, processor, input_path, CancellationToken(), etag)
+    assert fresh["segments"] == []
+
+
+def test_checkpoint_of_the_same_input_is_reused(input_path):
+    job = make_job(input_path)
+    processor = get_processor(job.job_type)
+    job.checkpoint = checkpoint.plan(job, processor, input_path, CancellationToken(), '"v1"')
+
+    assert checkpoint.plan(job, processor, input_path, CancellationToken(), '"v1"') is job.checkpoint
@@ -0,0 +1,53 @@
+import pytest
+
+from app.processors.csv import columnar
+from app.processors.csv.column_stats import CsvColumnStatsProcessor
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.stats.streaming import ColumnSummary
+
+pytestmark = pytest.mark.skipif(not columnar.HAS_ARROW, reason="needs pyarrow and numpy")
+
+# cells float() and a naive regex disagree on, next to plain numbers and text
+CELLS = ["1_000", " 7 ", "+2", "-.5", "1e3", "1.", "inf", "NaN", "1e400", "١٢", "0x10", "", "abc"]
+
+
+def scan_both(path, **options):
+    args = (str(path), CsvDialect(), True, 5)
+    rows = CsvColumnStatsProcessor.scan_rows(*args, CancellationToken(), ProgressReporter(), **options)
+    batches = CsvColumnStatsProcessor.scan_columnar(*args, CancellationToken(), ProgressReporter(), **options)
+    return rows, batches
+
+
+def as_dicts(summaries: dict) -> dict:
+    return {name: summary.to_dict() for name, summary in summaries.items()}
+
+
+def test_engines_agree_on_repeated_names_and_numbers(tmp_path):
+    path = tmp_path / "input.csv"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("a,b,a,plain\n")
+        for i in range(2_000):
+            cell = CELLS[i % len(CELLS)]
+            f.write(f"text-{i},{cell},{i % 13 - 6},{i * 0.25}\n")
+
+    (row_summaries, row_profiles), (batch_summaries, batch_profiles) = scan_both(path)
+
+    assert list(batch_summaries) == list(row_summaries) == ["a", "b", "plain"]
+    rows, batches = as_dicts(row_summaries), as_dicts(batch_summaries)
+    for name in rows:
+        assert batches[name] == pytest.approx(rows[name]), name
+    # the last "a" column is the numeric one
+    assert rows["a"]["non_numeric_count"] == 0
+    assert {n: p.to_dict() for n, p in batch_profiles.items()} == {n: p.to_dict() for n, p in row_profiles.items()}
+
+
+@pytest.mark.parametrize("cell,numeric", [
+    ("1_000", False), (" 7 ", True), ("\t-1.5e2\n", True), ("\v1", False),
+    ("١٢", False), ("inf", False), ("nan", False), ("1e400", False), (".", False),
+])
+def test_summary_number_rule(cell, numeric):
+    summary = ColumnSummary()
+    summary.add(cell)
+    assert summary.stats.count == int(numeric)
+    assert summary.non_numeric_count == int(not numeric)
@@ -0,0 +1,87 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.models.job import Job
+from app.processors.csv.predicates import Predicate
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.registry import get_processor
+from app.workers.worker import build_artifact_opener, build_payload
+from tests.fakes import FakeStorage
+
+HEADER = ["id", "price", "status", "unit price", "note"]
+ROWS = [
+    ["1", "150", "active", "5", "x"],
+    ["2", "abc", "pending", "12", ""],
+    ["3", "", "closed", "9.99", "  "],
+    ["4", "50", "active"],
+    [],
+    ["5", "100", "pending", "10", "AB-note"],
+]
+
+
+@pytest.mark.parametrize("where,ids", [
+    ("price > 100", ["1"]),
+    # cells that are not numbers match no numeric comparison, != included
+    ("price != 100", ["1", "4"]),
+    ("price not in (150, 50)", ["5"]),
+    ("0 < price <= 100", ["4", "5"]),
+    ('status in ("active", "pending")', ["1", "2", "4", "5"]),
+    ('not (status == "active" or col("unit price") <= 9.99)', ["2", "5"]),
+    # a short row reads "" for the cells it lacks
+    ("blank(note)", ["2", "3", "4"]),
+    ('startswith(note, "AB-") or contains(status, "los")', ["3", "5"]),
+    ('id == "1" and endswith(status, "ive")', ["1"]),
+])
+def test_compiled_predicate(where, ids):
+    batch_filter = Predicate(where).compile(HEADER)
+    assert [row[0] for row in batch_filter(ROWS)] == ids
+
+
+@pytest.mark.parametrize("where", [
+    "__import__('os').system('true')",
+    "price.real > 1",
+    "price > unit",
+    "lower(status) == 'x'",
+    "price + 1 > 2",
+    "",
+])
+def test_predicate_rejects_what_the_grammar_lacks(where):
+    with pytest.raises(ValueError):
+        Predicate(where)
+
+
+def test_predicate_rejects_unknown_columns():
+    with pytest.raises(ValueError, match="not in the CSV header"):
+        Predicate("quantity > 1").compile(HEADER)
+
+
+def test_filter_streams_a_compressed_artifact(tmp_path):
+    input_path = tmp_path / "input"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(ROWS)
+
+    metadata = {"where": 'status == "active"', "columns": ["note", "id"], "output_compression": "gzip"}
+    job = Job(
+        job_type=JobType.CSV_FILTER,
+        input_file_path="data.csv",
+        input_metadata=build_input_metadata(JobType.CSV_FILTER, "data.csv", metadata),
+    )
+    storage, artifacts = FakeStorage(), []
+    payload = build_payload(
+        job, input_path, CancellationToken(), ProgressReporter(),
+        open_artifact=build_artifact_opener(job, storage, artifacts),
+    )
+
+    get_processor(JobType.CSV_FILTER).process(payload)
+
+    [artifact] = artifacts
+    data = gzip.decompress(storage.objects[(settings.S3_OUTPUT_BUCKET, artifact["key"])]).decode()
+    assert list(csv.reader(io.StringIO(data, newline=""))) == [["note", "id"], ["x", "1"], ["", "4"]]
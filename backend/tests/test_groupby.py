@@ -0,0 +1,54 @@
+import csv
+from collections import defaultdict
+
+import pytest
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.models.job import Job
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.registry import get_processor
+from app.workers.worker import build_payload
+
+AGGREGATES = ["count", "sum(amount)", "min(amount)", "max(amount)", "mean(amount)"]
+
+
+@pytest.fixture(autouse=True)
+def small_budget(monkeypatch):
+    monkeypatch.setattr(settings, "CSV_GROUPBY_MEMORY_MB", 1)
+
+
+def test_spilled_groupby_matches_a_dict(tmp_path):
+    # 30k groups of two columns: far more partial aggregates than 1 MB holds
+    input_path = tmp_path / "input"
+    rows = [[f"r{i % 7}", f"c{i % 30_011 % 4_289}", str(i % 1_000 - 500)] for i in range(150_000)]
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["region", "customer", "amount"])
+        writer.writerows(rows)
+
+    job = Job(
+        job_type=JobType.CSV_GROUPBY,
+        input_file_path="data.csv",
+        input_metadata=build_input_metadata(
+            JobType.CSV_GROUPBY, "data.csv", {"group_by": ["region", "customer"], "aggregates": AGGREGATES}
+        ),
+    )
+    result = get_processor(JobType.CSV_GROUPBY).process(
+        build_payload(job, input_path, CancellationToken(), ProgressReporter())
+    )
+
+    amounts = defaultdict(list)
+    for region, customer, amount in rows:
+        amounts[(region, customer)].append(int(amount))
+    expected = {
+        key: {"count": len(values), "sum_amount": sum(values), "min_amount": min(values),
+              "max_amount": max(values), "mean_amount": pytest.approx(sum(values) / len(values))}
+        for key, values in amounts.items()
+    }
+
+    assert result["spilled_to_disk"]
+    assert result["group_count"] == len(expected) > 20_000
+    groups = {(g.pop("region"), g.pop("customer")): g for g in result["groups"]}
+    assert groups == expected
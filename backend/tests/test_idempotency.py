@@ -0,0 +1,123 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.routes import jobs
+from app.schemas.job import JobBulkRequest, JobBulkRetryRequest
+from tests.fakes import FakeIdempotency
+
+KEY = "retry-2026-10-19"
+
+
+class FakeJobs:
+    """JobRepository's bulk operations; `during` runs inside the operation, as an overlapping request would."""
+
+    def __init__(self):
+        self.calls = 0
+        self.during = None
+        self.error = None
+
+    def __call__(self, db) -> "FakeJobs":
+        return self
+
+    def bulk_retry(self, *, reset_retries=False, **criteria):
+        return self._run(criteria), 1
+
+    def bulk_cancel(self, **criteria):
+        return self._run(criteria)
+
+    def _run(self, criteria):
+        self.calls += 1
+        if self.during is not None:
+            self.during()
+        if self.error is not None:
+            raise self.error
+        return list(criteria["job_ids"])
+
+
+class NoQueue:
+    def enqueue_many(self, job_ids) -> None:
+        pass
+
+
+@pytest.fixture
+def repos(monkeypatch):
+    idem, repo = FakeIdempotency(), FakeJobs()
+    monkeypatch.setattr(jobs, "IdempotencyRepository", idem)
+    monkeypatch.setattr(jobs, "JobRepository", repo)
+    monkeypatch.setattr(jobs, "JobQueue", NoQueue)
+    return idem, repo
+
+
+@pytest.fixture
+def request_body():
+    return JobBulkRetryRequest(job_ids=[uuid.uuid4()])
+
+
+def retry(body, response=None):
+    return jobs.bulk_retry_jobs(body, response or Response(), idempotency_key=KEY, db=None)
+
+
+def test_overlapping_request_is_refused_while_the_first_runs(repos, request_body):
+    idem, repo = repos
+    refused = []
+
+    def overlap():
+        with pytest.raises(HTTPException) as e:
+            retry(request_body)
+        refused.append(e.value.status_code)
+
+    repo.during = overlap
+    result = retry(request_body)
+
+    assert refused == [409]
+    assert repo.calls == 1
+    assert idem.get(jobs.BULK_RETRY_SCOPE, KEY).response == result.model_dump(mode="json")
+
+
+def test_finished_request_is_replayed(repos, request_body):
+    _, repo = repos
+    first = retry(request_body)
+
+    response = Response()
+    assert retry(request_body, response) == first
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert repo.calls == 1
+
+
+def test_failed_request_releases_its_key(repos, request_body):
+    idem, repo = repos
+    repo.error = RuntimeError("database went away")
+    with pytest.raises(RuntimeError):
+        retry(request_body)
+    assert idem.get(jobs.BULK_RETRY_SCOPE, KEY) is None
+
+    repo.error = None
+    assert retry(request_body).affected == 1
+    assert repo.calls == 2
+
+
+def test_key_reused_with_another_body(repos, request_body):
+    retry(request_body)
+    with pytest.raises(HTTPException) as e:
+        retry(JobBulkRetryRequest(job_ids=[uuid.uuid4()]))
+    assert e.value.status_code == 422
+
+
+def test_bulk_cancel_reserves_its_key(repos):
+    idem, repo = repos
+    body = JobBulkRequest(job_ids=[uuid.uuid4()])
+    refused = []
+
+    def overlap():
+        with pytest.raises(HTTPException) as e:
+            jobs.bulk_cancel_jobs(body, Response(), idempotency_key=KEY, db=None)
+        refused.append(e.value.status_code)
+
+    repo.during = overlap
+    jobs.bulk_cancel_jobs(body, Response(), idempotency_key=KEY, db=None)
+
+    assert refused == [409]
+    assert repo.calls == 1
+    assert idem.get(jobs.BULK_CANCEL_SCOPE, KEY).response["affected"] == 1
@@ -0,0 +1,62 @@
+import csv
+import io
+from collections import defaultdict
+
+import pytest
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.models.job import Job
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.registry import get_processor
+from app.workers.worker import build_artifact_opener, build_payload
+from tests.fakes import FakeStorage
+
+
+@pytest.fixture(autouse=True)
+def small_budget(monkeypatch):
+    monkeypatch.setattr(settings, "CSV_JOIN_MEMORY_MB", 1)
+
+
+def write_csv(path, header, rows) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_spilled_left_join_matches_a_nested_loop(tmp_path):
+    # a few MB each side; every third left key has no match, some have two
+    left = [[str(i), f"name, {i}"] for i in range(40_000)]
+    right = [[str(i), f"v{i}-{n}"] for i in range(40_000) if i % 3 for n in range(1 + (i % 7 == 0))]
+    input_path = tmp_path / "input"
+    write_csv(input_path, ["id", "name"], left)
+    write_csv(tmp_path / "input-right", ["id", "value"], right)
+
+    metadata = {"right_input": "right.csv", "on": "id", "how": "left"}
+    job = Job(
+        job_type=JobType.CSV_JOIN,
+        input_file_path="left.csv",
+        input_metadata=build_input_metadata(JobType.CSV_JOIN, "left.csv", metadata),
+    )
+    storage, artifacts = FakeStorage(), []
+    payload = build_payload(
+        job, input_path, CancellationToken(), ProgressReporter(),
+        open_artifact=build_artifact_opener(job, storage, artifacts),
+    )
+
+    result = get_processor(JobType.CSV_JOIN).process(payload)
+
+    assert result["spilled"]
+    [artifact] = artifacts
+    data = storage.objects[(settings.S3_OUTPUT_BUCKET, artifact["key"])]
+    header, *rows = csv.reader(io.StringIO(data.decode(), newline=""))
+    assert header == ["id", "name", "value"]
+
+    values = defaultdict(list)
+    for key, value in right:
+        values[key].append(value)
+    expected = [[key, name, value] for key, name in left for value in values.get(key) or [""]]
+    assert sorted(rows) == sorted(expected)
+    assert result["unmatched_left_rows"] == sum(1 for key, _ in left if key not in values)
@@ -0,0 +1,55 @@
+import pytest
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.processors.csv.multi_scan import CsvMultiScanProcessor
+from app.processors.registry import get_processor
+
+
+@pytest.fixture
+def people(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text("id,name,age\n1,ann,30\n2,bob,40\n2,bob,40\n")
+    return str(path)
+
+
+def job_input(path: str, operations: list) -> dict:
+    metadata = build_input_metadata(JobType.CSV_MULTI_SCAN, path, {"operations": operations})
+    return {"input_file_path": path, "input_metadata": metadata}
+
+
+def test_operations_share_one_scan(people):
+    result = CsvMultiScanProcessor().process(
+        job_input(people, ["CSV_ROW_COUNT", {"type": "CSV_COLUMN_STATS"}])
+    )
+
+    assert result["operations"] == ["CSV_ROW_COUNT", "CSV_COLUMN_STATS"]
+    assert result["results"]["CSV_ROW_COUNT"]["rows"] == 4  # header included
+    assert result["results"]["CSV_COLUMN_STATS"]["columns"]["age"]["count"] == 3
+
+
+@pytest.mark.parametrize("operation", ["CSV_MULTI_SCAN", "CSV_SORT", "NDJSON_VALIDATE"])
+def test_operations_without_a_scan_operator_are_rejected(people, operation):
+    processor = CsvMultiScanProcessor()
+    job = job_input(people, ["CSV_ROW_COUNT", operation])
+
+    for call in (
+        lambda: processor.operator(job),
+        lambda: processor.shardable(job["input_metadata"]),
+        lambda: processor.reduce_reads_input(job["input_metadata"]),
+    ):
+        with pytest.raises(ValueError, match="cannot run in a CSV_MULTI_SCAN"):
+            call()
+
+
+def test_operations_do_not_see_the_operations_list(people, monkeypatch):
+    seen = []
+    row_count = get_processor(JobType.CSV_ROW_COUNT)
+    operator = row_count.operator
+    monkeypatch.setattr(row_count, "operator", lambda sub_input: seen.append(sub_input) or operator(sub_input))
+
+    CsvMultiScanProcessor().process(job_input(people, [{"type": "CSV_ROW_COUNT", "extra": 1}]))
+
+    assert "operations" not in seen[0]["input_metadata"]
+    assert seen[0]["input_metadata"]["extra"] == 1
+    assert seen[0]["input_metadata"]["delimiter"] == ","
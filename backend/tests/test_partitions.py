@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.repositories import job_archive_repository
+from app.repositories.job_archive_repository import JobArchiveRepository
+
+# what pg_get_expr() gives for jobs_legacy and for one monthly partition
+BOUNDS = [
+    ("jobs_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-12-01 00:00:00+00')"),
+    ("jobs_p2026_12", "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"),
+    ("jobs_default", "DEFAULT"),
+]
+
+
+class FakeSession:
+    """Answers the partition catalog query with BOUNDS and records everything else."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        if "pg_inherits" not in str(statement):
+            self.statements.append(str(statement))
+        return self
+
+    def all(self):
+        return list(BOUNDS)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def october(monkeypatch):
+    monkeypatch.setattr(job_archive_repository, "utc_now", lambda: datetime(2026, 10, 19, tzinfo=timezone.utc))
+
+
+def test_partitions_reads_bounds():
+    assert JobArchiveRepository(FakeSession()).partitions("jobs")[:2] == [
+        ("jobs_legacy", None, datetime(2026, 12, 1, tzinfo=timezone.utc)),
+        ("jobs_p2026_12", datetime(2026, 12, 1, tzinfo=timezone.utc), datetime(2027, 1, 1, tzinfo=timezone.utc)),
+    ]
+
+
+def test_ensure_partitions_skips_covered_months():
+    db = FakeSession()
+
+    # October and November are in jobs_legacy, December has its partition
+    assert JobArchiveRepository(db).ensure_partitions("jobs", months_ahead=3) == ["jobs_p2027_01"]
+    [create] = db.statements
+    assert "PARTITION OF jobs FOR VALUES FROM ('2027-01-01T00:00:00+00:00') TO ('2027-02-01T00:00:00+00:00')" in create
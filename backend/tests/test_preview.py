@@ -0,0 +1,57 @@
+import bz2
+import gzip
+
+import pytest
+import zstandard
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.processors import preview
+from tests.fakes import FakeStorage
+
+
+def csv_bytes(rows: int, width: int = 800) -> bytes:
+    lines = ["id,text"] + [f"{i},{'x' * width}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def preview_rows(data: bytes, name: str) -> dict:
+    storage = FakeStorage()
+    storage.put("inputs", name, data)
+    metadata = build_input_metadata(JobType.CSV_COLUMN_STATS, name, {})
+    return preview.preview_object(storage, "inputs", name, metadata)["rows"]
+
+
+def test_small_file_is_exact():
+    rows = preview_rows(csv_bytes(100, width=10), "small.csv")
+    assert rows["exact"] and rows["estimate"] == 100
+
+
+@pytest.mark.parametrize("name, compress", [
+    ("big.csv.bz2", bz2.compress),
+    ("big.csv.gz", gzip.compress),
+    ("big.csv.zst", zstandard.compress),
+])
+def test_compressed_head_past_the_budget_is_not_exact(name, compress):
+    # ~16 MB of text, compressed into less than one sample
+    data = compress(csv_bytes(20000))
+    assert len(data) < settings.PREVIEW_SAMPLE_KB * 1024
+
+    rows = preview_rows(data, name)
+
+    assert not rows["exact"]
+    assert rows["low"] is None and rows["high"] is None
+    if rows["estimate"] is not None:
+        assert 15000 < rows["estimate"] < 25000
+
+
+def test_compressed_file_within_the_budget_is_exact():
+    rows = preview_rows(bz2.compress(csv_bytes(500, width=10)), "small.csv.bz2")
+    assert rows["exact"] and rows["estimate"] == 500
+
+
+def test_decompress_head_stops_at_the_limit_for_bz2():
+    data, _, complete = preview.decompress_head(bz2.compress(csv_bytes(20000)), "bz2", 64 * 1024)
+    assert len(data) == 64 * 1024
+    assert not complete
@@ -0,0 +1,73 @@
+import csv
+
+import pytest
+
+from app.processors.base import ScanOperator
+from app.processors.csv import scanner
+from app.processors.csv.scanner import CsvDialect
+from app.processors.execution import CancellationToken, ProgressReporter
+
+
+class Recorder(ScanOperator):
+    def start(self, header):
+        self.header = header
+        self.rows = []
+
+    def consume(self, rows):
+        self.rows.extend(rows)
+
+    def finalize(self):
+        return {}
+
+
+def scan(path, dialect):
+    recorder = Recorder()
+    count = scanner.scan(str(path), dialect, [recorder], CancellationToken(), ProgressReporter())
+    return count, recorder.header, recorder.rows
+
+
+def test_rows_match_csv_reader(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text('\n"id","note"\n1,"two\nlines"\n\n2,"a ""quote"""\n3\n', newline="")
+
+    count, header, rows = scan(path, CsvDialect())
+
+    with open(path, newline="") as f:
+        records = list(csv.reader(f))
+    assert header == ["id", "note"]
+    # blank lines, before the header too, reach the operators like csv.reader's empty rows
+    assert rows == [[], *records[2:]] and count == len(records) - 1
+    assert rows[1] == ["1", "two\nlines"] and rows[-1] == ["3"]
+
+
+def test_dialect_metadata_without_quotes_or_header(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text('a;"b\nc;d\n', newline="")
+
+    dialect = CsvDialect.from_metadata({"delimiter": ";", "quotechar": None, "has_header": False})
+    count, header, rows = scan(path, dialect)
+
+    assert header == ["column_1", "column_2"]
+    assert rows == [["a", '"b'], ["c", "d"]] and count == 2
+
+
+def test_sniffed_dialect_is_written_out(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text("id|name\n1|'x|y'\n2|z\n", newline="")
+
+    metadata = scanner.resolve_metadata({"sniff": True}, str(path))
+
+    assert metadata == {"delimiter": "|", "quotechar": "'", "has_header": True, "sniff": False}
+    assert scan(path, CsvDialect.from_metadata(metadata))[2] == [["1", "x|y"], ["2", "z"]]
+
+
+@pytest.mark.parametrize("metadata", [
+    {"delimiter": ";;"},
+    {"delimiter": "\n"},
+    {"delimiter": "é"},
+    {"quotechar": ","},
+    {"has_header": "yes"},
+])
+def test_invalid_dialect_metadata(metadata):
+    with pytest.raises(ValueError):
+        scanner.dialect_metadata(metadata)
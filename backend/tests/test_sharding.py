@@ -0,0 +1,110 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.core.storage import StorageError
+from app.models.job import Job
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.registry import get_processor
+from app.repositories.job_repository import JobRepository
+from app.workers import sharding
+from app.workers.worker import build_payload
+from tests.fakes import FakeStorage
+
+KEY = "data.csv"
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_SHARD_MIN_MB", 1)
+    monkeypatch.setattr(settings, "JOB_SHARD_MB", 1)
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "input"
+    with open(path, "w") as f:
+        f.write('id,group,note\n')
+        for i in range(200_000):
+            # quoted newlines must not be taken for record boundaries
+            note = '"line one\nline two"' if i % 1000 == 0 else f"n{i % 13}"
+            f.write(f"{i},g{i % 7},{note}\n")
+    return path
+
+
+def make_job(job_type: JobType, **metadata) -> Job:
+    return Job(
+        job_type=job_type,
+        input_file_path=KEY,
+        input_metadata=build_input_metadata(job_type, KEY, metadata),
+        started_at=None,
+    )
+
+
+def run_shards(job, input_path, tmp_path, storage, etag) -> dict:
+    """Split `job`, scan every shard as its worker would, and reduce them."""
+    processor = get_processor(job.job_type)
+    shards = sharding.split(job, input_path, CancellationToken(), etag=etag)
+    assert len(shards) >= 3
+
+    partials, shard_dirs = [], []
+    for shard in shards:
+        workspace = tmp_path / "shards" / str(shard.shard_index)
+        shard_input = sharding.fetch_shard_input(shard, storage, workspace, CancellationToken())
+        payload = build_payload(shard, shard_input, CancellationToken(), ProgressReporter())
+        payload["shard"] = shard.input_metadata["shard"]
+        result = sharding.scan_shard(processor, payload)
+        partials.append(json.loads(json.dumps(result["partial"])))
+        shard_dirs.append(workspace / "artifacts")
+
+    payload = build_payload(job, input_path, CancellationToken(), ProgressReporter())
+    return processor.reduce(payload, partials, shard_dirs)
+
+
+@pytest.mark.parametrize("job_type, metadata", [
+    (JobType.CSV_COLUMN_STATS, {"profile": True}),
+    (JobType.CSV_GROUPBY, {"group_by": "group", "aggregates": ["count", "sum(id)", "max(id)"]}),
+])
+def test_sharded_result_matches_a_single_scan(input_path, tmp_path, job_type, metadata):
+    storage = FakeStorage()
+    etag = storage.put(settings.S3_INPUT_BUCKET, KEY, input_path.read_bytes())
+    job = make_job(job_type, **metadata)
+
+    expected = get_processor(job_type).process(
+        build_payload(job, input_path, CancellationToken(), ProgressReporter())
+    )
+    sharded = run_shards(job, input_path, tmp_path, storage, etag)
+
+    if job_type == JobType.CSV_GROUPBY:
+        # a reduce emits groups partition by partition
+        assert sorted(sharded["groups"], key=lambda g: g["group"]) == expected["groups"]
+    else:
+        for name, stats in expected["columns"].items():
+            assert sharded["columns"][name]["count"] == stats["count"]
+            assert sharded["columns"][name]["distinct_count"] == stats["distinct_count"]
+            assert sharded["columns"][name].get("avg") == pytest.approx(stats.get("avg"))
+
+
+def test_shards_read_the_version_the_parent_split(input_path, tmp_path):
+    storage = FakeStorage()
+    etag = storage.put(settings.S3_INPUT_BUCKET, KEY, input_path.read_bytes())
+    shards = sharding.split(make_job(JobType.CSV_COLUMN_STATS), input_path, CancellationToken(), etag=etag)
+    assert all(shard.input_metadata["shard"]["etag"] == etag for shard in shards)
+
+    # overwritten with different content of the same size while the shards run
+    storage.put(settings.S3_INPUT_BUCKET, KEY, input_path.read_bytes().replace(b"g1", b"g2"))
+
+    with pytest.raises(StorageError):
+        sharding.fetch_shard_input(shards[1], storage, tmp_path / "shard", CancellationToken())
+
+
+def test_bulk_selector_leaves_shards_out():
+    condition = JobRepository(None)._selector(job_ids=[uuid.uuid4()])
+    sql = str(condition.compile(dialect=postgresql.dialect()))
+
+    assert "jobs.parent_job_id IS NULL" in sql
@@ -0,0 +1,62 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+from app.core.enums.job_type import JobType
+from app.core.job_factory import build_input_metadata
+from app.core.settings import settings
+from app.models.job import Job
+from app.processors.execution import CancellationToken, ProgressReporter
+from app.processors.registry import get_processor
+from app.workers.worker import build_artifact_opener, build_payload
+from tests.fakes import FakeStorage
+
+KEY = [{"column": "score", "type": "number", "order": "desc"}, {"column": "id", "type": "number"}]
+
+
+@pytest.fixture(autouse=True)
+def small_budget(monkeypatch):
+    monkeypatch.setattr(settings, "CSV_SORT_MEMORY_MB", 1)
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    # about 2 MB of rows in no particular order
+    path = tmp_path / "input"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "score", "note"])
+        for i in range(60_000):
+            writer.writerow([i * 7919 % 60_000, i * 104_729 % 1_013 / 4, f"note, {i % 17}"])
+    return path
+
+
+def test_spilled_sort_streams_a_compressed_artifact(input_path):
+    job = Job(
+        job_type=JobType.CSV_SORT,
+        input_file_path="data.csv",
+        input_metadata=build_input_metadata(
+            JobType.CSV_SORT, "data.csv", {"key": KEY, "output_compression": "gzip"}
+        ),
+    )
+    storage, artifacts = FakeStorage(), []
+    payload = build_payload(
+        job, input_path, CancellationToken(), ProgressReporter(),
+        open_artifact=build_artifact_opener(job, storage, artifacts),
+    )
+
+    result = get_processor(JobType.CSV_SORT).process(payload)
+
+    assert result["runs"] > 1
+    [artifact] = artifacts
+    assert artifact["content_encoding"] == "gzip"
+    data = gzip.decompress(storage.objects[(settings.S3_OUTPUT_BUCKET, artifact["key"])])
+    assert artifact["plain_bytes"] == len(data)
+
+    with open(input_path, newline="") as f:
+        header, *rows = list(csv.reader(f))
+    expected = [header, *sorted(rows, key=lambda row: (-float(row[1]), int(row[0])))]
+    assert list(csv.reader(io.StringIO(data.decode(), newline=""))) == expected
+    assert result["sorted_rows"] == len(rows)
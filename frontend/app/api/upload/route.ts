@@ -9,6 +9,7 @@
 // Kept for potential external use or testing. Safe to delete when no longer needed.
 import { NextRequest, NextResponse } from "next/server";
 import { getMinioClient, getInputBucket } from "@/lib/minio-client";
+import { ACCEPTED_EXTENSIONS } from "@/lib/constants";
 import { Readable } from "stream";
 
 export async function POST(req: NextRequest) {
@@ -21,9 +22,9 @@ export async function POST(req: NextRequest) {
         }
 
         const ext = file.name.split(".").pop()?.toLowerCase();
-        if (!["json", "csv"].includes(ext || "")) {
+        if (!(ACCEPTED_EXTENSIONS as readonly string[]).includes(ext || "")) {
             return NextResponse.json(
-                { error: "Only .json and .csv files are supported" },
+                { error: `Only ${ACCEPTED_EXTENSIONS.join(", ")} files are supported` },
                 { status: 400 }
             );
         }
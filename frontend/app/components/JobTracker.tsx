@@ -53,7 +53,7 @@ export function JobTracker({ jobId }: JobTrackerProps) {
                 <StatusBadge status={job.status} />
             </div>
 
-            <ProgressBar status={job.status} />
+            <ProgressBar status={job.status} percent={job.percent_complete} />
             <div className="h-1"></div>
 
             {/* Meta info */}
@@ -13,6 +13,7 @@ const STATUS_CONFIG: Record<
     COMPLETED: { label: "Completed", color: "#34d399", bg: "rgba(52,211,153,0.12)" },
     FAILED: { label: "Failed", color: "#f87171", bg: "rgba(248,113,113,0.12)" },
     DEAD: { label: "Dead", color: "#9ca3af", bg: "rgba(156,163,175,0.12)" },
+    CANCELLED: { label: "Cancelled", color: "#64748b", bg: "rgba(100,116,139,0.12)" },
 };
 
 export function StatusBadge({ status }: { status: JobStatus }) {
@@ -1,21 +1,23 @@
 // components/tracker/ProgressBar.tsx
 // Responsibility: render a 3-step progress bar for a job's lifecycle.
-// Pure presentational — receives status, renders nothing else.
+// Pure presentational — receives status (and optional percent), renders nothing else.
 import type { JobStatus } from "@/lib/api";
 import { PROGRESS_STEPS } from "@/lib/constants";
 
 interface ProgressBarProps {
     status: JobStatus;
+    // Share of the input processed, reported while PROCESSING.
+    percent?: number | null;
 }
 
-export function ProgressBar({ status }: ProgressBarProps) {
+export function ProgressBar({ status, percent }: ProgressBarProps) {
     const isFailed = status === "FAILED" || status === "DEAD";
     const stepIndex = PROGRESS_STEPS.indexOf(status as JobStatus);
     const progress = isFailed
         ? 100
         : stepIndex === -1
             ? 0
-            : ((stepIndex + 1) / PROGRESS_STEPS.length) * 100;
+            : ((stepIndex + 1 + stepFraction(status, percent)) / PROGRESS_STEPS.length) * 100;
 
     return (
         <div className="w-full mt-4">
@@ -42,3 +44,9 @@ export function ProgressBar({ status }: ProgressBarProps) {
         </div>
     );
 }
+
+// While PROCESSING, fill part of the way toward the next step.
+function stepFraction(status: JobStatus, percent?: number | null): number {
+    if (status !== "PROCESSING" || percent == null) return 0;
+    return Math.min(Math.max(percent, 0), 100) / 100 * 0.99;
+}
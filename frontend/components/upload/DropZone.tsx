@@ -37,7 +37,7 @@ export function DropZone({ file, fileInputRef, onDrop, onClear }: DropZoneProps)
             <input
                 ref={fileInputRef}
                 type="file"
-                accept=".json,.csv"
+                accept=".json,.csv,.ndjson,.jsonl"
                 style={{ display: "none" }}
                 onChange={(e) => {
                     const f = e.target.files?.[0];
@@ -83,7 +83,7 @@ export function DropZone({ file, fileInputRef, onDrop, onClear }: DropZoneProps)
                         Drag &amp; drop or <span style={{ color: "var(--accent-2)" }}>browse</span>
                     </p>
                     <p style={{ fontSize: "0.7rem", color: "var(--text-dim)", marginTop: 4 }}>
-                        Supports .json and .csv
+                        Supports .json, .csv and .ndjson
                     </p>
                 </>
             )}
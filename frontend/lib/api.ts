@@ -11,14 +11,24 @@ export type JobStatus =
   | "RETRYING"
   | "FAILED"
   | "COMPLETED"
-  | "DEAD";
+  | "DEAD"
+  | "CANCELLED";
 
 export type JobType =
   | "TEST_JOB"
   | "CSV_ROW_COUNT"
   | "CSV_COLUMN_STATS"
   | "CSV_DEDUPLICATE"
-  | "JSON_CANONICALIZE";
+  | "CSV_MULTI_SCAN"
+  | "CSV_TO_PARQUET"
+  | "CSV_SORT"
+  | "CSV_JOIN"
+  | "CSV_GROUPBY"
+  | "CSV_FILTER"
+  | "CSV_INFER_SCHEMA"
+  | "JSON_CANONICALIZE"
+  | "NDJSON_CANONICALIZE"
+  | "NDJSON_VALIDATE";
 
 export interface JobCreateRequest {
   job_type: JobType;
@@ -32,6 +42,13 @@ export interface JobCreateResponse {
   status: JobStatus;
 }
 
+export interface JobProgress {
+  rows_processed: number;
+  bytes_processed: number;
+  total_bytes: number | null;
+  updated_at: string | null;
+}
+
 export interface JobStatusResponse {
   job_id: string;
   job_type: JobType;
@@ -45,6 +62,14 @@ export interface JobStatusResponse {
   updated_at: string;
   next_run_at: string | null;
   finished_at: string | null;
+  cancel_requested_at?: string | null;
+  progress?: JobProgress | null;
+  percent_complete?: number | null;
+  estimated_finish_at?: string | null;
+  parent_job_id?: string | null;
+  shard_index?: number | null;
+  shard_count?: number | null;
+  shards_pending?: number | null;
 }
 
 export interface JobListResponse {
@@ -88,12 +113,30 @@ export async function retryJob(jobId: string): Promise<JobStatusResponse> {
   return res.json();
 }
 
+export async function cancelJob(jobId: string): Promise<JobStatusResponse> {
+  const res = await fetch(`${API_URL}/jobs/${jobId}`, { method: "DELETE" });
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(err.detail || "Failed to cancel job");
+  }
+  return res.json();
+}
+
 export const JOB_TYPE_LABELS: Record<JobType, string> = {
   TEST_JOB: "Test Job",
   CSV_ROW_COUNT: "CSV Row Count",
   CSV_COLUMN_STATS: "CSV Column Stats",
   CSV_DEDUPLICATE: "CSV Deduplicate",
+  CSV_MULTI_SCAN: "CSV Multi-Scan",
+  CSV_TO_PARQUET: "CSV to Parquet",
+  CSV_SORT: "CSV Sort",
+  CSV_JOIN: "CSV Join",
+  CSV_GROUPBY: "CSV Group By",
+  CSV_FILTER: "CSV Filter",
+  CSV_INFER_SCHEMA: "CSV Infer Schema",
   JSON_CANONICALIZE: "JSON Canonicalize",
+  NDJSON_CANONICALIZE: "NDJSON Canonicalize",
+  NDJSON_VALIDATE: "NDJSON Validate",
 };
 
 export const STATUS_ORDER: JobStatus[] = [
@@ -104,6 +147,7 @@ export const STATUS_ORDER: JobStatus[] = [
   "COMPLETED",
   "FAILED",
   "DEAD",
+  "CANCELLED",
 ];
 
-export const TERMINAL_STATUSES: JobStatus[] = ["COMPLETED", "FAILED", "DEAD"];
+export const TERMINAL_STATUSES: JobStatus[] = ["COMPLETED", "FAILED", "DEAD", "CANCELLED"];
@@ -4,7 +4,7 @@
 import type { JobStatus } from "./api";
 
 /** Statuses that mean the job has finished (success or failure). */
-export const TERMINAL_STATUSES: JobStatus[] = ["COMPLETED", "FAILED", "DEAD"];
+export const TERMINAL_STATUSES: JobStatus[] = ["COMPLETED", "FAILED", "DEAD", "CANCELLED"];
 
 /** Ordered sequence of all statuses for display/sorting. */
 export const STATUS_ORDER: JobStatus[] = [
@@ -15,13 +15,14 @@ export const STATUS_ORDER: JobStatus[] = [
     "COMPLETED",
     "FAILED",
     "DEAD",
+    "CANCELLED",
 ];
 
 /** The three progress steps shown in the tracker progress bar. */
 export const PROGRESS_STEPS: JobStatus[] = ["QUEUED", "PROCESSING", "COMPLETED"];
 
 /** Accepted file extensions for job input files. */
-export const ACCEPTED_EXTENSIONS = ["json", "csv"] as const;
+export const ACCEPTED_EXTENSIONS = ["json", "csv", "ndjson", "jsonl"] as const;
 
 /**
  * Files at or below this size are uploaded via a single PUT to /api/minio-upload.
@@ -5,7 +5,7 @@ test-data-generator.py
 Generate large test files for the Resilient Async Job Processing Platform.
 
 Usage:
-    python test-data-generator.py [--type csv|json|both] [--rows N] [--output-dir PATH]
+    python test-data-generator.py [--type csv|json|ndjson|both] [--rows N] [--output-dir PATH]
 
 Defaults:
     --type      both
@@ -20,6 +20,7 @@ Examples:
 Generated files:
     large_test.csv   — Multi-column CSV, useful for CSV_ROW_COUNT / CSV_COLUMN_STATS / CSV_DEDUPLICATE jobs
     large_test.json  — Array of records, useful for JSON_CANONICALIZE jobs
+    large_test.ndjson — One record per line (--type ndjson), useful for NDJSON_* jobs
 """
 
 import csv
@@ -66,6 +67,23 @@ def generate_csv(output_path: str, num_rows: int) -> None:
     print(f"  ✓ CSV done: {size_mb:.1f} MB in {time.time() - start:.1f}s")
 
 
+def random_record(i: int) -> dict:
+    return {
+        "id": i,
+        "sku": f"SKU-{random_string(6).upper()}",
+        "name": f"product_{random_string(8)}",
+        "category": random.choice(CATEGORIES),
+        "price": round(random.uniform(1.0, 9999.99), 2),
+        "quantity": random.randint(0, 10000),
+        "status": random.choice(STATUSES),
+        "tags": [random_string(5) for _ in range(random.randint(1, 5))],
+        "metadata": {
+            "created_at": f"2025-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
+            "source": random_string(10),
+        },
+    }
+
+
 def generate_json(output_path: str, num_rows: int) -> None:
     print(f"Generating JSON with {num_rows:,} records → {output_path}")
     start = time.time()
@@ -74,20 +92,7 @@ def generate_json(output_path: str, num_rows: int) -> None:
     with open(output_path, "w") as f:
         f.write("[\n")
         for i in range(1, num_rows + 1):
-            record = {
-                "id": i,
-                "sku": f"SKU-{random_string(6).upper()}",
-                "name": f"product_{random_string(8)}",
-                "category": random.choice(CATEGORIES),
-                "price": round(random.uniform(1.0, 9999.99), 2),
-                "quantity": random.randint(0, 10000),
-                "status": random.choice(STATUSES),
-                "tags": [random_string(5) for _ in range(random.randint(1, 5))],
-                "metadata": {
-                    "created_at": f"2025-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
-                    "source": random_string(10),
-                },
-            }
+            record = random_record(i)
             suffix = ",\n" if i < num_rows else "\n"
             f.write("  " + json.dumps(record) + suffix)
 
@@ -102,9 +107,26 @@ def generate_json(output_path: str, num_rows: int) -> None:
     print(f"  ✓ JSON done: {size_mb:.1f} MB in {time.time() - start:.1f}s")
 
 
+def generate_ndjson(output_path: str, num_rows: int) -> None:
+    print(f"Generating NDJSON with {num_rows:,} records → {output_path}")
+    start = time.time()
+
+    with open(output_path, "w") as f:
+        for i in range(1, num_rows + 1):
+            f.write(json.dumps(random_record(i)) + "\n")
+
+            if i % 10_000 == 0:
+                elapsed = time.time() - start
+                pct = i / num_rows * 100
+                print(f"  {pct:.0f}% ({i:,} records) — {elapsed:.1f}s elapsed")
+
+    size_mb = os.path.getsize(output_path) / 1024 / 1024
+    print(f"  ✓ NDJSON done: {size_mb:.1f} MB in {time.time() - start:.1f}s")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Generate large test files for the platform")
-    parser.add_argument("--type", choices=["csv", "json", "both"], default="both",
+    parser.add_argument("--type", choices=["csv", "json", "ndjson", "both"], default="both",
                         help="Type of file to generate (default: both)")
     parser.add_argument("--rows", type=int, default=700_000,
                         help="Number of rows/records (default: 700000 → ~600 MB CSV)")
@@ -133,6 +155,11 @@ def main() -> None:
         generate_json(path, args.rows)
         generated.append(path)
 
+    if args.type == "ndjson":
+        path = os.path.join(args.output_dir, "large_test.ndjson")
+        generate_ndjson(path, args.rows)
+        generated.append(path)
+
     print(f"\n{'='*55}")
     print(" Generated files:")
     for p in generated: